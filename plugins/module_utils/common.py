@@ -19,15 +19,34 @@ Utility functions for use by more than one Ansible module.
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
+import base64
+import copy
+import gzip
+import hashlib
+import json
 import logging
+import logging.handlers
+import os
 import traceback
 import platform
+import random
+import re
 import sys
+import tempfile
+import threading
+import time
+import uuid
+import zlib
+from datetime import datetime
 
 from ansible.module_utils import six
+from ansible.module_utils.six.moves import queue
 
 try:
-    from zhmcclient import Session, ClientAuthError
+    from zhmcclient import Session, Job, ClientAuthError, NotFound, \
+        StatusTimeout, HTTPError
+    import zhmcclient
+    from zhmcclient import ConnectionError as HMCConnectionError
     IMP_ZHMCCLIENT_ERR = None
 except ImportError:
     IMP_ZHMCCLIENT_ERR = traceback.format_exc()
@@ -38,6 +57,12 @@ try:
 except ImportError:
     IMP_ZHMCCLIENT_MOCK_ERR = traceback.format_exc()
 
+try:
+    import fcntl
+except ImportError:
+    # Not available on Windows; the request throttle is then disabled
+    fcntl = None
+
 
 class Error(Exception):
     """
@@ -68,6 +93,14 @@ class VersionError(Error):
     pass
 
 
+class ReplayError(Error):
+    """
+    Indicates that a replayed session has no recorded result for an HTTP
+    request.
+    """
+    pass
+
+
 # Partition status values that may happen after Partition.start()
 START_END_STATUSES = ('active', 'degraded')
 
@@ -92,6 +125,99 @@ LPAR_LOADED_END_STATUSES = ('operating', 'acceptable', 'exceptions')
 # TODO: Confirm and then simplify by removing this.
 LPAR_BAD_STATUSES = tuple()
 
+# Default for the maximum number of concurrently running HMC operations
+DEFAULT_MAX_CONCURRENCY = 10
+
+# Name of the Python logger for the common module utilities
+COMMON_LOGGER_NAME = 'zhmc_common'
+
+# Default hard timeout in seconds for waiting for a partition status
+DEFAULT_STATUS_TIMEOUT = 900
+
+# Upper bounds in seconds of the buckets of the wait histograms
+WAIT_HISTOGRAM_BUCKETS = (1, 2, 5, 10, 30, 60, 120, 300, 600)
+
+# Default path name of the file with the historical operation durations
+DEFAULT_WAIT_HISTORY_FILE = os.path.join(
+    tempfile.gettempdir(), 'zhmc_ansible_wait_history.json')
+
+# Environment variables that enable throttling of the HMC requests of all
+# module processes on the Ansible controller, per HMC
+THROTTLE_CONCURRENCY_ENVVAR = 'ZHMC_MAX_CONCURRENT_REQUESTS'
+THROTTLE_RATE_ENVVAR = 'ZHMC_MAX_REQUESTS_PER_SECOND'
+
+# Default directory for the lock files of the request throttle
+DEFAULT_THROTTLE_DIR = os.path.join(
+    tempfile.gettempdir(), 'zhmc_ansible_throttle')
+
+# Default maximum time in seconds for waiting for a free slot of the request
+# throttle
+DEFAULT_THROTTLE_TIMEOUT = 600
+
+# Environment variable with the directory of the name-URI cache files. An
+# empty value disables the cache.
+URI_CACHE_DIR_ENVVAR = 'ZHMC_URI_CACHE_DIR'
+
+# Default directory of the name-URI cache files
+DEFAULT_URI_CACHE_DIR = os.path.join(
+    tempfile.gettempdir(), 'zhmc_ansible_uri_cache')
+
+# Environment variables for the retry policy for transient HMC errors
+RETRY_ATTEMPTS_ENVVAR = 'ZHMC_RETRY_ATTEMPTS'
+RETRY_BACKOFF_ENVVAR = 'ZHMC_RETRY_BACKOFF'
+
+# Defaults for the retry policy
+DEFAULT_RETRY_ATTEMPTS = 3
+DEFAULT_RETRY_BACKOFF = 1.0
+
+# Log levels for the 'log_level' and 'hmc_log_level' module parameters
+LOG_LEVELS = {
+    'debug': logging.DEBUG,
+    'info': logging.INFO,
+    'warning': logging.WARNING,
+    'error': logging.ERROR,
+}
+
+# Environment variables for the log file: The maximum length of a log message
+# (longer messages are truncated), and the size at which the log file is
+# rotated with the number of rotated log files to keep
+LOG_MAX_LENGTH_ENVVAR = 'ZHMC_LOG_MAX_LENGTH'
+LOG_MAX_BYTES_ENVVAR = 'ZHMC_LOG_MAX_BYTES'
+LOG_BACKUP_COUNT_ENVVAR = 'ZHMC_LOG_BACKUP_COUNT'
+
+# Defaults for the log file
+DEFAULT_LOG_MAX_LENGTH = 10000
+DEFAULT_LOG_BACKUP_COUNT = 5
+
+# Environment variables for the format of the log file ('text' or 'json'),
+# and for the correlation ID of the module invocation in the JSON format
+LOG_FORMAT_ENVVAR = 'ZHMC_LOG_FORMAT'
+LOG_CORRELATION_ID_ENVVAR = 'ZHMC_LOG_CORRELATION_ID'
+
+# Environment variables with the path name of a session cassette file into
+# which the HTTP requests of the session are recorded, or from which they are
+# replayed instead of communicating with the HMC
+SESSION_RECORD_ENVVAR = 'ZHMC_SESSION_RECORD'
+SESSION_REPLAY_ENVVAR = 'ZHMC_SESSION_REPLAY'
+
+# Pattern for the names of the properties in the request bodies and results
+# of HMC requests whose values are not stored in session cassette files
+# (passwords, the session ID and the session credential of a logon)
+SESSION_CASSETTE_SECRETS = re.compile(
+    r'password|^api-session$|^session-credential$')
+
+# Value that replaces the values of secret properties in session cassettes
+SESSION_CASSETTE_REDACTED = '********'
+
+# Name of the logger for the method, URI, status and duration of each HMC
+# request. It logs at the info level and uses the 'hmc_log_level' parameter.
+REQUEST_LOGGER_NAME = COMMON_LOGGER_NAME + '.requests'
+
+# HTTP status codes of HMC errors that are considered transient:
+# 409: The object is busy or in a transitional state
+# 503: The HMC is temporarily unavailable
+TRANSIENT_HTTP_STATUSES = (409, 503)
+
 
 def common_fail_on_import_errors(module):
     """
@@ -124,6 +250,670 @@ def missing_required_lib(library, reason=None, url=None):
     return msg
 
 
+class RequestThrottle(object):
+    """
+    Throttle for the HMC requests of all processes on the local system that
+    use the same HMC.
+
+    The throttle is shared across processes through lock files in a
+    directory per HMC host:
+
+    * The number of concurrent requests is limited by a set of slot files, of
+      which each request locks one. The locks are released by the operating
+      system when a process ends, so a killed process does not leak slots.
+
+    * The request rate is limited by a file with the earliest time for the
+      next request, which is updated under an exclusive lock.
+
+    The throttle is reentrant per thread, so that requests that are issued
+    while performing a request (e.g. polling the job of a synchronous
+    operation) do not deadlock.
+
+    If the lock files cannot be used, requests are not throttled.
+    """
+
+    def __init__(self, hmc_host, max_concurrent_requests=None,
+                 max_requests_per_second=None, directory=DEFAULT_THROTTLE_DIR,
+                 poll_interval=0.05, timeout=DEFAULT_THROTTLE_TIMEOUT):
+        """
+        Parameters:
+          hmc_host (str): HMC host, for keying the throttle.
+          max_concurrent_requests (int): Maximum number of concurrent
+            requests to the HMC, or None for no limit.
+          max_requests_per_second (float): Maximum rate of requests to the
+            HMC, or None for no limit.
+          directory (str): Directory for the lock files. A subdirectory for
+            the HMC host is created in it.
+          poll_interval (float): Average time in seconds between attempts to
+            get a free slot.
+          timeout (float): Maximum time in seconds for waiting for a free
+            slot.
+        """
+        self.hmc_host = hmc_host
+        self.max_concurrent_requests = max_concurrent_requests
+        self.max_requests_per_second = max_requests_per_second
+        self.directory = os.path.join(
+            directory, re.sub(r'[^\w.-]', '_', hmc_host))
+        self.poll_interval = poll_interval
+        self.timeout = timeout
+        self.requests = 0
+        self.throttled_requests = 0
+        self.wait_time = 0.0
+        self._enabled = fcntl is not None
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        if self._enabled:
+            try:
+                os.makedirs(self.directory)
+            except OSError:
+                self._enabled = os.path.isdir(self.directory)
+
+    def _acquire_slot(self):
+        """
+        Lock a free slot file and return its file descriptor, waiting until a
+        slot is free.
+
+        Raises:
+          Error: No slot became free within the timeout.
+        """
+        end_time = time.time() + self.timeout
+        while True:
+            for index in range(self.max_concurrent_requests):
+                slot_file = os.path.join(
+                    self.directory, 'slot-{0}.lock'.format(index))
+                fd = os.open(slot_file, os.O_RDWR | os.O_CREAT, 0o600)
+                try:
+                    fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                    return fd
+                except (IOError, OSError):
+                    os.close(fd)
+            if time.time() >= end_time:
+                raise Error(
+                    "Timed out after {0} s waiting for one of the {1} slots "
+                    "of the request throttle for HMC {2} in {3}".
+                    format(self.timeout, self.max_concurrent_requests,
+                           self.hmc_host, self.directory))
+            time.sleep(self.poll_interval * random.uniform(0.5, 1.5))
+
+    def _wait_for_rate(self):
+        """
+        Reserve the next request time according to the rate limit, and wait
+        until it has come.
+        """
+        rate_file = os.path.join(self.directory, 'rate')
+        fd = os.open(rate_file, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            content = os.read(fd, 64)
+            try:
+                next_time = float(content)
+            except ValueError:
+                next_time = 0.0
+            now = time.time()
+            start = max(now, next_time)
+            os.lseek(fd, 0, os.SEEK_SET)
+            os.ftruncate(fd, 0)
+            next_time = start + 1.0 / self.max_requests_per_second
+            os.write(fd, six.b(repr(next_time)))
+        finally:
+            os.close(fd)  # also releases the lock
+        if start > now:
+            time.sleep(start - now)
+
+    def _enter(self):
+        """
+        Wait until a request may be performed, and return the file descriptor
+        of the locked slot file, or None.
+        """
+        start = time.time()
+        fd = None
+        try:
+            if self.max_concurrent_requests:
+                fd = self._acquire_slot()
+            if self.max_requests_per_second:
+                self._wait_for_rate()
+        except (IOError, OSError):
+            # Lock files cannot be used; do not throttle
+            if fd is not None:
+                os.close(fd)
+                fd = None
+            self._enabled = False
+        wait_time = time.time() - start
+        with self._stats_lock:
+            self.requests += 1
+            self.wait_time += wait_time
+            if wait_time >= 0.001:
+                self.throttled_requests += 1
+        return fd
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call the function that performs an HMC request, when the throttle
+        allows it.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth or not self._enabled:
+            return func(*args, **kwargs)
+        fd = self._enter()
+        self._local.depth = depth + 1
+        try:
+            return func(*args, **kwargs)
+        finally:
+            self._local.depth = depth
+            if fd is not None:
+                os.close(fd)  # also releases the lock
+
+    def wrap(self, session):
+        """
+        Throttle the HTTP methods of a zhmcclient session object.
+
+        The completion of asynchronous jobs of synchronously performed
+        operations is waited for outside of the throttle, so that a
+        long-running operation does not hold a slot while its job is polled.
+
+        A session that is already throttled is not wrapped again, because
+        nested throttles would each hold a slot for the same request.
+        """
+        if isinstance(getattr(session, 'zhmc_throttle', None),
+                      RequestThrottle):
+            return
+        orig_get = session.get
+        orig_post = session.post
+        orig_delete = session.delete
+        faked = isinstance(session, FakedSession)
+
+        def get(*args, **kwargs):
+            "Throttled GET"
+            return self.call(orig_get, *args, **kwargs)
+
+        def post(*args, **kwargs):
+            "Throttled POST"
+            if faked or not kwargs.get('wait_for_completion', False):
+                return self.call(orig_post, *args, **kwargs)
+            operation_timeout = kwargs.pop('operation_timeout', None)
+            kwargs['wait_for_completion'] = False
+            result = self.call(orig_post, *args, **kwargs)
+            if isinstance(result, Job):
+                return result.wait_for_completion(operation_timeout)
+            return result
+
+        def delete(*args, **kwargs):
+            "Throttled DELETE"
+            return self.call(orig_delete, *args, **kwargs)
+
+        session.get = get
+        session.post = post
+        session.delete = delete
+        session.zhmc_throttle = self
+
+    def stats(self):
+        """
+        Return the throttle statistics, as a dict.
+        """
+        with self._stats_lock:
+            return dict(
+                requests=self.requests,
+                throttled_requests=self.throttled_requests,
+                wait_time=round(self.wait_time, 3),
+            )
+
+
+def positive_envvar(envvar, conv):
+    """
+    Return the value of an environment variable converted with the
+    conversion function, or None if it is not set.
+
+    Raises:
+      ParameterError: The value is not a positive number.
+    """
+    value = os.environ.get(envvar, None)
+    if not value:
+        return None
+    try:
+        result = conv(value)
+        if result <= 0:
+            raise ValueError()
+    except ValueError:
+        raise ParameterError(
+            "Environment variable {0} must be a positive number, "
+            "but is: {1!r}".format(envvar, value))
+    return result
+
+
+def request_throttle(hmc_host):
+    """
+    Return a request throttle for the HMC host as configured by the
+    environment variables THROTTLE_CONCURRENCY_ENVVAR and
+    THROTTLE_RATE_ENVVAR, or None if throttling is not configured.
+
+    Raises:
+      ParameterError: Invalid value of an environment variable.
+    """
+    max_concurrent_requests = positive_envvar(
+        THROTTLE_CONCURRENCY_ENVVAR, int)
+    max_requests_per_second = positive_envvar(THROTTLE_RATE_ENVVAR, float)
+    if not max_concurrent_requests and not max_requests_per_second:
+        return None
+    return RequestThrottle(
+        hmc_host,
+        max_concurrent_requests=max_concurrent_requests,
+        max_requests_per_second=max_requests_per_second)
+
+
+class NameUriCache(object):
+    """
+    Persistent cache of the URIs of HMC resources by name, for finding
+    resources without listing them.
+
+    The cache is a JSON file per HMC host that is shared by all processes on
+    the local system. Cached URIs may be outdated (e.g. when a resource has
+    been deleted and re-created), so they must be validated when they are
+    used, and the entry must be removed if the resource no longer exists
+    (see find_partition()).
+
+    If the cache file cannot be written, the cache is not persisted.
+    """
+
+    def __init__(self, hmc_host, directory=DEFAULT_URI_CACHE_DIR):
+        """
+        Parameters:
+          hmc_host (str): HMC host, for keying the cache file.
+          directory (str): Directory for the cache file.
+        """
+        self.hmc_host = hmc_host
+        self.directory = directory
+        self.filename = os.path.join(
+            directory, re.sub(r'[^\w.-]', '_', hmc_host) + '.json')
+        self.hits = 0
+        self.misses = 0
+        self._entries = None
+
+    def _read(self):
+        """
+        Read the cache file and return its entries, or an empty dict if it
+        does not exist or cannot be read.
+        """
+        try:
+            with open(self.filename) as fp:
+                entries = json.load(fp)
+        except (IOError, OSError, ValueError):
+            return {}
+        return entries if isinstance(entries, dict) else {}
+
+    def _write(self, key, uri):
+        """
+        Set the entry for the key in the cache file, or remove it if uri is
+        None. The file is re-read under an exclusive lock, so that the
+        entries that other processes have written in the meantime are kept.
+        """
+        try:
+            if not os.path.isdir(self.directory):
+                os.makedirs(self.directory)
+            fd = os.open(
+                self.filename + '.lock', os.O_RDWR | os.O_CREAT, 0o600)
+            try:
+                if fcntl is not None:
+                    fcntl.flock(fd, fcntl.LOCK_EX)
+                entries = self._read()
+                if uri is None:
+                    entries.pop(key, None)
+                else:
+                    entries[key] = uri
+                tmp_filename = '{0}.{1}'.format(self.filename, os.getpid())
+                with open(tmp_filename, 'w') as fp:
+                    json.dump(entries, fp)
+                os.rename(tmp_filename, self.filename)
+            finally:
+                os.close(fd)
+        except (IOError, OSError):
+            pass
+
+    def get(self, key):
+        """
+        Return the cached URI for the key, or None.
+        """
+        if self._entries is None:
+            self._entries = self._read()
+        uri = self._entries.get(key)
+        if uri is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return uri
+
+    def set(self, key, uri):
+        """
+        Cache the URI for the key.
+        """
+        if self._entries is None:
+            self._entries = self._read()
+        if self._entries.get(key) != uri:
+            self._entries[key] = uri
+            self._write(key, uri)
+
+    def delete(self, key):
+        """
+        Remove the entry for the key, e.g. because its URI is outdated.
+        """
+        if self._entries is None:
+            self._entries = self._read()
+        if self._entries.pop(key, None) is not None:
+            self._write(key, None)
+
+
+def uri_cache(hmc_host, faked=False):
+    """
+    Return the name-URI cache for the HMC host in the directory specified by
+    the environment variable URI_CACHE_DIR_ENVVAR, or None if the cache is
+    disabled.
+
+    For a faked session, the cache is used only if the environment variable
+    is set, because the resources of a faked HMC do not persist.
+    """
+    directory = os.environ.get(URI_CACHE_DIR_ENVVAR, None)
+    if directory is None and not faked:
+        directory = DEFAULT_URI_CACHE_DIR
+    if not directory:
+        return None
+    return NameUriCache(hmc_host, directory)
+
+
+def _success_status(method, result):
+    """
+    Return the HTTP status code that is implied by the method and the result
+    of a successful HTTP request of a zhmcclient session object, which does
+    not return the HTTP status code.
+    """
+    if method == 'GET':
+        return 200
+    if method == 'DELETE':
+        return 204
+    if isinstance(result, Job):
+        return 202
+    if result is None:
+        return 204
+    if isinstance(result, dict) and 'object-uri' in result:
+        return 201
+    return 200
+
+
+def log_requests(session):
+    """
+    Log the method, URI, HTTP status and duration of each HTTP request of a
+    zhmcclient session object to the REQUEST_LOGGER_NAME logger.
+
+    The status is the HTTP status code of a failed request, the HTTP status
+    code implied by the method and result of a successful request (see
+    _success_status()), and `None` for requests that failed without an HTTP
+    response.
+
+    Wrapping a session object again has no effect.
+    """
+    if getattr(session, 'zhmc_log_requests', False):
+        return
+    logger = logging.getLogger(REQUEST_LOGGER_NAME)
+
+    def wrap_method(method, func):
+
+        def logged_func(*args, **kwargs):
+            "Logged HTTP method"
+            if not logger.isEnabledFor(logging.INFO):
+                return func(*args, **kwargs)
+            uri = args[0] if args else kwargs.get('uri')
+            status = None
+            error = None
+            start = time.time()
+            try:
+                result = func(*args, **kwargs)
+                status = _success_status(method, result)
+                return result
+            except Exception as exc:
+                error = exc.__class__.__name__
+                status = getattr(exc, 'http_status', None)
+                raise
+            finally:
+                duration = round(time.time() - start, 3)
+                logger.info(
+                    "HMC request %s %s: status %s, error %s, duration %s s",
+                    method, uri, status, error, duration,
+                    extra=dict(zhmc_request=dict(
+                        method=method, uri=uri, status=status, error=error,
+                        duration=duration)))
+
+        return logged_func
+
+    session.get = wrap_method('GET', session.get)
+    session.post = wrap_method('POST', session.post)
+    session.delete = wrap_method('DELETE', session.delete)
+    session.zhmc_log_requests = True
+
+
+class SessionCassette(object):
+    """
+    A cassette with the HTTP requests of a zhmcclient session and their
+    results.
+
+    The requests of a session can be recorded into the cassette, and the
+    cassette can be saved to a file. A session can then replay the results
+    from the file, without communicating with the HMC. Replayed requests are
+    matched by method, URI and body; requests with the same method, URI and
+    body get the results in the order they were recorded.
+
+    The values of secret properties (see SESSION_CASSETTE_SECRETS) in the
+    request bodies and results, e.g. the password in the body of the logon
+    request, are redacted when they are recorded, and are ignored when
+    requests are matched for replaying.
+
+    If the file name ends with '.gz', the file is compressed with gzip.
+    """
+
+    def __init__(self, filename, interactions=None):
+        """
+        Parameters:
+
+            filename (string): Path name of the cassette file.
+
+            interactions (list of dict): Recorded interactions, each with
+              items 'method', 'uri', 'body' and either 'result', 'job' or
+              'error'.
+        """
+        self.filename = filename
+        self.interactions = interactions or []
+        self.mode = None
+        self.replayed = 0
+        self._results = None
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @staticmethod
+    def _request(method, args, kwargs):
+        """
+        Return the URI and the body of an HTTP request from the arguments of
+        the zhmcclient session method.
+        """
+        uri = args[0] if args else kwargs.get('uri')
+        body = None
+        if method == 'POST':
+            body = args[1] if len(args) > 1 else kwargs.get('body')
+        return uri, body
+
+    @classmethod
+    def _redact(cls, value):
+        """
+        Return a copy of a request body or result in which the values of
+        secret properties are redacted.
+        """
+        if isinstance(value, dict):
+            return dict(
+                (name, SESSION_CASSETTE_REDACTED
+                 if SESSION_CASSETTE_SECRETS.search(name) and
+                 item is not None else cls._redact(item))
+                for name, item in value.items())
+        if isinstance(value, list):
+            return [cls._redact(item) for item in value]
+        return value
+
+    @classmethod
+    def _key(cls, method, uri, body):
+        return method, uri, json.dumps(cls._redact(body), sort_keys=True)
+
+    def record(self, session):
+        """
+        Record the HTTP requests of a zhmcclient session object.
+
+        HTTP requests that are performed by another HTTP request (e.g. when
+        waiting for the completion of an asynchronous operation) are not
+        recorded, because their result is part of the recorded result of the
+        outer request.
+        """
+
+        def wrap_method(method, func):
+
+            def recorded_func(*args, **kwargs):
+                "Recorded HTTP method"
+                depth = getattr(self._local, 'depth', 0)
+                if depth > 0:
+                    return func(*args, **kwargs)
+                uri, body = self._request(method, args, kwargs)
+                item = dict(method=method, uri=uri, body=self._redact(body))
+                self._local.depth = depth + 1
+                try:
+                    result = func(*args, **kwargs)
+                except zhmcclient.Error as exc:
+                    item['error'] = dict(
+                        cls=exc.__class__.__name__, message=str(exc),
+                        body=self._redact(getattr(exc, '_body', None)))
+                    raise
+                else:
+                    if isinstance(result, Job):
+                        item['job'] = dict(
+                            uri=result.uri, op_method=result.op_method,
+                            op_uri=result.op_uri)
+                    else:
+                        item['result'] = self._redact(result)
+                    return result
+                finally:
+                    self._local.depth = depth
+                    with self._lock:
+                        self.interactions.append(item)
+
+            return recorded_func
+
+        session.get = wrap_method('GET', session.get)
+        session.post = wrap_method('POST', session.post)
+        session.delete = wrap_method('DELETE', session.delete)
+        session.zhmc_cassette = self
+        self.mode = 'record'
+
+    def replay(self, session):
+        """
+        Replace the HTTP methods of a zhmcclient session object with methods
+        that return the recorded results.
+
+        Raises (in the replaced methods):
+          ReplayError: There is no recorded result for the request.
+          zhmcclient.Error: The recorded error of the request.
+        """
+        self._results = {}
+        for item in self.interactions:
+            key = self._key(item['method'], item['uri'], item['body'])
+            self._results.setdefault(key, []).append(item)
+        self._results = dict(
+            (key, list(reversed(items)))
+            for key, items in self._results.items())
+
+        def wrap_method(method):
+
+            def replayed_func(*args, **kwargs):
+                "Replayed HTTP method"
+                uri, body = self._request(method, args, kwargs)
+                with self._lock:
+                    items = self._results.get(self._key(method, uri, body))
+                    if not items:
+                        raise ReplayError(
+                            "Session cassette {0} has no recorded result "
+                            "for request {1} {2}".
+                            format(self.filename, method, uri))
+                    item = items.pop()
+                    self.replayed += 1
+                if 'error' in item:
+                    raise self._error(item['error'])
+                if 'job' in item:
+                    job = item['job']
+                    return Job(session, job['uri'], job['op_method'],
+                               job['op_uri'])
+                return copy.deepcopy(item['result'])
+
+            return replayed_func
+
+        session.get = wrap_method('GET')
+        session.post = wrap_method('POST')
+        session.delete = wrap_method('DELETE')
+        session.zhmc_cassette = self
+        self.mode = 'replay'
+
+    def _error(self, error):
+        """
+        Return the exception for a recorded error.
+        """
+        cls = getattr(zhmcclient, error['cls'], None)
+        if cls is not None and issubclass(cls, HTTPError):
+            return cls(error['body'])
+        if cls is not None and issubclass(cls, HMCConnectionError):
+            return cls(error['message'], None)
+        return ReplayError("Recorded error for the request: {0}: {1}".
+                           format(error['cls'], error['message']))
+
+    def stats(self):
+        """
+        Return the statistics of the cassette, as a dict.
+        """
+        with self._lock:
+            stats = dict(recorded=len(self.interactions))
+            if self.mode == 'replay':
+                stats['replayed'] = self.replayed
+                stats['remaining'] = sum(
+                    len(items) for items in self._results.values())
+            return stats
+
+    @staticmethod
+    def _open(filename, mode):
+        if filename.endswith('.gz'):
+            return gzip.open(filename, mode if six.PY2 else mode + 't')
+        return open(filename, mode)
+
+    def save(self):
+        """
+        Save the recorded interactions to the cassette file.
+        """
+        directory, basename = os.path.split(self.filename)
+        tmp_file = os.path.join(
+            directory, ".{0}.{1}".format(os.getpid(), basename))
+        with self._lock:
+            data = dict(version=1, interactions=self.interactions)
+            with self._open(tmp_file, 'w') as fp:
+                json.dump(data, fp, separators=(',', ':'))
+        os.rename(tmp_file, self.filename)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Load a cassette from a cassette file.
+
+        Raises:
+          ParameterError: The cassette file cannot be read.
+        """
+        try:
+            with cls._open(filename, 'r') as fp:
+                data = json.load(fp)
+            interactions = data['interactions']
+        except (IOError, OSError, ValueError, KeyError, TypeError) as exc:
+            raise ParameterError(
+                "Cannot read session cassette file {0}: {1}".
+                format(filename, exc))
+        return cls(filename, interactions)
+
+
 def open_session(params):
     """
     Open a session with the HMC and validate session-related parameters.
@@ -148,6 +938,27 @@ def open_session(params):
       returned that is set up for this existing HMC session. That HMC session
       will not be logged off in close_session().
 
+    If the environment variables THROTTLE_CONCURRENCY_ENVVAR or
+    THROTTLE_RATE_ENVVAR are set, the HTTP methods of the returned session
+    are throttled by a RequestThrottle that is shared by all processes on
+    the local system that use the same HMC.
+
+    The GET requests of the returned session are retried on transient errors
+    according to the retry policy returned by default_retry_policy().
+
+    Each HTTP request of the returned session is logged by log_requests().
+
+    If the environment variable SESSION_RECORD_ENVVAR is set, the HTTP
+    requests of the returned session are recorded into a SessionCassette
+    that is saved to that file in close_session(). If the environment
+    variable SESSION_REPLAY_ENVVAR is set (and no faked session is used),
+    the HTTP requests of the returned session are replayed from that
+    cassette file, without communicating with the HMC.
+
+    The returned session has the name-URI cache returned by uri_cache() in
+    its 'zhmc_uri_cache' attribute, for use by find_cpc() and
+    find_partition().
+
     Parameters:
       params (dict): Module parameters, with these items:
         - hmc_host (str): HMC host name or IP address.
@@ -172,6 +983,14 @@ def open_session(params):
                 "object if specified, but is of type {0}".
                 format(type(faked_session)))
         logoff = False
+        record_session(faked_session)
+        log_requests(faked_session)
+        throttle = request_throttle(params['hmc_host'])
+        if throttle:
+            throttle.wrap(faked_session)
+        default_retry_policy().wrap(faked_session)
+        faked_session.zhmc_uri_cache = uri_cache(
+            params['hmc_host'], faked=True)
         return faked_session, logoff
 
     hmc_host = params['hmc_host']
@@ -212,17 +1031,60 @@ def open_session(params):
     session = Session(
         hmc_host, userid, password, verify_cert=verify_cert,
         session_id=session_id)
+    replay_file = os.environ.get(SESSION_REPLAY_ENVVAR, None)
+    if replay_file:
+        SessionCassette.load(replay_file).replay(session)
+        logoff = False
+    else:
+        record_session(session)
+    log_requests(session)
+    throttle = request_throttle(hmc_host)
+    if throttle:
+        throttle.wrap(session)
+    default_retry_policy().wrap(session)
+    session.zhmc_uri_cache = uri_cache(hmc_host)
     return session, logoff
 
 
+def record_session(session):
+    """
+    Record the HTTP requests of a zhmcclient session object into a
+    SessionCassette, if the environment variable SESSION_RECORD_ENVVAR is set.
+    """
+    record_file = os.environ.get(SESSION_RECORD_ENVVAR, None)
+    if record_file:
+        SessionCassette(record_file).record(session)
+
+
 def close_session(session, logoff):
     """
     Close a session with the HMC.
 
+    If the session is throttled, the throttle statistics are logged. If the
+    session is retried, the retry statistics are logged.
+
+    If the session is recorded, the session cassette is saved. The statistics
+    of a recorded or replayed session are logged.
+
     Parameters:
       session (zhmcclient.Session): The session object to close.
       logoff (bool): Indicator to logoff the session.
     """
+    throttle = getattr(session, 'zhmc_throttle', None)
+    if throttle:
+        logging.getLogger(COMMON_LOGGER_NAME).debug(
+            "Request throttle for HMC %s: %r", throttle.hmc_host,
+            throttle.stats())
+    retry_policy = getattr(session, 'zhmc_retry', None)
+    if retry_policy:
+        logging.getLogger(COMMON_LOGGER_NAME).debug(
+            "Retries of HMC requests: %r", retry_policy.stats())
+    cassette = getattr(session, 'zhmc_cassette', None)
+    if cassette:
+        if cassette.mode == 'record':
+            cassette.save()
+        logging.getLogger(COMMON_LOGGER_NAME).debug(
+            "Session cassette %s: %r", cassette.filename, cassette.stats())
     if logoff:
         try:
             session.logoff()
@@ -305,6 +1167,337 @@ def eq_mac(mac_actual, mac_new, prop_name):
     return mac_actual == mac_new
 
 
+class PropertyFreshness(object):
+    """
+    Tracks which properties of a zhmcclient resource object are current, i.e.
+    have been retrieved from the HMC during the module run and have not been
+    invalidated by an operation on the resource since then.
+
+    The tracker is kept on the resource object (see of()), so that all
+    functions that operate on the same resource object share it. That way,
+    each set of properties is retrieved at most once per module run, unless
+    the resource is changed in between.
+    """
+
+    # Name of the attribute of the resource object with the tracker
+    ATTR = 'zhmc_freshness'
+
+    def __init__(self):
+        self.full = False
+        self.names = set()
+
+    @classmethod
+    def of(cls, resource):
+        """
+        Return the tracker of the resource object, creating it if needed.
+        """
+        freshness = vars(resource).get(cls.ATTR)
+        if freshness is None:
+            freshness = cls()
+            setattr(resource, cls.ATTR, freshness)
+        return freshness
+
+    def is_fresh(self, names=None):
+        """
+        Return a boolean indicating whether the specified properties (or the
+        full set of properties, if names is None) are current.
+        """
+        if self.full:
+            return True
+        return names is not None and self.names.issuperset(names)
+
+    def mark_fresh(self, names=None):
+        """
+        Mark the specified properties (or the full set of properties, if
+        names is None) as current.
+        """
+        if names is None:
+            self.full = True
+        else:
+            self.names.update(names)
+
+    def invalidate(self):
+        """
+        Mark all properties as no longer current, e.g. after an operation
+        that may have changed them.
+        """
+        self.full = False
+        self.names = set()
+
+
+def pull_full_properties(resource):
+    """
+    Retrieve the full set of properties of the resource, unless they are
+    current (see PropertyFreshness).
+
+    Parameters:
+      resource (zhmcclient.BaseResource): The resource.
+    """
+    freshness = PropertyFreshness.of(resource)
+    if not freshness.is_fresh():
+        resource.pull_full_properties()
+        freshness.mark_fresh()
+
+
+def invalidate_properties(resource):
+    """
+    Mark the properties of the resource as no longer current (see
+    PropertyFreshness), after an operation that may have changed them.
+
+    Parameters:
+      resource (zhmcclient.BaseResource): The resource.
+    """
+    PropertyFreshness.of(resource).invalidate()
+
+
+def pull_properties(resource, names):
+    """
+    Retrieve the specified properties of the resource with a
+    property-selective request, and update them in the resource object,
+    unless they are current (see PropertyFreshness).
+
+    The full set of properties is retrieved instead if the zhmcclient version
+    does not support property-selective requests, or if the session is a
+    faked session (zhmcclient_mock does not support them).
+
+    Parameters:
+      resource (zhmcclient.BaseResource): The resource.
+      names (iterable of str): Names of the HMC properties to retrieve.
+    """
+    freshness = PropertyFreshness.of(resource)
+    if freshness.is_fresh(names):
+        return
+    if not hasattr(resource, 'pull_properties') or \
+            isinstance(resource.manager.session, FakedSession):
+        resource.pull_full_properties()
+        freshness.mark_fresh()
+    else:
+        resource.pull_properties(sorted(names))
+        freshness.mark_fresh(names)
+
+
+def result_properties_parameter():
+    "Return the Ansible module definition of the result_properties parameter."
+    result_properties = dict(
+        required=False,
+        type='dict',
+        default=None,
+        options=dict(
+            include=dict(required=False, type='list', elements='str',
+                         default=None),
+            exclude=dict(required=False, type='list', elements='str',
+                         default=None),
+        ),
+    )
+    return result_properties
+
+
+class ResultSelector(object):
+    """
+    Selection of the top-level properties in the resource properties that are
+    returned by a module, as specified in the 'result_properties' module
+    parameter.
+
+    The selection is applied before properties are retrieved from the HMC:
+    Artificial properties that are not selected should not be determined at
+    all (see selected()), and if properties to be included are specified,
+    pull() retrieves only those and the properties that the selected
+    artificial properties depend on. apply() then reduces the resource
+    properties to the selected properties.
+    """
+
+    def __init__(self, result_properties, dependencies=None,
+                 always=('name',)):
+        """
+        Parameters:
+          result_properties (dict): Value of the 'result_properties' module
+            parameter, with items 'include' and 'exclude', or None for
+            selecting all properties. Underscores in the property names are
+            translated into hyphens.
+          dependencies (dict): The names of the HMC properties that an
+            artificial property is determined from, by artificial property
+            name.
+          always (iterable of str): The names of the properties that are
+            always selected.
+        """
+        result_properties = result_properties or {}
+        include = result_properties.get('include', None)
+        exclude = result_properties.get('exclude', None) or []
+        self.include = None if include is None else \
+            set(name.replace('_', '-') for name in include)
+        self.exclude = set(name.replace('_', '-') for name in exclude)
+        self.dependencies = dependencies or {}
+        self.always = set(always)
+
+    def selected(self, name):
+        """
+        Return a boolean indicating whether the property is selected.
+        """
+        if name in self.always:
+            return True
+        if self.include is not None and name not in self.include:
+            return False
+        return name not in self.exclude
+
+    def hmc_properties(self):
+        """
+        Return the names of the HMC properties to be retrieved, as a set, or
+        None if the full set of properties is to be retrieved.
+        """
+        if self.include is None:
+            return None
+        names = set(self.always)
+        for name in self.include:
+            if name in self.exclude:
+                continue
+            if name in self.dependencies:
+                names.update(self.dependencies[name])
+            else:
+                names.add(name)
+        return names
+
+    def pull(self, resource, required=()):
+        """
+        Retrieve the properties of the resource that are needed for the
+        selected properties (see pull_properties()), or the full set of
+        properties if there is no include list.
+
+        Parameters:
+          resource (zhmcclient.BaseResource): The resource.
+          required (iterable of str): Names of additional HMC properties that
+            are needed for processing the resource.
+        """
+        names = self.hmc_properties()
+        if names is None:
+            resource.pull_full_properties()
+        else:
+            pull_properties(resource, names.union(required))
+
+    def apply(self, properties):
+        """
+        Return the resource properties reduced to the selected properties,
+        as a new dict.
+        """
+        return dict((name, value) for name, value in properties.items()
+                    if self.selected(name))
+
+
+class ListDelta(object):
+    """
+    Delta of the result list of a list module relative to the result list of
+    a previous invocation, as specified in the 'since_token' module parameter.
+
+    Each item in the result list is identified by its 'cpc_name' and 'name'
+    properties, and is represented by a fingerprint that is a hash of all of
+    its properties. The token returned by a module is a compact encoding of
+    the fingerprints of all items in its complete result list, so that a
+    later invocation can return only the items that were added or changed
+    since then, and the identities of the items that were removed.
+    """
+
+    # Version prefix of the token format
+    TOKEN_PREFIX = 'zhmc1:'
+
+    # Number of hex digits of the SHA-256 hash used as fingerprint
+    FINGERPRINT_LENGTH = 16
+
+    def __init__(self, since_token):
+        """
+        Parameters:
+          since_token (str): Value of the 'since_token' module parameter, or
+            None for returning the complete result list.
+
+        Raises:
+          ParameterError: The since_token is invalid.
+        """
+        self.since_token = since_token
+        self.previous = None
+        if since_token is not None:
+            self.previous = self.decode(since_token)
+
+    @staticmethod
+    def key(item):
+        """
+        Return the identity of an item in the result list, as a tuple.
+        """
+        return (item.get('cpc_name'), item['name'])
+
+    @classmethod
+    def fingerprint(cls, item):
+        """
+        Return the fingerprint of an item in the result list, as a string.
+        """
+        data = json.dumps(item, sort_keys=True, default=str)
+        digest = hashlib.sha256(data.encode('utf-8')).hexdigest()
+        return digest[:cls.FINGERPRINT_LENGTH]
+
+    @classmethod
+    def encode(cls, fingerprints):
+        """
+        Return the token for the fingerprints of the items, by item identity.
+        """
+        data = json.dumps(
+            sorted([cpc_name, name, fingerprint]
+                   for (cpc_name, name), fingerprint in fingerprints.items()),
+            separators=(',', ':'))
+        token = base64.urlsafe_b64encode(zlib.compress(data.encode('utf-8')))
+        return cls.TOKEN_PREFIX + token.decode('ascii')
+
+    @classmethod
+    def decode(cls, token):
+        """
+        Return the fingerprints of the items, by item identity, from a token.
+
+        Raises:
+          ParameterError: The token is invalid.
+        """
+        if not token.startswith(cls.TOKEN_PREFIX):
+            raise ParameterError(
+                "The 'since_token' parameter is not a token returned by this "
+                "module: {0!r}".format(token[:40]))
+        try:
+            data = zlib.decompress(base64.urlsafe_b64decode(
+                token[len(cls.TOKEN_PREFIX):].encode('ascii')))
+            return dict(((cpc_name, name), fingerprint)
+                        for cpc_name, name, fingerprint in
+                        json.loads(data.decode('utf-8')))
+        except (ValueError, TypeError, zlib.error) as exc:
+            raise ParameterError(
+                "The 'since_token' parameter is not a valid token: {0}".
+                format(exc))
+
+    def apply(self, items):
+        """
+        Return the delta of the complete result list relative to the
+        since_token.
+
+        Parameters:
+          items (list of dict): The complete result list.
+
+        Returns:
+          tuple(items, removed, token): The items that were added or changed
+          (all items if there is no since_token), a list of dicts with the
+          'cpc_name' and 'name' properties of the items that were removed
+          (empty if there is no since_token), and the token for the complete
+          result list.
+        """
+        fingerprints = {}
+        changed_items = []
+        for item in items:
+            key = self.key(item)
+            fingerprint = self.fingerprint(item)
+            fingerprints[key] = fingerprint
+            if self.previous is None or \
+                    self.previous.get(key) != fingerprint:
+                changed_items.append(item)
+        removed = []
+        if self.previous is not None:
+            for cpc_name, name in sorted(self.previous):
+                if (cpc_name, name) not in fingerprints:
+                    removed.append(dict(cpc_name=cpc_name, name=name))
+        return changed_items, removed, self.encode(fingerprints)
+
+
 def pull_partition_status(partition):
     """
     Retrieve the partition operational status as fast as possible and return
@@ -316,23 +1509,600 @@ def pull_partition_status(partition):
         raise AssertionError()
     this_part = parts[0]
     actual_status = this_part.get_property('status')
+    partition.update_properties_local({'status': actual_status})
+    PropertyFreshness.of(partition).mark_fresh(['status'])
     return actual_status
 
 
-def stop_partition(partition, check_mode):
+def partition_status(partition):
+    """
+    Return the operational status of the partition, retrieving it (see
+    pull_partition_status()) only if it is not current.
+    """
+    if PropertyFreshness.of(partition).is_fresh(['status']):
+        return partition.get_property('status')
+    return pull_partition_status(partition)
+
+
+def find_cpc(client, cpc_name):
+    """
+    Find a CPC by name, using the name-URI cache of the session (see
+    NameUriCache), if enabled.
+
+    For a cached URI, the CPC object is returned without a request to the
+    HMC. It is validated when it is used (see find_partition()).
+
+    Raises:
+      zhmcclient.NotFound: The CPC does not exist.
+    """
+    cache = getattr(client.session, 'zhmc_uri_cache', None)
+    key = 'cpc:{0}'.format(cpc_name)
+    if cache:
+        uri = cache.get(key)
+        if uri:
+            return client.cpcs.resource_object(uri, {'name': cpc_name})
+    cpc = client.cpcs.find(name=cpc_name)
+    if cache:
+        cache.set(key, cpc.uri)
+    return cpc
+
+
+def _cached_partition(cache, cpc, partition_name):
+    """
+    Return the partition with the cached URI, or None if there is no cached
+    URI or it is outdated (in which case the entry is removed).
+
+    The cached URI is validated by retrieving the name and parent properties
+    of the partition with a property-selective request, so that the full set
+    of properties is retrieved only where it is needed.
+    """
+    key = 'partition:{0}:{1}'.format(cpc.uri, partition_name)
+    uri = cache.get(key)
+    if not uri:
+        return None
+    partition = cpc.partitions.resource_object(uri, {'name': partition_name})
+    try:
+        pull_properties(partition, ['name', 'parent'])
+    except HTTPError as exc:
+        if exc.http_status != 404:
+            raise
+    else:
+        if partition.properties.get('name') == partition_name and \
+                partition.properties.get('parent') == cpc.uri:
+            return partition
+    cache.delete(key)
+    return None
+
+
+def _listed_partition(cpc, partition_name):
+    """
+    Return the partition found by listing the partitions of the CPC, or None
+    if it does not exist.
+    """
+    try:
+        return cpc.partitions.find(name=partition_name)
+    except NotFound:
+        return None
+
+
+def find_partition(client, cpc_name, partition_name, required=True):
+    """
+    Find a CPC and a partition in it by name, using the name-URI cache of the
+    session (see NameUriCache), if enabled.
+
+    If both URIs are cached, no list operation is performed. A cached
+    partition URI is validated by retrieving the name and parent properties
+    of the partition with a property-selective request; if the partition no
+    longer exists (HTTP status 404) or has a different name or CPC, the cache
+    entry is removed and the partition is found by listing instead. A cached CPC URI is validated the same way when
+    listing its partitions.
+
+    Parameters:
+      client (zhmcclient.Client): The client.
+      cpc_name (str): Name of the CPC.
+      partition_name (str): Name of the partition.
+      required (bool): Raise NotFound if the partition does not exist,
+        instead of returning None for it.
+
+    Returns:
+      tuple: (cpc, partition), where partition is None if it does not exist
+      and required is False.
+
+    Raises:
+      zhmcclient.NotFound: The CPC does not exist, or the partition does not
+        exist and required is True.
+    """
+    cache = getattr(client.session, 'zhmc_uri_cache', None)
+    cpc = find_cpc(client, cpc_name)
+    partition = _cached_partition(cache, cpc, partition_name) \
+        if cache else None
+    if partition is None:
+        try:
+            partition = _listed_partition(cpc, partition_name)
+        except HTTPError as exc:
+            if not cache or exc.http_status != 404:
+                raise
+            # The cached CPC URI is outdated
+            cache.delete('cpc:{0}'.format(cpc_name))
+            cpc = find_cpc(client, cpc_name)
+            partition = _listed_partition(cpc, partition_name)
+        if partition is not None and cache:
+            cache.set('partition:{0}:{1}'.format(cpc.uri, partition_name),
+                      partition.uri)
+    if partition is None and required:
+        raise NotFound({'name': partition_name}, cpc.partitions)
+    return cpc, partition
+
+
+class WaitHistory(object):
+    """
+    Historical durations of long-running operations per CPC and operation,
+    as an exponentially weighted moving average.
+
+    The durations are kept in memory and, if a file is specified, are also
+    stored in that JSON file so that they are shared across module
+    invocations. Failures to access the file are ignored.
+    """
+
+    # Weight of a new duration in the moving average
+    WEIGHT = 0.3
+
+    def __init__(self, filename=None):
+        """
+        Parameters:
+          filename (str): Path name of the JSON file, or None for keeping the
+            durations only in memory.
+        """
+        self.filename = filename
+        self._durations = None
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def _key(cpc_name, operation):
+        return "{0}/{1}".format(cpc_name, operation)
+
+    def _load(self):
+        """
+        Return the durations from the file, or an empty dict.
+        """
+        if self.filename:
+            try:
+                with open(self.filename, 'r') as fp:
+                    durations = json.load(fp)
+                if isinstance(durations, dict):
+                    return durations
+            except (IOError, OSError, ValueError):
+                pass
+        return {}
+
+    def _save(self, durations):
+        """
+        Replace the file with the durations.
+        """
+        tmp_filename = "{0}.{1}".format(self.filename, os.getpid())
+        try:
+            with open(tmp_filename, 'w') as fp:
+                json.dump(durations, fp)
+            os.rename(tmp_filename, self.filename)
+        except (IOError, OSError):
+            pass
+
+    def get(self, cpc_name, operation):
+        """
+        Return the average duration in seconds of the operation on the CPC,
+        or None if there is no history for it.
+        """
+        with self._lock:
+            if self._durations is None:
+                self._durations = self._load()
+            return self._durations.get(self._key(cpc_name, operation))
+
+    def record(self, cpc_name, operation, duration):
+        """
+        Add a duration in seconds of the operation on the CPC to the history.
+        """
+        key = self._key(cpc_name, operation)
+        with self._lock:
+            # Merge with the file, to pick up durations of other processes
+            durations = self._load()
+            for _key, _duration in (self._durations or {}).items():
+                durations.setdefault(_key, _duration)
+            previous = durations.get(key)
+            if previous is None:
+                durations[key] = duration
+            else:
+                durations[key] = previous + self.WEIGHT * (duration - previous)
+            self._durations = durations
+            if self.filename:
+                self._save(durations)
+
+
+class WaitStrategy(object):
+    """
+    Strategy for polling until a long-running operation has completed.
+
+    The first poll is delayed based on the historical duration of the
+    operation on the CPC, if known. Subsequent polls use an exponential
+    back-off with random jitter, so that many concurrently waiting Ansible
+    forks do not poll the HMC in lockstep. Waiting ends at a hard timeout.
+
+    The wait times are recorded in a histogram per operation that is logged
+    at debug level after each wait.
+
+    Subclasses may override intervals() to implement a different polling
+    schedule.
+    """
+
+    def __init__(self, timeout=DEFAULT_STATUS_TIMEOUT, initial_interval=1.0,
+                 max_interval=30.0, factor=2.0, jitter=0.2, history=None,
+                 initial_delay_ratio=0.5, logger=None):
+        """
+        Parameters:
+          timeout (float): Hard timeout in seconds for a wait.
+          initial_interval (float): Poll interval in seconds for the first
+            poll without history, and the start of the back-off.
+          max_interval (float): Maximum poll interval in seconds.
+          factor (float): Factor by which the poll interval grows.
+          jitter (float): Maximum relative random deviation of each poll
+            interval, e.g. 0.2 for +/-20%.
+          history (WaitHistory): Historical operation durations, or None.
+          initial_delay_ratio (float): Ratio of the historical duration of
+            the operation that is waited before the first poll.
+          logger (logging.Logger): Logger for the wait histograms. Default:
+            The logger for the common module utilities.
+        """
+        self.timeout = timeout
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.factor = factor
+        self.jitter = jitter
+        self.history = history
+        self.initial_delay_ratio = initial_delay_ratio
+        self.logger = logger or logging.getLogger(COMMON_LOGGER_NAME)
+        self._histograms = {}
+        self._lock = threading.Lock()
+
+    def _jittered(self, interval):
+        if self.jitter:
+            interval *= random.uniform(1 - self.jitter, 1 + self.jitter)
+        return interval
+
+    def intervals(self, cpc_name=None, operation=None):
+        """
+        Generate the time in seconds to wait before each poll.
+
+        Parameters:
+          cpc_name (str): Name of the CPC, for looking up the history.
+          operation (str): Name of the operation, for looking up the history.
+        """
+        if self.history is not None and operation:
+            duration = self.history.get(cpc_name, operation)
+            if duration:
+                yield self._jittered(
+                    min(duration * self.initial_delay_ratio, self.timeout))
+        interval = self.initial_interval
+        while True:
+            yield self._jittered(interval)
+            interval = min(interval * self.factor, self.max_interval)
+
+    def wait(self, check, cpc_name=None, operation=None):
+        """
+        Poll until the check function returns True or the timeout expires.
+
+        Parameters:
+          check (callable): Function without arguments that performs one poll
+            and returns True when the operation has completed.
+          cpc_name (str): Name of the CPC, for the history.
+          operation (str): Name of the operation, for the history and the
+            histogram.
+
+        Returns:
+          bool: Indicates whether the operation has completed (i.e. False
+          means the timeout expired).
+        """
+        start = time.time()
+        deadline = start + self.timeout
+        polls = 0
+        done = False
+        for interval in self.intervals(cpc_name, operation):
+            remaining = deadline - time.time()
+            if remaining <= 0:
+                break
+            time.sleep(min(interval, remaining))
+            polls += 1
+            if check():
+                done = True
+                break
+        self.record_wait(operation, time.time() - start, polls, done)
+        return done
+
+    def record_duration(self, cpc_name, operation, duration):
+        """
+        Record the duration in seconds of a complete operation in the
+        history.
+        """
+        if self.history is not None:
+            self.history.record(cpc_name, operation, duration)
+
+    def record_wait(self, operation, duration, polls, done):
+        """
+        Add a wait to the histogram of the operation and log the histogram.
+        """
+        with self._lock:
+            histogram = self._histograms.setdefault(
+                operation, [0] * (len(WAIT_HISTOGRAM_BUCKETS) + 1))
+            for index, bound in enumerate(WAIT_HISTOGRAM_BUCKETS):
+                if duration <= bound:
+                    break
+            else:
+                index = len(WAIT_HISTOGRAM_BUCKETS)
+            histogram[index] += 1
+            buckets = ", ".join(
+                "<={0}s: {1}".format(bound, count) for bound, count in
+                zip(WAIT_HISTOGRAM_BUCKETS, histogram))
+            buckets += ", >{0}s: {1}".format(
+                WAIT_HISTOGRAM_BUCKETS[-1], histogram[-1])
+        self.logger.debug(
+            "Wait for %s %s after %.1f s and %d polls; wait histogram for %s: "
+            "%s", operation, "completed" if done else "timed out", duration,
+            polls, operation, buckets)
+
+
+_WAIT_STRATEGY = []
+
+
+def default_wait_strategy():
+    """
+    Return the default wait strategy, which uses a history that is stored in
+    DEFAULT_WAIT_HISTORY_FILE.
+    """
+    if not _WAIT_STRATEGY:
+        _WAIT_STRATEGY.append(
+            WaitStrategy(history=WaitHistory(DEFAULT_WAIT_HISTORY_FILE)))
+    return _WAIT_STRATEGY[0]
+
+
+def is_transient_error(exc):
+    """
+    Return a boolean indicating whether the exception is an HMC error that
+    is considered transient, i.e. that may not occur when retrying the
+    request.
+    """
+    if isinstance(exc, HTTPError):
+        return exc.http_status in TRANSIENT_HTTP_STATUSES
+    return isinstance(exc, HMCConnectionError)
+
+
+class RetryPolicy(object):
+    """
+    Policy for retrying HMC requests and operations that failed with a
+    transient error (see is_transient_error()), with an exponential back-off
+    and random jitter between the attempts.
+
+    Only idempotent requests and operations that are known to be safe to
+    retry must be performed with the policy.
+
+    The policy is reentrant per thread: Requests that are issued while
+    performing an operation with the policy are not retried individually,
+    because the operation is retried as a whole.
+    """
+
+    def __init__(self, attempts=DEFAULT_RETRY_ATTEMPTS,
+                 backoff=DEFAULT_RETRY_BACKOFF, max_backoff=30.0, factor=2.0,
+                 jitter=0.2, logger=None):
+        """
+        Parameters:
+          attempts (int): Maximum number of attempts, including the first
+            one. 1 disables retrying.
+          backoff (float): Time in seconds to wait before the first retry.
+          max_backoff (float): Maximum time in seconds to wait before a
+            retry.
+          factor (float): Factor by which the time before a retry grows.
+          jitter (float): Maximum relative random deviation of each back-off
+            time, e.g. 0.2 for +/-20%.
+          logger (logging.Logger): Logger for the retries. Default: The
+            logger for the common module utilities.
+        """
+        self.attempts = attempts
+        self.backoff = WaitStrategy(
+            initial_interval=backoff, max_interval=max_backoff, factor=factor,
+            jitter=jitter)
+        self.logger = logger or logging.getLogger(COMMON_LOGGER_NAME)
+        self._local = threading.local()
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        """
+        Reset the retry statistics.
+        """
+        with self._stats_lock:
+            self.retried_requests = 0
+            self.retries = 0
+            self.failed_requests = 0
+            self.backoff_time = 0.0
+
+    def stats(self):
+        """
+        Return the retry statistics, as a dict with these items:
+
+        * retried_requests (int): Number of requests or operations that were
+          retried at least once.
+        * retries (int): Total number of retries.
+        * failed_requests (int): Number of retried requests or operations
+          that still failed after the last attempt.
+        * backoff_time (float): Total time in seconds waited before retries.
+        """
+        with self._stats_lock:
+            return dict(
+                retried_requests=self.retried_requests,
+                retries=self.retries,
+                failed_requests=self.failed_requests,
+                backoff_time=round(self.backoff_time, 3),
+            )
+
+    def call(self, func, *args, **kwargs):
+        """
+        Call the function that performs an HMC request or an operation that
+        is safe to retry, and retry it on transient errors.
+        """
+        depth = getattr(self._local, 'depth', 0)
+        if depth or self.attempts <= 1:
+            return func(*args, **kwargs)
+        self._local.depth = depth + 1
+        try:
+            delays = self.backoff.intervals()
+            attempt = 1
+            while True:
+                try:
+                    result = func(*args, **kwargs)
+                except (HTTPError, HMCConnectionError) as exc:
+                    if not is_transient_error(exc):
+                        raise
+                    if attempt >= self.attempts:
+                        if attempt > 1:
+                            with self._stats_lock:
+                                self.failed_requests += 1
+                        raise
+                    delay = next(delays)
+                    self.logger.debug(
+                        "Retrying %s in %.1f s after attempt %d failed with "
+                        "transient error: %s: %s",
+                        getattr(func, '__name__', func), delay, attempt,
+                        exc.__class__.__name__, exc)
+                    time.sleep(delay)
+                    with self._stats_lock:
+                        if attempt == 1:
+                            self.retried_requests += 1
+                        self.retries += 1
+                        self.backoff_time += delay
+                    attempt += 1
+                else:
+                    return result
+        finally:
+            self._local.depth = depth
+
+    def wrap(self, session):
+        """
+        Retry the GET requests of a zhmcclient session object.
+
+        Wrapping a session object again with the same policy has no effect.
+        """
+        if getattr(session, 'zhmc_retry', None) is self:
+            return
+        orig_get = session.get
+
+        def get(*args, **kwargs):
+            "Retried GET"
+            return self.call(orig_get, *args, **kwargs)
+
+        session.get = get
+        session.zhmc_retry = self
+
+
+_RETRY_POLICY = []
+
+
+def default_retry_policy():
+    """
+    Return the default retry policy, as configured by the environment
+    variables RETRY_ATTEMPTS_ENVVAR and RETRY_BACKOFF_ENVVAR.
+
+    Raises:
+      ParameterError: Invalid value of an environment variable.
+    """
+    if not _RETRY_POLICY:
+        attempts = positive_envvar(RETRY_ATTEMPTS_ENVVAR, int)
+        backoff = positive_envvar(RETRY_BACKOFF_ENVVAR, float)
+        _RETRY_POLICY.append(RetryPolicy(
+            attempts=attempts or DEFAULT_RETRY_ATTEMPTS,
+            backoff=backoff or DEFAULT_RETRY_BACKOFF))
+    return _RETRY_POLICY[0]
+
+
+def wait_for_partition_status(partition, statuses, operation,
+                              wait_strategy=None):
+    """
+    Wait until the partition has one of the specified statuses, using a wait
+    strategy.
+
+    Parameters:
+      partition (zhmcclient.Partition): The partition.
+      statuses (tuple of str): The desired statuses.
+      operation (str): Name of the operation that is waited for, e.g.
+        'partition-start'.
+      wait_strategy (WaitStrategy): The wait strategy. Default: The strategy
+        returned by default_wait_strategy().
+
+    Raises:
+      zhmcclient.StatusTimeout: The timeout of the wait strategy expired.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    wait_strategy = wait_strategy or default_wait_strategy()
+    actual = {}
+
+    def check():
+        actual['status'] = pull_partition_status(partition)
+        return actual['status'] in statuses
+
+    if not wait_strategy.wait(
+            check, partition.manager.cpc.name, operation):
+        raise StatusTimeout(
+            "Waiting for partition {0} to reach status(es) '{1}' timed out "
+            "after {2} s - current status is '{3}'".
+            format(partition.name, statuses, wait_strategy.timeout,
+                   actual.get('status')),
+            actual.get('status'), statuses, wait_strategy.timeout)
+
+
+def _timed_partition_operation(partition, method, operation, wait_strategy):
+    """
+    Perform the synchronous start or stop operation on the partition and
+    record its duration in the history of the wait strategy.
+    """
+    wait_strategy = wait_strategy or default_wait_strategy()
+    start = time.time()
+    try:
+        getattr(partition, method)()
+    finally:
+        invalidate_properties(partition)
+    wait_strategy.record_duration(
+        partition.manager.cpc.name, operation, time.time() - start)
+
+
+def _submit_partition_operation(partition, method, jobs):
+    """
+    Submit the start or stop operation on the partition asynchronously and
+    append the zhmcclient.Job object for it to the list of jobs.
+    """
+    try:
+        jobs.append(getattr(partition, method)(wait_for_completion=False))
+    finally:
+        invalidate_properties(partition)
+
+
+def stop_partition(partition, check_mode, jobs=None, wait_strategy=None):
     """
     Ensure that the partition is stopped, by influencing the operational
     status of the partition, regardless of what its current operational status
     is.
 
-    The resulting operational status will be one of STOP_END_STATUSES.
+    The resulting operational status will be one of STOP_END_STATUSES, unless
+    the stop operation was submitted asynchronously.
 
     Parameters:
-      partition (zhmcclient.Partition): The partition (must exist, and its
-        status property is assumed to be current).
+      partition (zhmcclient.Partition): The partition (must exist). Its
+        status is retrieved unless it is current (see partition_status()).
+        In check mode, its status property is assumed to be current.
       check_mode (bool): Indicates whether the playbook was run in check mode,
         in which case this method does ot actually stop the partition, but
         just returns what would have been done.
+      jobs (list): If not None, the final stop operation is submitted
+        asynchronously without waiting for its completion, and the
+        zhmcclient.Job object for it is appended to this list.
+      wait_strategy (WaitStrategy): The strategy for waiting for status
+        transitions. Default: The strategy returned by
+        default_wait_strategy().
 
     Returns:
       bool: Indicates whether the partition was changed.
@@ -343,9 +2113,10 @@ def stop_partition(partition, check_mode):
       zhmcclient.Error: Any zhmcclient exception can happen.
     """
     changed = False
-    if not check_mode:
-        partition.pull_full_properties()
-    status = partition.get_property('status')
+    if check_mode:
+        status = partition.get_property('status')
+    else:
+        status = partition_status(partition)
     if status in BAD_STATUSES:
         raise StatusError(
             "Target CPC {0!r} has issues; status of partition {1!r} is: {2!r}".
@@ -355,9 +2126,15 @@ def stop_partition(partition, check_mode):
     elif status == 'starting':
         if not check_mode:
             # Let it first finish the starting
-            partition.wait_for_status(START_END_STATUSES)
+            wait_for_partition_status(
+                partition, START_END_STATUSES, 'partition-start',
+                wait_strategy)
             # Then stop it
-            partition.stop()
+            if jobs is not None:
+                _submit_partition_operation(partition, 'stop', jobs)
+                return True
+            _timed_partition_operation(
+                partition, 'stop', 'partition-stop', wait_strategy)
             status = pull_partition_status(partition)
             if status not in STOP_END_STATUSES:
                 raise StatusError(
@@ -372,8 +2149,9 @@ def stop_partition(partition, check_mode):
     elif status == 'stopping':
         if not check_mode:
             # Let it finish the stopping
-            partition.wait_for_status(STOP_END_STATUSES)
-            status = pull_partition_status(partition)
+            wait_for_partition_status(
+                partition, STOP_END_STATUSES, 'partition-stop', wait_strategy)
+            status = partition_status(partition)
             if status not in STOP_END_STATUSES:
                 raise StatusError(
                     "Could not get partition {0!r} from 'stopping' status into "
@@ -387,8 +2165,12 @@ def stop_partition(partition, check_mode):
     else:
         # status in START_END_STATUSES
         if not check_mode:
-            previous_status = pull_partition_status(partition)
-            partition.stop()
+            previous_status = status
+            if jobs is not None:
+                _submit_partition_operation(partition, 'stop', jobs)
+                return True
+            _timed_partition_operation(
+                partition, 'stop', 'partition-stop', wait_strategy)
             status = pull_partition_status(partition)
             if status not in STOP_END_STATUSES:
                 raise StatusError(
@@ -402,20 +2184,28 @@ def stop_partition(partition, check_mode):
     return changed
 
 
-def start_partition(partition, check_mode):
+def start_partition(partition, check_mode, jobs=None, wait_strategy=None):
     """
     Ensure that the partition is started, by influencing the operational
     status of the partition, regardless of what its current operational status
     is.
 
-    The resulting operational status will be one of START_END_STATUSES.
+    The resulting operational status will be one of START_END_STATUSES, unless
+    the start operation was submitted asynchronously.
 
     Parameters:
-      partition (zhmcclient.Partition): The partition (must exist, and its
-        status property is assumed to be current).
+      partition (zhmcclient.Partition): The partition (must exist). Its
+        status is retrieved unless it is current (see partition_status()).
+        In check mode, its status property is assumed to be current.
       check_mode (bool): Indicates whether the playbook was run in check mode,
         in which case this method does not actually change the partition, but
         just returns what would have been done.
+      jobs (list): If not None, the final start operation is submitted
+        asynchronously without waiting for its completion, and the
+        zhmcclient.Job object for it is appended to this list.
+      wait_strategy (WaitStrategy): The strategy for waiting for status
+        transitions. Default: The strategy returned by
+        default_wait_strategy().
 
     Returns:
       bool: Indicates whether the partition was changed.
@@ -426,9 +2216,10 @@ def start_partition(partition, check_mode):
       zhmcclient.Error: Any zhmcclient exception can happen.
     """
     changed = False
-    if not check_mode:
-        partition.pull_full_properties()
-    status = partition.get_property('status')
+    if check_mode:
+        status = partition.get_property('status')
+    else:
+        status = partition_status(partition)
     if status in BAD_STATUSES:
         raise StatusError(
             "Target CPC {0!r} has issues; status of partition {1!r} is: {2!r}".
@@ -438,9 +2229,14 @@ def start_partition(partition, check_mode):
     elif status == 'stopping':
         if not check_mode:
             # Let it first finish the stopping
-            partition.wait_for_status(STOP_END_STATUSES)
+            wait_for_partition_status(
+                partition, STOP_END_STATUSES, 'partition-stop', wait_strategy)
             # Then start it
-            partition.start()
+            if jobs is not None:
+                _submit_partition_operation(partition, 'start', jobs)
+                return True
+            _timed_partition_operation(
+                partition, 'start', 'partition-start', wait_strategy)
             status = pull_partition_status(partition)
             if status not in START_END_STATUSES:
                 raise StatusError(
@@ -455,8 +2251,10 @@ def start_partition(partition, check_mode):
     elif status == 'starting':
         if not check_mode:
             # Let it finish the starting
-            partition.wait_for_status(START_END_STATUSES)
-            status = pull_partition_status(partition)
+            wait_for_partition_status(
+                partition, START_END_STATUSES, 'partition-start',
+                wait_strategy)
+            status = partition_status(partition)
             if status not in START_END_STATUSES:
                 raise StatusError(
                     "Could not get partition {0!r} from 'starting' status into "
@@ -470,8 +2268,12 @@ def start_partition(partition, check_mode):
     else:
         # status in STOP_END_STATUSES
         if not check_mode:
-            previous_status = pull_partition_status(partition)
-            partition.start()
+            previous_status = status
+            if jobs is not None:
+                _submit_partition_operation(partition, 'start', jobs)
+                return True
+            _timed_partition_operation(
+                partition, 'start', 'partition-start', wait_strategy)
             status = pull_partition_status(partition)
             if status not in START_END_STATUSES:
                 raise StatusError(
@@ -485,7 +2287,7 @@ def start_partition(partition, check_mode):
     return changed
 
 
-def wait_for_transition_completion(partition):
+def wait_for_transition_completion(partition, wait_strategy=None):
     """
     If the partition is in a transitional state, wait for completion of that
     transition. This is required for updating properties.
@@ -494,28 +2296,68 @@ def wait_for_transition_completion(partition):
     STOP_END_STATUSES.
 
     Parameters:
-      partition (zhmcclient.Partition): The partition (must exist, and its
-        status property is assumed to be current).
+      partition (zhmcclient.Partition): The partition (must exist). Its
+        status is always retrieved, because a transition may have begun.
+      wait_strategy (WaitStrategy): The strategy for waiting for the
+        transition. Default: The strategy returned by default_wait_strategy().
 
     Raises:
       StatusError: Partition is in one of BAD_STATUSES.
       zhmcclient.Error: Any zhmcclient exception can happen.
     """
-    partition.pull_full_properties()
-    status = partition.get_property('status')
+    status = pull_partition_status(partition)
     if status in BAD_STATUSES:
         raise StatusError(
             "Target CPC {0!r} has issues; status of partition {1!r} is: {2!r}".
             format(partition.manager.cpc.name, partition.name, status))
     elif status == 'stopping':
-        partition.wait_for_status(STOP_END_STATUSES)
+        wait_for_partition_status(
+            partition, STOP_END_STATUSES, 'partition-stop', wait_strategy)
     elif status == 'starting':
-        partition.wait_for_status(START_END_STATUSES)
+        wait_for_partition_status(
+            partition, START_END_STATUSES, 'partition-start', wait_strategy)
     else:
         if not (status in START_END_STATUSES or status in STOP_END_STATUSES):
             raise AssertionError()
 
 
+def update_after_transition(partition, resource, properties,
+                            wait_strategy=None):
+    """
+    Wait for completion of a transition of the partition and update the
+    properties of the partition or of one of its child resources (e.g. a NIC
+    or HBA).
+
+    Because the update sets the same properties again, this is retried as a
+    whole on transient errors, according to the retry policy of the session.
+
+    Parameters:
+      partition (zhmcclient.Partition): The partition.
+      resource (zhmcclient.BaseResource): The partition or its child
+        resource to be updated.
+      properties (dict): The properties to be updated.
+      wait_strategy (WaitStrategy): The strategy for waiting for the
+        transition. Default: The strategy returned by default_wait_strategy().
+
+    Raises:
+      StatusError: Partition is in one of BAD_STATUSES.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+
+    def update():
+        wait_for_transition_completion(partition, wait_strategy)
+        try:
+            resource.update_properties(properties)
+        finally:
+            invalidate_properties(resource)
+
+    retry_policy = getattr(partition.manager.session, 'zhmc_retry', None)
+    if retry_policy:
+        retry_policy.call(update)
+    else:
+        update()
+
+
 def pull_lpar_status(lpar):
     """
     Retrieve the LPAR operational status as fast as possible and return it.
@@ -528,13 +2370,14 @@ def pull_lpar_status(lpar):
     return actual_status
 
 
-def ensure_lpar_inactive(logger, lpar, check_mode):
+def ensure_lpar_inactive(logger, lpar, check_mode, jobs=None):
     """
     Ensure that the LPAR is in an inactive status, regardless of what its
     current operational status is.
 
     If this function returns, the operational status of the LPAR will be one of
-    LPAR_INACTIVE_END_STATUSES.
+    LPAR_INACTIVE_END_STATUSES, unless the deactivate operation was submitted
+    asynchronously.
 
     Parameters:
 
@@ -547,6 +2390,10 @@ def ensure_lpar_inactive(logger, lpar, check_mode):
         in which case this method does ot actually stop the LPAR, but
         just returns what would have been done.
 
+      jobs (list): If not None, the deactivate operation is submitted
+        asynchronously without waiting for its completion, and the
+        zhmcclient.Job object for it is appended to this list.
+
     Returns:
       bool: Indicates whether the LPAR was changed.
 
@@ -569,6 +2416,9 @@ def ensure_lpar_inactive(logger, lpar, check_mode):
         return changed
 
     if not check_mode:
+        if jobs is not None:
+            jobs.append(lpar.deactivate(wait_for_completion=False, force=True))
+            return True
         lpar.deactivate(force=True)
         status = pull_lpar_status(lpar)
     changed = True
@@ -583,7 +2433,7 @@ def ensure_lpar_inactive(logger, lpar, check_mode):
 
 
 def ensure_lpar_active(
-        logger, lpar, check_mode, activation_profile_name, force):
+        logger, lpar, check_mode, activation_profile_name, force, jobs=None):
     """
     Ensure that the LPAR is at least active, regardless of what its
     current operational status is.
@@ -592,7 +2442,8 @@ def ensure_lpar_active(
     If the LPAR was already loaded, it remains loaded.
 
     If this function returns, the operational status of the LPAR will be one of
-    LPAR_ACTIVE_END_STATUSES.
+    LPAR_ACTIVE_END_STATUSES, unless the activate operation was submitted
+    asynchronously.
 
     Parameters:
 
@@ -626,6 +2477,10 @@ def ensure_lpar_active(
 
         TODO: Verify the statements in the description of the 'force' parameter.
 
+      jobs (list): If not None, the activate operation is submitted
+        asynchronously without waiting for its completion, and the
+        zhmcclient.Job object for it is appended to this list.
+
     Returns:
       bool: Indicates whether the LPAR was changed.
 
@@ -649,6 +2504,12 @@ def ensure_lpar_active(
 
     if status == 'not-activated':
         if not check_mode:
+            if jobs is not None:
+                jobs.append(lpar.activate(
+                    wait_for_completion=False,
+                    activation_profile_name=activation_profile_name,
+                    force=False))
+                return True
             lpar.activate(
                 activation_profile_name=activation_profile_name, force=False)
             status = pull_lpar_status(lpar)
@@ -664,13 +2525,14 @@ def ensure_lpar_active(
 
 
 def ensure_lpar_loaded(
-        logger, lpar, check_mode, activation_profile_name, force):
+        logger, lpar, check_mode, activation_profile_name, force, jobs=None):
     """
     Ensure that the LPAR is loaded, regardless of what its current operational
     status is.
 
     If this function returns, the operational status of the LPAR will be one of
-    LPAR_LOADED_END_STATUSES.
+    LPAR_LOADED_END_STATUSES, unless the final operation was submitted
+    asynchronously.
 
     Parameters:
 
@@ -705,6 +2567,12 @@ def ensure_lpar_loaded(
 
         TODO: Verify the statements in the description of the 'force' parameter.
 
+      jobs (list): If not None, the final operation (activate or load) is
+        submitted asynchronously without waiting for its completion, and the
+        zhmcclient.Job object for it is appended to this list. An activate
+        operation that is followed by a load operation is still performed
+        synchronously.
+
     Returns:
       bool: Indicates whether the LPAR was changed.
 
@@ -736,6 +2604,9 @@ def ensure_lpar_loaded(
     if status == 'not-operating':
         # The LPAR was defined not to auto-load, so we load it.
         if not check_mode:
+            if jobs is not None:
+                jobs.append(lpar.load(wait_for_completion=False))
+                return True
             lpar.load()
             status = pull_lpar_status(lpar)
         changed = True
@@ -776,6 +2647,85 @@ def to_unicode(value):
                         format(type(value), value))
 
 
+class PropertyDef(object):
+    """
+    Compiled definition of a single resource property, as built by
+    PropertySchema from one item of a property definition dict
+    (e.g. ZHMC_PARTITION_PROPERTIES).
+    """
+
+    __slots__ = ('name', 'hmc_name', 'allowed', 'create', 'update',
+                 'update_while_active', 'eq_func', 'type_cast', 'required',
+                 'default')
+
+    def __init__(self, name, prop_def):
+        """
+        Parameters:
+          name (string): Property name (using Ansible module names).
+          prop_def (tuple): Property definition (allowed, create, update,
+            update_while_active, eq_func, type_cast, required(o),
+            default(o)). (o) means optional.
+        """
+        self.name = name
+        self.hmc_name = name.replace('_', '-')
+        self.allowed, self.create, self.update, self.update_while_active, \
+            self.eq_func, self.type_cast = prop_def[0:6]
+        self.required = prop_def[6] if len(prop_def) > 6 else False
+        self.default = prop_def[7] if len(prop_def) > 7 else None
+
+    def __repr__(self):
+        return "PropertyDef({0!r})".format(self.name)
+
+
+class PropertySchema(object):
+    """
+    Compiled property definitions of a resource type.
+
+    The schema is built once at import time of the module from the property
+    definition dict of the resource type, so that the processing of the
+    'properties' module parameter does not need to unpack the definition
+    tuples and derive the HMC property names on every call.
+
+    It can be used like a read-only dict of PropertyDef objects by property
+    name (using Ansible module names).
+    """
+
+    __slots__ = ('props', 'allowed_names', 'create_names', 'update_names',
+                 'update_while_active_names')
+
+    def __init__(self, resource_properties):
+        """
+        Parameters:
+          resource_properties (dict): Dictionary of property definitions for
+            the resource type (e.g. ZHMC_PARTITION_PROPERTIES). Each value of
+            the dictionary must be a tuple (allowed, create, update,
+            update_while_active, eq_func, type_cast, required(o),
+            default(o)). For details, see the modules using this class. (o)
+            means optional.
+        """
+        self.props = dict(
+            (name, PropertyDef(name, prop_def))
+            for name, prop_def in resource_properties.items())
+        defs = self.props.values()
+        self.allowed_names = frozenset(d.name for d in defs if d.allowed)
+        self.create_names = frozenset(d.name for d in defs if d.create)
+        self.update_names = frozenset(d.name for d in defs if d.update)
+        self.update_while_active_names = frozenset(
+            d.name for d in defs if d.update_while_active)
+
+    def __contains__(self, name):
+        return name in self.props
+
+    def __getitem__(self, name):
+        return self.props[name]
+
+    def __iter__(self):
+        return iter(self.props)
+
+    def __len__(self):
+        return len(self.props)
+
+
 def process_normal_property(
         prop_name, resource_properties, input_props, resource):
     """
@@ -785,11 +2735,8 @@ def process_normal_property(
 
       prop_name (string): Property name (using Ansible module names).
 
-      resource_properties (dict): Dictionary of property definitions for the
-        resource type (e.g. ZHMC_PARTITION_PROPERTIES). Each value must be a
-        tuple (allowed, create, update, update_while_active, eq_func,
-        type_cast, required(o), default(o)). For details, see the modules
-        using this function. (o) means optional.
+      resource_properties (PropertySchema): Compiled property definitions
+        for the resource type (e.g. ZHMC_PARTITION_SCHEMA).
 
       input_props (dict): New properties.
 
@@ -814,44 +2761,34 @@ def process_normal_property(
     deactivate = False
 
     p = resource_properties[prop_name]
-    allowed, create, update, update_while_active, eq_func, type_cast = p[0:6]
-    # Note: If and when required/default are be used here:
-    # try:
-    #     required = p[6]
-    # except IndexError:
-    #     required = False
-    # try:
-    #     default = p[7]
-    # except IndexError:
-    #     default = None
 
     # Double check that the property is not a read-only property
-    if not allowed:
+    if not p.allowed:
         raise AssertionError()
-    if not (create or update):
+    if not (p.create or p.update):
         raise AssertionError()
 
-    hmc_prop_name = prop_name.replace('_', '-')
+    hmc_prop_name = p.hmc_name
     input_prop_value = input_props[prop_name]
 
-    if type_cast:
-        input_prop_value = type_cast(input_prop_value)
+    if p.type_cast:
+        input_prop_value = p.type_cast(input_prop_value)
 
     if resource:
         # Resource does exist.
 
         current_prop_value = resource.properties.get(hmc_prop_name)
 
-        if eq_func:
-            equal = eq_func(current_prop_value, input_prop_value,
-                            prop_name)
+        if p.eq_func:
+            equal = p.eq_func(current_prop_value, input_prop_value,
+                              prop_name)
         else:
             equal = (current_prop_value == input_prop_value)
 
         if not equal:
-            if update:
+            if p.update:
                 update_props[hmc_prop_name] = input_prop_value
-                if not update_while_active:
+                if not p.update_while_active:
                     deactivate = True
             else:
                 raise ParameterError(
@@ -863,25 +2800,1449 @@ def process_normal_property(
     else:
         # Resource does not exist.
         # Prefer setting the property during resource creation.
-        if create:
+        if p.create:
             create_props[hmc_prop_name] = input_prop_value
         else:
             update_props[hmc_prop_name] = input_prop_value
-            if not update_while_active:
+            if not p.update_while_active:
                 deactivate = True
 
     return create_props, update_props, deactivate
 
 
-def log_init(logger_name, log_file=None):
+# Dictionary of properties of NIC resources, in this format:
+#   name: (allowed, create, update, update_while_active, eq_func, type_cast)
+# where:
+#   name: Name of the property according to the data model, with hyphens
+#     replaced by underscores (this is how it is or would be specified in
+#     the 'properties' module parameter).
+#   allowed: Indicates whether it is allowed in the 'properties' module
+#     parameter.
+#   create: Indicates whether it can be specified for the "Create NIC"
+#     operation.
+#   update: Indicates whether it can be specified for the "Update NIC
+#     Properties" operation (at all).
+#   update_while_active: Indicates whether it can be specified for the "Update
+#     NIC Properties" operation while the partition of the NIC is active. None
+#     means "not applicable" (i.e. update=False).
+#   eq_func: Equality test function for two values of the property; None means
+#     to use Python equality.
+#   type_cast: Type cast function for an input value of the property; None
+#     means to use it directly. This can be used for example to convert
+#     integers provided as strings by Ansible back into integers (that is a
+#     current deficiency of Ansible).
+# Note: This should always represent the latest version of the HMC/SE.
+# Attempts to set a property that does not exist or that is not writeable in
+# the target HMC will be handled by the HMC rejecting the operation.
+ZHMC_NIC_PROPERTIES = {
+
+    # create+update properties:
+    'name': (
+        False, True, True, True, None, None),  # provided in 'name' module parm
+    'description': (True, True, True, True, None, to_unicode),
+    'device_number': (True, True, True, True, eq_hex, None),
+    'network_adapter_port_uri': (
+        False, True, True, True, None, None),  # via adapter_name/_port
+    'virtual_switch_uri': (
+        False, True, True, True, None, None),  # via adapter_name/_port
+    'adapter_name': (
+        True, True, True, True, None,
+        None),  # artificial property, type_cast ignored
+    'adapter_port': (
+        True, True, True, True, None,
+        None),  # artificial property, type_cast ignored
+    # The ssc-*, vlan-id and mac-address properties were introduced in
+    # API version 2.2 (an update of SE 2.13.1).
+    # The mac-address property was changed to be writeable in API version 2.20
+    # (SE 2.14.0).
+    'ssc_management_nic': (True, True, True, True, None, None),
+    'ssc_ip_address_type': (True, True, True, True, None, None),
+    'ssc_ip_address': (True, True, True, True, None, None),
+    'ssc_mask_prefix': (True, True, True, True, None, None),
+    'vlan_id': (True, True, True, True, None, int),
+    'mac_address': (True, True, True, None, eq_mac, None),
+    # The vlan-type property was introduced in API version 2.20 (SE 2.14.0).
+    'vlan_type': (True, True, True, True, None, None),
+    # The function-* properties were introduced in API version 3.4
+    # (SE 2.15 GA2).
+    'function_number': (True, True, True, True, None, int),
+    'function_range': (True, True, True, True, None, int),
+
+    # read-only properties:
+    'element-uri': (False, False, False, None, None, None),
+    'element-id': (False, False, False, None, None, None),
+    'parent': (False, False, False, None, None, None),
+    'class': (False, False, False, None, None, None),
+    'type': (False, False, False, None, None, None),
+}
+
+ZHMC_NIC_SCHEMA = PropertySchema(ZHMC_NIC_PROPERTIES)
+
+
+def find_adapter(partition, adapter_name, adapters=None):
+    """
+    Return the adapter with the specified name in the CPC of the partition,
+    or None if it does not exist.
+
+    Parameters:
+
+      partition (zhmcclient.Partition): The partition.
+
+      adapter_name (string): Name of the adapter.
+
+      adapters (dict): The adapters of the CPC, with key: adapter name,
+        value: zhmcclient.Adapter object, or None for finding the adapter by
+        listing the adapters of the CPC.
+    """
+    if adapters is not None:
+        return adapters.get(adapter_name)
+    try:
+        return partition.manager.cpc.adapters.find(name=adapter_name)
+    except NotFound:
+        return None
+
+
+def process_nic_properties(partition, nic, params, adapters=None):
+    """
+    Process the properties specified in the 'properties' module parameter,
+    and return two dictionaries (create_props, update_props) that contain
+    the properties that can be created, and the properties that can be updated,
+    respectively. If the resource exists, the input property values are
+    compared with the existing resource property values and the returned set
+    of properties is the minimal set of properties that need to be changed.
+
+    - Underscores in the property names are translated into hyphens.
+    - The presence of read-only properties, invalid properties (i.e. not
+      defined in the data model for partitions), and properties that are not
+      allowed because of restrictions or because they are auto-created from
+      an artificial property is surfaced by raising ParameterError.
+    - The properties resulting from handling artificial properties are
+      added to the returned dictionaries.
+
+    Parameters:
+
+      partition (zhmcclient.Partition): Partition containing the NIC. Must
+        exist.
+
+      nic (zhmcclient.Nic): NIC to be updated with the full set of current
+        properties, or `None` if it did not previously exist.
+
+      params (dict): Module input parameters, or a device entry with
+        the 'name' and 'properties' items.
+
+      adapters (dict): The adapters of the CPC by name, for looking up the
+        adapter specified in the artificial properties (see find_adapter()),
+        or None for finding the adapter by listing the adapters of the CPC.
+
+    Returns:
+      tuple of (create_props, update_props, stop), where:
+        * create_props: dict of properties for
+          zhmcclient.NicManager.create()
+        * update_props: dict of properties for
+          zhmcclient.Nic.update_properties()
+        * stop (bool): Indicates whether some update properties require the
+          partition containg the NIC to be stopped when doing the update.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+    """
+    create_props = {}
+    update_props = {}
+    stop = False
+
+    # handle 'name' property
+    nic_name = to_unicode(params['name'])
+    create_props['name'] = nic_name
+    # We looked up the NIC by name, so we will never have to update its name
+
+    # Names of the artificial properties
+    adapter_name_art_name = 'adapter_name'
+    adapter_port_art_name = 'adapter_port'
+
+    # handle the other properties
+    input_props = params.get('properties', {})
+    if input_props is None:
+        input_props = {}
+    for prop_name in input_props:
+
+        if prop_name not in ZHMC_NIC_SCHEMA:
+            raise ParameterError(
+                "Property {0!r} is not defined in the data model for "
+                "NICs.".format(prop_name))
+
+        if prop_name not in ZHMC_NIC_SCHEMA.allowed_names:
+            raise ParameterError(
+                "Property {0!r} is not allowed in the 'properties' module "
+                "parameter.".format(prop_name))
+
+        if prop_name in (adapter_name_art_name, adapter_port_art_name):
+            # Artificial properties will be processed together after this loop
+            continue
+
+        # Process a normal (= non-artificial) property
+        _create_props, _update_props, _stop = process_normal_property(
+            prop_name, ZHMC_NIC_SCHEMA, input_props, nic)
+        create_props.update(_create_props)
+        update_props.update(_update_props)
+        if _stop:
+            stop = True
+
+    # Process artificial properties
+    if (adapter_name_art_name in input_props) != \
+            (adapter_port_art_name in input_props):
+        raise ParameterError(
+            "Artificial properties {0!r} and {1!r} must either both be "
+            "specified or both be omitted.".
+            format(adapter_name_art_name, adapter_port_art_name))
+    if adapter_name_art_name in input_props and \
+            adapter_port_art_name in input_props:
+        adapter_name = to_unicode(input_props[adapter_name_art_name])
+        adapter_port_index = int(input_props[adapter_port_art_name])
+        adapter = find_adapter(partition, adapter_name, adapters)
+        if adapter is None:
+            raise ParameterError(
+                "Artificial property {0!r} does not specify the name of an "
+                "existing adapter: {1!r}".
+                format(adapter_name_art_name, adapter_name))
+        try:
+            port = adapter.ports.find(index=adapter_port_index)
+        except NotFound:
+            raise ParameterError(
+                "Artificial property {0!r} does not specify the index of an "
+                "existing port on adapter {1!r}: {2!r}".
+                format(adapter_port_art_name, adapter_name,
+                       adapter_port_index))
+
+        # The rest of it depends on the network adapter family:
+        adapter_family = adapter.get_property('adapter-family')
+        if adapter_family in ('roce', 'cna'):
+            # Here we perform the same logic as in the property loop, just now
+            # simplified by the knowledge about the property flags (create,
+            # update, etc.).
+            hmc_prop_name = 'network-adapter-port-uri'
+            input_prop_value = port.uri
+            if nic:
+                if nic.properties.get(hmc_prop_name) != input_prop_value:
+                    update_props[hmc_prop_name] = input_prop_value
+            else:
+                update_props[hmc_prop_name] = input_prop_value
+            create_props[hmc_prop_name] = input_prop_value
+        elif adapter_family in ('osa', 'hipersockets'):
+            vswitches = partition.manager.cpc.virtual_switches.findall(
+                **{'backing-adapter-uri': adapter.uri})
+            # Adapters of this family always have a vswitch (one for each
+            # port), so we assert that we can find one or more:
+            if not vswitches:
+                raise AssertionError()
+            found_vswitch = None
+            for vswitch in vswitches:
+                if vswitch.get_property('port') == adapter_port_index:
+                    found_vswitch = vswitch
+                    break
+            # Because we already checked for the existence of the specified
+            # port index, we can now assert that we found the vswitch for that
+            # port:
+            if not found_vswitch:
+                raise AssertionError()
+            # Here we perform the same logic as in the property loop, just now
+            # simplified by the knowledge about the property flags (create,
+            # update, etc.).
+            hmc_prop_name = 'virtual-switch-uri'
+            input_prop_value = found_vswitch.uri
+            if nic:
+                if nic.properties.get(hmc_prop_name) != input_prop_value:
+                    update_props[hmc_prop_name] = input_prop_value
+            else:
+                update_props[hmc_prop_name] = input_prop_value
+            create_props[hmc_prop_name] = input_prop_value
+        else:
+            raise ParameterError(
+                "Artificial property {0!r} specifies the name of a "
+                "non-network adapter of family {1!r}: {2!r}".
+                format(adapter_name_art_name, adapter_family, adapter_name))
+
+    return create_props, update_props, stop
+
+
+# Dictionary of properties of HBA resources, in this format:
+#   name: (allowed, create, update, update_while_active, eq_func, type_cast)
+# where:
+#   name: Name of the property according to the data model, with hyphens
+#     replaced by underscores (this is how it is or would be specified in
+#     the 'properties' module parameter).
+#   allowed: Indicates whether it is allowed in the 'properties' module
+#     parameter.
+#   create: Indicates whether it can be specified for the "Create HBA"
+#     operation.
+#   update: Indicates whether it can be specified for the "Update HBA
+#     Properties" operation (at all).
+#   update_while_active: Indicates whether it can be specified for the "Update
+#     HBA Properties" operation while the partition of the HBA is active. None
+#     means "not applicable" (i.e. update=False).
+#   eq_func: Equality test function for two values of the property; None means
+#     to use Python equality.
+#   type_cast: Type cast function for an input value of the property; None
+#     means to use it directly. This can be used for example to convert
+#     integers provided as strings by Ansible back into integers (that is a
+#     current deficiency of Ansible).
+ZHMC_HBA_PROPERTIES = {
+
+    # create-only properties:
+    'adapter_port_uri': (
+        False, True, False, None, None, None),  # via adapter_name/_port
+    'adapter_name': (
+        True, True, False, None, None,
+        None),  # artificial property, type_cast ignored
+    'adapter_port': (
+        True, True, False, None, None,
+        None),  # artificial property, type_cast ignored
+
+    # create+update properties:
+    'name': (
+        False, True, True, True, None, None),  # provided in 'name' module parm
+    'description': (True, True, True, True, None, to_unicode),
+    'device_number': (True, True, True, True, eq_hex, None),
+
+    # read-only properties:
+    'element-uri': (False, False, False, None, None, None),
+    'element-id': (False, False, False, None, None, None),
+    'parent': (False, False, False, None, None, None),
+    'class': (False, False, False, None, None, None),
+    'wwpn': (False, False, False, None, None, None),
+}
+
+ZHMC_HBA_SCHEMA = PropertySchema(ZHMC_HBA_PROPERTIES)
+
+
+def process_hba_properties(partition, hba, params, adapters=None):
+    """
+    Process the properties specified in the 'properties' module parameter,
+    and return two dictionaries (create_props, update_props) that contain
+    the properties that can be created, and the properties that can be updated,
+    respectively. If the resource exists, the input property values are
+    compared with the existing resource property values and the returned set
+    of properties is the minimal set of properties that need to be changed.
+
+    - Underscores in the property names are translated into hyphens.
+    - The presence of read-only properties, invalid properties (i.e. not
+      defined in the data model for partitions), and properties that are not
+      allowed because of restrictions or because they are auto-created from
+      an artificial property is surfaced by raising ParameterError.
+    - The properties resulting from handling artificial properties are
+      added to the returned dictionaries.
+
+    Parameters:
+
+      partition (zhmcclient.Partition): Partition containing the HBA. Must
+        exist.
+
+      hba (zhmcclient.Hba): HBA to be updated with the full set of current
+        properties, or `None` if it did not previously exist.
+
+      params (dict): Module input parameters, or a device entry with
+        the 'name' and 'properties' items.
+
+      adapters (dict): The adapters of the CPC by name, for looking up the
+        adapter specified in the artificial properties (see find_adapter()),
+        or None for finding the adapter by listing the adapters of the CPC.
+
+    Returns:
+      tuple of (create_props, update_props, stop), where:
+        * create_props: dict of properties for
+          zhmcclient.HbaManager.create()
+        * update_props: dict of properties for
+          zhmcclient.Hba.update_properties()
+        * stop (bool): Indicates whether some update properties require the
+          partition containg the HBA to be stopped when doing the update.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+    """
+    create_props = {}
+    update_props = {}
+    stop = False
+
+    # handle 'name' property
+    hba_name = to_unicode(params['name'])
+    create_props['name'] = hba_name
+    # We looked up the HBA by name, so we will never have to update its name
+
+    # Names of the artificial properties
+    adapter_name_art_name = 'adapter_name'
+    adapter_port_art_name = 'adapter_port'
+
+    # handle the other properties
+    input_props = params.get('properties', {})
+    if input_props is None:
+        input_props = {}
+    for prop_name in input_props:
+
+        if prop_name not in ZHMC_HBA_SCHEMA:
+            raise ParameterError(
+                "Property {0!r} is not defined in the data model for "
+                "HBAs.".format(prop_name))
+
+        if prop_name not in ZHMC_HBA_SCHEMA.allowed_names:
+            raise ParameterError(
+                "Property {0!r} is not allowed in the 'properties' module "
+                "parameter.".format(prop_name))
+
+        if prop_name in (adapter_name_art_name, adapter_port_art_name):
+            # Artificial properties will be processed together after this loop
+            continue
+
+        # Process a normal (= non-artificial) property
+        _create_props, _update_props, _stop = process_normal_property(
+            prop_name, ZHMC_HBA_SCHEMA, input_props, hba)
+        create_props.update(_create_props)
+        update_props.update(_update_props)
+        if _stop:
+            stop = True
+
+    # Process artificial properties
+    if (adapter_name_art_name in input_props) != \
+            (adapter_port_art_name in input_props):
+        raise ParameterError(
+            "Artificial properties {0!r} and {1!r} must either both be "
+            "specified or both be omitted.".
+            format(adapter_name_art_name, adapter_port_art_name))
+    if adapter_name_art_name in input_props and \
+            adapter_port_art_name in input_props:
+        adapter_name = to_unicode(input_props[adapter_name_art_name])
+        adapter_port_index = int(input_props[adapter_port_art_name])
+        adapter = find_adapter(partition, adapter_name, adapters)
+        if adapter is None:
+            raise ParameterError(
+                "Artificial property {0!r} does not specify the name of an "
+                "existing adapter: {1!r}".
+                format(adapter_name_art_name, adapter_name))
+        try:
+            port = adapter.ports.find(index=adapter_port_index)
+        except NotFound:
+            raise ParameterError(
+                "Artificial property {0!r} does not specify the index of an "
+                "existing port on adapter {1!r}: {2!r}".
+                format(adapter_port_art_name, adapter_name,
+                       adapter_port_index))
+        hmc_prop_name = 'adapter-port-uri'
+        if hba:
+            existing_port_uri = hba.get_property(hmc_prop_name)
+            if port.uri != existing_port_uri:
+                raise ParameterError(
+                    "Artificial properties {0!r} and {1!r} cannot be used to "
+                    "change the adapter port of an existing HBA".
+                    format(adapter_name_art_name, adapter_port_art_name))
+        create_props[hmc_prop_name] = port.uri
+
+    return create_props, update_props, stop
+
+
+# Dictionary of properties of virtual function resources, in this format:
+#   name: (allowed, create, update, update_while_active, eq_func, type_cast)
+# where:
+#   name: Name of the property according to the data model, with hyphens
+#     replaced by underscores (this is how it is or would be specified in
+#     the 'properties' module parameter).
+#   allowed: Indicates whether it is allowed in the 'properties' module
+#     parameter.
+#   create: Indicates whether it can be specified for the "Create Virtual
+#     Function" operation.
+#   update: Indicates whether it can be specified for the "Update Virtual
+#     Function Properties" operation (at all).
+#   update_while_active: Indicates whether it can be specified for the "Update
+#     Virtual Function Properties" operation while the partition of the
+#     virtual function is active. None means "not applicable" (i.e.
+#     update=False).
+#   eq_func: Equality test function for two values of the property; None means
+#     to use Python equality.
+#   type_cast: Type cast function for an input value of the property; None
+#     means to use it directly. This can be used for example to convert
+#     integers provided as strings by Ansible back into integers (that is a
+#     current deficiency of Ansible).
+ZHMC_VFUNCTION_PROPERTIES = {
+
+    # create+update properties:
+    'name': (
+        False, True, True, True, None, None),  # provided in 'name' module parm
+    'description': (True, True, True, True, None, to_unicode),
+    'device_number': (True, True, True, True, eq_hex, None),
+    'adapter_uri': (
+        False, True, True, True, None, None),  # via adapter_name
+    'adapter_name': (
+        True, True, True, True, None,
+        None),  # artificial property, type_cast ignored
+
+    # read-only properties:
+    'element-uri': (False, False, False, None, None, None),
+    'element-id': (False, False, False, None, None, None),
+    'parent': (False, False, False, None, None, None),
+    'class': (False, False, False, None, None, None),
+}
+
+ZHMC_VFUNCTION_SCHEMA = PropertySchema(ZHMC_VFUNCTION_PROPERTIES)
+
+
+def process_vfunction_properties(partition, vfunction, params,
+                                 adapters=None):
+    """
+    Process the properties specified in the 'properties' module parameter,
+    and return two dictionaries (create_props, update_props) that contain
+    the properties that can be created, and the properties that can be updated,
+    respectively. If the resource exists, the input property values are
+    compared with the existing resource property values and the returned set
+    of properties is the minimal set of properties that need to be changed.
+
+    - Underscores in the property names are translated into hyphens.
+    - The presence of read-only properties, invalid properties (i.e. not
+      defined in the data model for partitions), and properties that are not
+      allowed because of restrictions or because they are auto-created from
+      an artificial property is surfaced by raising ParameterError.
+    - The properties resulting from handling artificial properties are
+      added to the returned dictionaries.
+
+    Parameters:
+
+      partition (zhmcclient.Partition): Partition containing the virtual
+        function. Must exist.
+
+      vfunction (zhmcclient.VirtualFunction): Virtual function to be updated
+        with the full set of current properties, or `None` if it did not
+        previously exist.
+
+      params (dict): Module input parameters, or a device entry with
+        the 'name' and 'properties' items.
+
+      adapters (dict): The adapters of the CPC by name, for looking up the
+        adapter specified in the artificial properties (see find_adapter()),
+        or None for finding the adapter by listing the adapters of the CPC.
+
+    Returns:
+      tuple of (create_props, update_props, stop), where:
+        * create_props: dict of properties for
+          zhmcclient.VirtualFunctionManager.create()
+        * update_props: dict of properties for
+          zhmcclient.VirtualFunction.update_properties()
+        * stop (bool): Indicates whether some update properties require the
+          partition containg the virtual function to be stopped when doing the
+          update.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+    """
+    create_props = {}
+    update_props = {}
+    stop = False
+
+    # handle 'name' property
+    vfunction_name = to_unicode(params['name'])
+    create_props['name'] = vfunction_name
+    # We looked up the virtual function by name, so we will never have to
+    # update its name
+
+    # Names of the artificial properties
+    adapter_name_art_name = 'adapter_name'
+
+    # handle the other properties
+    input_props = params.get('properties', {})
+    if input_props is None:
+        input_props = {}
+    for prop_name in input_props:
+
+        if prop_name not in ZHMC_VFUNCTION_SCHEMA:
+            raise ParameterError(
+                "Property {0!r} is not defined in the data model for "
+                "virtual functions.".format(prop_name))
+
+        if prop_name not in ZHMC_VFUNCTION_SCHEMA.allowed_names:
+            raise ParameterError(
+                "Property {0!r} is not allowed in the 'properties' module "
+                "parameter.".format(prop_name))
+
+        if prop_name == adapter_name_art_name:
+            # Artificial properties will be processed together after this loop
+            continue
+
+        # Process a normal (= non-artificial) property
+        _create_props, _update_props, _stop = process_normal_property(
+            prop_name, ZHMC_VFUNCTION_SCHEMA, input_props, vfunction)
+        create_props.update(_create_props)
+        update_props.update(_update_props)
+        if _stop:
+            stop = True
+
+    # Process artificial properties
+    if adapter_name_art_name in input_props:
+        adapter_name = to_unicode(input_props[adapter_name_art_name])
+        adapter = find_adapter(partition, adapter_name, adapters)
+        if adapter is None:
+            raise ParameterError(
+                "Artificial property {0!r} does not specify the name of an "
+                "existing adapter: {1!r}".
+                format(adapter_name_art_name, adapter_name))
+
+        # Here we perform the same logic as in the property loop, just now
+        # simplified by the knowledge about the property flags (create, update,
+        # etc.).
+        hmc_prop_name = 'adapter-uri'
+        input_prop_value = adapter.uri
+        if vfunction:
+            if vfunction.properties.get(hmc_prop_name) != input_prop_value:
+                update_props[hmc_prop_name] = input_prop_value
+        else:
+            update_props[hmc_prop_name] = input_prop_value
+        create_props[hmc_prop_name] = input_prop_value
+
+    return create_props, update_props, stop
+
+
+def concurrent_map(func, items, max_concurrency):
+    """
+    Call a function for each item of a list, with up to a maximum number of
+    calls running concurrently in separate threads, and return the list of
+    return values in the order of the items.
+
+    All calls are completed before this function returns. If any call raised
+    an exception, the exception of the first such item (in the order of the
+    items) is re-raised.
+
+    Parameters:
+
+      func (callable): Function to be called with one item as its only
+        positional argument.
+
+      items (iterable): The items.
+
+      max_concurrency (int): Maximum number of concurrently running calls.
+        A value of 1 or less causes the calls to be made serially in the
+        current thread.
+
+    Returns:
+      list: Return values of the calls, in the order of the items.
+    """
+    items = list(items)
+    if max_concurrency <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    results = [None] * len(items)
+    exc_infos = [None] * len(items)
+    index_queue = queue.Queue()
+    for index in range(len(items)):
+        index_queue.put(index)
+
+    def worker():
+        "Process items until the queue is exhausted."
+        while True:
+            try:
+                index = index_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                results[index] = func(items[index])
+            except Exception:  # pylint: disable=broad-except
+                exc_infos[index] = sys.exc_info()
+
+    threads = []
+    for _ in range(min(max_concurrency, len(items))):
+        thread = threading.Thread(target=worker)
+        thread.daemon = True
+        thread.start()
+        threads.append(thread)
+    for thread in threads:
+        thread.join()
+
+    for exc_info in exc_infos:
+        if exc_info is not None:
+            six.reraise(*exc_info)
+    return results
+
+
+class ResourceFetcher(object):
+    """
+    Retrieves the full set of properties of zhmcclient resource objects from
+    the HMC, such that each resource (identified by its URI) is retrieved at
+    most once, and the retrievals run concurrently.
+
+    Resource objects are registered with add(), which returns the resource
+    object that is registered for the URI of the resource. That way, resources
+    that are reached via multiple paths (e.g. the parent adapters of multiple
+    ports) are represented by a single object. fetch() retrieves the
+    properties of all registered resources that do not have their full set of
+    properties yet.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """
+        Parameters:
+
+          max_concurrency (int): Maximum number of concurrently running
+            retrievals.
+        """
+        self.max_concurrency = max_concurrency
+        self._resources = {}  # resource objects by URI
+        self._pending = []  # resource objects to be retrieved
+
+    def add(self, resource):
+        """
+        Register a resource object, and return the resource object that is
+        registered for its URI.
+        """
+        try:
+            return self._resources[resource.uri]
+        except KeyError:
+            self._resources[resource.uri] = resource
+            if not resource.full_properties:
+                self._pending.append(resource)
+            return resource
+
+    def fetch(self):
+        """
+        Retrieve the full set of properties of all registered resources that
+        do not have them yet.
+        """
+        # Resources may have been retrieved since they were registered, e.g.
+        # by accessing a property that was not present.
+        pending = [res for res in self._pending if not res.full_properties]
+        self._pending = []
+        concurrent_map(
+            lambda resource: resource.pull_full_properties(), pending,
+            self.max_concurrency)
+
+
+# Child resources of CPCs that can be returned as artificial properties, in
+# this format:
+#   name: (dpm, list_func)
+# where:
+#   name: Name of the artificial property.
+#   dpm: Operational mode of the CPC to which the child resources apply: True
+#     for DPM mode, False for classic mode, None for both.
+#   list_func: Function that lists the child resources, given the CPC.
+CPC_CHILD_RESOURCES = {
+    'partitions': (
+        None, lambda cpc: cpc.partitions.list()),
+    'adapters': (
+        None, lambda cpc: cpc.adapters.list()),
+    'storage-groups': (
+        None, lambda cpc: cpc.manager.console.storage_groups.list(
+            filter_args={'cpc-uri': cpc.uri})),
+    'virtual-switches': (
+        True, lambda cpc: cpc.virtual_switches.list()),
+    'lpars': (
+        False, lambda cpc: cpc.lpars.list()),
+}
+
+
+def list_cpc_children(cpc_names, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+    """
+    List child resources of CPCs, with up to a maximum number of lists running
+    concurrently across all CPCs.
+
+    Names of child resources that do not apply to the operational mode of a
+    CPC are ignored for that CPC. The operational mode is determined only if
+    needed.
+
+    Parameters:
+
+      cpc_names (iterable of tuple(zhmcclient.Cpc, list of str)): The CPCs,
+        each with the names of the child resources to be listed, as keys in
+        CPC_CHILD_RESOURCES.
+
+      max_concurrency (int): Maximum number of concurrently running lists.
+
+    Returns:
+      list of dict: For each CPC in the order of cpc_names, the child
+      resources, with key: name of the child resources, value: list of the
+      properties of the child resources, as returned by the list operation.
+
+    Raises:
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    results = []
+    lists = []  # tuple(result dict, cpc, name)
+    for cpc, names in cpc_names:
+        result = {}
+        results.append(result)
+        dpm_enabled = None
+        for name in sorted(names):
+            dpm = CPC_CHILD_RESOURCES[name][0]
+            if dpm is not None:
+                if dpm_enabled is None:
+                    dpm_enabled = cpc.get_property('dpm-enabled')
+                if dpm != dpm_enabled:
+                    continue
+            lists.append((result, cpc, name))
+
+    def list_children(item):
+        "List the child resources of one kind for one CPC."
+        _, cpc, name = item
+        list_func = CPC_CHILD_RESOURCES[name][1]
+        return [dict(res.properties) for res in list_func(cpc)]
+
+    children = concurrent_map(list_children, lists, max_concurrency)
+    for (result, _, name), child_properties in zip(lists, children):
+        result[name] = child_properties
+    return results
+
+
+def _manager_key(manager):
+    """
+    Return a key that identifies the resource manager, for caching resources
+    by manager.
+    """
+    parent = manager.parent
+    return (parent.uri if parent is not None else None, manager.class_name)
+
+
+class FullFetch(object):
+    """
+    Fetch strategy for ResourceReconciler that finds the resource by name and
+    retrieves its full set of properties.
+    """
+
+    def find(self, manager, name):
+        """
+        Return the resource with the name, without retrieving its properties.
+
+        Raises:
+          zhmcclient.NotFound: The resource does not exist.
+        """
+        return manager.find(name=name)
+
+    def pull(self, resource):
+        """
+        Retrieve the properties of a resource that was found.
+        """
+        resource.pull_full_properties()
+
+    def refresh(self, resource):
+        """
+        Retrieve the properties of a resource after it was created or updated.
+        """
+        resource.pull_full_properties()
+
+
+class SelectiveFetch(FullFetch):
+    """
+    Fetch strategy for ResourceReconciler that retrieves only the specified
+    properties of the resource (see pull_properties()), also after it was
+    created or updated.
+
+    The properties needed by the process_properties() function of the module
+    must be included.
+    """
+
+    def __init__(self, names):
+        """
+        Parameters:
+          names (iterable of str): Names of the HMC properties to retrieve.
+        """
+        self.names = set(names)
+
+    def pull(self, resource):
+        pull_properties(resource, self.names)
+
+    def refresh(self, resource):
+        pull_properties(resource, self.names)
+
+
+class BatchFetch(FullFetch):
+    """
+    Fetch strategy for ResourceReconciler that lists the resources of a
+    manager once and retrieves the full properties of all of them
+    concurrently (see ResourceFetcher).
+
+    It is suitable when multiple resources of the same manager are reconciled
+    with the same strategy object.
+    """
+
+    def __init__(self, max_concurrency=DEFAULT_MAX_CONCURRENCY):
+        """
+        Parameters:
+          max_concurrency (int): Maximum number of concurrently running
+            retrievals.
+        """
+        self.max_concurrency = max_concurrency
+        self._listed = {}  # resource objects by name, by manager key
+
+    def find(self, manager, name):
+        key = _manager_key(manager)
+        try:
+            resources = self._listed[key]
+        except KeyError:
+            fetcher = ResourceFetcher(self.max_concurrency)
+            resources = dict((res.name, fetcher.add(res))
+                             for res in manager.list())
+            fetcher.fetch()
+            self._listed[key] = resources
+        try:
+            return resources[name]
+        except KeyError:
+            raise NotFound({'name': name}, manager)
+
+    def pull(self, resource):
+        if not resource.full_properties:
+            resource.pull_full_properties()
+
+
+class CachedFetch(object):
+    """
+    Fetch strategy for ResourceReconciler that caches the resources found by
+    another fetch strategy, so that reconciling a resource again (e.g. in
+    batch modules that name a resource more than once) neither looks it up
+    nor retrieves its properties again.
+
+    The properties are retrieved again after the resource was created or
+    updated.
     """
-    Set up logging for the loggers of the current Ansible module, and for the
-    loggers of the underlying zhmcclient package.
 
-    The log level of these loggers is set to debug.
+    def __init__(self, fetch=None):
+        """
+        Parameters:
+          fetch: The fetch strategy that is used on a cache miss.
+            Default: FullFetch.
+        """
+        self.fetch = fetch or FullFetch()
+        self._found = {}  # resource objects by (manager key, name)
+
+    def find(self, manager, name):
+        key = (_manager_key(manager), name)
+        try:
+            return self._found[key]
+        except KeyError:
+            resource = self.fetch.find(manager, name)
+            self._found[key] = resource
+            return resource
+
+    def pull(self, resource):
+        if not resource.full_properties:
+            self.fetch.pull(resource)
+
+    def refresh(self, resource):
+        self.fetch.refresh(resource)
 
-    If a log file is specified, a log file handler for that log file (with a
-    log formatter) is created and attached to these loggers.
+
+def create_or_update_resource(manager, resource, create_props, update_props,
+                              fetch=None, update_func=None):
+    """
+    Create a resource and update its update-only properties, or update an
+    existing resource, and refresh its properties once after the change, in
+    case an input property value gets changed by the HMC.
+
+    Parameters:
+      manager: zhmcclient manager for the resource type.
+      resource: zhmcclient resource object, or None for creating the
+        resource.
+      create_props (dict): HMC properties for the creation.
+      update_props (dict): HMC properties for the update. When creating the
+        resource, only the properties not in create_props are updated.
+      fetch: Fetch strategy for the refresh. Default: FullFetch.
+      update_func (callable): Function update_func(resource, props) that
+        updates an existing resource. Default: resource.update_properties().
+
+    Returns:
+      zhmcclient resource object that was created or updated.
+    """
+    if resource is None:
+        resource = manager.create(create_props)
+        update2_props = {}
+        for name, value in update_props.items():
+            if name not in create_props:
+                update2_props[name] = value
+        if update2_props:
+            resource.update_properties(update2_props)
+    elif update_func:
+        update_func(resource, update_props)
+    else:
+        resource.update_properties(update_props)
+    (fetch or FullFetch()).refresh(resource)
+    return resource
+
+
+class ResourceReconciler(object):
+    """
+    Reconciles a resource with the properties specified in the module
+    parameters, using the pipeline that is common to the modules managing
+    resources with state=present:
+
+    * find the resource by name and retrieve its properties, using a fetch
+      strategy (FullFetch, SelectiveFetch, BatchFetch, or CachedFetch),
+    * determine the properties to be set, using the process_properties()
+      function of the module,
+    * create the resource or update its properties,
+    * refresh the properties once after the change.
+
+    HMC requests are subject to the retry policy and the request throttle of
+    the session (see open_session()).
+    """
+
+    def __init__(self, manager, name, process_properties, fetch=None,
+                 update_func=None, check_mode_func=None, logger=None):
+        """
+        Parameters:
+          manager: zhmcclient manager for the resource type.
+          name (string): Name of the resource.
+          process_properties (callable): Function process_properties(resource)
+            returning a tuple (create_props, update_props) or (create_props,
+            update_props, stop) for the resource, or for creating it if
+            resource is None. stop must be False, since stopping the parent is
+            not handled.
+          fetch: Fetch strategy. Default: FullFetch.
+          update_func (callable): Function update_func(resource, props) that
+            updates an existing resource (e.g. update_after_transition()).
+            Default: resource.update_properties().
+          check_mode_func (callable): Function check_mode_func(create_props,
+            update_props) that returns a local resource object for a resource
+            that would be created, in check mode. Default: None, i.e. no
+            resource is returned in that case.
+          logger (logging.Logger): Logger. Default: The logger for the common
+            module utilities.
+        """
+        self.manager = manager
+        self.name = name
+        self.process_properties = process_properties
+        self.fetch = fetch or FullFetch()
+        self.update_func = update_func
+        self.check_mode_func = check_mode_func
+        self.logger = logger or logging.getLogger(COMMON_LOGGER_NAME)
+        self.resource = None
+        self.created = False
+        self.update_props = {}
+
+    def find(self):
+        """
+        Find the resource and retrieve its properties using the fetch strategy.
+
+        Returns:
+          zhmcclient resource object, or None if the resource does not exist.
+        """
+        try:
+            resource = self.fetch.find(self.manager, self.name)
+        except NotFound:
+            return None
+        self.fetch.pull(resource)
+        return resource
+
+    def reconcile(self, check_mode):
+        """
+        Ensure that the resource exists and has the specified properties.
+
+        The resource is available as the 'resource' attribute afterwards (it
+        may be None in check mode), whether it was created as the 'created'
+        attribute, and the updated properties as the 'update_props'
+        attribute.
+
+        Returns:
+          tuple of (changed, result), where result is a dict with the
+          properties of the resource (in check mode, updated with the
+          properties that would be updated), or an empty dict if there is no
+          resource.
+
+        Raises:
+          ParameterError: An issue with the module parameters.
+          zhmcclient.Error: Any zhmcclient exception can happen.
+        """
+        resource = self.find()
+        processed = self.process_properties(resource)
+        create_props, update_props = processed[0:2]
+        stop = processed[2] if len(processed) > 2 else False
+        if stop:
+            raise AssertionError("Unexpected stop for {0} {1!r}".
+                                 format(self.manager.class_name, self.name))
+        self.created = resource is None
+        self.update_props = update_props
+
+        if resource is None:
+            # It does not exist. Create it and update it if there are
+            # update-only properties.
+            self.logger.debug(
+                "Creating %s %r with properties %r, update-only properties "
+                "%r", self.manager.class_name, self.name, create_props,
+                update_props)
+            if not check_mode:
+                resource = create_or_update_resource(
+                    self.manager, None, create_props, update_props,
+                    self.fetch)
+            elif self.check_mode_func:
+                update2_props = dict(
+                    (name, value) for name, value in update_props.items()
+                    if name not in create_props)
+                resource = self.check_mode_func(create_props, update2_props)
+            self.resource = resource
+            result = dict(resource.properties) if resource else {}
+            return True, result
+
+        self.resource = resource
+        if create_props:
+            raise AssertionError("Unexpected create_props: {0!r}".
+                                 format(create_props))
+        if not update_props:
+            return False, dict(resource.properties)
+
+        self.logger.debug(
+            "Updating %s %r with properties %r", self.manager.class_name,
+            self.name, update_props)
+        if not check_mode:
+            create_or_update_resource(
+                self.manager, resource, create_props, update_props,
+                self.fetch, self.update_func)
+            return True, dict(resource.properties)
+        result = dict(resource.properties)
+        result.update(update_props)
+        return True, result
+
+
+# Artificial properties that can be expanded for storage groups
+STORAGE_GROUP_EXPANSIONS = (
+    'candidate-adapter-ports', 'storage-volumes', 'virtual-storage-resources')
+
+# Storage group property with the URIs of the child resources, by artificial
+# property that is expanded from it
+STORAGE_GROUP_EXPANSION_URIS = {
+    'candidate-adapter-ports': 'candidate-adapter-port-uris',
+    'storage-volumes': 'storage-volume-uris',
+    'virtual-storage-resources': 'virtual-storage-resource-uris',
+}
+
+
+def expand_storage_group_properties(storage_groups, fetcher, expansions):
+    """
+    Retrieve the properties of storage groups and of the child resources
+    selected for expansion, and return them.
+
+    The storage groups, their candidate adapter ports with the parent
+    adapters of the ports, their storage volumes and their virtual storage
+    resources are registered with the fetcher and are retrieved in two
+    concurrent rounds (first the storage groups, then their child resources).
+    Any other resources registered with the fetcher by the caller are
+    retrieved as well.
+
+    Storage groups whose properties with the URIs of the child resources
+    selected for expansion are current (see PropertyFreshness), e.g. after a
+    property-selective retrieval, are not retrieved again. Their returned
+    properties are then the properties that had been retrieved.
+
+    Note: The storage volumes are created from the 'storage-volume-uris'
+    property, because the 'List Storage Volumes of a Storage Group' operation
+    returns an empty list for auto-discovered volumes.
+
+    Parameters:
+
+      storage_groups (list of zhmcclient.StorageGroup): The storage groups.
+
+      fetcher (ResourceFetcher): The fetcher to be used.
+
+      expansions (iterable of string): The artificial properties to be
+        expanded, as a subset of STORAGE_GROUP_EXPANSIONS.
+
+    Returns:
+      list of dict: The properties of the storage groups, in the order of the
+      storage groups, extended by the selected artificial properties:
+
+      * 'candidate-adapter-ports': List of Port objects, each of which is
+        represented as its dictionary of properties, extended by the
+        'parent-adapter' property with the properties of the adapter of the
+        port.
+
+      * 'storage-volumes': List of StorageVolume objects, each of which is
+        represented as its dictionary of properties.
+
+      * 'virtual-storage-resources': List of VirtualStorageResource objects,
+        each of which is represented as its dictionary of properties.
+    """
+    uri_names = [STORAGE_GROUP_EXPANSION_URIS[name] for name in expansions
+                 if name in STORAGE_GROUP_EXPANSION_URIS]
+    storage_groups = [
+        sg if PropertyFreshness.of(sg).is_fresh(uri_names)
+        else fetcher.add(sg) for sg in storage_groups]
+    fetcher.fetch()
+
+    children_list = []
+    for storage_group in storage_groups:
+        children = {}
+        if 'candidate-adapter-ports' in expansions:
+            # The ports are created from the 'candidate-adapter-port-uris'
+            # property instead of using list_candidate_adapter_ports(),
+            # because that creates a separate Adapter object for each port.
+            caps = []
+            adapter_manager = storage_group.cpc.adapters
+            for port_uri in storage_group.get_property(
+                    'candidate-adapter-port-uris'):
+                adapter_uri = re.match(r'^(/api/adapters/[^/]*)/',
+                                       port_uri).group(1)
+                adapter = fetcher.add(
+                    adapter_manager.resource_object(adapter_uri))
+                port = fetcher.add(adapter.ports.resource_object(port_uri))
+                caps.append((port, adapter))
+            children['candidate-adapter-ports'] = caps
+        if 'storage-volumes' in expansions:
+            children['storage-volumes'] = [
+                fetcher.add(storage_group.storage_volumes.resource_object(uri))
+                for uri in storage_group.get_property('storage-volume-uris')]
+        if 'virtual-storage-resources' in expansions:
+            vsr_manager = storage_group.virtual_storage_resources
+            children['virtual-storage-resources'] = [
+                fetcher.add(vsr_manager.resource_object(uri))
+                for uri in storage_group.get_property(
+                    'virtual-storage-resource-uris')]
+        children_list.append(children)
+    fetcher.fetch()
+
+    sgs_prop = []
+    for storage_group, children in zip(storage_groups, children_list):
+        sg_properties = dict(storage_group.properties)
+        if 'candidate-adapter-ports' in children:
+            caps_prop = []
+            for port, adapter in children['candidate-adapter-ports']:
+                cap_properties = dict(port.properties)
+                cap_properties['parent-adapter'] = dict(adapter.properties)
+                caps_prop.append(cap_properties)
+            sg_properties['candidate-adapter-ports'] = caps_prop
+        for name in ('storage-volumes', 'virtual-storage-resources'):
+            if name in children:
+                sg_properties[name] = [
+                    dict(res.properties) for res in children[name]]
+        sgs_prop.append(sg_properties)
+    return sgs_prop
+
+
+class QueueLogHandler(logging.Handler):
+    """
+    A log handler that puts the log records into a queue, from where a
+    background thread formats them and writes them to a log file.
+
+    This moves the cost of formatting the log records, truncating the log
+    messages and writing them to the log file out of the thread that logs.
+    The message arguments are merged into the message in the thread that
+    logs, because they may be mutable objects that are changed afterwards
+    (e.g. the request and response bodies logged by zhmcclient). Log messages
+    that are longer than a maximum length are truncated.
+
+    The log file is rotated by size if a maximum size is specified.
+
+    If the process is forked, the background thread is started again in the
+    new process when it logs for the first time.
+    """
+
+    def __init__(self, filename, max_length=None, max_bytes=0,
+                 backup_count=DEFAULT_LOG_BACKUP_COUNT):
+        """
+        Parameters:
+
+            filename (string): Path name of the log file.
+
+            max_length (int): Maximum length of a log message, or `None` for
+              no truncation.
+
+            max_bytes (int): Size of the log file at which it is rotated, or
+              0 for no rotation.
+
+            backup_count (int): Number of rotated log files that are kept.
+        """
+        super(QueueLogHandler, self).__init__()
+        self.filename = os.path.abspath(filename)
+        self.max_length = max_length
+        self.target = logging.handlers.RotatingFileHandler(
+            self.filename, maxBytes=max_bytes, backupCount=backup_count)
+        self._queue = None
+        self._thread = None
+        self._pid = None
+
+    def setFormatter(self, fmt):
+        super(QueueLogHandler, self).setFormatter(fmt)
+        self.target.setFormatter(fmt)
+
+    def _start(self):
+        """
+        Start the background thread in the current process.
+        """
+        self._queue = queue.Queue()
+        self._pid = os.getpid()
+        self._thread = threading.Thread(target=self._write_records)
+        self._thread.daemon = True
+        self._thread.start()
+
+    def _write_records(self):
+        """
+        Background thread: Write the queued log records until the sentinel
+        `None` is received.
+        """
+        while True:
+            record = self._queue.get()
+            if record is None:
+                break
+            self.target.handle(self.truncate(record))
+
+    def truncate(self, record):
+        """
+        Return the log record with its message truncated to the maximum
+        length.
+        """
+        msg = record.getMessage()
+        if self.max_length and len(msg) > self.max_length:
+            msg = "{0}... ({1} more characters)".format(
+                msg[:self.max_length], len(msg) - self.max_length)
+        record.msg = msg
+        record.args = None
+        return record
+
+    def emit(self, record):
+        """
+        Queue a copy of the log record with the message arguments merged into
+        the message. The log record is formatted in the background thread.
+        """
+        try:
+            record = copy.copy(record)
+            record.msg = record.getMessage()
+            record.args = None
+            if record.exc_info:
+                # The traceback is formatted while it is still available
+                if not record.exc_text:
+                    record.exc_text = logging.Formatter().formatException(
+                        record.exc_info)
+                record.exc_info = None
+            self.acquire()
+            try:
+                if self._thread is None or self._pid != os.getpid():
+                    self._start()
+                self._queue.put(record)
+            finally:
+                self.release()
+        except Exception:  # pylint: disable=broad-except
+            self.handleError(record)
+
+    def flush(self):
+        """
+        Wait until the queued log records have been written, and flush the
+        log file.
+        """
+        self.acquire()
+        try:
+            if self._thread is not None and self._pid == os.getpid():
+                self._queue.put(None)
+                self._thread.join()
+            self._thread = None
+            self.target.flush()
+        finally:
+            self.release()
+
+    def close(self):
+        """
+        Write the queued log records and close the log file. The log file is
+        opened again when the handler is used again.
+        """
+        self.flush()
+        self.target.close()
+        super(QueueLogHandler, self).close()
+
+
+class JsonLogFormatter(logging.Formatter):
+    """
+    A log formatter that formats each log record as a JSON object on a single
+    line (JSON lines format).
+
+    The JSON object has the time (in UTC), log level, logger name, process
+    ID, the name of the Ansible module and the correlation ID of the module
+    invocation, and the log message. Log records of HMC requests (see
+    log_requests()) additionally have the method, URI, HTTP status, error
+    and duration of the request.
+    """
+
+    def __init__(self, module_name, correlation_id):
+        super(JsonLogFormatter, self).__init__()
+        self.module_name = module_name
+        self.correlation_id = correlation_id
+
+    def format(self, record):
+        item = dict(
+            time=datetime.utcfromtimestamp(record.created).isoformat() +
+            '+00:00',
+            level=record.levelname,
+            logger=record.name,
+            pid=record.process,
+            module=self.module_name,
+            correlation_id=self.correlation_id,
+            message=record.getMessage(),
+        )
+        request = getattr(record, 'zhmc_request', None)
+        if request:
+            item.update(request)
+        if record.exc_info and not record.exc_text:
+            record.exc_text = self.formatException(record.exc_info)
+        if record.exc_text:
+            item['exception'] = record.exc_text
+        return json.dumps(item, sort_keys=True)
+
+
+def log_formatter(module_name, datefmt):
+    """
+    Return the log formatter for the log file as configured by the
+    environment variables LOG_FORMAT_ENVVAR and LOG_CORRELATION_ID_ENVVAR,
+    and a list of messages about invalid values of these environment
+    variables, which are then ignored.
+
+    If no correlation ID is set, a new one is generated for the module
+    invocation.
+    """
+    messages = []
+    log_format = os.environ.get(LOG_FORMAT_ENVVAR, None) or 'text'
+    if log_format == 'json':
+        correlation_id = os.environ.get(LOG_CORRELATION_ID_ENVVAR, None) or \
+            uuid.uuid4().hex
+        return JsonLogFormatter(module_name, correlation_id), messages
+    if log_format != 'text':
+        messages.append(
+            "Ignoring invalid log configuration: Environment variable {0} "
+            "must be 'text' or 'json', but is: {1!r}".
+            format(LOG_FORMAT_ENVVAR, log_format))
+    fmt = logging.Formatter(
+        fmt='%(asctime)s %(levelname)s %(name)s %(process)d %(message)s',
+        datefmt=datefmt)
+    return fmt, messages
+
+
+def log_handler(log_file):
+    """
+    Return a QueueLogHandler for the log file that is configured by the
+    environment variables LOG_MAX_LENGTH_ENVVAR, LOG_MAX_BYTES_ENVVAR and
+    LOG_BACKUP_COUNT_ENVVAR, and a list of messages about invalid values of
+    these environment variables, which are then ignored.
+
+    The handler is flushed and closed by logging.shutdown() when the process
+    exits.
+    """
+    config = {}
+    messages = []
+    for name, envvar, default in (
+            ('max_length', LOG_MAX_LENGTH_ENVVAR, DEFAULT_LOG_MAX_LENGTH),
+            ('max_bytes', LOG_MAX_BYTES_ENVVAR, 0),
+            ('backup_count', LOG_BACKUP_COUNT_ENVVAR,
+             DEFAULT_LOG_BACKUP_COUNT)):
+        try:
+            value = positive_envvar(envvar, int)
+        except ParameterError as exc:
+            messages.append("Ignoring invalid log configuration: {0}".
+                            format(exc))
+            value = None
+        config[name] = default if value is None else value
+    return QueueLogHandler(log_file, **config), messages
+
+
+def log_init(logger_name, log_file=None, log_level='debug',
+             hmc_log_level='debug'):
+    """
+    Set up logging for the loggers of the current Ansible module, of the
+    common module utilities, and of the underlying zhmcclient package.
+
+    The log level of the module and common loggers is set to log_level, and
+    the log level of the 'zhmcclient.hmc' logger that logs the interactions
+    with the HMC is set to hmc_log_level. Log calls below these levels are
+    not processed at all.
+
+    The HMC requests are logged at the info level by the logger named
+    REQUEST_LOGGER_NAME, which also has the log level hmc_log_level.
+
+    If a log file is specified, a QueueLogHandler for that log file (with the
+    log formatter returned by log_formatter()) is created and attached to
+    these loggers.
 
     Parameters:
 
@@ -890,6 +4251,12 @@ def log_init(logger_name, log_file=None):
 
         log_file (string): Path name of a log file to log to, or `None`.
           If `None`, logging will be propagated to the Python root logger.
+
+        log_level (string): Log level for the module and common loggers, as
+          one of the values of LOG_LEVELS.
+
+        hmc_log_level (string): Log level for the HMC interactions, as one of
+          the values of LOG_LEVELS.
     """
 
     # The datefmt parameter of logging.Formatter() supports the datetime
@@ -903,35 +4270,52 @@ def log_init(logger_name, log_file=None):
     DATEFMT = '%Y-%m-%dT%H:%M:%S%z'  # 2019-02-20T10:54:26+0100
     # DATEFMT = None  # 2019-02-20 10:54:26,123 (= local time)
 
+    handler = None
+    messages = []
     if log_file:
-        handler = logging.FileHandler(log_file)
-        fmt = logging.Formatter(
-            fmt='%(asctime)s %(levelname)s %(name)s %(process)d %(message)s',
-            datefmt=DATEFMT)
-        handler.setFormatter(fmt)
-    else:
-        handler = None
+        for name in (logger_name, COMMON_LOGGER_NAME, 'zhmcclient.hmc'):
+            handler = find_log_handler(logging.getLogger(name), log_file)
+            if handler:
+                break
+        else:
+            handler, messages = log_handler(log_file)
+            fmt, fmt_messages = log_formatter(logger_name, DATEFMT)
+            handler.setFormatter(fmt)
+            messages.extend(fmt_messages)
+
+    for name, level in ((logger_name, log_level),
+                        (COMMON_LOGGER_NAME, log_level),
+                        ('zhmcclient.hmc', hmc_log_level)):
+        logger = logging.getLogger(name)
+        logger.setLevel(LOG_LEVELS[level])
+        if handler:
+            ensure_one_handler(logger, handler)
 
-    logger = logging.getLogger(logger_name)
-    logger.setLevel(logging.DEBUG)
-    if handler:
-        ensure_one_handler(logger, handler)
+    # The request logger propagates to the handler of the common logger
+    logging.getLogger(REQUEST_LOGGER_NAME).setLevel(LOG_LEVELS[hmc_log_level])
 
-    logger = logging.getLogger('zhmcclient.hmc')
-    logger.setLevel(logging.DEBUG)
-    if handler:
-        ensure_one_handler(logger, handler)
+    logger = logging.getLogger(COMMON_LOGGER_NAME)
+    for msg in messages:
+        logger.warning(msg)
+
+
+def find_log_handler(logger, log_file):
+    """
+    Return the QueueLogHandler of the logger for the log file, or `None`.
+    """
+    filename = os.path.abspath(log_file)
+    for hdlr in logger.handlers:
+        if isinstance(hdlr, QueueLogHandler) and hdlr.filename == filename:
+            return hdlr
+    return None
 
 
 def ensure_one_handler(logger, handler):
     """
     Ensure that the logger has the specified handler exactly once. The handler
-    must be a FileHandler, and the handler is recognized by the file name it
-    logs to (i.e. the new and existing handler may be different Python objects).
+    must be a QueueLogHandler, and the handler is recognized by the file name
+    it logs to (i.e. the new and existing handler may be different Python
+    objects).
     """
-    for hdlr in logger.handlers:
-        if isinstance(hdlr, logging.FileHandler) and \
-                hdlr.stream.name == handler.stream.name:
-            break
-    else:
+    if find_log_handler(logger, handler.filename) is None:
         logger.addHandler(handler)
@@ -0,0 +1,725 @@
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Utility functions and classes for HMC metrics, for use by the zhmc_metrics
+and zhmc_metrics_exporter modules.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import errno
+import json
+import logging
+import mmap
+import os
+import re
+import signal
+import struct
+import tempfile
+import threading
+import time
+import traceback
+from array import array
+from datetime import datetime
+
+from .common import Error, HTTPError, COMMON_LOGGER_NAME
+
+try:
+    import zhmcclient
+    IMP_ZHMCCLIENT_ERR = None
+except ImportError:
+    IMP_ZHMCCLIENT_ERR = traceback.format_exc()
+
+LOGGER = logging.getLogger(COMMON_LOGGER_NAME)
+
+# Default directory of the files of the metrics exporters
+DEFAULT_METRICS_DIR = os.path.join(
+    tempfile.gettempdir(), 'zhmc_ansible_metrics')
+
+# Range of the anticipated frequency of a metrics context in seconds
+MIN_INTERVAL = 15
+MAX_INTERVAL = 3600
+
+# Defaults for the ring buffer of a metrics exporter
+DEFAULT_CAPACITY = 10000
+DEFAULT_RECORD_SIZE = 512
+
+# Highest file descriptor closed in the exporter daemon process
+MAXFD = 1024
+
+# Typecodes of the arrays for the values of numeric metrics, by metric type
+# (as in zhmcclient.MetricDefinition)
+ARRAY_TYPECODES = {
+    int: 'q',
+    float: 'd',
+}
+
+# Metric types by their name in the state file of a metrics exporter
+METRIC_TYPES = {
+    'int': int,
+    'float': float,
+    'bool': bool,
+    'str': str,
+}
+
+
+def metric_value(value_str, metric_type):
+    """
+    Return the value of a metric in a metrics response string as an object
+    of the metric type.
+    """
+    if metric_type is bool:
+        return value_str.lower() == 'true'
+    if metric_type is str:
+        return value_str.strip('"')
+    return metric_type(value_str)
+
+
+def group_metrics(metric_group_definition):
+    """
+    Return the metrics of a metric group as a list of tuples (name, type),
+    in the order of their values in a metrics response.
+
+    Parameters:
+      metric_group_definition (zhmcclient.MetricGroupDefinition): The
+        definition of the metric group.
+    """
+    m_defs = sorted(metric_group_definition.metric_definitions.values(),
+                    key=lambda m_def: m_def.index)
+    return [(m_def.name, m_def.type) for m_def in m_defs]
+
+
+def iter_metrics_response(response, metric_group_definitions):
+    """
+    Parse a metrics response string in a single pass and yield its samples.
+
+    For the format of the metrics response string, see the "Get Metrics"
+    operation in the :term:`HMC API` book.
+
+    Parameters:
+      response (str): The metrics response string.
+      metric_group_definitions (dict): zhmcclient.MetricGroupDefinition
+        objects of the metric groups in the response, by group name.
+
+    Yields:
+      tuple: (group_name, resource_uri, timestamp, values), with the timestamp
+      in milliseconds since the epoch and the values as a list in the order
+      of group_metrics().
+    """
+    group_name = None
+    converters = None
+    resource_uri = None
+    timestamp = None
+    # 0: before a metric group, 1: before a resource, 2: before a timestamp,
+    # 3: before a row of values
+    state = 0
+    for line in response.splitlines():
+        if state == 0:
+            if line:
+                group_name = line.strip('"')
+                m_defs = metric_group_definitions[group_name]. \
+                    metric_definitions
+                converters = sorted(
+                    (m_def.index, m_def.type) for m_def in m_defs.values())
+                state = 1
+        elif state == 1:
+            if line:
+                resource_uri = line.strip('"')
+                state = 2
+            else:
+                state = 0
+        elif state == 2:
+            timestamp = int(line)
+            state = 3
+        elif line:
+            str_values = line.split(',')
+            yield group_name, resource_uri, timestamp, [
+                metric_value(str_values[index], m_type)
+                for index, m_type in converters]
+        else:
+            state = 1
+
+
+class MetricsRecord(object):
+    """
+    The samples of the metrics of one metric group for one resource, stored
+    in columns: an array per numeric metric and a list per other metric.
+    """
+
+    def __init__(self, resource_uri, metrics):
+        """
+        Parameters:
+          resource_uri (str): URI of the resource.
+          metrics (list): The metrics of the metric group, as tuples (name,
+            type) (see group_metrics()).
+        """
+        self.resource_uri = resource_uri
+        self.timestamps = array('q')
+        self.columns = []
+        for name, metric_type in metrics:
+            typecode = ARRAY_TYPECODES.get(metric_type)
+            self.columns.append((name, array(typecode) if typecode else []))
+
+    def append(self, timestamp, values):
+        """
+        Append a sample with its timestamp (in milliseconds since the epoch)
+        and its metric values (in the order of the metrics).
+        """
+        self.timestamps.append(timestamp)
+        for (_, column), value in zip(self.columns, values):
+            column.append(value)
+
+    def aggregates(self):
+        """
+        Return the minimum, maximum and average of each numeric metric over
+        the samples, as a dict by metric name.
+        """
+        result = {}
+        for name, column in self.columns:
+            if isinstance(column, array) and column:
+                result[name] = dict(
+                    min=min(column),
+                    max=max(column),
+                    avg=round(sum(column) / len(column), 3),
+                )
+        return result
+
+    def result(self, resource_name, resource_class, aggregate):
+        """
+        Return the record for the result of the zhmc_metrics module.
+        """
+        try:
+            timestamp = datetime.utcfromtimestamp(
+                self.timestamps[-1] / 1000.0)
+        except (ValueError, OverflowError, OSError):
+            # The HMC sometimes returns timestamps that are way too large
+            timestamp = datetime.utcnow()
+        record = dict(
+            resource_uri=self.resource_uri,
+            resource_name=resource_name,
+            resource_class=resource_class,
+            samples=len(self.timestamps),
+            timestamp=timestamp.isoformat() + '+00:00',
+            metrics=dict((name, column[-1]) for name, column in self.columns),
+        )
+        if aggregate:
+            record['aggregates'] = self.aggregates()
+        return record
+
+
+def resource_names(client, resource_class):
+    """
+    Return the names of the resources of a resource class by URI, for the
+    resource classes that can be listed with a single request, or None
+    otherwise.
+    """
+    console = client.consoles.console
+    if resource_class == 'cpc':
+        resources = client.cpcs.list()
+    elif resource_class == 'partition':
+        resources = console.list_permitted_partitions()
+    elif resource_class == 'logical-partition':
+        resources = console.list_permitted_lpars()
+    else:
+        return None
+    return dict((res.uri, res.name) for res in resources)
+
+
+class MetricsRingBuffer(object):
+    """
+    A ring buffer of metric samples in a memory-mapped file, that is written
+    by one process (the metrics exporter) and can be read by any number of
+    processes at the same time.
+
+    The file has a header, followed by a fixed number of records of a fixed
+    size. Each record holds one sample of one resource, as a JSON object. When
+    the buffer is full, the oldest records are overwritten.
+
+    Each record starts with its sequence number plus one, which is zero while
+    the record is being written. A reader only accepts a record if the
+    sequence number is the expected one before and after reading it.
+    """
+
+    # magic, record size, capacity, number of records written, number of
+    # records that were dropped because they were too large
+    HEADER = struct.Struct('<8sIIQQ')
+    HEADER_SIZE = 64
+    MAGIC = b'ZHMCMRB1'
+
+    # sequence number plus one, timestamp, payload length
+    RECORD_HEADER = struct.Struct('<QqH')
+
+    def __init__(self, filename, mm, record_size, capacity, written=0,
+                 dropped=0):
+        self.filename = filename
+        self.record_size = record_size
+        self.capacity = capacity
+        self.written = written
+        self.dropped = dropped
+        self._mm = mm
+
+    @classmethod
+    def create(cls, filename, record_size=DEFAULT_RECORD_SIZE,
+               capacity=DEFAULT_CAPACITY):
+        """
+        Open the ring buffer file for writing. An existing file with the same
+        record size and capacity is continued, so that its samples are kept.
+        Otherwise, the file is created empty.
+        """
+        size = cls.HEADER_SIZE + record_size * capacity
+        header = None
+        if os.path.exists(filename) and os.path.getsize(filename) == size:
+            with open(filename, 'rb') as fp:
+                header = cls.HEADER.unpack(fp.read(cls.HEADER.size))
+            if header[:3] != (cls.MAGIC, record_size, capacity):
+                header = None
+        if header is None:
+            with open(filename, 'wb') as fp:
+                fp.write(cls.HEADER.pack(cls.MAGIC, record_size, capacity,
+                                         0, 0))
+                fp.truncate(size)
+            header = (cls.MAGIC, record_size, capacity, 0, 0)
+        with open(filename, 'r+b') as fp:
+            mm = mmap.mmap(fp.fileno(), size)
+        return cls(filename, mm, *header[1:])
+
+    @classmethod
+    def open(cls, filename):
+        """
+        Open the ring buffer file for reading.
+
+        Raises:
+          Error: The file does not exist or is not a ring buffer file.
+        """
+        try:
+            with open(filename, 'rb') as fp:
+                mm = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+        except (IOError, OSError, ValueError) as exc:
+            raise Error("Cannot open metrics buffer file {0}: {1}".
+                        format(filename, exc))
+        header = cls.HEADER.unpack_from(mm, 0)
+        if header[0] != cls.MAGIC:
+            mm.close()
+            raise Error("File {0} is not a metrics buffer file".
+                        format(filename))
+        return cls(filename, mm, *header[1:])
+
+    def close(self):
+        """
+        Close the ring buffer file.
+        """
+        self._mm.close()
+
+    def _write_header(self):
+        self.HEADER.pack_into(
+            self._mm, 0, self.MAGIC, self.record_size, self.capacity,
+            self.written, self.dropped)
+
+    def append(self, timestamp, payload):
+        """
+        Append a record with the timestamp (in milliseconds since the epoch)
+        and the payload (a JSON-serializable object), overwriting the oldest
+        record if the buffer is full.
+
+        Returns:
+          bool: Indicates whether the record was written. Records whose
+          payload does not fit into the record size are dropped.
+        """
+        data = json.dumps(payload, separators=(',', ':')).encode('utf-8')
+        if len(data) > self.record_size - self.RECORD_HEADER.size:
+            self.dropped += 1
+            self._write_header()
+            return False
+        seq = self.written
+        offset = self.HEADER_SIZE + (seq % self.capacity) * self.record_size
+        self.RECORD_HEADER.pack_into(self._mm, offset, 0, timestamp, len(data))
+        start = offset + self.RECORD_HEADER.size
+        self._mm[start:start + len(data)] = data
+        struct.pack_into('<Q', self._mm, offset, seq + 1)
+        self.written = seq + 1
+        self._write_header()
+        return True
+
+    def records(self):
+        """
+        Yield the records in the buffer from the oldest to the newest, as
+        tuples (timestamp, payload).
+        """
+        _, _, _, written, self.dropped = self.HEADER.unpack_from(self._mm, 0)
+        self.written = written
+        for seq in range(max(0, written - self.capacity), written):
+            offset = self.HEADER_SIZE + \
+                (seq % self.capacity) * self.record_size
+            tag, timestamp, length = self.RECORD_HEADER.unpack_from(
+                self._mm, offset)
+            if tag != seq + 1:
+                continue  # Overwritten or being written
+            start = offset + self.RECORD_HEADER.size
+            data = self._mm[start:start + length]
+            if struct.unpack_from('<Q', self._mm, offset)[0] != seq + 1:
+                continue  # Overwritten while reading
+            yield timestamp, json.loads(data.decode('utf-8'))
+
+
+def exporter_files(directory, hmc_host):
+    """
+    Return the path names of the ring buffer file and of the state file of
+    the metrics exporter for the HMC host, as a tuple.
+    """
+    base = os.path.join(directory, re.sub(r'[^\w.-]', '_', hmc_host))
+    return base + '.buffer', base + '.json'
+
+
+def write_state(filename, state):
+    """
+    Write the state file of a metrics exporter.
+    """
+    tmp_filename = '{0}.{1}'.format(filename, os.getpid())
+    with open(tmp_filename, 'w') as fp:
+        json.dump(state, fp)
+    os.rename(tmp_filename, filename)
+
+
+def process_alive(pid):
+    """
+    Return a boolean indicating whether a process with the PID exists.
+    """
+    try:
+        os.kill(pid, 0)
+    except OSError as exc:
+        # EPERM: The process exists, but belongs to another user
+        return exc.errno == errno.EPERM
+    return True
+
+
+def exporter_status(directory, hmc_host):
+    """
+    Return the state of the metrics exporter for the HMC host as a dict, or
+    None if no metrics exporter has been started for the HMC host.
+
+    In addition to the items of the state file, the dict has items 'running'
+    (whether the exporter process is running), 'written' and 'dropped' (the
+    number of records written to and dropped from the ring buffer), and
+    'buffer_file'.
+    """
+    buffer_file, state_file = exporter_files(directory, hmc_host)
+    try:
+        with open(state_file) as fp:
+            state = json.load(fp)
+    except (IOError, OSError, ValueError):
+        return None
+    state['running'] = state.get('status') in ('starting', 'running') and \
+        process_alive(state['pid'])
+    state['buffer_file'] = buffer_file
+    state['written'] = 0
+    state['dropped'] = 0
+    if os.path.exists(buffer_file):
+        try:
+            buffer = MetricsRingBuffer.open(buffer_file)
+        except Error:
+            pass
+        else:
+            state['written'] = buffer.written
+            state['dropped'] = buffer.dropped
+            buffer.close()
+    return state
+
+
+class MetricsExporter(object):
+    """
+    Exporter that keeps a metrics context open on the HMC, retrieves the
+    metrics at its interval, and appends the samples to a ring buffer file
+    (see MetricsRingBuffer), until it is stopped.
+
+    The state of the exporter (e.g. its PID and the metric definitions) is
+    kept in a state file next to the ring buffer file (see exporter_files()).
+    Errors while retrieving the metrics are counted in the state file and do
+    not end the exporter. If the metrics context no longer exists on the HMC,
+    it is created again.
+    """
+
+    def __init__(self, client, hmc_host, metric_groups, interval,
+                 directory=DEFAULT_METRICS_DIR, capacity=DEFAULT_CAPACITY,
+                 record_size=DEFAULT_RECORD_SIZE):
+        """
+        Parameters:
+          client (zhmcclient.Client): The client for the HMC.
+          hmc_host (str): HMC host, for keying the files.
+          metric_groups (list of str): Names of the metric groups.
+          interval (int): Time in seconds between retrieving the metrics.
+          directory (str): Directory for the files.
+          capacity (int): Number of records in the ring buffer.
+          record_size (int): Size of a record in the ring buffer in bytes.
+        """
+        self.client = client
+        self.hmc_host = hmc_host
+        self.metric_groups = metric_groups
+        self.interval = interval
+        self.directory = directory
+        self.capacity = capacity
+        self.record_size = record_size
+        self.buffer_file, self.state_file = exporter_files(
+            directory, hmc_host)
+        self.state = dict(
+            pid=os.getpid(),
+            hmc_host=hmc_host,
+            metric_groups=metric_groups,
+            interval=interval,
+            capacity=capacity,
+            record_size=record_size,
+            status='starting',
+            started=datetime.utcnow().isoformat() + '+00:00',
+            stopped=None,
+            samples=0,
+            errors=0,
+            last_error=None,
+            metrics=None,
+        )
+        self._stop = threading.Event()
+        self._names = {}
+
+    def stop(self):
+        """
+        Stop the exporter. Can be called from a signal handler.
+        """
+        self._stop.set()
+
+    def _create_context(self):
+        context = self.client.metrics_contexts.create({
+            'anticipated-frequency-seconds': self.interval,
+            'metric-groups': self.metric_groups,
+        })
+        missing = [name for name in self.metric_groups
+                   if name not in context.metric_group_definitions]
+        if missing:
+            context.delete()
+            raise Error("The HMC does not support metric groups: {0}".
+                        format(', '.join(missing)))
+        self.state['metrics'] = dict(
+            (name, dict(
+                resource_class=mg_def.resource_class,
+                metrics=[[m_name, m_type.__name__]
+                         for m_name, m_type in group_metrics(mg_def)]))
+            for name, mg_def in context.metric_group_definitions.items())
+        return context
+
+    def _resource_name(self, resource_class, resource_uri, refreshed):
+        """
+        Return the name of the resource, listing the resources of its class
+        at most once per sample if it is not known.
+        """
+        names = self._names.get(resource_class)
+        if (names is None or resource_uri not in names) and \
+                resource_class not in refreshed:
+            refreshed.add(resource_class)
+            names = resource_names(self.client, resource_class) or {}
+            self._names[resource_class] = names
+        return names.get(resource_uri)
+
+    def _export_sample(self, context, response, buffer):
+        mg_defs = context.metric_group_definitions
+        refreshed = set()
+        for group_name, resource_uri, timestamp, values in \
+                iter_metrics_response(response, mg_defs):
+            resource_name = self._resource_name(
+                mg_defs[group_name].resource_class, resource_uri, refreshed)
+            buffer.append(timestamp, dict(
+                g=group_name, r=resource_uri, n=resource_name, v=values))
+        self.state['samples'] += 1
+
+    def run(self, max_samples=None):
+        """
+        Run the exporter until it is stopped, or until max_samples samples
+        have been retrieved (for testing).
+
+        Raises:
+          zhmcclient.Error: The metrics context could not be created.
+        """
+        if not os.path.isdir(self.directory):
+            os.makedirs(self.directory)
+        write_state(self.state_file, self.state)
+        context = None
+        buffer = None
+        try:
+            context = self._create_context()
+            buffer = MetricsRingBuffer.create(
+                self.buffer_file, self.record_size, self.capacity)
+            self.state['status'] = 'running'
+            write_state(self.state_file, self.state)
+            while not self._stop.is_set():
+                try:
+                    if context is None:
+                        context = self._create_context()
+                    try:
+                        response = context.get_metrics()
+                    except HTTPError as exc:
+                        if exc.http_status == 404:
+                            # The metrics context no longer exists on the HMC
+                            context = None
+                        raise
+                    self._export_sample(context, response, buffer)
+                except zhmcclient.Error as exc:
+                    LOGGER.debug("Metrics exporter for HMC %s: %s: %s",
+                                 self.hmc_host, exc.__class__.__name__, exc)
+                    self.state['errors'] += 1
+                    self.state['last_error'] = "{0}: {1}".format(
+                        exc.__class__.__name__, exc)
+                write_state(self.state_file, self.state)
+                if max_samples and self.state['samples'] >= max_samples:
+                    break
+                self._stop.wait(self.interval)
+            self.state['status'] = 'stopped'
+        except Exception as exc:
+            self.state['status'] = 'failed'
+            self.state['last_error'] = "{0}: {1}".format(
+                exc.__class__.__name__, exc)
+            raise
+        finally:
+            if context is not None:
+                try:
+                    context.delete()
+                except zhmcclient.Error:
+                    pass
+            if buffer is not None:
+                buffer.close()
+            self.state['stopped'] = datetime.utcnow().isoformat() + '+00:00'
+            write_state(self.state_file, self.state)
+
+
+def spawn_daemon(func):
+    """
+    Run a function in a daemon process that is detached from the current
+    process (double fork), and return the PID of the daemon process.
+
+    The standard file descriptors of the daemon process are redirected to
+    the null device, so that Ansible does not wait for it.
+    """
+    read_fd, write_fd = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        # Intermediate process
+        try:
+            os.close(read_fd)
+            os.setsid()
+            daemon_pid = os.fork()
+            if daemon_pid != 0:
+                os.write(write_fd, str(daemon_pid).encode('ascii'))
+                os._exit(0)
+            # Daemon process. Inherited file descriptors are closed, so that
+            # pipes of the invoking process (e.g. Ansible) are not kept open.
+            # Log file handlers reopen their files when logging next time.
+            logging.shutdown()
+            os.chdir('/')
+            null_fd = os.open(os.devnull, os.O_RDWR)
+            for fd in (0, 1, 2):
+                os.dup2(null_fd, fd)
+            os.closerange(3, MAXFD)
+            func()
+        except BaseException:  # pylint: disable=broad-except
+            os._exit(1)
+        os._exit(0)
+    os.close(write_fd)
+    os.waitpid(pid, 0)
+    data = os.read(read_fd, 32)
+    os.close(read_fd)
+    if not data:
+        raise Error("Could not start the daemon process")
+    return int(data)
+
+
+def run_exporter_daemon(exporter, close_func=None):
+    """
+    Run the exporter in the current (daemon) process, stopping it on
+    SIGTERM, and call close_func at the end.
+    """
+    signal.signal(signal.SIGTERM, lambda signum, frame: exporter.stop())
+    try:
+        exporter.run()
+    finally:
+        if close_func:
+            close_func()
+
+
+def stop_exporter(state, timeout=60, poll_interval=0.2):
+    """
+    Stop a running metrics exporter and wait until it has stopped.
+
+    Parameters:
+      state (dict): The state of the exporter (see exporter_status()).
+
+    Raises:
+      Error: The exporter did not stop within the timeout.
+    """
+    try:
+        os.kill(state['pid'], signal.SIGTERM)
+    except OSError:
+        return
+    directory = os.path.dirname(state['buffer_file'])
+    end_time = time.time() + timeout
+    while time.time() < end_time:
+        new_state = exporter_status(directory, state['hmc_host'])
+        if new_state is None or not new_state['running']:
+            return
+        time.sleep(poll_interval)
+    raise Error("The metrics exporter with PID {0} did not stop within {1} "
+                "seconds".format(state['pid'], timeout))
+
+
+def read_exporter_samples(directory, hmc_host, metric_groups, samples):
+    """
+    Read the most recent samples of the metric groups from the ring buffer of
+    the metrics exporter for the HMC host.
+
+    Returns:
+      tuple: (records, state), with records as a dict by metric group name of
+      dicts by resource URI of tuples (resource_name, MetricsRecord), and
+      state as returned by exporter_status().
+
+    Raises:
+      Error: There is no metrics exporter for the HMC host, or it does not
+        export all of the metric groups.
+    """
+    state = exporter_status(directory, hmc_host)
+    if state is None or not state.get('metrics'):
+        raise Error("There is no metrics exporter for HMC {0} in directory "
+                    "{1}".format(hmc_host, directory))
+    missing = [name for name in metric_groups if name not in state['metrics']]
+    if missing:
+        raise Error("The metrics exporter for HMC {0} does not export metric "
+                    "groups {1!r}".format(hmc_host, missing))
+
+    all_samples = {}  # by group, by resource URI, list of (name, ts, values)
+    buffer = MetricsRingBuffer.open(state['buffer_file'])
+    try:
+        for timestamp, payload in buffer.records():
+            group_samples = all_samples.setdefault(payload['g'], {})
+            group_samples.setdefault(payload['r'], []).append(
+                (payload['n'], timestamp, payload['v']))
+    finally:
+        buffer.close()
+
+    records = {}
+    for group_name in metric_groups:
+        group_def = state['metrics'][group_name]
+        metrics = [(name, METRIC_TYPES[type_name])
+                   for name, type_name in group_def['metrics']]
+        group_records = records.setdefault(group_name, {})
+        for uri, resource_samples in all_samples.get(group_name, {}).items():
+            record = MetricsRecord(uri, metrics)
+            for _, timestamp, values in resource_samples[-samples:]:
+                record.append(timestamp, values)
+            group_records[uri] = (resource_samples[-1][0], record)
+    return records, state
@@ -108,8 +108,10 @@ options:
     description:
       - The name of the target adapter. In case of renaming an adapter, this is
         the new name of the adapter.
+      - Exactly one of C(name) and C(adapters) must be specified.
     type: str
-    required: true
+    required: false
+    default: null
   cpc_name:
     description:
       - The name of the CPC with the target adapter.
@@ -180,6 +182,54 @@ options:
     type: dict
     required: false
     default: null
+  adapters:
+    description:
+      - "Only for C(state=set|facts): The target adapters, for processing
+         multiple adapters in one module invocation (batch mode). This is
+         mutually exclusive with the C(name) module parameter, and the
+         C(match) and C(properties) module parameters are ignored. Instead,
+         each list item specifies its own C(name), C(match) and
+         C(properties) with the same meaning as the corresponding module
+         parameters."
+      - "In batch mode, the adapters of the CPC are listed only once for
+         identifying all target adapters, and the retrieval of adapter and
+         port properties as well as the adapter updates run concurrently."
+      - "The list items must have unique names and must identify different
+         adapters."
+      - Exactly one of C(name) and C(adapters) must be specified.
+    type: list
+    elements: dict
+    required: false
+    default: null
+    suboptions:
+      name:
+        description:
+          - The name of the target adapter.
+        type: str
+        required: true
+      match:
+        description:
+          - "Only for C(state=set): Match properties for identifying the
+             target adapter, if an adapter with the specified name does not
+             exist."
+        type: dict
+        required: false
+        default: null
+      properties:
+        description:
+          - "Only for C(state=set): New values for the properties of the
+             adapter."
+        type: dict
+        required: false
+        default: null
+  max_concurrency:
+    description:
+      - "The maximum number of concurrent HMC operations for retrieving
+         adapter and port properties and (in batch mode) for updating
+         adapters."
+    type: int
+    required: false
+    default: 10
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -188,6 +238,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -234,6 +301,17 @@ EXAMPLES = """
       description: "This is adapter {{ my_adapter_name }}"
   register: adapter1
 
+- name: Gather facts about multiple existing adapters
+  zhmc_adapter:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    cpc_name: "{{ my_cpc_name }}"
+    adapters:
+      - name: "{{ my_adapter1_name }}"
+      - name: "{{ my_adapter2_name }}"
+    state: facts
+  register: adapters1
+
 - name: "Ensure a Hipersockets adapter exists and has the desired property
          values"
   zhmc_adapter:
@@ -271,6 +349,7 @@ adapter:
   description:
     - "For C(state=absent), an empty dictionary."
     - "For C(state=set|present|facts), the adapter and its ports."
+    - "Not present in batch mode (C(adapters) specified)."
   returned: success
   type: dict
   contains:
@@ -334,16 +413,45 @@ adapter:
         "type": "fcp",
         "used-capacity": 20
     }
+adapters:
+  description:
+    - "Only in batch mode (C(adapters) specified): The target adapters and
+       their ports, as a dictionary with the adapter name as specified in
+       C(adapters) as key and the adapter properties as value, as described
+       for the C(adapter) return value."
+  returned: success
+  type: dict
+  sample:
+    {
+        "FCP_120_SAN1_02": {
+            "adapter-family": "ficon",
+            "adapter-id": "120",
+            "name": "FCP_120_SAN1_02",
+            "object-uri": "/api/adapters/dfb2147a-e578-11e8-a87c-00106f239c31",
+            "ports": [
+                {
+                    "class": "storage-port",
+                    "element-uri": "/api/adapters/dfb2147a-e578-11e8-a87c-00106f239c31/storage-ports/0",
+                    "index": 0,
+                    "name": "Port 0"
+                }
+            ],
+            "type": "fcp"
+        }
+    }
 """
 
 import logging  # noqa: E402
+import re  # noqa: E402
 import traceback  # noqa: E402
 from ansible.module_utils.basic import AnsibleModule  # noqa: E402
+from ansible.module_utils import six  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, to_unicode, \
-    process_normal_property, eq_hex, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    process_normal_property, PropertySchema, eq_hex, missing_required_lib, \
+    common_fail_on_import_errors, concurrent_map, ResourceFetcher, \
+    DEFAULT_MAX_CONCURRENCY  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -423,6 +531,8 @@ ZHMC_ADAPTER_PROPERTIES = {
     'udx_loaded': (False, None, False, None, None, None),
 }
 
+ZHMC_ADAPTER_SCHEMA = PropertySchema(ZHMC_ADAPTER_PROPERTIES)
+
 
 # Conversion of crypto types between module parameter values and HMC values
 CRYPTO_TYPES_MOD2HMC = {
@@ -488,13 +598,7 @@ def process_properties(adapter, params):
         input_props = {}
     for prop_name in input_props:
 
-        try:
-            allowed, create, update, update_active, eq_func, type_cast = \
-                ZHMC_ADAPTER_PROPERTIES[prop_name]
-        except KeyError:
-            allowed = False
-
-        if not allowed:
+        if prop_name not in ZHMC_ADAPTER_SCHEMA.allowed_names:
             raise ParameterError(
                 "Invalid adapter property {0!r} specified in the 'properties' "
                 "module parameter.".format(prop_name))
@@ -514,7 +618,7 @@ def process_properties(adapter, params):
         else:
             # Process a normal (= non-artificial) property
             _create_props, _update_props, _stop = process_normal_property(
-                prop_name, ZHMC_ADAPTER_PROPERTIES, input_props, adapter)
+                prop_name, ZHMC_ADAPTER_SCHEMA, input_props, adapter)
             create_props.update(_create_props)
             update_props.update(_update_props)
             if _stop:
@@ -523,50 +627,214 @@ def process_properties(adapter, params):
     return create_props, update_props, change_adapter_type, change_crypto_type
 
 
-def identify_adapter(cpc, name, match_props):
+def _matches_value(value, match_value):
+    """
+    Return a boolean indicating whether a property value matches a match
+    value, following the rules of filtering for the zhmcclient library:
+    A list of match values matches if one of them matches, string values are
+    matched by interpreting the match value as a regular expression that
+    needs to match the entire string, and other values are matched by
+    equality.
+    """
+    if isinstance(match_value, (list, tuple)):
+        return any(_matches_value(value, mv) for mv in match_value)
+    if isinstance(value, six.string_types) and \
+            isinstance(match_value, six.string_types):
+        return re.match(match_value + '$', value) is not None
+    return value == match_value
+
+
+def _matches_adapter(adapter, match_props_hmc, partial):
+    """
+    Return a boolean indicating whether an adapter matches all match
+    properties, based on the properties present in the adapter object.
+
+    If partial is True, match properties that are not present in the adapter
+    object are ignored. Otherwise, they cause the adapter not to match.
+    """
+    for prop_name_hmc, match_value in match_props_hmc.items():
+        if prop_name_hmc not in adapter.properties:
+            if partial:
+                continue
+            return False
+        if not _matches_value(adapter.properties[prop_name_hmc], match_value):
+            return False
+    return True
+
+
+def identify_adapter(cpc, name, match_props, adapters=None,
+                     max_concurrency=DEFAULT_MAX_CONCURRENCY):
     """
     Identify the target adapter based on its name, or if an adapter with that
     name does not exist in the CPC, based on its match properties.
+
+    The adapters of the CPC are listed only once and that list is used for
+    both ways of identification. If a match property is not returned by the
+    listing, the full properties are retrieved (concurrently) only for the
+    adapters that match on the listed properties.
+
+    Parameters:
+
+      cpc (zhmcclient.Cpc): CPC with the target adapter.
+
+      name (str): Name of the target adapter.
+
+      match_props (dict): Match properties for identifying the target adapter
+        if no adapter with that name exists, as specified in the 'match'
+        module parameter. None or empty means that the adapter is identified
+        only by its name.
+
+      adapters (list of zhmcclient.Adapter): The adapters of the CPC, as
+        returned by cpc.adapters.list(). This can be used to reuse the list
+        for multiple adapters. None means that the adapters are listed.
+
+      max_concurrency (int): Maximum number of concurrent retrievals.
+
+    Returns:
+      zhmcclient.Adapter: The target adapter.
+
+    Raises:
+      zhmcclient.NotFound: No adapter was found.
+      zhmcclient.NoUniqueMatch: More than one adapter matches.
+      zhmcclient.Error: Any zhmcclient exception can happen.
     """
-    try:
-        adapter = cpc.adapters.find(name=name)
-    except zhmcclient.NotFound:
-        if not match_props:
-            raise
-        match_props_hmc = {}
-        for prop_name in match_props:
-            prop_name_hmc = prop_name.replace('_', '-')
-            match_value = match_props[prop_name]
-
-            # Apply type cast from property definition also to match values:
-            if prop_name in ZHMC_ADAPTER_PROPERTIES:
-                type_cast = ZHMC_ADAPTER_PROPERTIES[prop_name][5]
-                if type_cast:
-                    match_value = type_cast(match_value)
-
-            match_props_hmc[prop_name_hmc] = match_value
-        adapter = cpc.adapters.find(**match_props_hmc)
-    return adapter
-
-
-def get_adapter_ports(adapter):
+    if adapters is None:
+        adapters = cpc.adapters.list()
+
+    for adapter in adapters:
+        if adapter.name == name:
+            return adapter
+
+    if not match_props:
+        raise zhmcclient.NotFound({'name': name}, cpc.adapters)
+
+    match_props_hmc = {}
+    for prop_name in match_props:
+        prop_name_hmc = prop_name.replace('_', '-')
+        match_value = match_props[prop_name]
+
+        # Apply type cast from property definition also to match values:
+        if prop_name in ZHMC_ADAPTER_SCHEMA:
+            type_cast = ZHMC_ADAPTER_SCHEMA[prop_name].type_cast
+            if type_cast:
+                match_value = type_cast(match_value)
+
+        match_props_hmc[prop_name_hmc] = match_value
+
+    candidates = [adapter for adapter in adapters
+                  if _matches_adapter(adapter, match_props_hmc, partial=True)]
+    incomplete = [adapter for adapter in candidates
+                  if not all(pn in adapter.properties
+                             for pn in match_props_hmc)]
+    if incomplete:
+        fetcher = ResourceFetcher(max_concurrency)
+        for adapter in incomplete:
+            fetcher.add(adapter)
+        fetcher.fetch()
+        candidates = [adapter for adapter in candidates
+                      if _matches_adapter(adapter, match_props_hmc,
+                                          partial=False)]
+
+    if not candidates:
+        raise zhmcclient.NotFound(match_props_hmc, cpc.adapters)
+    if len(candidates) > 1:
+        raise zhmcclient.NoUniqueMatch(
+            match_props_hmc, cpc.adapters, candidates)
+    return candidates[0]
+
+
+def add_adapter_ports(adapter, fetcher):
+    """
+    List the ports of an adapter and add them to a ResourceFetcher for the
+    retrieval of their full properties.
+
+    The adapter must have its full properties.
+
+    Returns:
+      list of zhmcclient.Port: The ports of the adapter.
+    """
+    ports = adapter.ports.list()
+    # FICON adapters in unconfigured state reject the "Get Storage Port
+    # Properties" operation with HTTP Error 404,4 "Get for Storage Port
+    # Properties is not supported for this card type".
+    if adapter.get_property('type') != 'not-configured':
+        ports = [fetcher.add(port) for port in ports]
+    return ports
+
+
+def get_adapter_ports(adapter, max_concurrency=DEFAULT_MAX_CONCURRENCY):
     """
     Retrieve the ports of an adapter from the HMC.
 
+    The full properties of the ports are retrieved concurrently.
+
     Returns:
       list of dict with all port properties. In case of unconfigured FICON
       adapters, the property list is short (from list()).
     """
-    ports = adapter.ports.list()
-    result_ports = []
-    for port in ports:
-        # FICON adapters in unconfigured state reject the "Get Storage Port
-        # Properties" operation with HTTP Error 404,4 "Get for Storage Port
-        # Properties is not supported for this card type".
-        if adapter.get_property('type') != 'not-configured':
-            port.pull_full_properties()
-        result_ports.append(dict(port.properties))
-    return result_ports
+    fetcher = ResourceFetcher(max_concurrency)
+    ports = add_adapter_ports(adapter, fetcher)
+    fetcher.fetch()
+    return [dict(port.properties) for port in ports]
+
+
+def update_adapter(adapter, params, check_mode):
+    """
+    Ensure that the specified properties are set on an existing adapter.
+
+    The adapter must have its full properties.
+
+    Parameters:
+
+      adapter (zhmcclient.Adapter): The target adapter.
+
+      params (dict): Module input parameters, or an item of the 'adapters'
+        module parameter. The 'name' and 'properties' items are used.
+
+      check_mode (bool): Indicates whether the playbook was run in check
+        mode.
+
+    Returns:
+      tuple of (changed, result), where result is a dict with the adapter
+      properties (without ports).
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    changed = False
+    result = dict(adapter.properties)
+
+    # Update its properties and change adapter and crypto type, if needed.
+    create_props, update_props, chg_adapter_type, chg_crypto_type = \
+        process_properties(adapter, params)
+
+    if update_props:
+        if not check_mode:
+            adapter.update_properties(update_props)
+        else:
+            result.update(update_props)  # from input values
+        changed = True
+
+    if chg_adapter_type:
+        if not check_mode:
+            adapter.change_adapter_type(chg_adapter_type)
+        else:
+            result['type'] = chg_adapter_type
+        changed = True
+
+    if chg_crypto_type:
+        if not check_mode:
+            adapter.change_crypto_type(chg_crypto_type)
+        else:
+            result['crypto-type'] = chg_crypto_type
+        changed = True
+
+    if changed and not check_mode:
+        adapter.pull_full_properties()
+        result = dict(adapter.properties)  # from actual values
+
+    return changed, result
 
 
 def ensure_set(params, check_mode):
@@ -583,51 +851,22 @@ def ensure_set(params, check_mode):
     cpc_name = params['cpc_name']
     adapter_name = params['name']
     adapter_match = params['match']
-
-    changed = False
+    max_concurrency = params['max_concurrency']
 
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
         cpc = client.cpcs.find(name=cpc_name)
-        adapter = identify_adapter(cpc, adapter_name, adapter_match)
+        adapter = identify_adapter(
+            cpc, adapter_name, adapter_match, max_concurrency=max_concurrency)
         # The default exception handling is sufficient for the above.
 
         adapter.pull_full_properties()
-        result = dict(adapter.properties)
 
         # It was identified by name or match properties, so it does exist.
-        # Update its properties and change adapter and crypto type, if
-        # needed.
-        create_props, update_props, chg_adapter_type, chg_crypto_type = \
-            process_properties(adapter, params)
-
-        if update_props:
-            if not check_mode:
-                adapter.update_properties(update_props)
-            else:
-                result.update(update_props)  # from input values
-            changed = True
-
-        if chg_adapter_type:
-            if not check_mode:
-                adapter.change_adapter_type(chg_adapter_type)
-            else:
-                result['type'] = chg_adapter_type
-            changed = True
-
-        if chg_crypto_type:
-            if not check_mode:
-                adapter.change_crypto_type(chg_crypto_type)
-            else:
-                result['crypto-type'] = chg_crypto_type
-            changed = True
+        changed, result = update_adapter(adapter, params, check_mode)
 
-        if changed and not check_mode:
-            adapter.pull_full_properties()
-            result = dict(adapter.properties)  # from actual values
-
-        result['ports'] = get_adapter_ports(adapter)
+        result['ports'] = get_adapter_ports(adapter, max_concurrency)
 
         return changed, result
 
@@ -718,40 +957,12 @@ def ensure_present(params, check_mode):
             # It does exist.
             # Update its properties and change adapter and crypto type, if
             # needed.
-
             adapter.pull_full_properties()
-            result = dict(adapter.properties)
-
-            create_props, update_props, chg_adapter_type, chg_crypto_type = \
-                process_properties(adapter, params)
-
-            if update_props:
-                if not check_mode:
-                    adapter.update_properties(update_props)
-                else:
-                    result.update(update_props)  # from input values
-                changed = True
-
-            if chg_adapter_type:
-                if not check_mode:
-                    adapter.change_adapter_type(chg_adapter_type)
-                else:
-                    result['type'] = chg_adapter_type
-                changed = True
-
-            if chg_crypto_type:
-                if not check_mode:
-                    adapter.change_crypto_type(chg_crypto_type)
-                else:
-                    result['crypto-type'] = chg_crypto_type
-                changed = True
-
-            if changed and not check_mode:
-                adapter.pull_full_properties()
-                result = dict(adapter.properties)  # from actual values
+            changed, result = update_adapter(adapter, params, check_mode)
 
         if adapter:
-            result['ports'] = get_adapter_ports(adapter)
+            result['ports'] = get_adapter_ports(
+                adapter, params['max_concurrency'])
         else:
             # For now, we return no ports when creating in check mode
             result['ports'] = {}
@@ -811,6 +1022,7 @@ def facts(params, check_mode):
 
     cpc_name = params['cpc_name']
     adapter_name = params['name']
+    max_concurrency = params['max_concurrency']
 
     session, logoff = open_session(params)
     try:
@@ -821,7 +1033,7 @@ def facts(params, check_mode):
 
         adapter.pull_full_properties()
         result = dict(adapter.properties)
-        result['ports'] = get_adapter_ports(adapter)
+        result['ports'] = get_adapter_ports(adapter, max_concurrency)
 
         return False, result
 
@@ -829,6 +1041,99 @@ def facts(params, check_mode):
         close_session(session, logoff)
 
 
+def perform_batch_task(params, check_mode):
+    """
+    Perform the task for this module for the adapters specified in the
+    'adapters' module parameter (batch mode), dependent on the 'state' module
+    parameter.
+
+    The adapters of the CPC are listed only once for identifying all target
+    adapters, and the retrieval of adapter and port properties as well as the
+    adapter updates run concurrently.
+
+    If check_mode is True, check whether changes would occur, but don't
+    actually perform any changes.
+
+    Returns:
+      tuple of (changed, result), where result is a dict with key: name of
+      the adapter as specified in the 'adapters' module parameter, value:
+      dict with the adapter properties including its ports.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+
+    cpc_name = params['cpc_name']
+    items = params['adapters']
+    state = params['state']
+    max_concurrency = params['max_concurrency']
+
+    if state not in ('set', 'facts'):
+        raise ParameterError(
+            "The 'adapters' module parameter is not supported for "
+            "state={0!r}.".format(state))
+
+    names = [item['name'] for item in items]
+    if len(set(names)) != len(names):
+        raise ParameterError(
+            "Adapter names in the 'adapters' module parameter are not "
+            "unique: {0!r}".format(names))
+
+    session, logoff = open_session(params)
+    try:
+        client = zhmcclient.Client(session)
+        cpc = client.cpcs.find(name=cpc_name)
+        # The default exception handling is sufficient for the above.
+
+        cpc_adapters = cpc.adapters.list()
+        fetcher = ResourceFetcher(max_concurrency)
+        adapters = []
+        for item in items:
+            match_props = item['match'] if state == 'set' else None
+            adapter = identify_adapter(
+                cpc, item['name'], match_props, cpc_adapters, max_concurrency)
+            adapters.append(fetcher.add(adapter))
+
+        # Items that identify the same adapter would update it concurrently
+        item_names = {}
+        for item, adapter in zip(items, adapters):
+            if adapter.uri in item_names:
+                raise ParameterError(
+                    "Adapter items {0!r} and {1!r} in the 'adapters' module "
+                    "parameter identify the same adapter {2!r}.".
+                    format(item_names[adapter.uri], item['name'],
+                           adapter.name))
+            item_names[adapter.uri] = item['name']
+        fetcher.fetch()
+
+        if state == 'set':
+            results = concurrent_map(
+                lambda args: update_adapter(args[0], args[1], check_mode),
+                list(zip(adapters, items)), max_concurrency)
+        else:
+            results = [(False, dict(adapter.properties))
+                       for adapter in adapters]
+
+        fetcher = ResourceFetcher(max_concurrency)
+        adapter_ports = [add_adapter_ports(adapter, fetcher)
+                         for adapter in adapters]
+        fetcher.fetch()
+
+        changed = False
+        result = {}
+        for item, (_changed, adapter_result), ports in \
+                zip(items, results, adapter_ports):
+            changed |= _changed
+            adapter_result['ports'] = [dict(port.properties) for port in ports]
+            result[item['name']] = adapter_result
+
+        return changed, result
+
+    finally:
+        close_session(session, logoff)
+
+
 def perform_task(params, check_mode):
     """
     Perform the task for this module, dependent on the 'state' module
@@ -841,6 +1146,8 @@ def perform_task(params, check_mode):
       ParameterError: An issue with the module parameters.
       zhmcclient.Error: Any zhmcclient exception can happen.
     """
+    if params['adapters'] is not None:
+        return perform_batch_task(params, check_mode)
     actions = {
         "set": ensure_set,
         "present": ensure_present,
@@ -858,17 +1165,31 @@ def main():
         hmc_host=dict(required=True, type='str'),
         hmc_auth=hmc_auth_parameter(),
         cpc_name=dict(required=True, type='str'),
-        name=dict(required=True, type='str'),
+        name=dict(required=False, type='str', default=None),
         match=dict(required=False, type='dict', default={}),
+        adapters=dict(
+            required=False, type='list', elements='dict', default=None,
+            options=dict(
+                name=dict(required=True, type='str'),
+                match=dict(required=False, type='dict', default=None),
+                properties=dict(required=False, type='dict', default=None),
+            )),
+        max_concurrency=dict(required=False, type='int', default=10),
         state=dict(required=True, type='str',
                    choices=['set', 'present', 'absent', 'facts']),
         properties=dict(required=False, type='dict', default={}),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
     module = AnsibleModule(
         argument_spec=argument_spec,
+        mutually_exclusive=[('name', 'adapters')],
+        required_one_of=[('name', 'adapters')],
         supports_check_mode=True)
 
     if IMP_URLLIB3_ERR is not None:
@@ -884,7 +1205,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -907,8 +1229,10 @@ def main():
 
     LOGGER.debug(
         "Module exit (success): changed: %r, adapter: %r", changed, result)
-    module.exit_json(
-        changed=changed, adapter=result)
+    if module.params['adapters'] is not None:
+        module.exit_json(changed=changed, adapters=result)
+    else:
+        module.exit_json(changed=changed, adapter=result)
 
 
 if __name__ == '__main__':
@@ -145,6 +145,18 @@ options:
     type: str
     required: false
     default: null
+  since_token:
+    description:
+      - "Token returned in the C(token) result of a previous invocation of
+         this module with the same filter parameters. If specified, the
+         C(adapters) result contains only the adapters that were added or whose
+         returned properties changed since that invocation, and the
+         C(removed) result contains the adapters that were removed since
+         then."
+      - "If null, the C(adapters) result contains all adapters."
+    type: str
+    required: false
+    default: null
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -153,6 +165,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -186,6 +215,13 @@ EXAMPLES = """
     adapter_family: "ficon"
   register: adapter_list
 
+- name: List only the adapters that changed since the previous listing
+  zhmc_adapter_list:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    since_token: "{{ adapter_list.token }}"
+  register: adapter_list_delta
+
 """
 
 RETURN = """
@@ -235,6 +271,34 @@ adapters:
             "status": "active",
         }
     ]
+removed:
+  description: "Only for C(since_token): The adapters that were removed since
+    the invocation that returned the token, identified by their name and the
+    name of their parent CPC. Empty if no C(since_token) was specified."
+  returned: success
+  type: list
+  elements: dict
+  contains:
+    name:
+      description: "Adapter name"
+      type: str
+    cpc_name:
+      description: "Name of the parent CPC of the adapter"
+      type: str
+  sample:
+    [
+        {
+            "name": "adapter2",
+            "cpc_name": "CPC1"
+        }
+    ]
+token:
+  description: "Token that represents the complete list of adapters, with a
+    fingerprint of the returned properties of each adapter. It can be
+    passed in the C(since_token) parameter of a later invocation of this
+    module, to return only the changes since this invocation."
+  returned: success
+  type: str
 """
 
 import logging  # noqa: E402
@@ -242,7 +306,7 @@ import traceback  # noqa: E402
 from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
-    hmc_auth_parameter, Error, missing_required_lib  # noqa: E402
+    hmc_auth_parameter, Error, missing_required_lib, ListDelta  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -357,7 +421,12 @@ def main():
         adapter_family=dict(required=False, type='str', default=None),
         type=dict(required=False, type='str', default=None),
         status=dict(required=False, type='str', default=None),
+        since_token=dict(required=False, type='str', default=None),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -376,7 +445,8 @@ def main():
                          exception=IMP_ZHMCCLIENT_ERR)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -385,7 +455,9 @@ def main():
     changed = False
     try:
 
+        delta = ListDelta(module.params['since_token'])
         result_list = perform_list(module.params)
+        result_list, removed, token = delta.apply(result_list)
 
     except (Error, zhmcclient.Error) as exc:
         # These exceptions are considered errors in the environment or in user
@@ -399,7 +471,8 @@ def main():
 
     LOGGER.debug("Module exit (success): changed: %s, result: %r",
                  changed, result_list)
-    module.exit_json(changed=changed, adapters=result_list)
+    module.exit_json(
+        changed=changed, adapters=result_list, removed=removed, token=token)
 
 
 if __name__ == '__main__':
@@ -37,7 +37,8 @@ description:
   - Deactivate/Stop a CPC (Z system).
   - Activate/Start a CPC and update its properties.
   - Gather facts about a CPC, and for DPM operational mode, including its
-    adapters, partitions and storage groups.
+    adapters, partitions, storage groups and virtual switches, and for
+    classic operational mode, including its LPARs.
   - Update the properties of a CPC.
 author:
   - Andreas Maier (@andy-maier)
@@ -149,6 +150,92 @@ options:
     type: dict
     required: false
     default: null
+  result_properties:
+    description:
+      - "Only for C(state=set), C(state=active) and C(state=facts): Selects
+         the properties that are returned in the C(cpc) result, by their
+         names in the data model for CPC resources or the names of the
+         artificial properties 'partitions', 'adapters', 'storage-groups',
+         'virtual-switches' and 'lpars'.
+         Names may be specified with underscores instead of hyphens. The
+         'name' property is always returned. If null, all properties are
+         returned."
+      - "The artificial properties that are not selected are not retrieved
+         from the HMC, which avoids listing the partitions, adapters and
+         storage groups of a large CPC. For C(state=facts) with an C(include)
+         list, only the included CPC properties are retrieved from the HMC."
+      - "The artificial properties are only returned if they are also enabled
+         by their C(expand_*) parameter."
+    type: dict
+    required: false
+    default: null
+    suboptions:
+      include:
+        description:
+          - "Names of the properties to be returned. If null, all properties
+             are returned that are not excluded."
+        type: list
+        elements: str
+        required: false
+        default: null
+      exclude:
+        description:
+          - "Names of the properties not to be returned."
+        type: list
+        elements: str
+        required: false
+        default: null
+  expand_partitions:
+    description:
+      - "Only for C(state=set), C(state=active) and C(state=facts): Boolean
+         that controls whether the returned CPC contains the artificial
+         property 'partitions' with the partitions of the CPC."
+    type: bool
+    required: false
+    default: true
+  expand_adapters:
+    description:
+      - "Only for C(state=set), C(state=active) and C(state=facts): Boolean
+         that controls whether the returned CPC contains the artificial
+         property 'adapters' with the adapters of the CPC."
+    type: bool
+    required: false
+    default: true
+  expand_storage_groups:
+    description:
+      - "Only for C(state=set), C(state=active) and C(state=facts): Boolean
+         that controls whether the returned CPC contains the artificial
+         property 'storage-groups' with the storage groups associated with
+         the CPC."
+    type: bool
+    required: false
+    default: true
+  expand_virtual_switches:
+    description:
+      - "Only for C(state=set), C(state=active) and C(state=facts): Boolean
+         that controls whether the returned CPC contains the artificial
+         property 'virtual-switches' with the virtual switches of the CPC.
+         Ignored for CPCs in classic mode."
+    type: bool
+    required: false
+    default: false
+  expand_lpars:
+    description:
+      - "Only for C(state=set), C(state=active) and C(state=facts): Boolean
+         that controls whether the returned CPC contains the artificial
+         property 'lpars' with the LPARs of the CPC.
+         Ignored for CPCs in DPM mode."
+    type: bool
+    required: false
+    default: false
+  max_concurrency:
+    description:
+      - "The maximum number of concurrent HMC operations for listing the
+         child resources of the CPC that are enabled by the C(expand_*)
+         parameters."
+    type: int
+    required: false
+    default: 10
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -157,6 +244,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -217,7 +321,8 @@ msg:
   returned: failure
   type: str
 cpc:
-  description: "The CPC and its adapters, partitions, and storage groups."
+  description: "The CPC and its adapters, partitions, storage groups,
+    virtual switches and LPARs, as enabled by the C(expand_*) parameters."
   returned: success
   type: dict
   contains:
@@ -291,6 +396,38 @@ cpc:
         cpc-uri:
           description: "Canonical URI of the associated CPC"
           type: str
+    virtual-switches:
+      description: "Only for CPCs in DPM mode and if C(expand_virtual_switches)
+        is true: The virtual switches of the CPC, with a subset of their
+        properties. For details, see the :term:`HMC API` book."
+      type: list
+      elements: dict
+      contains:
+        name:
+          description: "Virtual switch name"
+          type: str
+        object-uri:
+          description: "Canonical URI of the virtual switch"
+          type: str
+        type:
+          description: "Type of the virtual switch"
+          type: str
+    lpars:
+      description: "Only for CPCs in classic mode and if C(expand_lpars) is
+        true: The LPARs of the CPC, with a subset of their properties. For
+        details, see the :term:`HMC API` book."
+      type: list
+      elements: dict
+      contains:
+        name:
+          description: "LPAR name"
+          type: str
+        object-uri:
+          description: "Canonical URI of the LPAR"
+          type: str
+        status:
+          description: "Status of the LPAR"
+          type: str
   sample:
     {
         "name": "CPCA",
@@ -352,8 +489,10 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, StatusError, ParameterError, to_unicode, \
-    process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    process_normal_property, PropertySchema, missing_required_lib, \
+    common_fail_on_import_errors, result_properties_parameter, \
+    ResultSelector, list_cpc_children, CPC_CHILD_RESOURCES, \
+    DEFAULT_MAX_CONCURRENCY  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -417,6 +556,8 @@ ZHMC_CPC_PROPERTIES = {
     # The properties not specified here default to allow=False.
 }
 
+ZHMC_CPC_SCHEMA = PropertySchema(ZHMC_CPC_PROPERTIES)
+
 
 def process_properties(cpc, params):
     """
@@ -450,20 +591,14 @@ def process_properties(cpc, params):
     update_props = {}
     for prop_name in input_props:
 
-        try:
-            allowed, create, update, update_active, eq_func, type_cast = \
-                ZHMC_CPC_PROPERTIES[prop_name]
-        except KeyError:
-            allowed = False
-
-        if not allowed:
+        if prop_name not in ZHMC_CPC_SCHEMA.allowed_names:
             raise ParameterError(
                 "CPC property {0!r} specified in the 'properties' module "
                 "parameter cannot be updated.".format(prop_name))
 
         # Process a normal (= non-artificial) property
         _create_props, _update_props, _stop = process_normal_property(
-            prop_name, ZHMC_CPC_PROPERTIES, input_props, cpc)
+            prop_name, ZHMC_CPC_SCHEMA, input_props, cpc)
         update_props.update(_update_props)
         if _create_props:
             raise AssertionError()
@@ -473,12 +608,56 @@ def process_properties(cpc, params):
     return update_props
 
 
-def add_artificial_properties(cpc_properties, cpc):
+# Module parameters that enable the artificial properties for the child
+# resources of a CPC (see CPC_CHILD_RESOURCES), in this format:
+#   name: (param, default)
+# where:
+#   name: Name of the artificial property in the 'cpc' result.
+#   param: Name of the module parameter that enables the property.
+#   default: Default value of the module parameter.
+CPC_CHILD_PROPERTIES = {
+    'partitions': ('expand_partitions', True),
+    'adapters': ('expand_adapters', True),
+    'storage-groups': ('expand_storage_groups', True),
+    'virtual-switches': ('expand_virtual_switches', False),
+    'lpars': ('expand_lpars', False),
+}
+
+# HMC properties of the CPC that the artificial properties in the module
+# result are determined from: The operational mode of the CPC for the child
+# resources that apply only to one operational mode.
+RESULT_PROPERTY_DEPENDENCIES = dict(
+    (name, () if CPC_CHILD_RESOURCES[name][0] is None else ('dpm-enabled',))
+    for name in CPC_CHILD_PROPERTIES)
+
+
+def result_selector(params):
+    """
+    Return the ResultSelector for the 'result_properties' module parameter.
+    """
+    return ResultSelector(
+        params.get('result_properties', None), RESULT_PROPERTY_DEPENDENCIES)
+
+
+def child_property_names(selector, params):
+    """
+    Return the names of the artificial properties for the child resources of
+    the CPC that are enabled by their 'expand_*' module parameter and are
+    selected by the ResultSelector.
+    """
+    return [name for name, (param, default) in CPC_CHILD_PROPERTIES.items()
+            if params.get(param, default) and selector.selected(name)]
+
+
+def add_artificial_properties(
+        cpc_properties, cpc, selector=None, params=None):
     """
     Add artificial properties to the CPC properties.
 
     Upon return, the cpc_properties dict has been extended by these artificial
-    properties:
+    properties, to the extent they are enabled by their 'expand_*' module
+    parameter, apply to the operational mode of the CPC, and are selected by
+    the ResultSelector (if specified):
 
     * 'partitions': List of partitions of the CPC, with the list subset of
       their properties.
@@ -488,17 +667,25 @@ def add_artificial_properties(cpc_properties, cpc):
 
     * 'storage-groups': List of storage groups attached to the partition, with
       the list subset of their properties.
-    """
-    partitions = cpc.partitions.list()
-    cpc_properties['partitions'] = [dict(p.properties) for p in partitions]
 
-    adapters = cpc.adapters.list()
-    cpc_properties['adapters'] = [dict(a.properties) for a in adapters]
+    * 'virtual-switches': List of virtual switches of the CPC (DPM mode only),
+      with the list subset of their properties.
 
-    storage_groups = cpc.manager.console.storage_groups.list(
-        filter_args={'cpc-uri': cpc.uri})
-    cpc_properties['storage-groups'] = [dict(sg.properties)
-                                        for sg in storage_groups]
+    * 'lpars': List of LPARs of the CPC (classic mode only), with the list
+      subset of their properties.
+
+    The enabled child resources are listed concurrently, with up to
+    'max_concurrency' lists running at the same time.
+    """
+    if selector is None:
+        selector = ResultSelector(None)
+    if params is None:
+        params = {}
+
+    names = child_property_names(selector, params)
+    max_concurrency = params.get('max_concurrency', DEFAULT_MAX_CONCURRENCY)
+    children = list_cpc_children([(cpc, names)], max_concurrency)
+    cpc_properties.update(children[0])
 
 
 def ensure_active(params, check_mode):
@@ -566,7 +753,9 @@ def ensure_active(params, check_mode):
             # changes, and not based upon newly retrieved properties.
             result.update(update_props)
             changed = True
-        add_artificial_properties(result, cpc)
+        selector = result_selector(params)
+        add_artificial_properties(result, cpc, selector, params)
+        result = selector.apply(result)
 
         return changed, result
 
@@ -658,7 +847,9 @@ def ensure_set(params, check_mode):
             result.update(update_props)
             changed = True
 
-        add_artificial_properties(result, cpc)
+        selector = result_selector(params)
+        add_artificial_properties(result, cpc, selector, params)
+        result = selector.apply(result)
 
         return changed, result
 
@@ -684,9 +875,16 @@ def facts(params, check_mode):
         cpc = client.cpcs.find(name=cpc_name)
         # The default exception handling is sufficient for the above.
 
-        cpc.pull_full_properties()
+        # The operational mode is needed for listing the child resources
+        # that apply to one operational mode only.
+        selector = result_selector(params)
+        required = set()
+        for name in child_property_names(selector, params):
+            required.update(RESULT_PROPERTY_DEPENDENCIES[name])
+        selector.pull(cpc, required=required)
         result = dict(cpc.properties)
-        add_artificial_properties(result, cpc)
+        add_artificial_properties(result, cpc, selector, params)
+        result = selector.apply(result)
 
         return False, result
 
@@ -727,7 +925,20 @@ def main():
                    choices=['inactive', 'active', 'set', 'facts']),
         activation_profile_name=dict(required=False, type='str', default=None),
         properties=dict(required=False, type='dict', default={}),
+        result_properties=result_properties_parameter(),
+        expand_partitions=dict(required=False, type='bool', default=True),
+        expand_adapters=dict(required=False, type='bool', default=True),
+        expand_storage_groups=dict(required=False, type='bool',
+                                   default=True),
+        expand_virtual_switches=dict(required=False, type='bool',
+                                     default=False),
+        expand_lpars=dict(required=False, type='bool', default=False),
+        max_concurrency=dict(required=False, type='int', default=10),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -748,7 +959,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
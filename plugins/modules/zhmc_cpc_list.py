@@ -36,6 +36,10 @@ short_description: List CPCs
 description:
   - List CPCs (Z systems). By default, only the CPCs managed by the targeted
     HMC are listed. Optionally, unmanaged CPCs can be listed in addition.
+  - Optionally, the full set of properties and child resources of the managed
+    CPCs can be returned. This allows gathering facts about all managed CPCs
+    in a single HMC session, instead of using the M(zhmc_cpc) module for each
+    CPC.
 author:
   - Andreas Maier (@andy-maier)
 requirements:
@@ -103,6 +107,35 @@ options:
     type: bool
     required: false
     default: false
+  full_properties:
+    description:
+      - "If True, all properties of the managed CPCs are returned. If False,
+         only the subset of properties shown in the C(cpcs) result is
+         returned."
+      - "The properties of the managed CPCs are retrieved concurrently in
+         either case."
+    type: bool
+    required: false
+    default: false
+  expand_children:
+    description:
+      - "Names of child resources of the managed CPCs that are added to each
+         managed CPC in the result, as artificial properties with the same
+         name. C(virtual_switches) is ignored for CPCs in classic mode, and
+         C(lpars) is ignored for CPCs in DPM mode."
+    type: list
+    elements: str
+    choices: ['partitions', 'adapters', 'storage_groups', 'virtual_switches',
+              'lpars']
+    required: false
+    default: []
+  max_concurrency:
+    description:
+      - "The maximum number of concurrent HMC operations for retrieving the
+         properties and child resources of the managed CPCs."
+    type: int
+    required: false
+    default: 10
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -111,6 +144,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -136,6 +186,15 @@ EXAMPLES = """
     include_unmanaged_cpcs: true
   register: cpc_list
 
+- name: Gather facts about all managed CPCs, including their partitions
+  zhmc_cpc_list:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    full_properties: true
+    expand_children:
+      - partitions
+  register: cpc_list
+
 """
 
 RETURN = """
@@ -149,7 +208,8 @@ msg:
   returned: failure
   type: str
 cpcs:
-  description: The list of CPCs, with a subset of their properties.
+  description: The list of CPCs, with a subset of their properties, or for
+    C(full_properties=true), with all properties of the managed CPCs.
   returned: success
   type: list
   elements: dict
@@ -181,6 +241,20 @@ cpcs:
       description: The SE version of the CPC, as a string 'M.N.U'.
         Only included for managed CPCs.
       type: str
+    "{property}":
+      description: "For C(full_properties=true), additional properties of
+        the managed CPCs, as described in the data model of the 'CPC' object
+        in the :term:`HMC API` book.
+        The property names have underscores (_) instead of the hyphens (-)
+        that are used in that book."
+    "{child}":
+      description: "For each name in C(expand_children) that is not ignored
+        for the CPC, the child resources of that name, with a
+        subset of their properties as described in the data model of the
+        respective object in the :term:`HMC API` book.
+        Only included for managed CPCs."
+      type: list
+      elements: dict
   sample:
     [
         {
@@ -204,7 +278,8 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    common_fail_on_import_errors, ResourceFetcher, \
+    list_cpc_children  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -224,9 +299,37 @@ LOGGER_NAME = 'zhmc_cpc_list'
 LOGGER = logging.getLogger(LOGGER_NAME)
 
 
+def managed_cpc_properties(cpc, full_properties):
+    """
+    Return the properties of a managed CPC for the result list.
+
+    The CPC must have its full set of properties already.
+    """
+    if full_properties:
+        cpc_properties = dict(
+            (name.replace('-', '_'), value)
+            for name, value in cpc.properties.items())
+        cpc_properties["is_managed"] = True
+    else:
+        cpc_properties = {
+            "name": cpc.name,
+            "is_managed": True,
+            "status": cpc.get_property('status'),
+            "has_unacceptable_status": cpc.get_property(
+                'has-unacceptable-status'),
+            "dpm_enabled": cpc.get_property('dpm-enabled'),
+            "se_version": cpc.get_property('se-version'),
+        }
+    return cpc_properties
+
+
 def perform_list(params):
     """
-    List the managed CPCs and return a subset of properties.
+    List the managed CPCs and return a subset of properties, or all
+    properties.
+
+    The properties and child resources of the managed CPCs are retrieved
+    concurrently, using the CPC objects from the list result.
 
     Raises:
       ParameterError: An issue with the module parameters.
@@ -235,6 +338,10 @@ def perform_list(params):
 
     session, logoff = open_session(params)
     include_unmanaged_cpcs = params.get('include_unmanaged_cpcs', False)
+    full_properties = params.get('full_properties', False)
+    expand_children = [name.replace('_', '-')
+                       for name in params.get('expand_children') or []]
+    max_concurrency = params.get('max_concurrency', 10)
 
     try:
         client = zhmcclient.Client(session)
@@ -244,16 +351,16 @@ def perform_list(params):
         # List the managed CPCs
         cpcs = client.cpcs.list()
         # The default exception handling is sufficient for the above.
-        for cpc in cpcs:
-            cpc_properties = {
-                "name": cpc.name,
-                "is_managed": True,
-                "status": cpc.get_property('status'),
-                "has_unacceptable_status": cpc.get_property(
-                    'has-unacceptable-status'),
-                "dpm_enabled": cpc.get_property('dpm-enabled'),
-                "se_version": cpc.get_property('se-version'),
-            }
+        LOGGER.debug("Retrieving properties of %d managed CPCs", len(cpcs))
+        fetcher = ResourceFetcher(max_concurrency)
+        cpcs = [fetcher.add(cpc) for cpc in cpcs]
+        fetcher.fetch()
+        children = list_cpc_children(
+            [(cpc, expand_children) for cpc in cpcs], max_concurrency)
+        for cpc, cpc_children in zip(cpcs, children):
+            cpc_properties = managed_cpc_properties(cpc, full_properties)
+            for name, child_properties in cpc_children.items():
+                cpc_properties[name.replace('-', '_')] = child_properties
             cpc_list.append(cpc_properties)
 
         # List the unmanaged CPCs
@@ -281,7 +388,17 @@ def main():
         hmc_host=dict(required=True, type='str'),
         hmc_auth=hmc_auth_parameter(),
         include_unmanaged_cpcs=dict(required=False, type='bool', default=False),
+        full_properties=dict(required=False, type='bool', default=False),
+        expand_children=dict(
+            required=False, type='list', elements='str', default=[],
+            choices=['partitions', 'adapters', 'storage_groups',
+                     'virtual_switches', 'lpars']),
+        max_concurrency=dict(required=False, type='int', default=10),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -302,7 +419,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -187,6 +187,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -370,7 +387,7 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    common_fail_on_import_errors, find_partition  # noqa: E402
 
 
 try:
@@ -528,8 +545,7 @@ def ensure_attached(params, check_mode):
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
-        partition = cpc.partitions.find(name=partition_name)
+        cpc, partition = find_partition(client, cpc_name, partition_name)
         # The default exception handling is sufficient for the above.
 
         # Determine all crypto adapters of the specified crypto type.
@@ -939,8 +955,7 @@ def ensure_detached(params, check_mode):
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
-        partition = cpc.partitions.find(name=partition_name)
+        cpc, partition = find_partition(client, cpc_name, partition_name)
         # The default exception handling is sufficient for the above.
 
         # Determine all crypto adapters of any crypto type
@@ -1021,8 +1036,7 @@ def facts(params, check_mode):
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
-        partition = cpc.partitions.find(name=partition_name)
+        cpc, partition = find_partition(client, cpc_name, partition_name)
         # The default exception handling is sufficient for the above.
 
         # Determine all crypto adapters of any crypto type
@@ -1081,6 +1095,10 @@ def main():
         crypto_type=dict(required=False, type='str',
                          choices=['ep11', 'cca', 'acc'], default='ep11'),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -1101,7 +1119,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
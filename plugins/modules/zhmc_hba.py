@@ -167,6 +167,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -237,9 +254,10 @@ import traceback  # noqa: E402
 from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
-    hmc_auth_parameter, Error, ParameterError, wait_for_transition_completion, \
-    eq_hex, to_unicode, process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    hmc_auth_parameter, Error, update_after_transition, \
+    ResourceReconciler, find_partition, missing_required_lib, \
+    common_fail_on_import_errors, \
+    process_hba_properties as process_properties  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -259,176 +277,6 @@ LOGGER_NAME = 'zhmc_hba'
 
 LOGGER = logging.getLogger(LOGGER_NAME)
 
-# Dictionary of properties of HBA resources, in this format:
-#   name: (allowed, create, update, update_while_active, eq_func, type_cast)
-# where:
-#   name: Name of the property according to the data model, with hyphens
-#     replaced by underscores (this is how it is or would be specified in
-#     the 'properties' module parameter).
-#   allowed: Indicates whether it is allowed in the 'properties' module
-#     parameter.
-#   create: Indicates whether it can be specified for the "Create HBA"
-#     operation.
-#   update: Indicates whether it can be specified for the "Update HBA
-#     Properties" operation (at all).
-#   update_while_active: Indicates whether it can be specified for the "Update
-#     HBA Properties" operation while the partition of the HBA is active. None
-#     means "not applicable" (i.e. update=False).
-#   eq_func: Equality test function for two values of the property; None means
-#     to use Python equality.
-#   type_cast: Type cast function for an input value of the property; None
-#     means to use it directly. This can be used for example to convert
-#     integers provided as strings by Ansible back into integers (that is a
-#     current deficiency of Ansible).
-ZHMC_HBA_PROPERTIES = {
-
-    # create-only properties:
-    'adapter_port_uri': (
-        False, True, False, None, None, None),  # via adapter_name/_port
-    'adapter_name': (
-        True, True, False, None, None,
-        None),  # artificial property, type_cast ignored
-    'adapter_port': (
-        True, True, False, None, None,
-        None),  # artificial property, type_cast ignored
-
-    # create+update properties:
-    'name': (
-        False, True, True, True, None, None),  # provided in 'name' module parm
-    'description': (True, True, True, True, None, to_unicode),
-    'device_number': (True, True, True, True, eq_hex, None),
-
-    # read-only properties:
-    'element-uri': (False, False, False, None, None, None),
-    'element-id': (False, False, False, None, None, None),
-    'parent': (False, False, False, None, None, None),
-    'class': (False, False, False, None, None, None),
-    'wwpn': (False, False, False, None, None, None),
-}
-
-
-def process_properties(partition, hba, params):
-    """
-    Process the properties specified in the 'properties' module parameter,
-    and return two dictionaries (create_props, update_props) that contain
-    the properties that can be created, and the properties that can be updated,
-    respectively. If the resource exists, the input property values are
-    compared with the existing resource property values and the returned set
-    of properties is the minimal set of properties that need to be changed.
-
-    - Underscores in the property names are translated into hyphens.
-    - The presence of read-only properties, invalid properties (i.e. not
-      defined in the data model for partitions), and properties that are not
-      allowed because of restrictions or because they are auto-created from
-      an artificial property is surfaced by raising ParameterError.
-    - The properties resulting from handling artificial properties are
-      added to the returned dictionaries.
-
-    Parameters:
-
-      partition (zhmcclient.Partition): Partition containing the HBA. Must
-        exist.
-
-      hba (zhmcclient.Hba): HBA to be updated with the full set of current
-        properties, or `None` if it did not previously exist.
-
-      params (dict): Module input parameters.
-
-    Returns:
-      tuple of (create_props, update_props, stop), where:
-        * create_props: dict of properties for
-          zhmcclient.HbaManager.create()
-        * update_props: dict of properties for
-          zhmcclient.Hba.update_properties()
-        * stop (bool): Indicates whether some update properties require the
-          partition containg the HBA to be stopped when doing the update.
-
-    Raises:
-      ParameterError: An issue with the module parameters.
-    """
-    create_props = {}
-    update_props = {}
-    stop = False
-
-    # handle 'name' property
-    hba_name = to_unicode(params['name'])
-    create_props['name'] = hba_name
-    # We looked up the HBA by name, so we will never have to update its name
-
-    # Names of the artificial properties
-    adapter_name_art_name = 'adapter_name'
-    adapter_port_art_name = 'adapter_port'
-
-    # handle the other properties
-    input_props = params.get('properties', {})
-    if input_props is None:
-        input_props = {}
-    for prop_name in input_props:
-
-        if prop_name not in ZHMC_HBA_PROPERTIES:
-            raise ParameterError(
-                "Property {0!r} is not defined in the data model for "
-                "HBAs.".format(prop_name))
-
-        allowed, create, update, update_while_active, eq_func, type_cast = \
-            ZHMC_HBA_PROPERTIES[prop_name]
-
-        if not allowed:
-            raise ParameterError(
-                "Property {0!r} is not allowed in the 'properties' module "
-                "parameter.".format(prop_name))
-
-        if prop_name in (adapter_name_art_name, adapter_port_art_name):
-            # Artificial properties will be processed together after this loop
-            continue
-
-        # Process a normal (= non-artificial) property
-        _create_props, _update_props, _stop = process_normal_property(
-            prop_name, ZHMC_HBA_PROPERTIES, input_props, hba)
-        create_props.update(_create_props)
-        update_props.update(_update_props)
-        if _stop:
-            stop = True
-
-    # Process artificial properties
-    if (adapter_name_art_name in input_props) != \
-            (adapter_port_art_name in input_props):
-        raise ParameterError(
-            "Artificial properties {0!r} and {1!r} must either both be "
-            "specified or both be omitted.".
-            format(adapter_name_art_name, adapter_port_art_name))
-    if adapter_name_art_name in input_props and \
-            adapter_port_art_name in input_props:
-        adapter_name = to_unicode(input_props[adapter_name_art_name])
-        adapter_port_index = int(input_props[adapter_port_art_name])
-        try:
-            adapter = partition.manager.cpc.adapters.find(
-                name=adapter_name)
-        except zhmcclient.NotFound:
-            raise ParameterError(
-                "Artificial property {0!r} does not specify the name of an "
-                "existing adapter: {1!r}".
-                format(adapter_name_art_name, adapter_name))
-        try:
-            port = adapter.ports.find(index=adapter_port_index)
-        except zhmcclient.NotFound:
-            raise ParameterError(
-                "Artificial property {0!r} does not specify the index of an "
-                "existing port on adapter {1!r}: {2!r}".
-                format(adapter_port_art_name, adapter_name,
-                       adapter_port_index))
-        hmc_prop_name = 'adapter-port-uri'
-        if hba:
-            existing_port_uri = hba.get_property(hmc_prop_name)
-            if port.uri != existing_port_uri:
-                raise ParameterError(
-                    "Artificial properties {0!r} and {1!r} cannot be used to "
-                    "change the adapter port of an existing HBA".
-                    format(adapter_name_art_name, adapter_port_art_name))
-        create_props[hmc_prop_name] = port.uri
-
-    return create_props, update_props, stop
-
 
 def ensure_present(params, check_mode):
     """
@@ -450,72 +298,25 @@ def ensure_present(params, check_mode):
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
+        _, partition = find_partition(
+            client, cpc_name, partition_name, required=not check_mode)
         # The default exception handling is sufficient for the above.
 
-        try:
-            partition = cpc.partitions.find(name=partition_name)
-        except zhmcclient.NotFound:
-            if check_mode:
-                # Once the partition is created, the HBA will also need to be
-                # created. Therefore, we set changed.
-                changed = True
-                return changed, result
-            raise
-
-        try:
-            hba = partition.hbas.find(name=hba_name)
-            hba.pull_full_properties()
-        except zhmcclient.NotFound:
-            hba = None
-
-        if not hba:
-            # It does not exist. Create it and update it if there are
-            # update-only properties.
-            if not check_mode:
-                create_props, update_props, stop = process_properties(
-                    partition, hba, params)
-                hba = partition.hbas.create(create_props)
-                update2_props = {}
-                for name, value in update_props.items():
-                    if name not in create_props:
-                        update2_props[name] = value
-                if update2_props:
-                    hba.update_properties(update2_props)
-                # We refresh the properties after the update, in case an
-                # input property value gets changed (for example, the
-                # partition does that with memory properties).
-                hba.pull_full_properties()
-            else:
-                # TODO: Show props in module result also in check mode.
-                pass
+        if not partition:
+            # Once the partition is created, the HBA will also need to be
+            # created. Therefore, we set changed.
             changed = True
-        else:
-            # It exists. Stop the partition if needed due to the HBA property
-            # update requirements, or wait for an updateable partition status,
-            # and update the HBA properties.
-            create_props, update_props, stop = process_properties(
-                partition, hba, params)
-            if update_props:
-                if not check_mode:
-                    # HBA properties can all be updated while the partition is
-                    # active, therefore:
-                    if stop:
-                        raise AssertionError()
-
-                    wait_for_transition_completion(partition)
-                    hba.update_properties(update_props)
-                    # We refresh the properties after the update, in case an
-                    # input property value gets changed (for example, the
-                    # partition does that with memory properties).
-                    hba.pull_full_properties()
-                else:
-                    # TODO: Show updated props in mod.result also in chk.mode
-                    pass
-                changed = True
-
-        if hba:
-            result = dict(hba.properties)
+            return changed, result
+
+        # HBA properties can all be updated while the partition is active,
+        # after waiting for an updateable partition status.
+        reconciler = ResourceReconciler(
+            partition.hbas, hba_name,
+            lambda hba: process_properties(partition, hba, params),
+            update_func=lambda hba, props: update_after_transition(
+                partition, hba, props),
+            logger=LOGGER)
+        changed, result = reconciler.reconcile(check_mode)
 
         return changed, result
 
@@ -543,8 +344,7 @@ def ensure_absent(params, check_mode):
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
-        partition = cpc.partitions.find(name=partition_name)
+        _, partition = find_partition(client, cpc_name, partition_name)
         # The default exception handling is sufficient for the above.
 
         try:
@@ -596,6 +396,10 @@ def main():
                    choices=['absent', 'present']),
         properties=dict(required=False, type='dict', default={}),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -616,7 +420,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
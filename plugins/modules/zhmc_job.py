@@ -0,0 +1,518 @@
+#!/usr/bin/python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+# For information on the format of the ANSIBLE_METADATA, DOCUMENTATION,
+# EXAMPLES, and RETURN strings, see
+# http://docs.ansible.com/ansible/dev_guide/developing_modules_documenting.html
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['stableinterface'],
+    'supported_by': 'community',
+    'shipped_by': 'other',
+    'other_repo_url': 'https://github.com/zhmcclient/zhmc-ansible-modules'
+}
+
+
+DOCUMENTATION = """
+---
+module: zhmc_job
+version_added: "2.9.0"
+short_description: Wait for asynchronous HMC jobs
+description:
+  - Wait for the completion of asynchronous jobs on the HMC, for example jobs
+    that were submitted by the zhmc_partition or zhmc_lpar modules with
+    C(wait=false).
+  - The jobs are polled concurrently. Each job is polled with an exponential
+    back-off with random jitter, starting with C(poll_interval) and doubling
+    the interval up to C(max_poll_interval) until the job has completed.
+  - Completed jobs are deleted on the HMC.
+  - If some of the jobs failed or did not complete within the timeout, the
+    module fails after all jobs have completed or timed out, and returns the
+    results of all jobs.
+seealso:
+  - module: zhmc_partition
+  - module: zhmc_lpar
+author:
+  - Andreas Maier (@andy-maier)
+requirements:
+  - "The HMC userid must be the userid that submitted the jobs, or must have
+    the permissions to query the jobs of other users."
+options:
+  hmc_host:
+    description:
+      - The hostname or IP address of the HMC.
+    type: str
+    required: true
+  hmc_auth:
+    description:
+      - The authentication credentials for the HMC.
+    type: dict
+    required: true
+    suboptions:
+      userid:
+        description:
+          - The userid (username) for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      password:
+        description:
+          - The password for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      session_id:
+        description:
+          - HMC session ID to be used.
+            This is mutually exclusive with providing C(userid) and C(password)
+            and can be created as described in :ref:`zhmc_session_module`.
+        type: str
+        required: false
+        default: null
+      ca_certs:
+        description:
+          - Path name of certificate file or certificate directory to be used
+            for verifying the HMC certificate. If null (default), the path name
+            in the 'REQUESTS_CA_BUNDLE' environment variable or the path name
+            in the 'CURL_CA_BUNDLE' environment variable is used, or if neither
+            of these variables is set, the certificates in the Mozilla CA
+            Certificate List provided by the 'certifi' Python package are used
+            for verifying the HMC certificate.
+        type: str
+        required: false
+        default: null
+      verify:
+        description:
+          - If True (default), verify the HMC certificate as specified in the
+            C(ca_certs) parameter. If False, ignore what is specified in the
+            C(ca_certs) parameter and do not verify the HMC certificate.
+        type: bool
+        required: false
+        default: true
+  job_uris:
+    description:
+      - "The URIs of the jobs to wait for (e.g. '/api/jobs/{job-id}'), for
+         example from the C(job_uri) result of the zhmc_partition or
+         zhmc_lpar modules."
+    type: list
+    elements: str
+    required: true
+  timeout:
+    description:
+      - "The maximum time in seconds to wait for all jobs. Jobs that did not
+         complete within this time are reported with status 'timeout'. The
+         jobs on the HMC are not cancelled."
+    type: int
+    required: false
+    default: 3600
+  poll_interval:
+    description:
+      - "The initial time in seconds between polls of a job."
+    type: float
+    required: false
+    default: 1
+  max_poll_interval:
+    description:
+      - "The maximum time in seconds between polls of a job."
+    type: float
+    required: false
+    default: 30
+  max_concurrency:
+    description:
+      - "The maximum number of jobs that are polled concurrently."
+    type: int
+    required: false
+    default: 10
+  log_file:
+    description:
+      - "File path of a log file to which the logic flow of this module as well
+         as interactions with the HMC are logged. If null, logging will be
+         propagated to the Python root logger."
+    type: str
+    required: false
+    default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  _faked_session:
+    description:
+      - "An internal parameter used for testing the module."
+    required: false
+    type: raw
+    default: null
+"""
+
+EXAMPLES = """
+---
+# Note: The following examples assume that some variables named 'my_*' are set.
+
+- name: Start the partitions without waiting for completion
+  zhmc_partition:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    cpc_name: "{{ my_cpc_name }}"
+    name: "{{ item }}"
+    state: active
+    wait: false
+  loop: "{{ my_partition_names }}"
+  register: start_results
+
+- name: Wait for the start jobs to complete
+  zhmc_job:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    job_uris: "{{ start_results.results | map(attribute='job_uri') | select() | list }}"
+    timeout: 1800
+  register: job_results
+"""
+
+RETURN = """
+changed:
+  description: Indicates if any change has been made by the module.
+    Always false, because waiting for jobs does not change any resources.
+  returned: always
+  type: bool
+msg:
+  description: An error message that describes the failure.
+  returned: failure
+  type: str
+jobs:
+  description:
+    - "The result for each job, in the order of the C(job_uris) module
+       parameter. Also returned if the module failed because some jobs failed
+       or timed out."
+  returned: always
+  type: list
+  elements: dict
+  contains:
+    uri:
+      description: "Job URI"
+      type: str
+    status:
+      description: "Completion status of the job: 'complete' (completed
+        successfully), 'failed' (completed in error, or the job status could
+        not be retrieved), 'canceled', or 'timeout'."
+      type: str
+    job_results:
+      description: "For status 'complete', the result of the asynchronous
+        operation, as described for the operation in the :term:`HMC API`
+        book. Null if the operation has no result or the job did not complete
+        successfully."
+      type: dict
+    error:
+      description: "For status 'failed', an error message; otherwise null."
+      type: str
+    duration:
+      description: "Time in seconds from the start of the module until the
+        completion of the job was detected."
+      type: float
+    polls:
+      description: "Number of times the job status was queried."
+      type: int
+  sample:
+    [
+        {
+            "duration": 47.3,
+            "error": null,
+            "job_results": null,
+            "polls": 7,
+            "status": "complete",
+            "uri": "/api/jobs/fa7ca4a6-02c2-11ed-b05a-00106f23e8ff"
+        }
+    ]
+"""
+
+import logging  # noqa: E402
+import time  # noqa: E402
+import traceback  # noqa: E402
+from ansible.module_utils.basic import AnsibleModule  # noqa: E402
+
+from ..module_utils.common import log_init, open_session, close_session, \
+    hmc_auth_parameter, Error, ParameterError, missing_required_lib, \
+    common_fail_on_import_errors, concurrent_map, WaitStrategy  # noqa: E402
+
+try:
+    import requests.packages.urllib3
+    IMP_URLLIB3_ERR = None
+except ImportError:
+    IMP_URLLIB3_ERR = traceback.format_exc()
+
+try:
+    import zhmcclient
+    IMP_ZHMCCLIENT_ERR = None
+except ImportError:
+    IMP_ZHMCCLIENT_ERR = traceback.format_exc()
+
+# Python logger name for this module
+LOGGER_NAME = 'zhmc_job'
+
+LOGGER = logging.getLogger(LOGGER_NAME)
+
+# Job status values returned by the HMC for jobs that will not complete
+JOB_CANCELED_STATUSES = ('cancel-pending', 'canceled')
+
+
+class JobState(object):
+    """
+    The polling state of one job.
+    """
+
+    def __init__(self, job, intervals):
+        self.job = job
+        self.intervals = intervals  # iterator of poll intervals
+        self.next_poll = 0.0
+        self.polls = 0
+        self.status = None
+        self.job_results = None
+        self.error = None
+        self.duration = None
+
+    def result(self):
+        """
+        Return the result for the job, as a dict.
+        """
+        return dict(
+            uri=self.job.uri,
+            status=self.status,
+            job_results=self.job_results,
+            error=self.error,
+            duration=self.duration,
+            polls=self.polls,
+        )
+
+
+def poll_job(state):
+    """
+    Query the status of a job once, and update its state if it has ended.
+
+    Completed jobs are deleted on the HMC. Errors are recorded in the state
+    instead of being raised.
+
+    Parameters:
+      state (JobState): The job state.
+
+    Returns:
+      bool: Indicates whether the job has ended.
+    """
+    state.polls += 1
+    try:
+        job_status, job_results = state.job.check_for_completion()
+    except zhmcclient.Error as exc:
+        state.status = 'failed'
+        state.error = "{0}: {1}".format(exc.__class__.__name__, exc)
+        return True
+    if job_status == 'complete':
+        state.status = 'complete'
+        state.job_results = job_results
+        return True
+    if job_status in JOB_CANCELED_STATUSES:
+        state.status = 'canceled'
+        return True
+    return False
+
+
+def wait_for_jobs(states, wait_strategy, max_concurrency):
+    """
+    Poll the specified jobs until all of them have ended or the timeout of the
+    wait strategy has expired.
+
+    The jobs that are due are polled concurrently. After each unsuccessful
+    poll, the next poll of the job is scheduled according to its poll
+    intervals.
+
+    Parameters:
+      states (list of JobState): The job states, with poll intervals from the
+        wait strategy.
+      wait_strategy (WaitStrategy): The wait strategy, for the timeout and the
+        wait histogram.
+      max_concurrency (int): Maximum number of concurrent polls.
+    """
+    timeout = wait_strategy.timeout
+    start = time.time()
+    deadline = start + timeout
+    pending = list(states)
+    while pending:
+        now = time.time()
+        due = [s for s in pending if s.next_poll <= now]
+        if not due:
+            next_poll = min(s.next_poll for s in pending)
+            if next_poll >= deadline:
+                break
+            time.sleep(next_poll - now)
+            continue
+
+        ended = concurrent_map(poll_job, due, max_concurrency)
+
+        now = time.time()
+        for state, has_ended in zip(due, ended):
+            if has_ended:
+                state.duration = round(now - start, 1)
+                pending.remove(state)
+                LOGGER.debug("Job %s ended with status %r after %d polls",
+                             state.job.uri, state.status, state.polls)
+                wait_strategy.record_wait(
+                    'job', now - start, state.polls, True)
+            else:
+                state.next_poll = now + next(state.intervals)
+        if now >= deadline:
+            break
+
+    for state in pending:
+        wait_strategy.record_wait('job', time.time() - start, state.polls,
+                                  False)
+        state.status = 'timeout'
+        state.error = "Job did not complete within {0} seconds".format(
+            timeout)
+
+
+def perform_task(params, check_mode):
+    """
+    Perform the task for this module.
+
+    Waiting for jobs does not change any resources, so check mode has no
+    effect.
+
+    Returns:
+      tuple of (changed, result), where result is the list of job results.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    job_uris = params['job_uris']
+    poll_interval = params['poll_interval']
+    max_poll_interval = params['max_poll_interval']
+
+    if poll_interval <= 0 or max_poll_interval < poll_interval:
+        raise ParameterError(
+            "The 'poll_interval' module parameter must be positive and must "
+            "not be greater than the 'max_poll_interval' module parameter.")
+    if len(set(job_uris)) != len(job_uris):
+        raise ParameterError(
+            "Job URIs in the 'job_uris' module parameter are not unique: "
+            "{0!r}".format(job_uris))
+
+    wait_strategy = WaitStrategy(
+        timeout=params['timeout'], initial_interval=poll_interval,
+        max_interval=max_poll_interval, logger=LOGGER)
+
+    session, logoff = open_session(params)
+    try:
+        states = [
+            JobState(zhmcclient.Job(session, uri, None, None),
+                     wait_strategy.intervals())
+            for uri in job_uris]
+        wait_for_jobs(states, wait_strategy, params['max_concurrency'])
+        result = [state.result() for state in states]
+        return False, result
+
+    finally:
+        close_session(session, logoff)
+
+
+def main():
+
+    # The following definition of module input parameters must match the
+    # description of the options in the DOCUMENTATION string.
+    argument_spec = dict(
+        hmc_host=dict(required=True, type='str'),
+        hmc_auth=hmc_auth_parameter(),
+        job_uris=dict(required=True, type='list', elements='str'),
+        timeout=dict(required=False, type='int', default=3600),
+        poll_interval=dict(required=False, type='float', default=1),
+        max_poll_interval=dict(required=False, type='float', default=30),
+        max_concurrency=dict(required=False, type='int', default=10),
+        log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
+        _faked_session=dict(required=False, type='raw'),
+    )
+
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True)
+
+    if IMP_URLLIB3_ERR is not None:
+        module.fail_json(msg=missing_required_lib("requests"),
+                         exception=IMP_URLLIB3_ERR)
+
+    requests.packages.urllib3.disable_warnings()
+
+    if IMP_ZHMCCLIENT_ERR is not None:
+        module.fail_json(msg=missing_required_lib("zhmcclient"),
+                         exception=IMP_ZHMCCLIENT_ERR)
+
+    common_fail_on_import_errors(module)
+
+    log_file = module.params['log_file']
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
+
+    _params = dict(module.params)
+    del _params['hmc_auth']
+    LOGGER.debug("Module entry: params: %r", _params)
+
+    try:
+
+        changed, result = perform_task(module.params, module.check_mode)
+
+    except (Error, zhmcclient.Error) as exc:
+        # These exceptions are considered errors in the environment or in user
+        # input. They have a proper message that stands on its own, so we
+        # simply pass that message on and will not need a traceback.
+        msg = "{0}: {1}".format(exc.__class__.__name__, exc)
+        LOGGER.debug(
+            "Module exit (failure): msg: %s", msg)
+        module.fail_json(msg=msg)
+    # Other exceptions are considered module errors and are handled by Ansible
+    # by showing the traceback.
+
+    failed = [r['uri'] for r in result if r['status'] != 'complete']
+    if failed:
+        msg = "{0} of {1} jobs did not complete successfully: {2}".format(
+            len(failed), len(result), ", ".join(failed))
+        LOGGER.debug(
+            "Module exit (failure): msg: %s", msg)
+        module.fail_json(msg=msg, changed=changed, jobs=result)
+
+    LOGGER.debug(
+        "Module exit (success): changed: %r, jobs: %r", changed, result)
+    module.exit_json(changed=changed, jobs=result)
+
+
+if __name__ == '__main__':
+    main()
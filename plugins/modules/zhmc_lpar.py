@@ -208,6 +208,22 @@ options:
     type: dict
     required: false
     default: null
+  wait:
+    description:
+      - "Boolean that controls whether the module waits for the completion of
+         the operation that changes the LPAR status, for C(state=inactive),
+         C(state=active) and C(state=loaded)."
+      - "If false, that operation is submitted as an asynchronous job on the
+         HMC, and the module returns the URI of the job in the C(job_uri)
+         result without waiting for its completion. The job can then be
+         waited for with the zhmc_job module. For C(state=loaded), an
+         activation that is needed before loading the LPAR is still
+         performed synchronously."
+      - "The C(properties) parameter is not allowed when this parameter is
+         false."
+    type: bool
+    required: false
+    default: true
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -216,6 +232,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -317,6 +350,15 @@ msg:
   description: An error message that describes the failure.
   returned: failure
   type: str
+job_uri:
+  description:
+    - "For C(wait=false), the URI of the asynchronous job that changes the
+       LPAR status, or null if no such job was submitted (e.g. because the
+       LPAR already had the desired status)."
+    - "For C(wait=true), always null."
+  returned: success
+  type: str
+  sample: "/api/jobs/fa7ca4a6-02c2-11ed-b05a-00106f23e8ff"
 lpar:
   description:
     - "The resource properties of the LPAR, after any specified updates have
@@ -501,7 +543,7 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, StatusError, \
     ensure_lpar_inactive, ensure_lpar_active, ensure_lpar_loaded, to_unicode, \
-    process_normal_property, missing_required_lib, \
+    process_normal_property, PropertySchema, missing_required_lib, \
     common_fail_on_import_errors  # noqa: E402
 
 try:
@@ -667,6 +709,8 @@ ZHMC_LPAR_PROPERTIES = {
     'request_origin': (False, False, False, None, None, None),
 }
 
+ZHMC_LPAR_SCHEMA = PropertySchema(ZHMC_LPAR_PROPERTIES)
+
 
 def process_properties(cpc, lpar, params):
     """
@@ -714,15 +758,12 @@ def process_properties(cpc, lpar, params):
         input_props = {}
     for prop_name in input_props:
 
-        if prop_name not in ZHMC_LPAR_PROPERTIES:
+        if prop_name not in ZHMC_LPAR_SCHEMA:
             raise ParameterError(
                 "Property {0!r} is not defined in the data model for "
                 "LPARs.".format(prop_name))
 
-        allowed, create, update, update_while_active, eq_func, type_cast = \
-            ZHMC_LPAR_PROPERTIES[prop_name]
-
-        if not allowed:
+        if prop_name not in ZHMC_LPAR_SCHEMA.allowed_names:
             raise ParameterError(
                 "Property {0!r} is not allowed in the 'properties' module "
                 "parameter.".format(prop_name))
@@ -730,7 +771,7 @@ def process_properties(cpc, lpar, params):
         else:
             # Process a normal (= non-artificial) property
             _create_props, _update_props, _stop = process_normal_property(
-                prop_name, ZHMC_LPAR_PROPERTIES, input_props, lpar)
+                prop_name, ZHMC_LPAR_SCHEMA, input_props, lpar)
             create_props.update(_create_props)
             update_props.update(_update_props)
             if _stop:
@@ -780,6 +821,8 @@ def ensure_inactive(params, check_mode):
 
     changed = False
     result = {}
+    # Receives the job of an asynchronous operation
+    jobs = None if params.get('wait', True) else []
 
     session, logoff = open_session(params)
     try:
@@ -791,9 +834,10 @@ def ensure_inactive(params, check_mode):
         # If we got here, the LPAR exists.
 
         # Deactivate the LPAR.
-        changed |= ensure_lpar_inactive(LOGGER, lpar, check_mode)
+        changed |= ensure_lpar_inactive(LOGGER, lpar, check_mode, jobs)
+        job_uri = jobs[0].uri if jobs else None
 
-        return changed, result
+        return changed, result, job_uri
 
     finally:
         close_session(session, logoff)
@@ -839,7 +883,7 @@ def perform_reset_clear(params, check_mode):
         changed = True
         result = {}
 
-        return changed, result
+        return changed, result, None
 
     finally:
         close_session(session, logoff)
@@ -885,7 +929,7 @@ def perform_reset_normal(params, check_mode):
         changed = True
         result = {}
 
-        return changed, result
+        return changed, result, None
 
     finally:
         close_session(session, logoff)
@@ -910,6 +954,13 @@ def ensure_active(params, check_mode):
         'activation_profile_name', DEFAULT_ACTIVATION_PROFILE_NAME)
     force = params.get('force', DEFAULT_FORCE)
 
+    # Receives the job of an asynchronous operation
+    jobs = None if params.get('wait', True) else []
+    if jobs is not None and params.get('properties', None):
+        raise ParameterError(
+            "Properties must not be specified for state=active with "
+            "wait=false for LPAR {0!r}.".format(lpar_name))
+
     changed = False
     result = {}
 
@@ -926,7 +977,8 @@ def ensure_active(params, check_mode):
         changed |= ensure_lpar_active(
             LOGGER, lpar, check_mode,
             activation_profile_name=activation_profile_name,
-            force=force)
+            force=force, jobs=jobs)
+        job_uri = jobs[0].uri if jobs else None
 
         # Update the properties of the LPAR.
         lpar.pull_full_properties()
@@ -946,7 +998,7 @@ def ensure_active(params, check_mode):
         result = lpar_properties
         add_artificial_properties(result, lpar)
 
-        return changed, result
+        return changed, result, job_uri
 
     finally:
         close_session(session, logoff)
@@ -968,6 +1020,13 @@ def ensure_loaded(params, check_mode):
         'activation_profile_name', DEFAULT_ACTIVATION_PROFILE_NAME)
     force = params.get('force', DEFAULT_FORCE)
 
+    # Receives the job of an asynchronous operation
+    jobs = None if params.get('wait', True) else []
+    if jobs is not None and params.get('properties', None):
+        raise ParameterError(
+            "Properties must not be specified for state=loaded with "
+            "wait=false for LPAR {0!r}.".format(lpar_name))
+
     changed = False
     result = {}
 
@@ -984,7 +1043,8 @@ def ensure_loaded(params, check_mode):
         changed |= ensure_lpar_loaded(
             LOGGER, lpar, check_mode,
             activation_profile_name=activation_profile_name,
-            force=force)
+            force=force, jobs=jobs)
+        job_uri = jobs[0].uri if jobs else None
 
         # Update the properties of the LPAR.
         lpar.pull_full_properties()
@@ -1004,7 +1064,7 @@ def ensure_loaded(params, check_mode):
         result = lpar_properties
         add_artificial_properties(result, lpar)
 
-        return changed, result
+        return changed, result, job_uri
 
     finally:
         close_session(session, logoff)
@@ -1062,7 +1122,7 @@ def ensure_set(params, check_mode):
         result = lpar_properties
         add_artificial_properties(result, lpar)
 
-        return changed, result
+        return changed, result, None
 
     finally:
         close_session(session, logoff)
@@ -1101,7 +1161,7 @@ def facts(params, check_mode):
         result = dict(lpar.properties)
         add_artificial_properties(result, lpar)
 
-        return changed, result
+        return changed, result, None
 
     finally:
         close_session(session, logoff)
@@ -1115,6 +1175,10 @@ def perform_task(params, check_mode):
     If check_mode is True, check whether changes would occur, but don't
     actually perform any changes.
 
+    Returns:
+      tuple of (changed, result, job_uri), where job_uri is the URI of the
+      asynchronous job that was submitted for wait=false, or None.
+
     Raises:
       ParameterError: An issue with the module parameters.
       StatusError: An issue with the LPAR status.
@@ -1152,7 +1216,12 @@ def main():
         os_ipl_token=dict(required=False, type='str', default=None),
         # Note: os_ipl_token is not a secret
         properties=dict(required=False, type='dict', default={}),
+        wait=dict(required=False, type='bool', default=True),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -1173,7 +1242,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -1181,7 +1251,8 @@ def main():
 
     try:
 
-        changed, result = perform_task(module.params, module.check_mode)
+        changed, result, job_uri = perform_task(
+            module.params, module.check_mode)
 
     except (Error, zhmcclient.Error) as exc:
         # These exceptions are considered errors in the environment or in user
@@ -1195,8 +1266,9 @@ def main():
     # by showing the traceback.
 
     LOGGER.debug(
-        "Module exit (success): changed: %r, cpc: %r", changed, result)
-    module.exit_json(changed=changed, lpar=result)
+        "Module exit (success): changed: %r, cpc: %r, job_uri: %r",
+        changed, result, job_uri)
+    module.exit_json(changed=changed, lpar=result, job_uri=job_uri)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,824 @@
+#!/usr/bin/python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+# For information on the format of the ANSIBLE_METADATA, DOCUMENTATION,
+# EXAMPLES, and RETURN strings, see
+# http://docs.ansible.com/ansible/dev_guide/developing_modules_documenting.html
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['stableinterface'],
+    'supported_by': 'community',
+    'shipped_by': 'other',
+    'other_repo_url': 'https://github.com/zhmcclient/zhmc-ansible-modules'
+}
+
+
+DOCUMENTATION = """
+---
+module: zhmc_lpar_batch
+version_added: "2.9.0"
+short_description: Activate, load or deactivate many LPARs
+description:
+  - Ensure that multiple LPARs of one or more CPCs (Z systems) in classic
+    mode are inactive, active or loaded, by performing the necessary
+    'Activate Logical Partition', 'Load Logical Partition' and 'Deactivate
+    Logical Partition' operations as asynchronous jobs on the HMC.
+  - Up to C(max_concurrency) jobs (and up to C(max_concurrency_per_cpc) jobs
+    per CPC) are outstanding at any time. All outstanding jobs are polled in
+    a single loop, and a new job is submitted as soon as a job completes.
+  - The module reports the operations performed and the time needed for each
+    LPAR. If the operations for some LPARs fail, the operations for the
+    other LPARs are still performed, and the module fails after all of them
+    have completed.
+  - Updating LPAR properties is not supported by this module; use the
+    zhmc_lpar module for that.
+seealso:
+  - module: zhmc_lpar
+author:
+  - Andreas Maier (@andy-maier)
+requirements:
+  - The targeted CPCs must be in the classic operational mode.
+  - "The HMC userid must have these task permissions:
+    'Activate', 'Deactivate', 'Load'."
+  - "The HMC userid must have object-access permissions to these objects:
+    Target LPARs, CPCs of target LPARs."
+options:
+  hmc_host:
+    description:
+      - The hostname or IP address of the HMC.
+    type: str
+    required: true
+  hmc_auth:
+    description:
+      - The authentication credentials for the HMC.
+    type: dict
+    required: true
+    suboptions:
+      userid:
+        description:
+          - The userid (username) for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      password:
+        description:
+          - The password for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      session_id:
+        description:
+          - HMC session ID to be used.
+            This is mutually exclusive with providing C(userid) and C(password)
+            and can be created as described in :ref:`zhmc_session_module`.
+        type: str
+        required: false
+        default: null
+      ca_certs:
+        description:
+          - Path name of certificate file or certificate directory to be used
+            for verifying the HMC certificate. If null (default), the path name
+            in the 'REQUESTS_CA_BUNDLE' environment variable or the path name
+            in the 'CURL_CA_BUNDLE' environment variable is used, or if neither
+            of these variables is set, the certificates in the Mozilla CA
+            Certificate List provided by the 'certifi' Python package are used
+            for verifying the HMC certificate.
+        type: str
+        required: false
+        default: null
+      verify:
+        description:
+          - If True (default), verify the HMC certificate as specified in the
+            C(ca_certs) parameter. If False, ignore what is specified in the
+            C(ca_certs) parameter and do not verify the HMC certificate.
+        type: bool
+        required: false
+        default: true
+  lpars:
+    description:
+      - The target LPARs.
+    type: list
+    elements: dict
+    required: true
+    suboptions:
+      cpc_name:
+        description:
+          - The name of the CPC with the target LPAR.
+        type: str
+        required: true
+      name:
+        description:
+          - The name of the target LPAR.
+        type: str
+        required: true
+      state:
+        description:
+          - "The desired state for the LPAR, as described for the C(state)
+             module parameter. If null, the C(state) module parameter is
+             used."
+        type: str
+        required: false
+        default: null
+        choices: ['inactive', 'active', 'loaded']
+      activation_profile_name:
+        description:
+          - "The name of the image or load activation profile to be used
+             when the LPAR needs to be activated. If null, the image or load
+             activation profile specified in the
+             'next-activation-profile-name' property of the LPAR is used."
+        type: str
+        required: false
+        default: null
+  state:
+    description:
+      - "The desired state for the LPARs that do not specify a state:"
+      - "* C(inactive): Ensures that the LPAR is inactive (i.e. status
+         'not-activated'). The LPAR is deactivated if needed, also if it is
+         currently loaded."
+      - "* C(active): Ensures that the LPAR is at least active (i.e. status
+         is 'not-operating', 'operating', 'acceptable' or 'exceptions'). The
+         LPAR is activated if needed. If auto-load is set in the activation
+         profile, the LPAR will also be loaded."
+      - "* C(loaded): Ensures that the LPAR is loaded (i.e. status is
+         'operating', 'acceptable' or 'exceptions'). The LPAR is first
+         activated if needed, and then loaded if needed."
+    type: str
+    required: true
+    choices: ['inactive', 'active', 'loaded']
+  max_concurrency:
+    description:
+      - "The maximum number of outstanding jobs."
+    type: int
+    required: false
+    default: 10
+  max_concurrency_per_cpc:
+    description:
+      - "The maximum number of outstanding jobs per CPC. Must be null or at
+         least 1. If null, only C(max_concurrency) applies."
+    type: int
+    required: false
+    default: null
+  poll_interval:
+    description:
+      - "The time in seconds between polling the outstanding jobs for
+         completion."
+    type: float
+    required: false
+    default: 5
+  timeout:
+    description:
+      - "The maximum time in seconds for all operations on a single LPAR,
+         starting with the submission of its first job. If the timeout
+         expires, the LPAR is reported as failed. The jobs on the HMC are not
+         cancelled."
+    type: int
+    required: false
+    default: 3600
+  log_file:
+    description:
+      - "File path of a log file to which the logic flow of this module as well
+         as interactions with the HMC are logged. If null, logging will be
+         propagated to the Python root logger."
+    type: str
+    required: false
+    default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  _faked_session:
+    description:
+      - "An internal parameter used for testing the module."
+    required: false
+    type: raw
+    default: null
+"""
+
+EXAMPLES = """
+---
+# Note: The following examples assume that some variables named 'my_*' are set.
+
+- name: Ensure the LPARs are loaded, with up to 2 jobs per CPC
+  zhmc_lpar_batch:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    lpars:
+      - cpc_name: "{{ my_cpc1_name }}"
+        name: "{{ my_lpar1_name }}"
+      - cpc_name: "{{ my_cpc1_name }}"
+        name: "{{ my_lpar2_name }}"
+      - cpc_name: "{{ my_cpc2_name }}"
+        name: "{{ my_lpar3_name }}"
+        activation_profile_name: "{{ my_lpar3_profile }}"
+    state: loaded
+    max_concurrency_per_cpc: 2
+  register: lpars1
+
+- name: Ensure the LPARs are inactive
+  zhmc_lpar_batch:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    lpars:
+      - cpc_name: "{{ my_cpc1_name }}"
+        name: "{{ my_lpar1_name }}"
+      - cpc_name: "{{ my_cpc1_name }}"
+        name: "{{ my_lpar2_name }}"
+    state: inactive
+"""
+
+RETURN = """
+changed:
+  description: Indicates if any change has been made by the module.
+  returned: always
+  type: bool
+msg:
+  description: An error message that describes the failure.
+  returned: failure
+  type: str
+lpars:
+  description:
+    - "The result for each target LPAR, in the order of the C(lpars) module
+       parameter. Also returned if the module failed because of failures for
+       some LPARs."
+  returned: always
+  type: list
+  elements: dict
+  contains:
+    cpc_name:
+      description: "CPC name"
+      type: str
+    name:
+      description: "LPAR name"
+      type: str
+    state:
+      description: "Desired state of the LPAR"
+      type: str
+    changed:
+      description: "Indicates whether the LPAR was changed."
+      type: bool
+    status:
+      description: "The 'status' property of the LPAR after the operations.
+        In check mode, the status before the operations."
+      type: str
+    operations:
+      description: "The operations performed on the LPAR, in the order they
+        were performed. In check mode, the operations that would be performed
+        when starting from the current status."
+      type: list
+      elements: dict
+      contains:
+        operation:
+          description: "The operation: 'activate', 'load' or 'deactivate'."
+          type: str
+        duration:
+          description: "Duration of the job in seconds. Null in check mode or
+            if the job did not complete."
+          type: float
+    queued:
+      description: "Time in seconds the LPAR waited for the submission of its
+        first job."
+      type: float
+    duration:
+      description: "Time in seconds from the submission of the first job
+        until the completion of the last job for the LPAR."
+      type: float
+    error:
+      description: "An error message if the operations for the LPAR failed,
+        or null."
+      type: str
+  sample:
+    [
+        {
+            "changed": true,
+            "cpc_name": "CPC1",
+            "duration": 184.2,
+            "error": null,
+            "name": "LPAR1",
+            "operations": [
+                {
+                    "duration": 121.5,
+                    "operation": "activate"
+                },
+                {
+                    "duration": 62.7,
+                    "operation": "load"
+                }
+            ],
+            "queued": 0.0,
+            "state": "loaded",
+            "status": "operating"
+        }
+    ]
+"""
+
+import logging  # noqa: E402
+import time  # noqa: E402
+import traceback  # noqa: E402
+from collections import deque  # noqa: E402
+from ansible.module_utils.basic import AnsibleModule  # noqa: E402
+
+from ..module_utils.common import log_init, open_session, close_session, \
+    hmc_auth_parameter, Error, ParameterError, StatusError, \
+    missing_required_lib, common_fail_on_import_errors, pull_lpar_status, \
+    LPAR_INACTIVE_END_STATUSES, LPAR_ACTIVE_END_STATUSES, \
+    LPAR_LOADED_END_STATUSES, LPAR_BAD_STATUSES  # noqa: E402
+
+try:
+    import requests.packages.urllib3
+    IMP_URLLIB3_ERR = None
+except ImportError:
+    IMP_URLLIB3_ERR = traceback.format_exc()
+
+try:
+    import zhmcclient
+    IMP_ZHMCCLIENT_ERR = None
+except ImportError:
+    IMP_ZHMCCLIENT_ERR = traceback.format_exc()
+
+# Python logger name for this module
+LOGGER_NAME = 'zhmc_lpar_batch'
+
+LOGGER = logging.getLogger(LOGGER_NAME)
+
+# Successful LPAR status values, by desired state
+END_STATUSES = {
+    'inactive': LPAR_INACTIVE_END_STATUSES,
+    'active': LPAR_ACTIVE_END_STATUSES,
+    'loaded': LPAR_LOADED_END_STATUSES,
+}
+
+
+def next_operation(state, status):
+    """
+    Return the next operation that is needed to bring an LPAR with the
+    specified status into the desired state.
+
+    Parameters:
+      state (str): Desired state ('inactive', 'active', 'loaded').
+      status (str): Current value of the 'status' property of the LPAR.
+
+    Returns:
+      str: The operation ('activate', 'load', 'deactivate'), or None if the
+      LPAR is already in the desired state.
+
+    Raises:
+      StatusError: The LPAR cannot be brought into the desired state from its
+        current status.
+    """
+    if status in LPAR_BAD_STATUSES:
+        raise StatusError(
+            "CPC has issues; status of LPAR is: {0!r}".format(status))
+    if status in END_STATUSES[state]:
+        return None
+    if state == 'inactive':
+        return 'deactivate'
+    if status == 'not-activated':
+        return 'activate'
+    if state == 'loaded' and status == 'not-operating':
+        return 'load'
+    raise StatusError(
+        "Cannot get LPAR from status {0!r} into state {1!r}".
+        format(status, state))
+
+
+def check_mode_operations(state, status):
+    """
+    Return the list of operations that are expected to be needed to bring an
+    LPAR with the specified status into the desired state, assuming the
+    LPAR does not auto-load.
+
+    Raises:
+      StatusError: The LPAR cannot be brought into the desired state from its
+        current status.
+    """
+    expected_status = {
+        'activate': 'not-operating',
+        'load': 'operating',
+        'deactivate': 'not-activated',
+    }
+    operations = []
+    operation = next_operation(state, status)
+    while operation:
+        operations.append(operation)
+        operation = next_operation(state, expected_status[operation])
+    return operations
+
+
+class LparTask(object):
+    """
+    The operations for one target LPAR, and their progress.
+    """
+
+    def __init__(self, cpc_name, lpar, state, activation_profile_name):
+        self.cpc_name = cpc_name
+        self.lpar = lpar
+        self.state = state
+        self.activation_profile_name = activation_profile_name
+        self.status = None
+        self.operations = []  # list of dict(operation, duration)
+        self.error = None
+        self.job = None
+        self.job_start = None
+        self.queued = 0.0
+        self.start = None
+        self.end = None
+
+    @property
+    def changed(self):
+        """
+        Indicates whether an operation was performed on the LPAR.
+        """
+        return bool(self.operations)
+
+    def submit(self, operation, now):
+        """
+        Submit the specified operation as an asynchronous job.
+
+        Raises:
+          zhmcclient.Error: Any zhmcclient exception can happen.
+        """
+        LOGGER.debug("Submitting %s job for LPAR %r on CPC %r",
+                     operation, self.lpar.name, self.cpc_name)
+        self.operations.append(dict(operation=operation, duration=None))
+        self.job_start = now
+        if operation == 'activate':
+            self.job = self.lpar.activate(
+                wait_for_completion=False,
+                activation_profile_name=self.activation_profile_name,
+                force=False)
+        elif operation == 'load':
+            self.job = self.lpar.load(wait_for_completion=False)
+        else:
+            self.job = self.lpar.deactivate(
+                wait_for_completion=False, force=True)
+
+    def complete_job(self, now):
+        """
+        Record the completion of the current job.
+        """
+        self.operations[-1]['duration'] = round(now - self.job_start, 1)
+        self.job = None
+        self.job_start = None
+
+    def finish(self, now, error=None):
+        """
+        Record the end of the operations for the LPAR.
+        """
+        self.end = now
+        self.job = None
+        if error:
+            self.error = error
+            LOGGER.debug("Operations for LPAR %r on CPC %r failed: %s",
+                         self.lpar.name, self.cpc_name, error)
+
+    def result(self):
+        """
+        Return the result for the LPAR, as a dict.
+        """
+        duration = None
+        if self.start is not None and self.end is not None:
+            duration = round(self.end - self.start, 1)
+        return dict(
+            cpc_name=self.cpc_name,
+            name=self.lpar.name,
+            state=self.state,
+            changed=self.changed,
+            status=self.status,
+            operations=self.operations,
+            queued=round(self.queued, 1),
+            duration=duration,
+            error=self.error,
+        )
+
+
+def run_tasks(tasks, max_concurrency, max_concurrency_per_cpc,
+              poll_interval, timeout):
+    """
+    Perform the operations for the specified LPAR tasks, by submitting
+    asynchronous jobs and polling all outstanding jobs in a single loop.
+
+    The 'status' attribute of each task must be set to the current LPAR
+    status. Failures of single tasks are recorded in the tasks and do not
+    stop the processing of the other tasks.
+
+    Parameters:
+      tasks (list of LparTask): The tasks.
+      max_concurrency (int): Maximum number of outstanding jobs.
+      max_concurrency_per_cpc (int): Maximum number of outstanding jobs per
+        CPC, or None for no per-CPC limit.
+      poll_interval (float): Time in seconds between polling the outstanding
+        jobs when none of them completed.
+      timeout (float): Maximum time in seconds for all operations of a task.
+    """
+    begin = time.time()
+    pending = deque()
+    for task in tasks:
+        try:
+            operation = next_operation(task.state, task.status)
+        except StatusError as exc:
+            task.finish(time.time(), "{0}: {1}".format(
+                exc.__class__.__name__, exc))
+            continue
+        if operation:
+            pending.append((task, operation))
+        else:
+            LOGGER.debug("LPAR %r on CPC %r already has status %r",
+                         task.lpar.name, task.cpc_name, task.status)
+
+    running = []
+    per_cpc = {}
+
+    def can_submit(task):
+        if len(running) >= max_concurrency:
+            return False
+        if max_concurrency_per_cpc and \
+                per_cpc.get(task.cpc_name, 0) >= max_concurrency_per_cpc:
+            return False
+        return True
+
+    def submit(task, operation):
+        now = time.time()
+        if task.start is None:
+            task.start = now
+            task.queued = now - begin
+        try:
+            task.submit(operation, now)
+        except zhmcclient.Error as exc:
+            task.finish(time.time(), "{0}: {1}".format(
+                exc.__class__.__name__, exc))
+            return False
+        return True
+
+    def release(task):
+        running.remove(task)
+        per_cpc[task.cpc_name] -= 1
+
+    while pending or running:
+
+        # Fill the concurrency window with pending tasks, in their order
+        # but skipping tasks whose CPC has reached its limit.
+        for item in list(pending):
+            task, operation = item
+            if not can_submit(task):
+                if len(running) >= max_concurrency:
+                    break
+                continue
+            pending.remove(item)
+            if submit(task, operation):
+                running.append(task)
+                per_cpc[task.cpc_name] = per_cpc.get(task.cpc_name, 0) + 1
+
+        # Poll all outstanding jobs
+        completed = False
+        for task in list(running):
+            try:
+                job_status, _ = task.job.check_for_completion()
+            except zhmcclient.Error as exc:
+                task.finish(time.time(), "{0}: {1}".format(
+                    exc.__class__.__name__, exc))
+                release(task)
+                completed = True
+                continue
+            now = time.time()
+            if job_status != 'complete':
+                if now - task.start > timeout:
+                    task.finish(now, "Timeout after {0} seconds waiting for "
+                                "completion of {1} job {2}".format(
+                                    timeout, task.operations[-1]['operation'],
+                                    task.job.uri))
+                    release(task)
+                    completed = True
+                continue
+
+            completed = True
+            previous = task.operations[-1]['operation']
+            task.complete_job(now)
+            try:
+                task.status = pull_lpar_status(task.lpar)
+                operation = next_operation(task.state, task.status)
+                if operation == previous:
+                    raise StatusError(
+                        "LPAR still has status {0!r} after {1} job".
+                        format(task.status, previous))
+            except (StatusError, zhmcclient.Error) as exc:
+                task.finish(time.time(), "{0}: {1}".format(
+                    exc.__class__.__name__, exc))
+                release(task)
+                continue
+            if operation is None:
+                task.finish(time.time())
+                release(task)
+                LOGGER.debug("LPAR %r on CPC %r reached status %r",
+                             task.lpar.name, task.cpc_name, task.status)
+            elif not submit(task, operation):
+                # Submitting the next operation failed, so the task is
+                # finished and its slot is released. If submitting succeeded,
+                # the task keeps its slot for its next operation.
+                release(task)
+
+        if running and not completed:
+            time.sleep(poll_interval)
+
+
+def perform_task(params, check_mode):
+    """
+    Perform the task for this module.
+
+    If check_mode is True, check whether changes would occur, but don't
+    actually perform any changes.
+
+    Returns:
+      tuple of (changed, result), where result is the list of LPAR results.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    items = params['lpars']
+    max_concurrency = params['max_concurrency']
+    max_concurrency_per_cpc = params['max_concurrency_per_cpc']
+
+    if max_concurrency < 1:
+        raise ParameterError(
+            "The 'max_concurrency' module parameter must be at least 1.")
+    if max_concurrency_per_cpc is not None and max_concurrency_per_cpc < 1:
+        raise ParameterError(
+            "The 'max_concurrency_per_cpc' module parameter must be null or "
+            "at least 1.")
+
+    keys = [(item['cpc_name'], item['name']) for item in items]
+    if len(set(keys)) != len(keys):
+        raise ParameterError(
+            "LPARs in the 'lpars' module parameter are not unique: {0!r}".
+            format(keys))
+
+    session, logoff = open_session(params)
+    try:
+        client = zhmcclient.Client(session)
+
+        # List the LPARs of each CPC once. The listed LPARs include their
+        # status.
+        cpc_lpars = {}
+        for cpc_name, _ in keys:
+            if cpc_name not in cpc_lpars:
+                cpc = client.cpcs.find(name=cpc_name)
+                cpc_lpars[cpc_name] = dict(
+                    (lpar.name, lpar) for lpar in cpc.lpars.list())
+        # The default exception handling is sufficient for the above.
+
+        tasks = []
+        for item in items:
+            cpc_name = item['cpc_name']
+            try:
+                lpar = cpc_lpars[cpc_name][item['name']]
+            except KeyError:
+                raise ParameterError(
+                    "LPAR {0!r} does not exist in CPC {1!r}".
+                    format(item['name'], cpc_name))
+            task = LparTask(
+                cpc_name, lpar, item['state'] or params['state'],
+                item['activation_profile_name'])
+            task.status = lpar.get_property('status')
+            tasks.append(task)
+
+        if check_mode:
+            for task in tasks:
+                try:
+                    operations = check_mode_operations(
+                        task.state, task.status)
+                except StatusError as exc:
+                    task.finish(None, "{0}: {1}".format(
+                        exc.__class__.__name__, exc))
+                    continue
+                task.operations = [
+                    dict(operation=op, duration=None) for op in operations]
+        else:
+            run_tasks(tasks, max_concurrency, max_concurrency_per_cpc,
+                      params['poll_interval'], params['timeout'])
+
+        result = [task.result() for task in tasks]
+        changed = any(task.changed for task in tasks)
+        return changed, result
+
+    finally:
+        close_session(session, logoff)
+
+
+def main():
+
+    # The following definition of module input parameters must match the
+    # description of the options in the DOCUMENTATION string.
+    argument_spec = dict(
+        hmc_host=dict(required=True, type='str'),
+        hmc_auth=hmc_auth_parameter(),
+        lpars=dict(
+            required=True, type='list', elements='dict',
+            options=dict(
+                cpc_name=dict(required=True, type='str'),
+                name=dict(required=True, type='str'),
+                state=dict(required=False, type='str', default=None,
+                           choices=['inactive', 'active', 'loaded']),
+                activation_profile_name=dict(
+                    required=False, type='str', default=None),
+            )),
+        state=dict(required=True, type='str',
+                   choices=['inactive', 'active', 'loaded']),
+        max_concurrency=dict(required=False, type='int', default=10),
+        max_concurrency_per_cpc=dict(
+            required=False, type='int', default=None),
+        poll_interval=dict(required=False, type='float', default=5),
+        timeout=dict(required=False, type='int', default=3600),
+        log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
+        _faked_session=dict(required=False, type='raw'),
+    )
+
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True)
+
+    if IMP_URLLIB3_ERR is not None:
+        module.fail_json(msg=missing_required_lib("requests"),
+                         exception=IMP_URLLIB3_ERR)
+
+    requests.packages.urllib3.disable_warnings()
+
+    if IMP_ZHMCCLIENT_ERR is not None:
+        module.fail_json(msg=missing_required_lib("zhmcclient"),
+                         exception=IMP_ZHMCCLIENT_ERR)
+
+    common_fail_on_import_errors(module)
+
+    log_file = module.params['log_file']
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
+
+    _params = dict(module.params)
+    del _params['hmc_auth']
+    LOGGER.debug("Module entry: params: %r", _params)
+
+    try:
+
+        changed, result = perform_task(module.params, module.check_mode)
+
+    except (Error, zhmcclient.Error) as exc:
+        # These exceptions are considered errors in the environment or in user
+        # input. They have a proper message that stands on its own, so we
+        # simply pass that message on and will not need a traceback.
+        msg = "{0}: {1}".format(exc.__class__.__name__, exc)
+        LOGGER.debug(
+            "Module exit (failure): msg: %s", msg)
+        module.fail_json(msg=msg)
+    # Other exceptions are considered module errors and are handled by Ansible
+    # by showing the traceback.
+
+    failed = ["{0}/{1}".format(r['cpc_name'], r['name'])
+              for r in result if r['error']]
+    if failed:
+        msg = "Operations failed for {0} of {1} LPARs: {2}".format(
+            len(failed), len(result), ", ".join(failed))
+        LOGGER.debug(
+            "Module exit (failure): msg: %s", msg)
+        module.fail_json(msg=msg, changed=changed, lpars=result)
+
+    LOGGER.debug(
+        "Module exit (success): changed: %r, lpars: %r", changed, result)
+    module.exit_json(changed=changed, lpars=result)
+
+
+if __name__ == '__main__':
+    main()
@@ -107,6 +107,18 @@ options:
     type: str
     required: false
     default: null
+  since_token:
+    description:
+      - "Token returned in the C(token) result of a previous invocation of
+         this module with the same filter parameters. If specified, the
+         C(lpars) result contains only the LPARs that were added or whose
+         returned properties changed since that invocation, and the
+         C(removed) result contains the LPARs that were removed since
+         then."
+      - "If null, the C(lpars) result contains all LPARs."
+    type: str
+    required: false
+    default: null
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -115,6 +127,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -140,6 +169,13 @@ EXAMPLES = """
     cpc_name: CPCA
   register: lpar_list
 
+- name: List only the LPARs that changed since the previous listing
+  zhmc_lpar_list:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    since_token: "{{ lpar_list.token }}"
+  register: lpar_list_delta
+
 """
 
 RETURN = """
@@ -192,6 +228,34 @@ lpars:
             "activation_mode": 'linux'
         }
     ]
+removed:
+  description: "Only for C(since_token): The LPARs that were removed since
+    the invocation that returned the token, identified by their name and the
+    name of their parent CPC. Empty if no C(since_token) was specified."
+  returned: success
+  type: list
+  elements: dict
+  contains:
+    name:
+      description: "LPAR name"
+      type: str
+    cpc_name:
+      description: "Name of the parent CPC of the LPAR"
+      type: str
+  sample:
+    [
+        {
+            "name": "LPAR2",
+            "cpc_name": "CPC1"
+        }
+    ]
+token:
+  description: "Token that represents the complete list of LPARs, with a
+    fingerprint of the returned properties of each LPAR. It can be
+    passed in the C(since_token) parameter of a later invocation of this
+    module, to return only the changes since this invocation."
+  returned: success
+  type: str
 """
 
 import logging  # noqa: E402
@@ -199,7 +263,7 @@ import traceback  # noqa: E402
 from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
-    hmc_auth_parameter, Error, missing_required_lib, \
+    hmc_auth_parameter, Error, missing_required_lib, ListDelta, \
     common_fail_on_import_errors  # noqa: E402
 
 try:
@@ -297,7 +361,12 @@ def main():
         hmc_host=dict(required=True, type='str'),
         hmc_auth=hmc_auth_parameter(),
         cpc_name=dict(required=False, type='str', default=None),
+        since_token=dict(required=False, type='str', default=None),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -318,7 +387,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -327,7 +397,9 @@ def main():
     changed = False
     try:
 
+        delta = ListDelta(module.params['since_token'])
         result_list = perform_list(module.params)
+        result_list, removed, token = delta.apply(result_list)
 
     except (Error, zhmcclient.Error) as exc:
         # These exceptions are considered errors in the environment or in user
@@ -341,7 +413,8 @@ def main():
 
     LOGGER.debug("Module exit (success): changed: %s, result: %r",
                  changed, result_list)
-    module.exit_json(changed=changed, lpars=result_list)
+    module.exit_json(
+        changed=changed, lpars=result_list, removed=removed, token=token)
 
 
 if __name__ == '__main__':
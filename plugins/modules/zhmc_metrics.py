@@ -0,0 +1,521 @@
+#!/usr/bin/python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+# For information on the format of the ANSIBLE_METADATA, DOCUMENTATION,
+# EXAMPLES, and RETURN strings, see
+# http://docs.ansible.com/ansible/dev_guide/developing_modules_documenting.html
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['stableinterface'],
+    'supported_by': 'community',
+    'shipped_by': 'other',
+    'other_repo_url': 'https://github.com/zhmcclient/zhmc-ansible-modules'
+}
+
+DOCUMENTATION = """
+---
+module: zhmc_metrics
+version_added: "2.9.0"
+short_description: Retrieve HMC metrics
+description:
+  - Retrieve the values of one or more HMC metric groups (e.g. the processor
+    and network usage of partitions), for all resources the HMC returns
+    metrics for.
+  - A single metrics context is created on the HMC for all specified metric
+    groups, and is deleted again when the module ends.
+  - If more than one sample is requested, the metrics are retrieved
+    repeatedly with the specified interval, and the minimum, maximum and
+    average of each numeric metric over the samples are returned in addition
+    to the last value.
+  - Alternatively, the most recent samples can be read from the ring buffer
+    of a metrics exporter that runs on the Ansible controller (see
+    zhmc_metrics_exporter), without any requests to the HMC.
+  - For the names and the metrics of the metric groups, see chapter
+    "Metric groups" in the :term:`HMC API` book.
+seealso:
+  - module: zhmc_metrics_exporter
+  - module: zhmc_partition_list
+  - module: zhmc_lpar_list
+author:
+  - Andreas Maier (@andy-maier)
+requirements:
+  - "The HMC userid must have object-access permissions to the resources for
+    which metrics are to be returned."
+options:
+  hmc_host:
+    description:
+      - The hostname or IP address of the HMC.
+    type: str
+    required: true
+  hmc_auth:
+    description:
+      - The authentication credentials for the HMC.
+    type: dict
+    required: true
+    suboptions:
+      userid:
+        description:
+          - The userid (username) for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      password:
+        description:
+          - The password for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      session_id:
+        description:
+          - HMC session ID to be used.
+            This is mutually exclusive with providing C(userid) and C(password)
+            and can be created as described in :ref:`zhmc_session_module`.
+        type: str
+        required: false
+        default: null
+      ca_certs:
+        description:
+          - Path name of certificate file or certificate directory to be used
+            for verifying the HMC certificate. If null (default), the path name
+            in the 'REQUESTS_CA_BUNDLE' environment variable or the path name
+            in the 'CURL_CA_BUNDLE' environment variable is used, or if neither
+            of these variables is set, the certificates in the Mozilla CA
+            Certificate List provided by the 'certifi' Python package are used
+            for verifying the HMC certificate.
+        type: str
+        required: false
+        default: null
+      verify:
+        description:
+          - If True (default), verify the HMC certificate as specified in the
+            C(ca_certs) parameter. If False, ignore what is specified in the
+            C(ca_certs) parameter and do not verify the HMC certificate.
+        type: bool
+        required: false
+        default: true
+  metric_groups:
+    description:
+      - "Names of the metric groups to be retrieved, e.g.
+         C(partition-usage)."
+    type: list
+    elements: str
+    required: true
+  samples:
+    description:
+      - "Number of samples of the metrics to be retrieved. For
+         C(source=exporter), the number of most recent samples to be read
+         from the ring buffer of the metrics exporter."
+    type: int
+    required: false
+    default: 1
+  interval:
+    description:
+      - "Time in seconds between the samples. The HMC updates the metrics
+         only in this interval, so it must be between 15 and 3600.
+         Ignored for C(source=exporter)."
+    type: int
+    required: false
+    default: 15
+  source:
+    description:
+      - "The source of the metrics:"
+      - "* C(hmc): Retrieve the metrics from the HMC."
+      - "* C(exporter): Read the metrics from the ring buffer of the metrics
+         exporter for the HMC (see zhmc_metrics_exporter). The exporter must
+         export all of the specified metric groups. The C(hmc_auth)
+         parameter is not used."
+    type: str
+    required: false
+    default: hmc
+    choices: ['hmc', 'exporter']
+  exporter_dir:
+    description:
+      - "Directory of the files of the metrics exporter, for
+         C(source=exporter)."
+      - "Default: The C(zhmc_ansible_metrics) directory in the temporary
+         directory of the Ansible controller."
+    type: str
+    required: false
+    default: null
+  log_file:
+    description:
+      - "File path of a log file to which the logic flow of this module as well
+         as interactions with the HMC are logged. If null, logging will be
+         propagated to the Python root logger."
+    type: str
+    required: false
+    default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  _faked_session:
+    description:
+      - "An internal parameter used for testing the module."
+    required: false
+    type: raw
+    default: null
+"""
+
+EXAMPLES = """
+---
+# Note: The following examples assume that some variables named 'my_*' are set.
+
+- name: Retrieve the current usage of all partitions
+  zhmc_metrics:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    metric_groups:
+      - partition-usage
+  register: metrics
+
+- name: Retrieve the usage of partitions and CPCs over a minute
+  zhmc_metrics:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    metric_groups:
+      - partition-usage
+      - dpm-system-usage-overview
+    samples: 5
+    interval: 15
+  register: metrics
+
+- name: Read the last 4 samples of the partition usage from the exporter
+  zhmc_metrics:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    metric_groups:
+      - partition-usage
+    samples: 4
+    source: exporter
+  register: metrics
+
+"""
+
+RETURN = """
+changed:
+  description: Indicates if any change has been made by the module.
+    This will always be false.
+  returned: always
+  type: bool
+msg:
+  description: An error message that describes the failure.
+  returned: failure
+  type: str
+metrics:
+  description: The metric values, as a dictionary with an item for each
+    specified metric group, whose key is the metric group name and whose
+    value is the list of metric values for each resource.
+  returned: success
+  type: dict
+  contains:
+    "{name}":
+      description: The metric values of the resources for the metric group.
+      type: list
+      elements: dict
+      contains:
+        resource_uri:
+          description: "URI of the resource."
+          type: str
+        resource_name:
+          description: "Name of the resource, for metric groups for CPCs,
+            partitions and LPARs. Null for other metric groups."
+          type: str
+        resource_class:
+          description: "Class of the resource, e.g. 'partition'."
+          type: str
+        samples:
+          description: "Number of samples of the metrics of the resource."
+          type: int
+        timestamp:
+          description: "Point in time of the last sample, as a string in ISO
+            8601 format."
+          type: str
+        metrics:
+          description: "The values of the metrics in the last sample, as a
+            dictionary with the metric names as keys."
+          type: dict
+        aggregates:
+          description: "The minimum, maximum and average value of each
+            numeric metric over the samples, as a dictionary with the metric
+            names as keys and dictionaries with items C(min), C(max) and
+            C(avg) as values. Only present if more than one sample was
+            requested."
+          type: dict
+  sample:
+    {
+        "partition-usage": [
+            {
+                "resource_uri": "/api/partitions/fa1f2466-12df-311a-804c",
+                "resource_name": "partition1",
+                "resource_class": "partition",
+                "samples": 2,
+                "timestamp": "2023-05-10T10:14:30+00:00",
+                "metrics": {
+                    "processor-usage": 15,
+                    "network-usage": 10,
+                    "storage-usage": 1,
+                    "accelerator-usage": 0,
+                    "crypto-usage": 0
+                },
+                "aggregates": {
+                    "processor-usage": {"min": 11, "max": 15, "avg": 13.0},
+                    "network-usage": {"min": 10, "max": 10, "avg": 10.0},
+                    "storage-usage": {"min": 1, "max": 1, "avg": 1.0},
+                    "accelerator-usage": {"min": 0, "max": 0, "avg": 0.0},
+                    "crypto-usage": {"min": 0, "max": 0, "avg": 0.0}
+                }
+            }
+        ]
+    }
+"""
+
+import logging  # noqa: E402
+import time  # noqa: E402
+import traceback  # noqa: E402
+from ansible.module_utils.basic import AnsibleModule  # noqa: E402
+
+from ..module_utils.common import log_init, open_session, close_session, \
+    hmc_auth_parameter, Error, ParameterError, missing_required_lib, \
+    common_fail_on_import_errors  # noqa: E402
+from ..module_utils.metrics import MetricsRecord, group_metrics, \
+    iter_metrics_response, resource_names, read_exporter_samples, \
+    DEFAULT_METRICS_DIR, MIN_INTERVAL, MAX_INTERVAL  # noqa: E402
+
+try:
+    import requests.packages.urllib3
+    IMP_URLLIB3_ERR = None
+except ImportError:
+    IMP_URLLIB3_ERR = traceback.format_exc()
+
+try:
+    import zhmcclient
+    IMP_ZHMCCLIENT_ERR = None
+except ImportError:
+    IMP_ZHMCCLIENT_ERR = traceback.format_exc()
+
+# Python logger name for this module
+LOGGER_NAME = 'zhmc_metrics'
+
+LOGGER = logging.getLogger(LOGGER_NAME)
+
+
+def check_params(params):
+    """
+    Check the module parameters.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+    """
+    if not params['metric_groups']:
+        raise ParameterError(
+            "Module parameter 'metric_groups' must not be empty.")
+    if params['samples'] < 1:
+        raise ParameterError(
+            "Module parameter 'samples' must be at least 1, but is: "
+            "{0}".format(params['samples']))
+    if not MIN_INTERVAL <= params['interval'] <= MAX_INTERVAL:
+        raise ParameterError(
+            "Module parameter 'interval' must be between {0} and {1}, but "
+            "is: {2}".format(MIN_INTERVAL, MAX_INTERVAL, params['interval']))
+
+
+def perform_retrieval(params):
+    """
+    Retrieve the metrics from the HMC and return them.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      Error: The HMC does not support some of the metric groups.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+
+    check_params(params)
+    metric_groups = params['metric_groups']
+    samples = params['samples']
+    interval = params['interval']
+
+    session, logoff = open_session(params)
+    try:
+        client = zhmcclient.Client(session)
+
+        LOGGER.debug("Creating metrics context for metric groups %r",
+                     metric_groups)
+        context = client.metrics_contexts.create({
+            'anticipated-frequency-seconds': interval,
+            'metric-groups': metric_groups,
+        })
+        try:
+            mg_defs = context.metric_group_definitions
+            missing = [name for name in metric_groups if name not in mg_defs]
+            if missing:
+                raise Error("The HMC does not support metric groups: {0}".
+                            format(', '.join(missing)))
+            records = dict((name, {}) for name in mg_defs)
+            for sample in range(samples):
+                if sample > 0:
+                    time.sleep(interval)
+                response = context.get_metrics()
+                for group_name, uri, timestamp, values in \
+                        iter_metrics_response(response, mg_defs):
+                    group_records = records[group_name]
+                    try:
+                        record = group_records[uri]
+                    except KeyError:
+                        record = MetricsRecord(
+                            uri, group_metrics(mg_defs[group_name]))
+                        group_records[uri] = record
+                    record.append(timestamp, values)
+        finally:
+            LOGGER.debug("Deleting metrics context")
+            context.delete()
+
+        result = {}
+        names_by_class = {}
+        for group_name in metric_groups:
+            resource_class = mg_defs[group_name].resource_class
+            group_records = records.get(group_name, {})
+            if group_records and resource_class not in names_by_class:
+                names_by_class[resource_class] = resource_names(
+                    client, resource_class)
+            names = names_by_class.get(resource_class) or {}
+            result[group_name] = [
+                record.result(names.get(uri), resource_class, samples > 1)
+                for uri, record in sorted(group_records.items())]
+        return result
+
+    finally:
+        close_session(session, logoff)
+
+
+def perform_exporter_read(params):
+    """
+    Read the most recent samples of the metrics from the ring buffer of the
+    metrics exporter for the HMC and return them.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      Error: There is no metrics exporter for the HMC, or it does not export
+        the metric groups.
+    """
+
+    check_params(params)
+    metric_groups = params['metric_groups']
+    samples = params['samples']
+    directory = params['exporter_dir'] or DEFAULT_METRICS_DIR
+
+    records, state = read_exporter_samples(
+        directory, params['hmc_host'], metric_groups, samples)
+    LOGGER.debug("Read metrics from exporter with PID %s (status: %s)",
+                 state['pid'], state['status'])
+
+    result = {}
+    for group_name in metric_groups:
+        resource_class = state['metrics'][group_name]['resource_class']
+        result[group_name] = [
+            record.result(name, resource_class, samples > 1)
+            for uri, (name, record) in sorted(records[group_name].items())]
+    return result
+
+
+def main():
+
+    # The following definition of module input parameters must match the
+    # description of the options in the DOCUMENTATION string.
+    argument_spec = dict(
+        hmc_host=dict(required=True, type='str'),
+        hmc_auth=hmc_auth_parameter(),
+        metric_groups=dict(required=True, type='list', elements='str'),
+        samples=dict(required=False, type='int', default=1),
+        interval=dict(required=False, type='int', default=15),
+        source=dict(required=False, type='str', default='hmc',
+                    choices=['hmc', 'exporter']),
+        exporter_dir=dict(required=False, type='str', default=None),
+        log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
+        _faked_session=dict(required=False, type='raw'),
+    )
+
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True)
+
+    if IMP_URLLIB3_ERR is not None:
+        module.fail_json(msg=missing_required_lib("requests"),
+                         exception=IMP_URLLIB3_ERR)
+
+    requests.packages.urllib3.disable_warnings()
+
+    if IMP_ZHMCCLIENT_ERR is not None:
+        module.fail_json(msg=missing_required_lib("zhmcclient"),
+                         exception=IMP_ZHMCCLIENT_ERR)
+
+    common_fail_on_import_errors(module)
+
+    log_file = module.params['log_file']
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
+
+    _params = dict(module.params)
+    del _params['hmc_auth']
+    LOGGER.debug("Module entry: params: %r", _params)
+
+    changed = False
+    try:
+
+        if module.params['source'] == 'exporter':
+            result = perform_exporter_read(module.params)
+        else:
+            result = perform_retrieval(module.params)
+
+    except (Error, zhmcclient.Error) as exc:
+        # These exceptions are considered errors in the environment or in user
+        # input. They have a proper message that stands on its own, so we
+        # simply pass that message on and will not need a traceback.
+        msg = "{0}: {1}".format(exc.__class__.__name__, exc)
+        LOGGER.debug("Module exit (failure): msg: %r", msg)
+        module.fail_json(msg=msg)
+    # Other exceptions are considered module errors and are handled by Ansible
+    # by showing the traceback.
+
+    LOGGER.debug("Module exit (success): changed: %s, result: %r",
+                 changed, result)
+    module.exit_json(changed=changed, metrics=result)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,592 @@
+#!/usr/bin/python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+# For information on the format of the ANSIBLE_METADATA, DOCUMENTATION,
+# EXAMPLES, and RETURN strings, see
+# http://docs.ansible.com/ansible/dev_guide/developing_modules_documenting.html
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['stableinterface'],
+    'supported_by': 'community',
+    'shipped_by': 'other',
+    'other_repo_url': 'https://github.com/zhmcclient/zhmc-ansible-modules'
+}
+
+DOCUMENTATION = """
+---
+module: zhmc_metrics_exporter
+version_added: "2.9.0"
+short_description: Manage a metrics exporter for an HMC
+description:
+  - Start, stop or inspect a metrics exporter for an HMC.
+  - A metrics exporter is a daemon process on the system the module runs on
+    (normally the Ansible controller). It keeps a metrics context open on the
+    HMC, retrieves the metrics of the specified metric groups at the
+    specified interval, and writes the samples to a ring buffer in a
+    memory-mapped file with fixed-size records. When the ring buffer is full,
+    the oldest samples are overwritten.
+  - The zhmc_metrics module can read the most recent samples from the ring
+    buffer without any requests to the HMC (see its C(source) parameter).
+  - There is at most one metrics exporter per HMC and exporter directory.
+  - When the metrics exporter is restarted with the same ring buffer size,
+    the samples in the ring buffer are kept.
+seealso:
+  - module: zhmc_metrics
+author:
+  - Andreas Maier (@andy-maier)
+requirements:
+  - "The HMC userid must have object-access permissions to the resources for
+    which metrics are to be returned."
+  - "The metrics exporter is not supported on Windows."
+options:
+  hmc_host:
+    description:
+      - The hostname or IP address of the HMC.
+    type: str
+    required: true
+  hmc_auth:
+    description:
+      - The authentication credentials for the HMC.
+      - The metrics exporter keeps using these credentials. With C(userid)
+        and C(password), it logs on again when its HMC session has expired.
+        With C(session_id), it cannot retrieve metrics anymore once that
+        session has expired.
+    type: dict
+    required: true
+    suboptions:
+      userid:
+        description:
+          - The userid (username) for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      password:
+        description:
+          - The password for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      session_id:
+        description:
+          - HMC session ID to be used.
+            This is mutually exclusive with providing C(userid) and C(password)
+            and can be created as described in :ref:`zhmc_session_module`.
+        type: str
+        required: false
+        default: null
+      ca_certs:
+        description:
+          - Path name of certificate file or certificate directory to be used
+            for verifying the HMC certificate. If null (default), the path name
+            in the 'REQUESTS_CA_BUNDLE' environment variable or the path name
+            in the 'CURL_CA_BUNDLE' environment variable is used, or if neither
+            of these variables is set, the certificates in the Mozilla CA
+            Certificate List provided by the 'certifi' Python package are used
+            for verifying the HMC certificate.
+        type: str
+        required: false
+        default: null
+      verify:
+        description:
+          - If True (default), verify the HMC certificate as specified in the
+            C(ca_certs) parameter. If False, ignore what is specified in the
+            C(ca_certs) parameter and do not verify the HMC certificate.
+        type: bool
+        required: false
+        default: true
+  state:
+    description:
+      - "The desired state for the metrics exporter:"
+      - "* C(started): Ensures that the metrics exporter is running with the
+         specified parameters. A running metrics exporter with different
+         parameters is restarted."
+      - "* C(stopped): Ensures that the metrics exporter is not running."
+      - "* C(facts): Returns the state of the metrics exporter."
+    type: str
+    required: true
+    choices: ['started', 'stopped', 'facts']
+  metric_groups:
+    description:
+      - "Names of the metric groups to be exported, e.g.
+         C(partition-usage). Required for C(state=started)."
+    type: list
+    elements: str
+    required: false
+    default: null
+  interval:
+    description:
+      - "Time in seconds between retrieving the metrics. Must be between 15
+         and 3600."
+    type: int
+    required: false
+    default: 15
+  capacity:
+    description:
+      - "Number of records in the ring buffer. Each record holds one sample
+         of one resource."
+    type: int
+    required: false
+    default: 10000
+  record_size:
+    description:
+      - "Size of a record in the ring buffer in bytes. Samples that do not
+         fit into a record are dropped and counted."
+    type: int
+    required: false
+    default: 512
+  exporter_dir:
+    description:
+      - "Directory of the files of the metrics exporter."
+      - "Default: The C(zhmc_ansible_metrics) directory in the temporary
+         directory of the system."
+    type: str
+    required: false
+    default: null
+  log_file:
+    description:
+      - "File path of a log file to which the logic flow of this module as well
+         as interactions with the HMC are logged. If null, logging will be
+         propagated to the Python root logger. The metrics exporter keeps
+         logging to this file."
+    type: str
+    required: false
+    default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  _faked_session:
+    description:
+      - "An internal parameter used for testing the module."
+    required: false
+    type: raw
+    default: null
+"""
+
+EXAMPLES = """
+---
+# Note: The following examples assume that some variables named 'my_*' are set.
+
+- name: Ensure the partition usage is exported every minute
+  zhmc_metrics_exporter:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    state: started
+    metric_groups:
+      - partition-usage
+    interval: 60
+  register: exporter
+
+- name: Ensure the metrics exporter is stopped
+  zhmc_metrics_exporter:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    state: stopped
+
+"""
+
+RETURN = """
+changed:
+  description: Indicates if any change has been made by the module.
+  returned: always
+  type: bool
+msg:
+  description: An error message that describes the failure.
+  returned: failure
+  type: str
+exporter:
+  description: The state of the metrics exporter, or null if a metrics
+    exporter was never started for the HMC and exporter directory.
+  returned: success
+  type: dict
+  contains:
+    pid:
+      description: "Process ID of the metrics exporter."
+      type: int
+    running:
+      description: "Indicates whether the metrics exporter is running."
+      type: bool
+    status:
+      description: "Status of the metrics exporter: 'starting', 'running',
+        'stopped' or 'failed'."
+      type: str
+    hmc_host:
+      description: "The HMC host."
+      type: str
+    metric_groups:
+      description: "Names of the exported metric groups."
+      type: list
+      elements: str
+    interval:
+      description: "Time in seconds between retrieving the metrics."
+      type: int
+    capacity:
+      description: "Number of records in the ring buffer."
+      type: int
+    record_size:
+      description: "Size of a record in the ring buffer in bytes."
+      type: int
+    buffer_file:
+      description: "Path name of the ring buffer file."
+      type: str
+    started:
+      description: "Point in time the metrics exporter was started, in ISO
+        8601 format."
+      type: str
+    stopped:
+      description: "Point in time the metrics exporter was stopped, in ISO
+        8601 format, or null if it has not been stopped."
+      type: str
+    samples:
+      description: "Number of times the metrics have been retrieved."
+      type: int
+    written:
+      description: "Number of records that have been written to the ring
+        buffer, including the ones that have been overwritten."
+      type: int
+    dropped:
+      description: "Number of records that have been dropped because they
+        did not fit into the record size."
+      type: int
+    errors:
+      description: "Number of failed retrievals of the metrics."
+      type: int
+    last_error:
+      description: "Message of the last error, or null."
+      type: str
+  sample:
+    {
+        "pid": 12345,
+        "running": true,
+        "status": "running",
+        "hmc_host": "10.11.12.13",
+        "metric_groups": ["partition-usage"],
+        "interval": 60,
+        "capacity": 10000,
+        "record_size": 512,
+        "buffer_file": "/tmp/zhmc_ansible_metrics/10.11.12.13.buffer",
+        "started": "2023-05-10T10:14:30.123456+00:00",
+        "stopped": null,
+        "samples": 12,
+        "written": 120,
+        "dropped": 0,
+        "errors": 0,
+        "last_error": null
+    }
+"""
+
+import logging  # noqa: E402
+import os  # noqa: E402
+import time  # noqa: E402
+import traceback  # noqa: E402
+from ansible.module_utils.basic import AnsibleModule  # noqa: E402
+
+from ..module_utils.common import log_init, open_session, close_session, \
+    hmc_auth_parameter, Error, ParameterError, missing_required_lib, \
+    common_fail_on_import_errors  # noqa: E402
+from ..module_utils.metrics import MetricsExporter, exporter_status, \
+    exporter_files, write_state, spawn_daemon, run_exporter_daemon, \
+    stop_exporter, process_alive, DEFAULT_METRICS_DIR, MIN_INTERVAL, \
+    MAX_INTERVAL  # noqa: E402
+
+try:
+    import requests.packages.urllib3
+    IMP_URLLIB3_ERR = None
+except ImportError:
+    IMP_URLLIB3_ERR = traceback.format_exc()
+
+try:
+    import zhmcclient
+    IMP_ZHMCCLIENT_ERR = None
+except ImportError:
+    IMP_ZHMCCLIENT_ERR = traceback.format_exc()
+
+# Python logger name for this module
+LOGGER_NAME = 'zhmc_metrics_exporter'
+
+LOGGER = logging.getLogger(LOGGER_NAME)
+
+# Time in seconds to wait for a started metrics exporter to be running
+START_TIMEOUT = 60
+
+# Items of the exporter state that are returned by the module
+RESULT_ITEMS = (
+    'pid', 'running', 'status', 'hmc_host', 'metric_groups', 'interval',
+    'capacity', 'record_size', 'buffer_file', 'started', 'stopped',
+    'samples', 'written', 'dropped', 'errors', 'last_error')
+
+
+def exporter_result(state):
+    """
+    Return the module result for the exporter state.
+    """
+    if state is None:
+        return None
+    return dict((name, state.get(name)) for name in RESULT_ITEMS)
+
+
+def check_params(params):
+    """
+    Check the module parameters for state=started.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+    """
+    if not params['metric_groups']:
+        raise ParameterError(
+            "Module parameter 'metric_groups' must be specified and not "
+            "empty for state=started.")
+    if not MIN_INTERVAL <= params['interval'] <= MAX_INTERVAL:
+        raise ParameterError(
+            "Module parameter 'interval' must be between {0} and {1}, but "
+            "is: {2}".format(MIN_INTERVAL, MAX_INTERVAL, params['interval']))
+    for name in ('capacity', 'record_size'):
+        if params[name] < 1:
+            raise ParameterError(
+                "Module parameter {0!r} must be positive, but is: {1}".
+                format(name, params[name]))
+
+
+def same_exporter(state, params):
+    """
+    Return a boolean indicating whether the exporter state matches the
+    module parameters.
+    """
+    return sorted(state['metric_groups']) == \
+        sorted(params['metric_groups']) and \
+        state['interval'] == params['interval'] and \
+        state['capacity'] == params['capacity'] and \
+        state['record_size'] == params['record_size']
+
+
+def run_exporter(params, directory):
+    """
+    Run the metrics exporter in the current (daemon) process until it is
+    stopped.
+    """
+    try:
+        session, logoff = open_session(params)
+    except Error as exc:
+        # Report the error like the exporter does, for start_exporter()
+        _, state_file = exporter_files(directory, params['hmc_host'])
+        write_state(state_file, dict(
+            pid=os.getpid(), hmc_host=params['hmc_host'], status='failed',
+            last_error="{0}: {1}".format(exc.__class__.__name__, exc)))
+        raise
+    client = zhmcclient.Client(session)
+    exporter = MetricsExporter(
+        client, params['hmc_host'], params['metric_groups'],
+        params['interval'], directory=directory,
+        capacity=params['capacity'], record_size=params['record_size'])
+    run_exporter_daemon(exporter, lambda: close_session(session, logoff))
+
+
+def start_exporter(params, directory):
+    """
+    Start the metrics exporter in a daemon process and wait until it is
+    running.
+
+    Returns:
+      dict: The state of the running exporter.
+
+    Raises:
+      Error: The exporter failed to start.
+    """
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    pid = spawn_daemon(lambda: run_exporter(params, directory))
+    LOGGER.debug("Started metrics exporter with PID %s", pid)
+    end_time = time.time() + START_TIMEOUT
+    while True:
+        state = exporter_status(directory, params['hmc_host'])
+        if state and state['pid'] == pid:
+            if state['status'] == 'running':
+                return state
+            if state['status'] == 'failed':
+                raise Error("The metrics exporter failed to start: {0}".
+                            format(state['last_error']))
+        if not process_alive(pid):
+            raise Error("The metrics exporter with PID {0} ended "
+                        "unexpectedly".format(pid))
+        if time.time() > end_time:
+            raise Error("The metrics exporter with PID {0} did not start "
+                        "within {1} seconds".format(pid, START_TIMEOUT))
+        time.sleep(0.2)
+
+
+def ensure_started(params, check_mode):
+    """
+    Ensure that the metrics exporter is running with the specified
+    parameters.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      Error: The exporter failed to start or to stop.
+    """
+    check_params(params)
+    directory = params['exporter_dir'] or DEFAULT_METRICS_DIR
+
+    state = exporter_status(directory, params['hmc_host'])
+    if state and state['running']:
+        if same_exporter(state, params):
+            return False, exporter_result(state)
+        if check_mode:
+            return True, exporter_result(state)
+        LOGGER.debug("Stopping metrics exporter with PID %s for restart",
+                     state['pid'])
+        stop_exporter(state)
+    elif check_mode:
+        return True, exporter_result(state)
+
+    state = start_exporter(params, directory)
+    return True, exporter_result(state)
+
+
+def ensure_stopped(params, check_mode):
+    """
+    Ensure that the metrics exporter is not running.
+
+    Raises:
+      Error: The exporter failed to stop.
+    """
+    directory = params['exporter_dir'] or DEFAULT_METRICS_DIR
+
+    state = exporter_status(directory, params['hmc_host'])
+    if not state or not state['running']:
+        return False, exporter_result(state)
+    if not check_mode:
+        LOGGER.debug("Stopping metrics exporter with PID %s", state['pid'])
+        stop_exporter(state)
+        state = exporter_status(directory, params['hmc_host'])
+    return True, exporter_result(state)
+
+
+def facts(params, check_mode):
+    """
+    Return the state of the metrics exporter.
+    """
+    directory = params['exporter_dir'] or DEFAULT_METRICS_DIR
+
+    state = exporter_status(directory, params['hmc_host'])
+    return False, exporter_result(state)
+
+
+def perform_task(params, check_mode):
+    """
+    Perform the task for this module, dependent on the 'state' module
+    parameter.
+
+    If check_mode is True, check whether changes would occur, but don't
+    actually perform any changes.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      Error: An issue with the metrics exporter.
+    """
+    actions = {
+        "started": ensure_started,
+        "stopped": ensure_stopped,
+        "facts": facts,
+    }
+    return actions[params['state']](params, check_mode)
+
+
+def main():
+
+    # The following definition of module input parameters must match the
+    # description of the options in the DOCUMENTATION string.
+    argument_spec = dict(
+        hmc_host=dict(required=True, type='str'),
+        hmc_auth=hmc_auth_parameter(),
+        state=dict(required=True, type='str',
+                   choices=['started', 'stopped', 'facts']),
+        metric_groups=dict(required=False, type='list', elements='str',
+                           default=None),
+        interval=dict(required=False, type='int', default=15),
+        capacity=dict(required=False, type='int', default=10000),
+        record_size=dict(required=False, type='int', default=512),
+        exporter_dir=dict(required=False, type='str', default=None),
+        log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
+        _faked_session=dict(required=False, type='raw'),
+    )
+
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True)
+
+    if IMP_URLLIB3_ERR is not None:
+        module.fail_json(msg=missing_required_lib("requests"),
+                         exception=IMP_URLLIB3_ERR)
+
+    requests.packages.urllib3.disable_warnings()
+
+    if IMP_ZHMCCLIENT_ERR is not None:
+        module.fail_json(msg=missing_required_lib("zhmcclient"),
+                         exception=IMP_ZHMCCLIENT_ERR)
+
+    common_fail_on_import_errors(module)
+
+    log_file = module.params['log_file']
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
+
+    _params = dict(module.params)
+    del _params['hmc_auth']
+    LOGGER.debug("Module entry: params: %r", _params)
+
+    try:
+
+        changed, result = perform_task(module.params, module.check_mode)
+
+    except (Error, zhmcclient.Error) as exc:
+        # These exceptions are considered errors in the environment or in user
+        # input. They have a proper message that stands on its own, so we
+        # simply pass that message on and will not need a traceback.
+        msg = "{0}: {1}".format(exc.__class__.__name__, exc)
+        LOGGER.debug("Module exit (failure): msg: %r", msg)
+        module.fail_json(msg=msg)
+    # Other exceptions are considered module errors and are handled by Ansible
+    # by showing the traceback.
+
+    LOGGER.debug("Module exit (success): changed: %s, result: %r",
+                 changed, result)
+    module.exit_json(changed=changed, exporter=result)
+
+
+if __name__ == '__main__':
+    main()
@@ -166,6 +166,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -258,9 +275,10 @@ import traceback  # noqa: E402
 from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
-    hmc_auth_parameter, Error, ParameterError, wait_for_transition_completion, \
-    eq_hex, eq_mac, to_unicode, process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    hmc_auth_parameter, Error, update_after_transition, \
+    ResourceReconciler, find_partition, missing_required_lib, \
+    common_fail_on_import_errors, \
+    process_nic_properties as process_properties  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -280,234 +298,6 @@ LOGGER_NAME = 'zhmc_nic'
 
 LOGGER = logging.getLogger(LOGGER_NAME)
 
-# Dictionary of properties of NIC resources, in this format:
-#   name: (allowed, create, update, update_while_active, eq_func, type_cast)
-# where:
-#   name: Name of the property according to the data model, with hyphens
-#     replaced by underscores (this is how it is or would be specified in
-#     the 'properties' module parameter).
-#   allowed: Indicates whether it is allowed in the 'properties' module
-#     parameter.
-#   create: Indicates whether it can be specified for the "Create NIC"
-#     operation.
-#   update: Indicates whether it can be specified for the "Update NIC
-#     Properties" operation (at all).
-#   update_while_active: Indicates whether it can be specified for the "Update
-#     NIC Properties" operation while the partition of the NIC is active. None
-#     means "not applicable" (i.e. update=False).
-#   eq_func: Equality test function for two values of the property; None means
-#     to use Python equality.
-#   type_cast: Type cast function for an input value of the property; None
-#     means to use it directly. This can be used for example to convert
-#     integers provided as strings by Ansible back into integers (that is a
-#     current deficiency of Ansible).
-# Note: This should always represent the latest version of the HMC/SE.
-# Attempts to set a property that does not exist or that is not writeable in
-# the target HMC will be handled by the HMC rejecting the operation.
-ZHMC_NIC_PROPERTIES = {
-
-    # create+update properties:
-    'name': (
-        False, True, True, True, None, None),  # provided in 'name' module parm
-    'description': (True, True, True, True, None, to_unicode),
-    'device_number': (True, True, True, True, eq_hex, None),
-    'network_adapter_port_uri': (
-        False, True, True, True, None, None),  # via adapter_name/_port
-    'virtual_switch_uri': (
-        False, True, True, True, None, None),  # via adapter_name/_port
-    'adapter_name': (
-        True, True, True, True, None,
-        None),  # artificial property, type_cast ignored
-    'adapter_port': (
-        True, True, True, True, None,
-        None),  # artificial property, type_cast ignored
-    # The ssc-*, vlan-id and mac-address properties were introduced in
-    # API version 2.2 (an update of SE 2.13.1).
-    # The mac-address property was changed to be writeable in API version 2.20
-    # (SE 2.14.0).
-    'ssc_management_nic': (True, True, True, True, None, None),
-    'ssc_ip_address_type': (True, True, True, True, None, None),
-    'ssc_ip_address': (True, True, True, True, None, None),
-    'ssc_mask_prefix': (True, True, True, True, None, None),
-    'vlan_id': (True, True, True, True, None, int),
-    'mac_address': (True, True, True, None, eq_mac, None),
-    # The vlan-type property was introduced in API version 2.20 (SE 2.14.0).
-    'vlan_type': (True, True, True, True, None, None),
-    # The function-* properties were introduced in API version 3.4
-    # (SE 2.15 GA2).
-    'function_number': (True, True, True, True, None, int),
-    'function_range': (True, True, True, True, None, int),
-
-    # read-only properties:
-    'element-uri': (False, False, False, None, None, None),
-    'element-id': (False, False, False, None, None, None),
-    'parent': (False, False, False, None, None, None),
-    'class': (False, False, False, None, None, None),
-    'type': (False, False, False, None, None, None),
-}
-
-
-def process_properties(partition, nic, params):
-    """
-    Process the properties specified in the 'properties' module parameter,
-    and return two dictionaries (create_props, update_props) that contain
-    the properties that can be created, and the properties that can be updated,
-    respectively. If the resource exists, the input property values are
-    compared with the existing resource property values and the returned set
-    of properties is the minimal set of properties that need to be changed.
-
-    - Underscores in the property names are translated into hyphens.
-    - The presence of read-only properties, invalid properties (i.e. not
-      defined in the data model for partitions), and properties that are not
-      allowed because of restrictions or because they are auto-created from
-      an artificial property is surfaced by raising ParameterError.
-    - The properties resulting from handling artificial properties are
-      added to the returned dictionaries.
-
-    Parameters:
-
-      partition (zhmcclient.Partition): Partition containing the NIC. Must
-        exist.
-
-      nic (zhmcclient.Nic): NIC to be updated with the full set of current
-        properties, or `None` if it did not previously exist.
-
-      params (dict): Module input parameters.
-
-    Returns:
-      tuple of (create_props, update_props, stop), where:
-        * create_props: dict of properties for
-          zhmcclient.NicManager.create()
-        * update_props: dict of properties for
-          zhmcclient.Nic.update_properties()
-        * stop (bool): Indicates whether some update properties require the
-          partition containg the NIC to be stopped when doing the update.
-
-    Raises:
-      ParameterError: An issue with the module parameters.
-    """
-    create_props = {}
-    update_props = {}
-    stop = False
-
-    # handle 'name' property
-    nic_name = to_unicode(params['name'])
-    create_props['name'] = nic_name
-    # We looked up the NIC by name, so we will never have to update its name
-
-    # Names of the artificial properties
-    adapter_name_art_name = 'adapter_name'
-    adapter_port_art_name = 'adapter_port'
-
-    # handle the other properties
-    input_props = params.get('properties', {})
-    if input_props is None:
-        input_props = {}
-    for prop_name in input_props:
-
-        if prop_name not in ZHMC_NIC_PROPERTIES:
-            raise ParameterError(
-                "Property {0!r} is not defined in the data model for "
-                "NICs.".format(prop_name))
-
-        allowed, create, update, update_while_active, eq_func, type_cast = \
-            ZHMC_NIC_PROPERTIES[prop_name]
-
-        if not allowed:
-            raise ParameterError(
-                "Property {0!r} is not allowed in the 'properties' module "
-                "parameter.".format(prop_name))
-
-        if prop_name in (adapter_name_art_name, adapter_port_art_name):
-            # Artificial properties will be processed together after this loop
-            continue
-
-        # Process a normal (= non-artificial) property
-        _create_props, _update_props, _stop = process_normal_property(
-            prop_name, ZHMC_NIC_PROPERTIES, input_props, nic)
-        create_props.update(_create_props)
-        update_props.update(_update_props)
-        if _stop:
-            stop = True
-
-    # Process artificial properties
-    if (adapter_name_art_name in input_props) != \
-            (adapter_port_art_name in input_props):
-        raise ParameterError(
-            "Artificial properties {0!r} and {1!r} must either both be "
-            "specified or both be omitted.".
-            format(adapter_name_art_name, adapter_port_art_name))
-    if adapter_name_art_name in input_props and \
-            adapter_port_art_name in input_props:
-        adapter_name = to_unicode(input_props[adapter_name_art_name])
-        adapter_port_index = int(input_props[adapter_port_art_name])
-        try:
-            adapter = partition.manager.cpc.adapters.find(
-                name=adapter_name)
-        except zhmcclient.NotFound:
-            raise ParameterError(
-                "Artificial property {0!r} does not specify the name of an "
-                "existing adapter: {1!r}".
-                format(adapter_name_art_name, adapter_name))
-        try:
-            port = adapter.ports.find(index=adapter_port_index)
-        except zhmcclient.NotFound:
-            raise ParameterError(
-                "Artificial property {0!r} does not specify the index of an "
-                "existing port on adapter {1!r}: {2!r}".
-                format(adapter_port_art_name, adapter_name,
-                       adapter_port_index))
-
-        # The rest of it depends on the network adapter family:
-        adapter_family = adapter.get_property('adapter-family')
-        if adapter_family in ('roce', 'cna'):
-            # Here we perform the same logic as in the property loop, just now
-            # simplified by the knowledge about the property flags (create,
-            # update, etc.).
-            hmc_prop_name = 'network-adapter-port-uri'
-            input_prop_value = port.uri
-            if nic:
-                if nic.properties.get(hmc_prop_name) != input_prop_value:
-                    update_props[hmc_prop_name] = input_prop_value
-            else:
-                update_props[hmc_prop_name] = input_prop_value
-            create_props[hmc_prop_name] = input_prop_value
-        elif adapter_family in ('osa', 'hipersockets'):
-            vswitches = partition.manager.cpc.virtual_switches.findall(
-                **{'backing-adapter-uri': adapter.uri})
-            # Adapters of this family always have a vswitch (one for each
-            # port), so we assert that we can find one or more:
-            if not vswitches:
-                raise AssertionError()
-            found_vswitch = None
-            for vswitch in vswitches:
-                if vswitch.get_property('port') == adapter_port_index:
-                    found_vswitch = vswitch
-                    break
-            # Because we already checked for the existence of the specified
-            # port index, we can now assert that we found the vswitch for that
-            # port:
-            if not found_vswitch:
-                raise AssertionError()
-            # Here we perform the same logic as in the property loop, just now
-            # simplified by the knowledge about the property flags (create,
-            # update, etc.).
-            hmc_prop_name = 'virtual-switch-uri'
-            input_prop_value = found_vswitch.uri
-            if nic:
-                if nic.properties.get(hmc_prop_name) != input_prop_value:
-                    update_props[hmc_prop_name] = input_prop_value
-            else:
-                update_props[hmc_prop_name] = input_prop_value
-            create_props[hmc_prop_name] = input_prop_value
-        else:
-            raise ParameterError(
-                "Artificial property {0!r} specifies the name of a "
-                "non-network adapter of family {1!r}: {2!r}".
-                format(adapter_name_art_name, adapter_family, adapter_name))
-
-    return create_props, update_props, stop
-
 
 def ensure_present(params, check_mode):
     """
@@ -529,71 +319,25 @@ def ensure_present(params, check_mode):
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
+        _, partition = find_partition(
+            client, cpc_name, partition_name, required=not check_mode)
         # The default exception handling is sufficient for the above.
 
-        try:
-            partition = cpc.partitions.find(name=partition_name)
-        except zhmcclient.NotFound:
-            if check_mode:
-                # Once the partition is created, the NIC will also need to be
-                # created. Therefore, we set changed.
-                changed = True
-                return changed, result
-            raise
-
-        try:
-            nic = partition.nics.find(name=nic_name)
-            nic.pull_full_properties()
-        except zhmcclient.NotFound:
-            nic = None
-
-        if not nic:
-            # It does not exist. Create it and update it if there are
-            # update-only properties.
-            if not check_mode:
-                create_props, update_props, stop = process_properties(
-                    partition, nic, params)
-                nic = partition.nics.create(create_props)
-                update2_props = {}
-                for name, value in update_props.items():
-                    if name not in create_props:
-                        update2_props[name] = value
-                if update2_props:
-                    nic.update_properties(update2_props)
-                # We refresh the properties after the update, in case an
-                # input property value gets changed (for example, the
-                # partition does that with memory properties).
-                nic.pull_full_properties()
-            else:
-                # TODO: Show props in module result also in check mode.
-                pass
+        if not partition:
+            # Once the partition is created, the NIC will also need to be
+            # created. Therefore, we set changed.
             changed = True
-        else:
-            # It exists. Stop the partition if needed due to the NIC property
-            # update requirements, or wait for an updateable partition status,
-            # and update the NIC properties.
-            create_props, update_props, stop = process_properties(
-                partition, nic, params)
-            if update_props:
-                if not check_mode:
-                    # NIC properties can all be updated while the partition is
-                    # active, therefore:
-                    if stop:
-                        raise AssertionError()
-                    wait_for_transition_completion(partition)
-                    nic.update_properties(update_props)
-                    # We refresh the properties after the update, in case an
-                    # input property value gets changed (for example, the
-                    # partition does that with memory properties).
-                    nic.pull_full_properties()
-                else:
-                    # TODO: Show updated props in mod.result also in chk.mode
-                    pass
-                changed = True
-
-        if nic:
-            result = dict(nic.properties)
+            return changed, result
+
+        # NIC properties can all be updated while the partition is active,
+        # after waiting for an updateable partition status.
+        reconciler = ResourceReconciler(
+            partition.nics, nic_name,
+            lambda nic: process_properties(partition, nic, params),
+            update_func=lambda nic, props: update_after_transition(
+                partition, nic, props),
+            logger=LOGGER)
+        changed, result = reconciler.reconcile(check_mode)
 
         return changed, result
 
@@ -621,8 +365,7 @@ def ensure_absent(params, check_mode):
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
-        partition = cpc.partitions.find(name=partition_name)
+        _, partition = find_partition(client, cpc_name, partition_name)
         # The default exception handling is sufficient for the above.
 
         try:
@@ -674,6 +417,10 @@ def main():
                    choices=['absent', 'present']),
         properties=dict(required=False, type='dict', default={}),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -694,7 +441,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -197,6 +197,72 @@ options:
     required: false
     type: bool
     default: false
+  result_properties:
+    description:
+      - "Selects the properties that are returned in the C(partition) result,
+         by their names in the data model of the 'Partition' object or the
+         names of the artificial properties described for the result. Names
+         may be specified with underscores instead of hyphens. The 'name'
+         property is always returned. If null, all properties are returned."
+      - "The selection is applied before the properties are retrieved from
+         the HMC: Artificial properties that are not selected (e.g. 'nics',
+         'hbas', 'virtual-functions' or 'storage-groups') are not
+         determined, and for C(state=facts) with an C(include) list, only the
+         included properties are retrieved from the HMC."
+    required: false
+    type: dict
+    default: null
+    suboptions:
+      include:
+        description:
+          - "Names of the properties to be returned. If null, all properties
+             are returned that are not excluded."
+        required: false
+        type: list
+        elements: str
+        default: null
+      exclude:
+        description:
+          - "Names of the properties not to be returned."
+        required: false
+        type: list
+        elements: str
+        default: null
+  wait:
+    description:
+      - "Boolean that controls whether the module waits for the completion of
+         the operation that starts the partition for C(state=active), or that
+         stops the partition for C(state=stopped)."
+      - "If false, that operation is submitted as an asynchronous job on the
+         HMC, and the module returns the URI of the job in the C(job_uri)
+         result without waiting for its completion. The job can then be
+         waited for with the zhmc_job module. The returned partition
+         properties reflect the state when the job was submitted."
+      - "For C(state=stopped), the stop operation is still performed
+         synchronously if the partition properties need to be updated
+         after stopping it. Operations that are needed before the final
+         start or stop operation, and the stopping of the partition for
+         C(state=absent), are always performed synchronously."
+    required: false
+    type: bool
+    default: true
+  check_mode_facts:
+    description:
+      - "Only for check mode with C(state=active|stopped): Boolean that
+         controls whether the full set of properties of an existing partition
+         and the artificial properties for its child resources (NICs, HBAs,
+         virtual functions, and the expansions controlled by
+         C(expand_storage_groups) and C(expand_crypto_adapters)) are
+         retrieved and returned in the C(partition) result."
+      - "If false, only the partition properties that the evaluation of the
+         C(properties) and C(state) parameters depends on are retrieved from
+         the HMC, and the C(partition) result contains only these properties
+         (and the properties that are returned when listing partitions). This
+         speeds up check mode runs that only need to know whether changes
+         would be made."
+    required: false
+    type: bool
+    default: true
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -205,6 +271,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -281,6 +364,23 @@ EXAMPLES = """
             access_mode: control
   register: part1
 
+- name: Start the partitions without waiting for completion
+  zhmc_partition:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    cpc_name: "{{ my_cpc_name }}"
+    name: "{{ item }}"
+    state: active
+    wait: false
+  loop: "{{ my_partition_names }}"
+  register: start_results
+
+- name: Wait for the start jobs to complete
+  zhmc_job:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    job_uris: "{{ start_results.results | map(attribute='job_uri') | select() | list }}"
+
 - name: Gather facts about a partition
   zhmc_partition:
     hmc_host: "{{ my_hmc_host }}"
@@ -304,6 +404,15 @@ msg:
   description: An error message that describes the failure.
   returned: failure
   type: str
+job_uri:
+  description:
+    - "For C(wait=false), the URI of the asynchronous job that starts or
+       stops the partition, or null if no such job was submitted (e.g.
+       because the partition already had the desired status)."
+    - "For C(wait=true), always null."
+  returned: success
+  type: str
+  sample: "/api/jobs/fa7ca4a6-02c2-11ed-b05a-00106f23e8ff"
 partition:
   description:
     - "For C(state=absent), an empty dictionary."
@@ -498,6 +607,38 @@ partition:
         "virtual-function-uris": [],
         "virtual-functions": []
     }
+retries:
+  description:
+    - "Counters for the retries of HMC requests and operations that failed
+       with a transient error (HTTP status 409 or 503, or a connection
+       error). The retry policy can be configured with the environment
+       variables 'ZHMC_RETRY_ATTEMPTS' (maximum number of attempts, default
+       3) and 'ZHMC_RETRY_BACKOFF' (time in seconds before the first retry,
+       default 1, doubled for each further retry)."
+  returned: always
+  type: dict
+  contains:
+    retried_requests:
+      description: "Number of requests or operations that were retried at
+        least once."
+      type: int
+    retries:
+      description: "Total number of retries."
+      type: int
+    failed_requests:
+      description: "Number of retried requests or operations that still
+        failed after the last attempt."
+      type: int
+    backoff_time:
+      description: "Total time in seconds that was waited before retries."
+      type: float
+  sample:
+    {
+        "backoff_time": 1.046,
+        "failed_requests": 0,
+        "retried_requests": 1,
+        "retries": 1
+    }
 """
 
 from collections import OrderedDict  # noqa: E402
@@ -511,9 +652,12 @@ from operator import itemgetter  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, StatusError, stop_partition, \
-    start_partition, wait_for_transition_completion, eq_hex, to_unicode, \
-    process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    start_partition, update_after_transition, eq_hex, to_unicode, \
+    process_normal_property, PropertySchema, missing_required_lib, \
+    common_fail_on_import_errors, ResourceFetcher, default_retry_policy, \
+    pull_properties, pull_full_properties, invalidate_properties, \
+    expand_storage_group_properties, STORAGE_GROUP_EXPANSIONS, \
+    result_properties_parameter, ResultSelector, find_partition  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -926,6 +1070,83 @@ ZHMC_PARTITION_PROPERTIES = {
         False, []),
 }
 
+ZHMC_PARTITION_SCHEMA = PropertySchema(ZHMC_PARTITION_PROPERTIES)
+
+
+# HMC properties of the partition that the processing of artificial
+# properties in the 'properties' module parameter depends on, in addition to
+# the properties for listing the NICs or HBAs of the partition.
+ARTIFICIAL_PROPERTY_DEPENDENCIES = {
+    'boot_network_nic_name': ('boot-network-device', 'nic-uris'),
+    'boot_storage_hba_name': ('boot-storage-device', 'hba-uris'),
+    'crypto_configuration': ('crypto-configuration',),
+}
+
+
+# HMC properties of the partition that the artificial properties in the
+# module result are determined from.
+RESULT_PROPERTY_DEPENDENCIES = {
+    'hbas': ('hba-uris',),
+    'nics': ('nic-uris',),
+    'virtual-functions': ('virtual-function-uris',),
+    'boot-storage-volume-name': ('boot-storage-volume',),
+    'storage-groups': ('storage-group-uris',),
+}
+
+
+def result_selector(params):
+    """
+    Return the ResultSelector for the 'result_properties' module parameter.
+    """
+    return ResultSelector(
+        params.get('result_properties', None), RESULT_PROPERTY_DEPENDENCIES)
+
+
+def dependent_properties(params):
+    """
+    Return the names of the HMC properties of an existing partition that the
+    evaluation of the 'properties' and 'state' module parameters depends on,
+    as a set.
+
+    Properties that are not defined in ZHMC_PARTITION_PROPERTIES are ignored
+    here and are surfaced later by process_properties().
+    """
+    names = set(['status'])
+    input_props = params.get('properties', None) or {}
+    for prop_name in input_props:
+        if prop_name in ARTIFICIAL_PROPERTY_DEPENDENCIES:
+            names.update(ARTIFICIAL_PROPERTY_DEPENDENCIES[prop_name])
+        elif prop_name in ZHMC_PARTITION_PROPERTIES:
+            names.add(prop_name.replace('_', '-'))
+    return names
+
+
+def selective_check_mode(params, check_mode):
+    """
+    Return a boolean indicating whether only the dependent properties of an
+    existing partition are retrieved and returned, for check mode with
+    check_mode_facts=false.
+    """
+    return check_mode and not params.get('check_mode_facts', True)
+
+
+def pull_partition_properties(partition, params, check_mode):
+    """
+    Retrieve the properties of an existing partition that are needed for
+    processing the module parameters.
+
+    In selective check mode, only the dependent properties of the partition
+    are retrieved (see pull_properties()), and no request is performed if
+    they are all known from listing the partition. Otherwise, the full set of
+    properties is retrieved.
+    """
+    if not selective_check_mode(params, check_mode):
+        pull_full_properties(partition)
+        return
+    names = dependent_properties(params) - set(partition.properties)
+    if names:
+        pull_properties(partition, names)
+
 
 def process_properties(cpc, partition, params):
     """
@@ -992,15 +1213,14 @@ def process_properties(cpc, partition, params):
         input_props = {}
     for prop_name in input_props:
 
-        if prop_name not in ZHMC_PARTITION_PROPERTIES:
+        if prop_name not in ZHMC_PARTITION_SCHEMA:
             raise ParameterError(
                 "Property {0!r} is not defined in the data model for "
                 "partitions.".format(prop_name))
 
-        allowed, create, update, update_while_active, eq_func, type_cast, \
-            required, default = ZHMC_PARTITION_PROPERTIES[prop_name]
+        prop_def = ZHMC_PARTITION_SCHEMA[prop_name]
 
-        if not allowed:
+        if not prop_def.allowed:
             raise ParameterError(
                 "Property {0!r} is not allowed in the 'properties' module "
                 "parameter.".format(prop_name))
@@ -1020,8 +1240,8 @@ def process_properties(cpc, partition, params):
                     format(prop_name))
 
             hba_name = input_props[prop_name]
-            if type_cast:
-                hba_name = type_cast(hba_name)
+            if prop_def.type_cast:
+                hba_name = prop_def.type_cast(hba_name)
 
             try:
                 hba = partition.hbas.find(name=hba_name)
@@ -1033,7 +1253,7 @@ def process_properties(cpc, partition, params):
             hmc_prop_name = 'boot-storage-device'
             if partition.properties.get(hmc_prop_name) != hba.uri:
                 update_props[hmc_prop_name] = hba.uri
-                if not update_while_active:
+                if not prop_def.update_while_active:
                     raise AssertionError()
 
         elif prop_name == 'boot_network_nic_name':
@@ -1045,8 +1265,8 @@ def process_properties(cpc, partition, params):
                     "partition previously exists.".format(prop_name))
 
             nic_name = input_props[prop_name]
-            if type_cast:
-                nic_name = type_cast(nic_name)
+            if prop_def.type_cast:
+                nic_name = prop_def.type_cast(nic_name)
 
             try:
                 nic = partition.nics.find(name=nic_name)
@@ -1058,7 +1278,7 @@ def process_properties(cpc, partition, params):
             hmc_prop_name = 'boot-network-device'
             if partition.properties.get(hmc_prop_name) != nic.uri:
                 update_props[hmc_prop_name] = nic.uri
-                if not update_while_active:
+                if not prop_def.update_while_active:
                     raise AssertionError()
 
         elif prop_name == 'crypto_configuration':
@@ -1205,7 +1425,7 @@ def process_properties(cpc, partition, params):
                 if input_props[prop_name] == '':
                     input_props[prop_name] = None
             _create_props, _update_props, _stop = process_normal_property(
-                prop_name, ZHMC_PARTITION_PROPERTIES, input_props, partition)
+                prop_name, ZHMC_PARTITION_SCHEMA, input_props, partition)
             create_props.update(_create_props)
             update_props.update(_update_props)
             if _stop:
@@ -1305,15 +1525,21 @@ def change_crypto_config(partition, crypto_changes, check_mode):
                 {'crypto-configuration': crypto_config})
         changed = True
 
+    if changed and not check_mode:
+        invalidate_properties(partition)
+
     return changed
 
 
 def add_artificial_properties(
         partition_properties, partition, expand_storage_groups,
-        expand_crypto_adapters):
+        expand_crypto_adapters, selector=None):
     """
     Add artificial properties to the partition_properties dict.
 
+    If a ResultSelector is specified, only the artificial properties it
+    selects are added.
+
     Upon return, the partition_properties dict has been extended by these
     artificial properties:
 
@@ -1358,120 +1584,96 @@ def add_artificial_properties(
     console = cpc.manager.console
     session = cpc.manager.client.session
 
+    def selected(name):
+        return selector is None or selector.selected(name)
+
     # Get the HBA child elements of the partition
-    hbas_prop = []
-    if partition.hbas is not None:
-        for hba in partition.hbas.list(full_properties=True):
-            hbas_prop.append(dict(hba.properties))
-    partition_properties['hbas'] = hbas_prop
+    if selected('hbas'):
+        hbas_prop = []
+        if partition.hbas is not None:
+            for hba in partition.hbas.list(full_properties=True):
+                hbas_prop.append(dict(hba.properties))
+        partition_properties['hbas'] = hbas_prop
 
     # Get the NIC child elements of the partition
-    nics_prop = []
-    for nic in partition.nics.list(full_properties=True):
-        nic_props = OrderedDict()
-        nic_props.update(nic.properties)
-        # Add artificial properties adapter-name/-port/-id:
-        vswitch_uri = nic.prop("virtual-switch-uri", None)
-        if vswitch_uri:
-            # OSA, Hipersockets
-            vswitch = cpc.virtual_switches.find(**{'object-uri': vswitch_uri})
-            adapter_uri = vswitch.get_property('backing-adapter-uri')
-            adapter_port = vswitch.get_property('port')
-            adapter = cpc.adapters.find(**{'object-uri': adapter_uri})
-            nic_props['adapter-name'] = adapter.name
-            nic_props['adapter-port'] = adapter_port
-            nic_props['adapter-id'] = adapter.get_property('adapter-id')
-        else:
-            # RoCE, CNA
-            port_uri = nic.prop("network-adapter-port-uri", None)
-            port_props = session.get(port_uri)
-            adapter_uri = port_props['parent']
-            adapter = cpc.adapters.find(**{'object-uri': adapter_uri})
-            nic_props['adapter-name'] = adapter.name
-            nic_props['adapter-port'] = port_props['index']
-            nic_props['adapter-id'] = adapter.get_property('adapter-id')
-        nics_prop.append(nic_props)
-    partition_properties['nics'] = nics_prop
+    if selected('nics'):
+        nics_prop = []
+        for nic in partition.nics.list(full_properties=True):
+            nic_props = OrderedDict()
+            nic_props.update(nic.properties)
+            # Add artificial properties adapter-name/-port/-id:
+            vswitch_uri = nic.prop("virtual-switch-uri", None)
+            if vswitch_uri:
+                # OSA, Hipersockets
+                vswitch = cpc.virtual_switches.find(
+                    **{'object-uri': vswitch_uri})
+                adapter_uri = vswitch.get_property('backing-adapter-uri')
+                adapter_port = vswitch.get_property('port')
+                adapter = cpc.adapters.find(**{'object-uri': adapter_uri})
+                nic_props['adapter-name'] = adapter.name
+                nic_props['adapter-port'] = adapter_port
+                nic_props['adapter-id'] = adapter.get_property('adapter-id')
+            else:
+                # RoCE, CNA
+                port_uri = nic.prop("network-adapter-port-uri", None)
+                port_props = session.get(port_uri)
+                adapter_uri = port_props['parent']
+                adapter = cpc.adapters.find(**{'object-uri': adapter_uri})
+                nic_props['adapter-name'] = adapter.name
+                nic_props['adapter-port'] = port_props['index']
+                nic_props['adapter-id'] = adapter.get_property('adapter-id')
+            nics_prop.append(nic_props)
+        partition_properties['nics'] = nics_prop
 
     # Get the VF child elements of the partition
-    vfs_prop = []
-    for vf in partition.virtual_functions.list(full_properties=True):
-        vfs_prop.append(dict(vf.properties))
-    partition_properties['virtual-functions'] = vfs_prop
+    if selected('virtual-functions'):
+        vfs_prop = []
+        for vf in partition.virtual_functions.list(full_properties=True):
+            vfs_prop.append(dict(vf.properties))
+        partition_properties['virtual-functions'] = vfs_prop
 
     # Set 'boot-storage-volume-name'
-    bsv_uri = partition.prop('boot-storage-volume', None)
-    if bsv_uri:
-        sg_uri = bsv_uri.split('/storage-volumes/')[0]
-        storage_group = console.storage_groups.resource_object(sg_uri)
-        bsv = storage_group.storage_volumes.find(**{'element-uri': bsv_uri})
-        bsv_name = bsv.name
+    if selected('boot-storage-volume-name'):
+        bsv_uri = partition.prop('boot-storage-volume', None)
+        if bsv_uri:
+            sg_uri = bsv_uri.split('/storage-volumes/')[0]
+            storage_group = console.storage_groups.resource_object(sg_uri)
+            bsv = storage_group.storage_volumes.find(
+                **{'element-uri': bsv_uri})
+            bsv_name = bsv.name
+        else:
+            bsv_name = None
+        partition_properties['boot-storage-volume-name'] = bsv_name
+
+    # The crypto adapters are registered first, so that they are retrieved
+    # concurrently with the storage groups.
+    fetcher = ResourceFetcher()
+    if expand_crypto_adapters and selected('crypto-configuration'):
+        cc = partition_properties.get('crypto-configuration', None)
     else:
-        bsv_name = None
-    partition_properties['boot-storage-volume-name'] = bsv_name
+        cc = None
+    if cc:
+        cas = [fetcher.add(cpc.adapters.resource_object(ca_uri))
+               for ca_uri in cc['crypto-adapter-uris']]
+
+    if expand_storage_groups and selected('storage-groups'):
+        storage_groups = [
+            console.storage_groups.resource_object(sg_uri)
+            for sg_uri in partition.properties['storage-group-uris']]
+        partition_properties['storage-groups'] = \
+            expand_storage_group_properties(
+                storage_groups, fetcher, STORAGE_GROUP_EXPANSIONS)
+    else:
+        fetcher.fetch()
 
-    if expand_storage_groups:
-        sgs_prop = []
-        for sg_uri in partition.properties['storage-group-uris']:
-            storage_group = console.storage_groups.resource_object(sg_uri)
-            storage_group.pull_full_properties()
-            sg_properties = dict(storage_group.properties)
-
-            # Candidate adapter ports and their adapters (full set of props)
-            caps_prop = []
-            for cap in storage_group.list_candidate_adapter_ports(
-                    full_properties=True):
-                cap_properties = dict(cap.properties)
-                adapter = cap.manager.adapter
-                adapter.pull_full_properties()
-                cap_properties['parent-adapter'] = dict(adapter.properties)
-                caps_prop.append(cap_properties)
-            sg_properties['candidate-adapter-ports'] = caps_prop
-
-            # Storage volumes (full set of properties).
-            # Note: We create the storage volumes from the
-            # 'storage-volume-uris' property, because the 'List Storage
-            # Volumes of a Storage Group' operation returns an empty list for
-            # auto-discovered volumes.
-            svs_prop = []
-            sv_uris = storage_group.get_property('storage-volume-uris')
-            for sv_uri in sv_uris:
-                sv = storage_group.storage_volumes.resource_object(sv_uri)
-                sv.pull_full_properties()
-                svs_prop.append(dict(sv.properties))
-            sg_properties['storage-volumes'] = svs_prop
-
-            # Virtual storage resources (full set of properties).
-            vsrs_prop = []
-            vsr_uris = storage_group.get_property(
-                'virtual-storage-resource-uris')
-            for vsr_uri in vsr_uris:
-                vsr = storage_group.virtual_storage_resources.resource_object(
-                    vsr_uri)
-                vsr.pull_full_properties()
-                vsrs_prop.append(dict(vsr.properties))
-            sg_properties['virtual-storage-resources'] = vsrs_prop
-
-            sgs_prop.append(sg_properties)
-
-        partition_properties['storage-groups'] = sgs_prop
-
-    if expand_crypto_adapters:
-
-        cc = partition_properties['crypto-configuration']
-        if cc:
-            # partition_properties is only a shallow copy of the
-            # Partition.properties dict, so cc is still a dict within the
-            # original Partition.properties dict. Therefore, we copy cc
-            # since we modify it.
-            cc = cc.copy()
-            cas_prop = []
-            for ca_uri in cc['crypto-adapter-uris']:
-                ca = cpc.adapters.resource_object(ca_uri)
-                ca.pull_full_properties()
-                cas_prop.append(dict(ca.properties))
-            cc['crypto-adapters'] = cas_prop
-            partition_properties['crypto-configuration'] = cc
+    if cc:
+        # partition_properties is only a shallow copy of the
+        # Partition.properties dict, so cc is still a dict within the
+        # original Partition.properties dict. Therefore, we copy cc
+        # since we modify it.
+        cc = cc.copy()
+        cc['crypto-adapters'] = [dict(ca.properties) for ca in cas]
+        partition_properties['crypto-configuration'] = cc
 
 
 def create_check_mode_partition(cpc, create_props, update_props):
@@ -1492,18 +1694,15 @@ def create_check_mode_partition(cpc, create_props, update_props):
     missing_props = []
 
     # Handle direct requiredness, direct defaults specified in prop defs
-    for prop_name in ZHMC_PARTITION_PROPERTIES:
-        prop_hmc_name = prop_name.replace('_', '-')
-        prop_defs = ZHMC_PARTITION_PROPERTIES[prop_name]
-        required = prop_defs[6]
-        default = prop_defs[7]
+    for prop_def in ZHMC_PARTITION_SCHEMA.props.values():
+        required = prop_def.required
 
         if not isinstance(required, types.FunctionType) and required and \
-                prop_hmc_name not in input_props:
-            missing_props.append(prop_name)
+                prop_def.hmc_name not in input_props:
+            missing_props.append(prop_def.name)
 
-        if default != SPECIAL_DEFAULT:
-            input_props.setdefault(prop_hmc_name, default)
+        if prop_def.default != SPECIAL_DEFAULT:
+            input_props.setdefault(prop_def.hmc_name, prop_def.default)
 
     if missing_props:
         raise ParameterError(
@@ -1534,15 +1733,13 @@ def create_check_mode_partition(cpc, create_props, update_props):
         '{0}{1:04X}'.format(name, random.randint(0, 16 ^ 4))
 
     # Handle function-based requiredness specified in prop defs
-    for prop_name in ZHMC_PARTITION_PROPERTIES:
-        prop_hmc_name = prop_name.replace('_', '-')
-        prop_defs = ZHMC_PARTITION_PROPERTIES[prop_name]
-        required = prop_defs[6]
+    for prop_def in ZHMC_PARTITION_SCHEMA.props.values():
+        required = prop_def.required
 
         if isinstance(required, types.FunctionType):
             required_ = required(input_props)
-            if required_ and prop_hmc_name not in input_props:
-                missing_props.append(prop_name)
+            if required_ and prop_def.hmc_name not in input_props:
+                missing_props.append(prop_def.name)
 
     if required_boot_ftp(input_props):
         if input_props['boot-ftp-host'] is None:
@@ -1594,18 +1791,19 @@ def ensure_active(params, check_mode):
 
     changed = False
     result = {}
+    job_uri = None
+    # Receives the job of an asynchronous start or stop operation
+    jobs = None if params['wait'] else []
 
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
+        cpc, partition = find_partition(
+            client, cpc_name, partition_name, required=False)
         # The default exception handling is sufficient for the above.
 
-        try:
-            partition = cpc.partitions.find(name=partition_name)
-            partition.pull_full_properties()
-        except zhmcclient.NotFound:
-            partition = None
+        if partition:
+            pull_partition_properties(partition, params, check_mode)
 
         if not partition:
             # It does not exist. Create it and update it if there are
@@ -1640,9 +1838,11 @@ def ensure_active(params, check_mode):
                 if not check_mode:
                     if stop:
                         stop_partition(partition, check_mode)
+                        partition.update_properties(update_props)
+                        invalidate_properties(partition)
                     else:
-                        wait_for_transition_completion(partition)
-                    partition.update_properties(update_props)
+                        update_after_transition(
+                            partition, partition, update_props)
                     # Properties are refreshed further down
                 else:
                     # Update the local object's properties
@@ -1655,26 +1855,32 @@ def ensure_active(params, check_mode):
         if not partition:
             raise AssertionError()
 
-        changed |= start_partition(partition, check_mode)
+        changed |= start_partition(partition, check_mode, jobs)
+        job_uri = jobs[0].uri if jobs else None
 
         if not check_mode:
 
             # Properties are refreshed only when not in check mode, because
             # in check mode we have local (client-side) changes that are not
-            # in the HMC.
-            partition.pull_full_properties()
+            # in the HMC. They are retrieved only if they are no longer
+            # current, i.e. if the partition was created or changed.
+            pull_full_properties(partition)
 
             status = partition.get_property('status')
-            if status not in ('active', 'degraded'):
+            if not job_uri and status not in ('active', 'degraded'):
                 raise StatusError(
                     "Could not get partition {0!r} into an active state, "
                     "status is: {1!r}".format(partition.name, status))
 
         result = dict(partition.properties)
-        add_artificial_properties(
-            result, partition, expand_storage_groups, expand_crypto_adapters)
+        selector = result_selector(params)
+        if not selective_check_mode(params, check_mode):
+            add_artificial_properties(
+                result, partition, expand_storage_groups,
+                expand_crypto_adapters, selector)
+        result = selector.apply(result)
 
-        return changed, result
+        return changed, result, job_uri
 
     finally:
         close_session(session, logoff)
@@ -1698,18 +1904,19 @@ def ensure_stopped(params, check_mode):
 
     changed = False
     result = {}
+    job_uri = None
+    # Receives the job of an asynchronous start or stop operation
+    jobs = None if params['wait'] else []
 
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
+        cpc, partition = find_partition(
+            client, cpc_name, partition_name, required=False)
         # The default exception handling is sufficient for the above.
 
-        try:
-            partition = cpc.partitions.find(name=partition_name)
-            partition.pull_full_properties()
-        except zhmcclient.NotFound:
-            partition = None
+        if partition:
+            pull_partition_properties(partition, params, check_mode)
 
         if not partition:
             # It does not exist. Create it and update it if there are
@@ -1738,10 +1945,15 @@ def ensure_stopped(params, check_mode):
                 process_properties(cpc, partition, params)
             # Note: create_props in this case only contains 'name' and can be
             # ignored.
-            changed |= stop_partition(partition, check_mode)
+            if update_props or crypto_changes:
+                # The partition must be stopped for the updates
+                jobs = None
+            changed |= stop_partition(partition, check_mode, jobs)
+            job_uri = jobs[0].uri if jobs else None
             if update_props:
                 if not check_mode:
                     partition.update_properties(update_props)
+                    invalidate_properties(partition)
                     # Properties are refreshed further down
                 else:
                     # Update the local object's properties
@@ -1757,20 +1969,25 @@ def ensure_stopped(params, check_mode):
         if not check_mode:
             # Properties are refreshed only when not in check mode, because
             # in check mode we have local (client-side) changes that are not
-            # in the HMC.
-            partition.pull_full_properties()
+            # in the HMC. They are retrieved only if they are no longer
+            # current, i.e. if the partition was created or changed.
+            pull_full_properties(partition)
 
             status = partition.get_property('status')
-            if status not in ('stopped'):
+            if not job_uri and status not in ('stopped'):
                 raise StatusError(
                     "Could not get partition {0!r} into a stopped state, "
                     "status is: {1!r}".format(partition.name, status))
 
         result = dict(partition.properties)
-        add_artificial_properties(
-            result, partition, expand_storage_groups, expand_crypto_adapters)
+        selector = result_selector(params)
+        if not selective_check_mode(params, check_mode):
+            add_artificial_properties(
+                result, partition, expand_storage_groups,
+                expand_crypto_adapters, selector)
+        result = selector.apply(result)
 
-        return changed, result
+        return changed, result, job_uri
 
     finally:
         close_session(session, logoff)
@@ -1795,20 +2012,19 @@ def ensure_absent(params, check_mode):
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
+        _, partition = find_partition(
+            client, cpc_name, partition_name, required=False)
         # The default exception handling is sufficient for the above.
 
-        try:
-            partition = cpc.partitions.find(name=partition_name)
-        except zhmcclient.NotFound:
-            return changed, result
+        if not partition:
+            return changed, result, None
 
         if not check_mode:
             stop_partition(partition, check_mode)
             partition.delete()
         changed = True
 
-        return changed, result
+        return changed, result, None
 
     finally:
         close_session(session, logoff)
@@ -1835,16 +2051,17 @@ def facts(params, check_mode):
     try:
         # The default exception handling is sufficient for this code
         client = zhmcclient.Client(session)
-        cpc = client.cpcs.find(name=cpc_name)
-
-        partition = cpc.partitions.find(name=partition_name)
-        partition.pull_full_properties()
+        _, partition = find_partition(client, cpc_name, partition_name)
+        selector = result_selector(params)
+        selector.pull(partition)
 
         result = dict(partition.properties)
         add_artificial_properties(
-            result, partition, expand_storage_groups, expand_crypto_adapters)
+            result, partition, expand_storage_groups, expand_crypto_adapters,
+            selector)
+        result = selector.apply(result)
 
-        return changed, result
+        return changed, result, None
 
     finally:
         close_session(session, logoff)
@@ -1858,6 +2075,10 @@ def perform_task(params, check_mode):
     If check_mode is True, check whether changes would occur, but don't
     actually perform any changes.
 
+    Returns:
+      tuple of (changed, result, job_uri), where job_uri is the URI of the
+      asynchronous job that was submitted for wait=false, or None.
+
     Raises:
       ParameterError: An issue with the module parameters.
       StatusError: An issue with the partition status.
@@ -1887,7 +2108,14 @@ def main():
         expand_storage_groups=dict(required=False, type='bool', default=False),
         expand_crypto_adapters=dict(required=False, type='bool',
                                     default=False),
+        result_properties=result_properties_parameter(),
+        wait=dict(required=False, type='bool', default=True),
+        check_mode_facts=dict(required=False, type='bool', default=True),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -1908,30 +2136,40 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
     LOGGER.debug("Module entry: params: %r", _params)
 
+    retry_policy = None
     try:
 
-        changed, result = perform_task(module.params, module.check_mode)
+        retry_policy = default_retry_policy()
+        retry_policy.reset_stats()
+
+        changed, result, job_uri = perform_task(
+            module.params, module.check_mode)
 
     except (Error, zhmcclient.Error) as exc:
         # These exceptions are considered errors in the environment or in user
         # input. They have a proper message that stands on its own, so we
         # simply pass that message on and will not need a traceback.
         msg = "{0}: {1}".format(exc.__class__.__name__, exc)
+        retries = retry_policy.stats() if retry_policy else None
         LOGGER.debug(
-            "Module exit (failure): msg: %s", msg)
-        module.fail_json(msg=msg)
+            "Module exit (failure): msg: %s, retries: %r", msg, retries)
+        module.fail_json(msg=msg, retries=retries)
     # Other exceptions are considered module errors and are handled by Ansible
     # by showing the traceback.
 
+    retries = retry_policy.stats()
     LOGGER.debug(
-        "Module exit (success): changed: %r, cpc: %r", changed, result)
-    module.exit_json(changed=changed, partition=result)
+        "Module exit (success): changed: %r, cpc: %r, job_uri: %r, "
+        "retries: %r", changed, result, job_uri, retries)
+    module.exit_json(changed=changed, partition=result, job_uri=job_uri,
+                     retries=retries)
 
 
 if __name__ == '__main__':
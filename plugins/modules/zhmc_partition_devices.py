@@ -0,0 +1,682 @@
+#!/usr/bin/python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+# For information on the format of the ANSIBLE_METADATA, DOCUMENTATION,
+# EXAMPLES, and RETURN strings, see
+# http://docs.ansible.com/ansible/dev_guide/developing_modules_documenting.html
+
+ANSIBLE_METADATA = {
+    'metadata_version': '1.1',
+    'status': ['stableinterface'],
+    'supported_by': 'community',
+    'shipped_by': 'other',
+    'other_repo_url': 'https://github.com/zhmcclient/zhmc-ansible-modules'
+}
+
+DOCUMENTATION = """
+---
+module: zhmc_partition_devices
+version_added: "2.9.0"
+short_description: Manage the NICs, HBAs and virtual functions of a partition
+description:
+  - Create, update, or delete the NICs (virtual Network Interface Cards), HBAs
+    (virtual Host Bus Adapters) and virtual functions of a partition of a CPC
+    (Z system) in a single task.
+  - The existing devices of each specified device type are listed once, the
+    necessary changes are determined for all specified devices, and the
+    changes are then performed with up to C(max_concurrency) operations
+    running concurrently. Deletions are performed before creations and
+    updates, so that device numbers of deleted devices can be reused.
+  - If some property update requires the partition to be stopped, the
+    partition is stopped once before any change is performed. It is not
+    restarted by this module; use the zhmc_partition module with
+    C(state=active) for that.
+  - The properties of each device are handled the same way as by the
+    zhmc_nic, zhmc_hba and zhmc_virtual_function modules.
+author:
+  - Andreas Maier (@andy-maier)
+requirements:
+  - The targeted Z system must be in the Dynamic Partition Manager (DPM)
+    operational mode.
+  - "The HMC userid must have these task permissions:
+    'Partition Details'."
+  - "The HMC userid must have object-access permissions to these objects:
+    The target partition, its CPC, the adapters backing the target devices."
+options:
+  hmc_host:
+    description:
+      - The hostname or IP address of the HMC.
+    type: str
+    required: true
+  hmc_auth:
+    description:
+      - The authentication credentials for the HMC.
+    type: dict
+    required: true
+    suboptions:
+      userid:
+        description:
+          - The userid (username) for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      password:
+        description:
+          - The password for authenticating with the HMC.
+            This is mutually exclusive with providing C(session_id).
+        type: str
+        required: false
+        default: null
+      session_id:
+        description:
+          - HMC session ID to be used.
+            This is mutually exclusive with providing C(userid) and C(password)
+            and can be created as described in :ref:`zhmc_session_module`.
+        type: str
+        required: false
+        default: null
+      ca_certs:
+        description:
+          - Path name of certificate file or certificate directory to be used
+            for verifying the HMC certificate. If null (default), the path name
+            in the 'REQUESTS_CA_BUNDLE' environment variable or the path name
+            in the 'CURL_CA_BUNDLE' environment variable is used, or if neither
+            of these variables is set, the certificates in the Mozilla CA
+            Certificate List provided by the 'certifi' Python package are used
+            for verifying the HMC certificate.
+        type: str
+        required: false
+        default: null
+      verify:
+        description:
+          - If True (default), verify the HMC certificate as specified in the
+            C(ca_certs) parameter. If False, ignore what is specified in the
+            C(ca_certs) parameter and do not verify the HMC certificate.
+        type: bool
+        required: false
+        default: true
+  cpc_name:
+    description:
+      - The name of the CPC with the target partition.
+    type: str
+    required: true
+  partition_name:
+    description:
+      - The name of the target partition.
+    type: str
+    required: true
+  nics:
+    description:
+      - "The desired NICs of the partition. If null, the NICs of the partition
+         are not managed."
+    type: list
+    elements: dict
+    required: false
+    default: null
+    suboptions:
+      name:
+        description:
+          - The name of the NIC.
+        type: str
+        required: true
+      state:
+        description:
+          - "The desired state for the NIC, as described for the zhmc_nic
+             module."
+        type: str
+        required: false
+        default: present
+        choices: ["absent", "present"]
+      properties:
+        description:
+          - "Dictionary with input properties for the NIC, for
+             C(state=present), as described for the zhmc_nic module."
+        type: dict
+        required: false
+        default: null
+  hbas:
+    description:
+      - "The desired HBAs of the partition. If null, the HBAs of the partition
+         are not managed."
+    type: list
+    elements: dict
+    required: false
+    default: null
+    suboptions:
+      name:
+        description:
+          - The name of the HBA.
+        type: str
+        required: true
+      state:
+        description:
+          - "The desired state for the HBA, as described for the zhmc_hba
+             module."
+        type: str
+        required: false
+        default: present
+        choices: ["absent", "present"]
+      properties:
+        description:
+          - "Dictionary with input properties for the HBA, for
+             C(state=present), as described for the zhmc_hba module."
+        type: dict
+        required: false
+        default: null
+  virtual_functions:
+    description:
+      - "The desired virtual functions of the partition. If null, the virtual
+         functions of the partition are not managed."
+    type: list
+    elements: dict
+    required: false
+    default: null
+    suboptions:
+      name:
+        description:
+          - The name of the virtual function.
+        type: str
+        required: true
+      state:
+        description:
+          - "The desired state for the virtual function, as described for the
+             zhmc_virtual_function module."
+        type: str
+        required: false
+        default: present
+        choices: ["absent", "present"]
+      properties:
+        description:
+          - "Dictionary with input properties for the virtual function, for
+             C(state=present), as described for the zhmc_virtual_function
+             module."
+        type: dict
+        required: false
+        default: null
+  purge:
+    description:
+      - "If True, existing devices of the device types that are specified
+         (i.e. whose parameter is not null) are deleted if they are not
+         specified in that parameter. If False, such devices remain
+         unchanged."
+    type: bool
+    required: false
+    default: false
+  max_concurrency:
+    description:
+      - "The maximum number of device operations that run concurrently."
+    type: int
+    required: false
+    default: 10
+  log_file:
+    description:
+      - "File path of a log file to which the logic flow of this module as well
+         as interactions with the HMC are logged. If null, logging will be
+         propagated to the Python root logger."
+    type: str
+    required: false
+    default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  _faked_session:
+    description:
+      - "An internal parameter used for testing the module."
+    required: false
+    type: raw
+    default: null
+"""
+
+EXAMPLES = """
+---
+# Note: The following examples assume that some variables named 'my_*' are set.
+
+- name: Ensure the partition has exactly the specified NICs and HBAs
+  zhmc_partition_devices:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    cpc_name: "{{ my_cpc_name }}"
+    partition_name: "{{ my_partition_name }}"
+    nics:
+      - name: nic1
+        properties:
+          adapter_name: "OSD 0128 A13B-13"
+          adapter_port: 0
+          device_number: "0100"
+      - name: nic2
+        properties:
+          adapter_name: "OSD 0128 A13B-13"
+          adapter_port: 1
+          device_number: "0200"
+    hbas:
+      - name: hba1
+        properties:
+          adapter_name: "FCP 0120 A13B-14"
+          adapter_port: 0
+          device_number: "1100"
+    purge: true
+  register: devices1
+
+- name: Ensure a virtual function does not exist in the partition
+  zhmc_partition_devices:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    cpc_name: "{{ my_cpc_name }}"
+    partition_name: "{{ my_partition_name }}"
+    virtual_functions:
+      - name: vf1
+        state: absent
+"""
+
+RETURN = """
+changed:
+  description: Indicates if any change has been made by the module.
+  returned: always
+  type: bool
+msg:
+  description: An error message that describes the failure.
+  returned: failure
+  type: str
+partition_devices:
+  description:
+    - "The devices of the partition that were specified with
+       C(state=present), after any changes, by device type. In check mode,
+       devices that would be created are not included."
+  returned: success
+  type: dict
+  contains:
+    nics:
+      description: "The NICs, as a dictionary with the NIC name as key and
+        the NIC properties as value, as described for the zhmc_nic module.
+        Only present if C(nics) was specified."
+      type: dict
+    hbas:
+      description: "The HBAs, as a dictionary with the HBA name as key and
+        the HBA properties as value, as described for the zhmc_hba module.
+        Only present if C(hbas) was specified."
+      type: dict
+    virtual_functions:
+      description: "The virtual functions, as a dictionary with the virtual
+        function name as key and the virtual function properties as value, as
+        described for the zhmc_virtual_function module.
+        Only present if C(virtual_functions) was specified."
+      type: dict
+  sample:
+    {
+        "nics": {
+            "nic1": {
+                "class": "nic",
+                "description": "",
+                "device-number": "0100",
+                "element-id": "5956e97a-f433-11ea-b67c-00106f239d19",
+                "element-uri": "/api/partitions/32323df4-f433-11ea-b67c-00106f239d19/nics/5956e97a-f433-11ea-b67c-00106f239d19",
+                "mac-address": "02:d2:4d:80:b9:88",
+                "name": "nic1",
+                "parent": "/api/partitions/32323df4-f433-11ea-b67c-00106f239d19",
+                "ssc-ip-address": null,
+                "ssc-ip-address-type": null,
+                "ssc-management-nic": false,
+                "ssc-mask-prefix": null,
+                "type": "osd",
+                "virtual-switch-uri": "/api/virtual-switches/db2f0bec-e578-11e8-bd0a-00106f239c31",
+                "vlan-id": null,
+                "vlan-type": null
+            }
+        }
+    }
+"""
+
+import logging  # noqa: E402
+import traceback  # noqa: E402
+from ansible.module_utils.basic import AnsibleModule  # noqa: E402
+
+from ..module_utils.common import log_init, open_session, close_session, \
+    hmc_auth_parameter, Error, ParameterError, missing_required_lib, \
+    common_fail_on_import_errors, stop_partition, \
+    wait_for_transition_completion, concurrent_map, ResourceFetcher, \
+    create_or_update_resource, process_nic_properties, \
+    process_hba_properties, process_vfunction_properties  # noqa: E402
+
+try:
+    import requests.packages.urllib3
+    IMP_URLLIB3_ERR = None
+except ImportError:
+    IMP_URLLIB3_ERR = traceback.format_exc()
+
+try:
+    import zhmcclient
+    IMP_ZHMCCLIENT_ERR = None
+except ImportError:
+    IMP_ZHMCCLIENT_ERR = traceback.format_exc()
+
+# Python logger name for this module
+LOGGER_NAME = 'zhmc_partition_devices'
+
+LOGGER = logging.getLogger(LOGGER_NAME)
+
+# Device types managed by this module, in this format:
+#   (param_name, manager_attr, process_func)
+# where:
+#   param_name: Name of the module parameter with the desired devices. This is
+#     also the key in the module result.
+#   manager_attr: Name of the attribute of zhmcclient.Partition with the
+#     manager object for the devices.
+#   process_func: Function that processes the properties of a device.
+DEVICE_TYPES = (
+    ('nics', 'nics', process_nic_properties),
+    ('hbas', 'hbas', process_hba_properties),
+    ('virtual_functions', 'virtual_functions', process_vfunction_properties),
+)
+
+
+def list_devices(partition, device_types, max_concurrency):
+    """
+    List the existing devices of the specified device types of the partition,
+    with their full properties.
+
+    Each device type is listed once, and the full properties of all devices
+    are retrieved concurrently.
+
+    Parameters:
+      partition (zhmcclient.Partition): The partition (must exist).
+      device_types (list of tuple): The device types to list, as items of
+        DEVICE_TYPES.
+      max_concurrency (int): Maximum number of concurrent retrievals.
+
+    Returns:
+      dict: Existing devices, with key: param_name of the device type,
+        value: dict with key: device name, value: device object.
+
+    Raises:
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    fetcher = ResourceFetcher(max_concurrency)
+    existing = {}
+    for param_name, manager_attr, _ in device_types:
+        manager = getattr(partition, manager_attr)
+        devices = [fetcher.add(dev) for dev in manager.list()]
+        existing[param_name] = dict((dev.name, dev) for dev in devices)
+    fetcher.fetch()
+    return existing
+
+
+def plan_changes(partition, device_types, params, existing):
+    """
+    Determine the changes that are needed to bring the devices of the
+    partition into the desired state.
+
+    Parameters:
+      partition (zhmcclient.Partition): The partition (must exist).
+      device_types (list of tuple): The device types to process, as items of
+        DEVICE_TYPES.
+      params (dict): Module input parameters.
+      existing (dict): Existing devices, as returned by list_devices().
+
+    Returns:
+      tuple of (deletes, changes, stop), where:
+        * deletes: list of tuples (param_name, device) for the devices to be
+          deleted.
+        * changes: list of tuples (param_name, manager, device, create_props,
+          update_props) for the devices to be created (device is None) or
+          updated.
+        * stop (bool): Indicates whether some update properties require the
+          partition to be stopped.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+    """
+    deletes = []
+    changes = []
+    stop = False
+
+    # The adapters of the CPC are listed only once, and only if a device
+    # specifies its backing adapter.
+    adapters = None
+    if any('adapter_name' in (entry['properties'] or {})
+           for param_name, _, _ in device_types
+           for entry in params[param_name] if entry['state'] != 'absent'):
+        adapters = dict(
+            (adapter.name, adapter)
+            for adapter in partition.manager.cpc.adapters.list())
+
+    for param_name, manager_attr, process_func in device_types:
+        manager = getattr(partition, manager_attr)
+        devices = existing[param_name]
+        desired_names = set()
+        for entry in params[param_name]:
+            name = entry['name']
+            if name in desired_names:
+                raise ParameterError(
+                    "Device {0!r} is specified more than once in the {1!r} "
+                    "module parameter.".format(name, param_name))
+            desired_names.add(name)
+            device = devices.get(name)
+            if entry['state'] == 'absent':
+                if device:
+                    deletes.append((param_name, device))
+                continue
+            create_props, update_props, _stop = process_func(
+                partition, device, entry, adapters)
+            if device is None:
+                changes.append(
+                    (param_name, manager, None, create_props, update_props))
+            elif update_props:
+                changes.append(
+                    (param_name, manager, device, create_props, update_props))
+                if _stop:
+                    stop = True
+        if params['purge']:
+            for name in sorted(devices):
+                if name not in desired_names:
+                    deletes.append((param_name, devices[name]))
+    return deletes, changes, stop
+
+
+def apply_change(change):
+    """
+    Create or update a device, and return the device object with its full
+    properties after the change.
+
+    Parameters:
+      change (tuple): A change, as returned by plan_changes().
+
+    Raises:
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    _, manager, device, create_props, update_props = change
+    return create_or_update_resource(
+        manager, device, create_props, update_props)
+
+
+def perform_task(params, check_mode):
+    """
+    Perform the task for this module.
+
+    If check_mode is True, check whether changes would occur, but don't
+    actually perform any changes.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      StatusError: An issue with the partition status.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    cpc_name = params['cpc_name']
+    partition_name = params['partition_name']
+    max_concurrency = params['max_concurrency']
+
+    device_types = [dt for dt in DEVICE_TYPES if params[dt[0]] is not None]
+
+    changed = False
+    result = {}
+
+    session, logoff = open_session(params)
+    try:
+        client = zhmcclient.Client(session)
+        cpc = client.cpcs.find(name=cpc_name)
+        # The default exception handling is sufficient for the above.
+
+        try:
+            partition = cpc.partitions.find(name=partition_name)
+        except zhmcclient.NotFound:
+            if check_mode:
+                # Once the partition is created, the devices will also need
+                # to be created. Therefore, we set changed.
+                changed = True
+                return changed, result
+            raise
+
+        existing = list_devices(partition, device_types, max_concurrency)
+        deletes, changes, stop = plan_changes(
+            partition, device_types, params, existing)
+
+        LOGGER.debug(
+            "Planned device changes for partition %r: deletes: %r, "
+            "creates/updates: %r, stop: %r", partition.name,
+            [dev.name for _, dev in deletes],
+            [change[3]['name'] for change in changes], stop)
+
+        if deletes or changes:
+            changed = True
+
+        devices = dict((param_name, dict(existing[param_name]))
+                       for param_name, _, _ in device_types)
+
+        if changed and not check_mode:
+            if stop:
+                stop_partition(partition, check_mode)
+            else:
+                wait_for_transition_completion(partition)
+
+            # Deletions are done first, so that the device numbers of deleted
+            # devices can be reused by created devices.
+            concurrent_map(
+                lambda delete: delete[1].delete(), deletes, max_concurrency)
+            for param_name, dev in deletes:
+                del devices[param_name][dev.name]
+
+            updated = concurrent_map(apply_change, changes, max_concurrency)
+            for change, dev in zip(changes, updated):
+                devices[change[0]][dev.name] = dev
+
+        for param_name, _, _ in device_types:
+            present_names = [entry['name'] for entry in params[param_name]
+                             if entry['state'] == 'present']
+            result[param_name] = dict(
+                (name, dict(devices[param_name][name].properties))
+                for name in present_names if name in devices[param_name])
+
+        return changed, result
+
+    finally:
+        close_session(session, logoff)
+
+
+def main():
+
+    device_spec = dict(
+        name=dict(required=True, type='str'),
+        state=dict(required=False, type='str', default='present',
+                   choices=['absent', 'present']),
+        properties=dict(required=False, type='dict', default=None),
+    )
+
+    # The following definition of module input parameters must match the
+    # description of the options in the DOCUMENTATION string.
+    argument_spec = dict(
+        hmc_host=dict(required=True, type='str'),
+        hmc_auth=hmc_auth_parameter(),
+        cpc_name=dict(required=True, type='str'),
+        partition_name=dict(required=True, type='str'),
+        nics=dict(required=False, type='list', elements='dict',
+                  options=device_spec, default=None),
+        hbas=dict(required=False, type='list', elements='dict',
+                  options=device_spec, default=None),
+        virtual_functions=dict(required=False, type='list', elements='dict',
+                               options=device_spec, default=None),
+        purge=dict(required=False, type='bool', default=False),
+        max_concurrency=dict(required=False, type='int', default=10),
+        log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
+        _faked_session=dict(required=False, type='raw'),
+    )
+
+    module = AnsibleModule(
+        argument_spec=argument_spec,
+        supports_check_mode=True)
+
+    if IMP_URLLIB3_ERR is not None:
+        module.fail_json(msg=missing_required_lib("requests"),
+                         exception=IMP_URLLIB3_ERR)
+
+    requests.packages.urllib3.disable_warnings()
+
+    if IMP_ZHMCCLIENT_ERR is not None:
+        module.fail_json(msg=missing_required_lib("zhmcclient"),
+                         exception=IMP_ZHMCCLIENT_ERR)
+
+    common_fail_on_import_errors(module)
+
+    log_file = module.params['log_file']
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
+
+    _params = dict(module.params)
+    del _params['hmc_auth']
+    LOGGER.debug("Module entry: params: %r", _params)
+
+    try:
+
+        changed, result = perform_task(module.params, module.check_mode)
+
+    except (Error, zhmcclient.Error) as exc:
+        # These exceptions are considered errors in the environment or in user
+        # input. They have a proper message that stands on its own, so we
+        # simply pass that message on and will not need a traceback.
+        msg = "{0}: {1}".format(exc.__class__.__name__, exc)
+        LOGGER.debug(
+            "Module exit (failure): msg: %s", msg)
+        module.fail_json(msg=msg)
+    # Other exceptions are considered module errors and are handled by Ansible
+    # by showing the traceback.
+
+    LOGGER.debug(
+        "Module exit (success): changed: %r, partition_devices: %r",
+        changed, result)
+    module.exit_json(changed=changed, partition_devices=result)
+
+
+if __name__ == '__main__':
+    main()
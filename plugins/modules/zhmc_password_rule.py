@@ -139,6 +139,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -249,6 +266,7 @@ password_rule:
     }
 """
 
+import functools  # noqa: E402
 import uuid  # noqa: E402
 import logging  # noqa: E402
 import traceback  # noqa: E402
@@ -256,8 +274,8 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, to_unicode, \
-    process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    process_normal_property, PropertySchema, missing_required_lib, \
+    common_fail_on_import_errors, ResourceReconciler  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -330,6 +348,8 @@ ZHMC_PASSWORD_RULE_PROPERTIES = {
     'replication_overwrite_possible': (False, False, False, True, None, bool),
 }
 
+ZHMC_PASSWORD_RULE_SCHEMA = PropertySchema(ZHMC_PASSWORD_RULE_PROPERTIES)
+
 
 def process_properties(console, pwrule, params):
     """
@@ -386,22 +406,19 @@ def process_properties(console, pwrule, params):
 
     for prop_name in input_props:
 
-        if prop_name not in ZHMC_PASSWORD_RULE_PROPERTIES:
+        if prop_name not in ZHMC_PASSWORD_RULE_SCHEMA:
             raise ParameterError(
                 "Property {0!r} is not defined in the data model for "
                 "password rules.".format(prop_name))
 
-        allowed, create, update, update_while_active, eq_func, type_cast = \
-            ZHMC_PASSWORD_RULE_PROPERTIES[prop_name]
-
-        if not allowed:
+        if prop_name not in ZHMC_PASSWORD_RULE_SCHEMA.allowed_names:
             raise ParameterError(
                 "Property {0!r} is not allowed in the 'properties' module "
                 "parameter.".format(prop_name))
 
         # Process a normal (= non-artificial) property
         _create_props, _update_props, _stop = process_normal_property(
-            prop_name, ZHMC_PASSWORD_RULE_PROPERTIES, input_props, pwrule)
+            prop_name, ZHMC_PASSWORD_RULE_SCHEMA, input_props, pwrule)
         create_props.update(_create_props)
         update_props.update(_update_props)
         if _stop:
@@ -474,67 +491,21 @@ def ensure_present(params, check_mode):
 
     pwrule_name = params['name']
 
-    changed = False
-    result = {}
-
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
         console = client.consoles.console
         # The default exception handling is sufficient for the above.
 
-        try:
-            pwrule = console.password_rules.find(name=pwrule_name)
-        except zhmcclient.NotFound:
-            pwrule = None
-
-        if pwrule is None:
-            # It does not exist. Create it and update it if there are
-            # update-only properties.
-            create_props, update_props = \
-                process_properties(console, pwrule, params)
-            update2_props = {}
-            for name, value in update_props.items():
-                if name not in create_props:
-                    update2_props[name] = value
-            if not check_mode:
-                pwrule = console.password_rules.create(create_props)
-                if update2_props:
-                    pwrule.update_properties(update2_props)
-                # We refresh the properties after the update, in case an
-                # input property value gets changed.
-                pwrule.pull_full_properties()
-            else:
-                # Create a Password Rule object locally
-                pwrule = create_check_mode_pwrule(
-                    console, create_props, update2_props)
-            result = dict(pwrule.properties)
-            changed = True
-        else:
-            # It exists. Update its properties.
-            pwrule.pull_full_properties()
-            result = dict(pwrule.properties)
-            create_props, update_props = \
-                process_properties(console, pwrule, params)
-            if create_props:
-                raise AssertionError("Unexpected "
-                                     "create_props: %r" % create_props)
-            if update_props:
-                LOGGER.debug(
-                    "Existing password rule %r needs to get properties "
-                    "updated: %r", pwrule_name, update_props)
-                if not check_mode:
-                    pwrule.update_properties(update_props)
-                    # We refresh the properties after the update, in case an
-                    # input property value gets changed.
-                    pwrule.pull_full_properties()
-                    result = dict(pwrule.properties)
-                else:
-                    # Update the local Password Rule object's properties
-                    result.update(update_props)
-                changed = True
-
-        if not pwrule:
+        reconciler = ResourceReconciler(
+            console.password_rules, pwrule_name,
+            lambda pwrule: process_properties(console, pwrule, params),
+            check_mode_func=functools.partial(
+                create_check_mode_pwrule, console),
+            logger=LOGGER)
+        changed, result = reconciler.reconcile(check_mode)
+
+        if not reconciler.resource:
             raise AssertionError()
 
         return changed, result
@@ -640,6 +611,10 @@ def main():
                    choices=['absent', 'present', 'facts']),
         properties=dict(required=False, type='dict', default={}),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -660,7 +635,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
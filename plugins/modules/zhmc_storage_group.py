@@ -165,6 +165,51 @@ options:
     type: bool
     required: false
     default: false
+  expand_properties:
+    description:
+      - "Only if C(expand=true): The artificial properties to be expanded.
+         If null (default), all of them are expanded. Child resources that
+         are not selected are not retrieved from the HMC."
+      - "The full properties of the expanded resources are retrieved
+         concurrently, and resources that are referenced multiple times (e.g.
+         an adapter with multiple candidate ports) are retrieved only once."
+    type: list
+    elements: str
+    required: false
+    default: null
+    choices: ['candidate_adapter_ports', 'storage_volumes',
+              'virtual_storage_resources', 'attached_partitions']
+  result_properties:
+    description:
+      - "Selects the properties that are returned in the C(storage_group)
+         result, by their names in the data model for storage groups or the
+         names of the artificial properties described for the result. Names
+         may be specified with underscores instead of hyphens. The 'name'
+         property is always returned. If null, all properties are returned."
+      - "Artificial properties that are not selected are not retrieved from
+         the HMC, in addition to the selection by C(expand) and
+         C(expand_properties). For C(state=facts) with an C(include) list,
+         only the included storage group properties are retrieved from the
+         HMC."
+    type: dict
+    required: false
+    default: null
+    suboptions:
+      include:
+        description:
+          - "Names of the properties to be returned. If null, all properties
+             are returned that are not excluded."
+        type: list
+        elements: str
+        required: false
+        default: null
+      exclude:
+        description:
+          - "Names of the properties not to be returned."
+        type: list
+        elements: str
+        required: false
+        default: null
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -173,6 +218,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -195,6 +257,18 @@ EXAMPLES = """
     expand: true
   register: sg1
 
+- name: Gather facts about a storage group, expanding only its volumes
+  zhmc_storage_group:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    cpc_name: "{{ my_cpc_name }}"
+    name: "{{ my_storage_group_name }}"
+    state: facts
+    expand: true
+    expand_properties:
+      - storage_volumes
+  register: sg1
+
 - name: Ensure the storage group does not exist
   zhmc_storage_group:
     hmc_host: "{{ my_hmc_host }}"
@@ -254,8 +328,9 @@ storage_group:
       type: list
       elements: str
     candidate-adapter-ports:
-      description: "Only present if C(expand=true): List of candidate storage
-        adapter ports of the storage group."
+      description: "Only present if C(expand=true) and selected in
+        C(expand_properties): List of candidate storage adapter ports of the
+        storage group."
       returned: "success+expand"
       type: list
       elements: dict
@@ -284,8 +359,8 @@ storage_group:
                 :term:`HMC API` book.
                 The property names have hyphens (-) as described in that book."
     storage-volumes:
-      description: "Only present if C(expand=true): Storage volumes of the
-        storage group."
+      description: "Only present if C(expand=true) and selected in
+        C(expand_properties): Storage volumes of the storage group."
       returned: "success+expand"
       type: list
       elements: dict
@@ -299,8 +374,9 @@ storage_group:
             of the 'Storage Group' object in the :term:`HMC API` book.
             The property names have hyphens (-) as described in that book."
     virtual-storage-resources:
-      description: "Only present if C(expand=true): Virtual storage resources
-        of the storage group."
+      description: "Only present if C(expand=true) and selected in
+        C(expand_properties): Virtual storage resources of the storage
+        group."
       returned: "success+expand"
       type: list
       elements: dict
@@ -312,8 +388,9 @@ storage_group:
             :term:`HMC API` book.
             The property names have hyphens (-) as described in that book."
     attached-partitions:
-      description: "Only present if C(expand=true): Partitions to which the
-        storage group is attached."
+      description: "Only present if C(expand=true) and selected in
+        C(expand_properties): Partitions to which the storage group is
+        attached."
       returned: "success+expand"
       type: list
       elements: dict
@@ -540,8 +617,10 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, to_unicode, \
-    process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    process_normal_property, PropertySchema, missing_required_lib, \
+    common_fail_on_import_errors, ResourceFetcher, ResourceReconciler, \
+    expand_storage_group_properties, STORAGE_GROUP_EXPANSIONS, \
+    result_properties_parameter, ResultSelector  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -624,6 +703,8 @@ ZHMC_STORAGE_GROUP_PROPERTIES = {
     'unassigned-worldwide-port-names': (False, False, False, None, None, None),
 }
 
+ZHMC_STORAGE_GROUP_SCHEMA = PropertySchema(ZHMC_STORAGE_GROUP_PROPERTIES)
+
 
 def process_properties(cpc, storage_group, params):
     """
@@ -690,22 +771,19 @@ def process_properties(cpc, storage_group, params):
         input_props = {}
     for prop_name in input_props:
 
-        if prop_name not in ZHMC_STORAGE_GROUP_PROPERTIES:
+        if prop_name not in ZHMC_STORAGE_GROUP_SCHEMA:
             raise ParameterError(
                 "Property {0!r} is not defined in the data model for "
                 "storage groups.".format(prop_name))
 
-        allowed, create, update, update_while_active, eq_func, type_cast = \
-            ZHMC_STORAGE_GROUP_PROPERTIES[prop_name]
-
-        if not allowed:
+        if prop_name not in ZHMC_STORAGE_GROUP_SCHEMA.allowed_names:
             raise ParameterError(
                 "Property {0!r} is not allowed in the 'properties' module "
                 "parameter.".format(prop_name))
 
         # Process a normal (= non-artificial) property
         _create_props, _update_props, _stop = process_normal_property(
-            prop_name, ZHMC_STORAGE_GROUP_PROPERTIES, input_props,
+            prop_name, ZHMC_STORAGE_GROUP_SCHEMA, input_props,
             storage_group)
         create_props.update(_create_props)
         update_props.update(_update_props)
@@ -715,18 +793,39 @@ def process_properties(cpc, storage_group, params):
     return create_props, update_props
 
 
-def add_artificial_properties(sg_properties, storage_group, expand):
+# HMC properties of the storage group that the artificial properties in the
+# module result are determined from.
+RESULT_PROPERTY_DEPENDENCIES = {
+    'candidate-adapter-ports': ('candidate-adapter-port-uris',),
+    'storage-volumes': ('storage-volume-uris',),
+    'virtual-storage-resources': ('virtual-storage-resource-uris',),
+}
+
+
+def result_selector(params):
+    """
+    Return the ResultSelector for the 'result_properties' module parameter.
+    """
+    return ResultSelector(
+        params.get('result_properties', None), RESULT_PROPERTY_DEPENDENCIES)
+
+
+def add_artificial_properties(
+        sg_properties, storage_group, expand, expand_properties=None,
+        selector=None):
     """
     Add artificial properties to the storage_group object.
 
-    Upon return, the sg_properties dict has been extended by these properties:
+    Upon return, the sg_properties dict has been extended by these properties,
+    or if a ResultSelector is specified, by those it selects:
 
     Regardless of expand:
 
     * 'attached-partition-names': List of Partition names to which the storage
       group is attached.
 
-    If expand is True:
+    If expand is True, the following properties, limited to those selected in
+    expand_properties (if not None):
 
     * 'candidate-adapter-ports': List of Port objects, each of which is
       represented as its dictionary of properties.
@@ -747,56 +846,49 @@ def add_artificial_properties(sg_properties, storage_group, expand):
       of its properties.
     """
 
-    parts = storage_group.list_attached_partitions()
+    if selector is None:
+        selector = ResultSelector(None)
+
+    if expand:
+        if expand_properties is None:
+            expansions = STORAGE_GROUP_EXPANSIONS + ('attached-partitions',)
+        else:
+            expansions = [name.replace('_', '-') for name in expand_properties]
+        expansions = [name for name in expansions if selector.selected(name)]
+    else:
+        expansions = []
+
+    if selector.selected('attached-partition-names') or \
+            'attached-partitions' in expansions:
+        parts = storage_group.list_attached_partitions()
 
     # List of attached partitions (just the names)
-    part_names_prop = []
-    for part in parts:
-        part_names_prop.append(part.get_property('name'))
-    sg_properties['attached-partition-names'] = part_names_prop
+    if selector.selected('attached-partition-names'):
+        part_names_prop = []
+        for part in parts:
+            part_names_prop.append(part.get_property('name'))
+        sg_properties['attached-partition-names'] = part_names_prop
 
-    if expand:
+    if expansions:
 
-        # Candidate adapter ports and their parent adapters (full set of props)
-        caps_prop = []
-        for cap in storage_group.list_candidate_adapter_ports(
-                full_properties=True):
-            adapter = cap.manager.adapter
-            adapter.pull_full_properties()
-            cap_properties = dict(cap.properties)
-            cap_properties['parent-adapter'] = dict(adapter.properties)
-            caps_prop.append(cap_properties)
-        sg_properties['candidate-adapter-ports'] = caps_prop
-
-        # Storage volumes (full set of properties).
-        # Note: We create the storage volumes from the 'storage-volume-uris'
-        # property, because the 'List Storage Volumes of a Storage Group'
-        # operation returns an empty list for auto-discovered volumes.
-        svs_prop = []
-        sv_uris = storage_group.get_property('storage-volume-uris')
-        for sv_uri in sv_uris:
-            sv = storage_group.storage_volumes.resource_object(sv_uri)
-            sv.pull_full_properties()
-            svs_prop.append(dict(sv.properties))
-        sg_properties['storage-volumes'] = svs_prop
-
-        # Virtual storage resources (full set of properties).
-        vsrs_prop = []
-        vsr_uris = storage_group.get_property('virtual-storage-resource-uris')
-        for vsr_uri in vsr_uris:
-            vsr = storage_group.virtual_storage_resources.resource_object(
-                vsr_uri)
-            vsr.pull_full_properties()
-            vsrs_prop.append(dict(vsr.properties))
-        sg_properties['virtual-storage-resources'] = vsrs_prop
+        # The attached partitions are registered first, so that they are
+        # retrieved concurrently with the storage group child resources.
+        fetcher = ResourceFetcher()
+        if 'attached-partitions' in expansions:
+            parts = [fetcher.add(part) for part in parts]
+
+        # Candidate adapter ports with their parent adapters, storage volumes
+        # and virtual storage resources (full set of properties).
+        sg_expanded = expand_storage_group_properties(
+            [storage_group], fetcher, expansions)[0]
+        for name in STORAGE_GROUP_EXPANSIONS:
+            if name in sg_expanded:
+                sg_properties[name] = sg_expanded[name]
 
         # List of attached partitions (full set of properties).
-        parts = storage_group.list_attached_partitions()
-        parts_prop = []
-        for part in parts:
-            part.pull_full_properties()
-            parts_prop.append(dict(part.properties))
-        sg_properties['attached-partitions'] = parts_prop
+        if 'attached-partitions' in expansions:
+            sg_properties['attached-partitions'] = [
+                dict(part.properties) for part in parts]
 
 
 def ensure_present(params, check_mode):
@@ -814,9 +906,7 @@ def ensure_present(params, check_mode):
     cpc_name = params['cpc_name']
     storage_group_name = params['name']
     expand = params['expand']
-
-    changed = False
-    result = {}
+    expand_properties = params.get('expand_properties')
 
     session, logoff = open_session(params)
     try:
@@ -825,57 +915,21 @@ def ensure_present(params, check_mode):
         cpc = client.cpcs.find(name=cpc_name)
         # The default exception handling is sufficient for the above.
 
-        try:
-            storage_group = console.storage_groups.find(
-                name=storage_group_name)
-        except zhmcclient.NotFound:
-            storage_group = None
-
-        if storage_group is None:
-            # It does not exist. Create it and update it if there are
-            # update-only properties.
-            if not check_mode:
-                create_props, update_props = \
-                    process_properties(cpc, storage_group, params)
-                storage_group = console.storage_groups.create(
-                    create_props)
-                update2_props = {}
-                for name, value in update_props.items():
-                    if name not in create_props:
-                        update2_props[name] = value
-                if update2_props:
-                    storage_group.update_properties(update2_props)
-                # We refresh the properties after the update, in case an
-                # input property value gets changed.
-                storage_group.pull_full_properties()
-            else:
-                # TODO: Show props in module result also in check mode.
-                pass
-            changed = True
-        else:
-            # It exists. Update its properties.
-            storage_group.pull_full_properties()
-            create_props, update_props = \
-                process_properties(cpc, storage_group, params)
-            if create_props:
-                raise AssertionError("Unexpected "
-                                     "create_props: %r" % create_props)
-            if update_props:
-                if not check_mode:
-                    storage_group.update_properties(update_props)
-                    # We refresh the properties after the update, in case an
-                    # input property value gets changed.
-                    storage_group.pull_full_properties()
-                else:
-                    # TODO: Show updated props in mod.result also in chk.mode
-                    pass
-                changed = True
+        reconciler = ResourceReconciler(
+            console.storage_groups, storage_group_name,
+            lambda storage_group: process_properties(
+                cpc, storage_group, params),
+            logger=LOGGER)
+        changed, result = reconciler.reconcile(check_mode)
+        storage_group = reconciler.resource
 
+        selector = result_selector(params)
         if not check_mode:
             if not storage_group:
                 raise AssertionError()
-            result = dict(storage_group.properties)
-            add_artificial_properties(result, storage_group, expand)
+            add_artificial_properties(
+                result, storage_group, expand, expand_properties, selector)
+        result = selector.apply(result)
 
         return changed, result
 
@@ -946,6 +1000,7 @@ def facts(params, check_mode):
     cpc_name = params['cpc_name']
     storage_group_name = params['name']
     expand = params['expand']
+    expand_properties = params.get('expand_properties')
 
     changed = False
     result = {}
@@ -958,7 +1013,8 @@ def facts(params, check_mode):
         cpc = client.cpcs.find(name=cpc_name)
 
         storage_group = console.storage_groups.find(name=storage_group_name)
-        storage_group.pull_full_properties()
+        selector = result_selector(params)
+        selector.pull(storage_group, required=('cpc-uri',))
 
         sg_cpc = storage_group.cpc
         if sg_cpc.uri != cpc.uri:
@@ -968,7 +1024,9 @@ def facts(params, check_mode):
                 format(storage_group_name, cpc.name, sg_cpc.name))
 
         result = dict(storage_group.properties)
-        add_artificial_properties(result, storage_group, expand)
+        add_artificial_properties(
+            result, storage_group, expand, expand_properties, selector)
+        result = selector.apply(result)
 
         return changed, result
 
@@ -1009,7 +1067,16 @@ def main():
                    choices=['absent', 'present', 'facts']),
         properties=dict(required=False, type='dict', default={}),
         expand=dict(required=False, type='bool', default=False),
+        expand_properties=dict(
+            required=False, type='list', elements='str', default=None,
+            choices=['candidate_adapter_ports', 'storage_volumes',
+                     'virtual_storage_resources', 'attached_partitions']),
+        result_properties=result_properties_parameter(),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -1030,7 +1097,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -121,8 +121,38 @@ options:
   partition_name:
     description:
       - The name of the partition for the attachment.
+      - Exactly one of C(partition_name) and C(partition_names) must be
+        specified.
     type: str
-    required: true
+    required: false
+    default: null
+  partition_names:
+    description:
+      - The names of multiple partitions for the attachment (batch mode).
+        The names must be unique.
+      - In batch mode, the partitions attached to the storage group are listed
+        only once, and the storage group is attached to or detached from the
+        partitions that need it, with up to C(max_concurrency) operations
+        running concurrently. If an attach or detach operation fails with
+        HTTP status 409 because the partition is in a transitional status,
+        the module waits for the transition to complete and retries the
+        operation once.
+      - If the operation fails for some partitions, the operations for the
+        other partitions are still performed, and the module fails with the
+        result for each partition in C(storage_group_attachments).
+      - Exactly one of C(partition_name) and C(partition_names) must be
+        specified.
+    type: list
+    elements: str
+    required: false
+    default: null
+  max_concurrency:
+    description:
+      - "Only for batch mode (C(partition_names)): The maximum number of
+         attach or detach operations that run concurrently."
+    type: int
+    required: false
+    default: 10
   state:
     description:
       - "The desired state for the storage group attachment. All states are
@@ -146,6 +176,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -186,6 +233,16 @@ EXAMPLES = """
     partition_name: "{{ my_partition_name }}"
     state: detached
 
+- name: Ensure the storage group is attached to a number of partitions
+  zhmc_storage_group_attachment:
+    hmc_host: "{{ my_hmc_host }}"
+    hmc_auth: "{{ my_hmc_auth }}"
+    cpc_name: "{{ my_cpc_name }}"
+    storage_group_name: "{{ my_storage_group_name }}"
+    partition_names: "{{ my_partition_names }}"
+    state: attached
+  register: sga2
+
 """
 
 RETURN = """
@@ -202,7 +259,7 @@ storage_group_attachment:
   description: "Attachment state of the storage group. If no check mode was
     requested, the attachment state after any changes is returned. If check
     mode was requested, the actual attachment state is returned."
-  returned: success
+  returned: success, if C(partition_name) is specified
   type: dict
   contains:
     attached:
@@ -213,6 +270,39 @@ storage_group_attachment:
     {
         "attached": false
     }
+storage_group_attachments:
+  description: "Only for batch mode (C(partition_names)): Attachment state of
+    the storage group for each of the specified partitions. If no check mode
+    was requested, the attachment state after any changes is returned. If
+    check mode was requested, the actual attachment state is returned.
+    Also returned if the module failed because changing the attachment
+    failed for some partitions."
+  returned: if C(partition_names) is specified
+  type: dict
+  contains:
+    "{name}":
+      description: "Partition name"
+      type: dict
+      contains:
+        attached:
+          description: "Attachment state of the storage group: Indicates
+            whether the storage group is attached to the partition."
+          type: bool
+        error:
+          description: "An error message if changing the attachment failed
+            for the partition, or null."
+          type: str
+  sample:
+    {
+        "part1": {
+            "attached": true,
+            "error": null
+        },
+        "part2": {
+            "attached": false,
+            "error": null
+        }
+    }
 """
 
 import logging  # noqa: E402
@@ -220,8 +310,9 @@ import traceback  # noqa: E402
 from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
-    hmc_auth_parameter, Error, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    hmc_auth_parameter, Error, ParameterError, missing_required_lib, \
+    common_fail_on_import_errors, wait_for_transition_completion, \
+    concurrent_map, find_partition  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -261,9 +352,8 @@ def ensure_attached(params, check_mode):
     try:
         client = zhmcclient.Client(session)
         console = client.consoles.console
-        cpc = client.cpcs.find(name=cpc_name)
+        _, partition = find_partition(client, cpc_name, partition_name)
         storage_group = console.storage_groups.find(name=storage_group_name)
-        partition = cpc.partitions.find(name=partition_name)
         # The default exception handling is sufficient for the above.
 
         attached_partitions = storage_group.list_attached_partitions(
@@ -312,9 +402,8 @@ def ensure_detached(params, check_mode):
     try:
         client = zhmcclient.Client(session)
         console = client.consoles.console
-        cpc = client.cpcs.find(name=cpc_name)
+        _, partition = find_partition(client, cpc_name, partition_name)
         storage_group = console.storage_groups.find(name=storage_group_name)
-        partition = cpc.partitions.find(name=partition_name)
         # The default exception handling is sufficient for the above.
 
         attached_partitions = storage_group.list_attached_partitions(
@@ -363,9 +452,8 @@ def facts(params, check_mode):
     try:
         client = zhmcclient.Client(session)
         console = client.consoles.console
-        cpc = client.cpcs.find(name=cpc_name)
+        find_partition(client, cpc_name, partition_name)  # check existance
         storage_group = console.storage_groups.find(name=storage_group_name)
-        cpc.partitions.find(name=partition_name)  # check existance
         # The default exception handling is sufficient for the above.
 
         attached_partitions = storage_group.list_attached_partitions(
@@ -390,6 +478,146 @@ def facts(params, check_mode):
         close_session(session, logoff)
 
 
+def change_attachment(partition, storage_group, attach):
+    """
+    Attach the storage group to the partition or detach it from the partition.
+
+    If the operation fails with HTTP status 409 (e.g. because the partition is
+    in a transitional status such as 'starting' or 'stopping'), wait for the
+    completion of any transition of the partition, and retry the operation
+    once.
+
+    Raises:
+      StatusError: The partition is in one of BAD_STATUSES.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+    if attach:
+        operation = partition.attach_storage_group
+    else:
+        operation = partition.detach_storage_group
+    try:
+        operation(storage_group)
+    except zhmcclient.HTTPError as exc:
+        if exc.http_status != 409:
+            raise
+        LOGGER.debug(
+            "Retrying to %s storage group %r %s partition %r after waiting "
+            "for transition completion (HTTPError: %s)",
+            'attach' if attach else 'detach', storage_group.name,
+            'to' if attach else 'from', partition.name, exc)
+        wait_for_transition_completion(partition)
+        operation(storage_group)
+
+
+def perform_batch_task(params, check_mode):
+    """
+    Perform the task for this module in batch mode, i.e. for the partitions
+    specified in the 'partition_names' module parameter, dependent on the
+    'state' module parameter.
+
+    The partitions of the CPC and the partitions attached to the storage group
+    are each listed only once, and the attach or detach operations that are
+    needed are performed concurrently.
+
+    If check_mode is True, check whether changes would occur, but don't
+    actually perform any changes.
+
+    Raises:
+      ParameterError: An issue with the module parameters.
+      StatusError: A partition is in one of BAD_STATUSES.
+      zhmcclient.Error: Any zhmcclient exception can happen.
+    """
+
+    cpc_name = params['cpc_name']
+    storage_group_name = params['storage_group_name']
+    partition_names = params['partition_names']
+    max_concurrency = params['max_concurrency']
+    state = params['state']
+
+    if len(set(partition_names)) != len(partition_names):
+        raise ParameterError(
+            "Partitions in the 'partition_names' module parameter are not "
+            "unique: {0!r}".format(partition_names))
+
+    changed = False
+
+    session, logoff = open_session(params)
+    try:
+        client = zhmcclient.Client(session)
+        console = client.consoles.console
+        cpc = client.cpcs.find(name=cpc_name)
+        storage_group = console.storage_groups.find(name=storage_group_name)
+        # The default exception handling is sufficient for the above.
+
+        partitions = dict(
+            (part.name, part) for part in cpc.partitions.list())
+        missing_names = [
+            name for name in partition_names if name not in partitions]
+        if missing_names:
+            raise ParameterError(
+                "Partitions {0!r} do not exist in CPC {1!r}.".
+                format(missing_names, cpc_name))
+
+        attached_names = set(
+            part.name for part in storage_group.list_attached_partitions())
+        attached = dict(
+            (name, name in attached_names) for name in partition_names)
+
+        if state == 'attached':
+            change_names = [
+                name for name in partition_names if not attached[name]]
+        elif state == 'detached':
+            change_names = [
+                name for name in partition_names if attached[name]]
+        else:
+            change_names = []
+
+        errors = dict((name, None) for name in partition_names)
+        if change_names:
+            LOGGER.debug(
+                "Need to %s storage group %r for partitions %r",
+                state[:-2], storage_group_name, change_names)
+            if check_mode:
+                changed = True
+            else:
+                attach = (state == 'attached')
+
+                def change_partition(name):
+                    """
+                    Change the attachment for one partition, and return an
+                    error message if that failed, or None.
+                    """
+                    try:
+                        change_attachment(
+                            partitions[name], storage_group, attach)
+                    except (Error, zhmcclient.Error) as exc:
+                        msg = "{0}: {1}".format(exc.__class__.__name__, exc)
+                        LOGGER.debug(
+                            "Failed to %s storage group %r for partition "
+                            "%r: %s", state[:-2], storage_group_name, name,
+                            msg)
+                        return msg
+                    return None
+
+                change_errors = concurrent_map(
+                    change_partition, change_names, max_concurrency)
+                for name, error in zip(change_names, change_errors):
+                    if error:
+                        errors[name] = error
+                    else:
+                        attached[name] = attach
+                        changed = True
+
+        result = dict(
+            (name, dict(attached=attached[name], error=errors[name]))
+            for name in partition_names)
+
+        return changed, result
+
+    finally:
+        close_session(session, logoff)
+
+
 def perform_task(params, check_mode):
     """
     Perform the task for this module, dependent on the 'state' module
@@ -407,6 +635,8 @@ def perform_task(params, check_mode):
         "attached": ensure_attached,
         "facts": facts,
     }
+    if params.get('partition_names') is not None:
+        return perform_batch_task(params, check_mode)
     return actions[params['state']](params, check_mode)
 
 
@@ -419,15 +649,24 @@ def main():
         hmc_auth=hmc_auth_parameter(),
         cpc_name=dict(required=True, type='str'),
         storage_group_name=dict(required=True, type='str'),
-        partition_name=dict(required=True, type='str'),
+        partition_name=dict(required=False, type='str', default=None),
+        partition_names=dict(required=False, type='list', elements='str',
+                             default=None),
+        max_concurrency=dict(required=False, type='int', default=10),
         state=dict(required=True, type='str',
                    choices=['detached', 'attached', 'facts']),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
     module = AnsibleModule(
         argument_spec=argument_spec,
+        mutually_exclusive=[('partition_name', 'partition_names')],
+        required_one_of=[('partition_name', 'partition_names')],
         supports_check_mode=True)
 
     if IMP_URLLIB3_ERR is not None:
@@ -443,7 +682,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -464,9 +704,24 @@ def main():
     # Other exceptions are considered module errors and are handled by Ansible
     # by showing the traceback.
 
-    LOGGER.debug(
-        "Module exit (success): changed: %r, cpc: %r", changed, result)
-    module.exit_json(changed=changed, storage_group_attachment=result)
+    if module.params['partition_names'] is not None:
+        failed = [name for name in module.params['partition_names']
+                  if result[name]['error']]
+        if failed:
+            msg = "Changing the attachment failed for {0} of {1} " \
+                "partitions: {2}".format(
+                    len(failed), len(result), ", ".join(failed))
+            LOGGER.debug(
+                "Module exit (failure): msg: %s", msg)
+            module.fail_json(
+                msg=msg, changed=changed, storage_group_attachments=result)
+        LOGGER.debug(
+            "Module exit (success): changed: %r, cpc: %r", changed, result)
+        module.exit_json(changed=changed, storage_group_attachments=result)
+    else:
+        LOGGER.debug(
+            "Module exit (success): changed: %r, cpc: %r", changed, result)
+        module.exit_json(changed=changed, storage_group_attachment=result)
 
 
 if __name__ == '__main__':
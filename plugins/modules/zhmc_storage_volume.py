@@ -164,6 +164,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -271,8 +288,8 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, eq_hex, to_unicode, \
-    process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    process_normal_property, PropertySchema, missing_required_lib, \
+    common_fail_on_import_errors, ResourceReconciler  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -346,6 +363,8 @@ ZHMC_STORAGE_VOLUME_PROPERTIES = {
     # 'type': 'fc' or 'fcp', as defined in its storage group
 }
 
+ZHMC_STORAGE_VOLUME_SCHEMA = PropertySchema(ZHMC_STORAGE_VOLUME_PROPERTIES)
+
 
 def process_properties(cpc, storage_group, storage_volume, params):
     """
@@ -407,22 +426,19 @@ def process_properties(cpc, storage_group, storage_volume, params):
         input_props = {}
     for prop_name in input_props:
 
-        if prop_name not in ZHMC_STORAGE_VOLUME_PROPERTIES:
+        if prop_name not in ZHMC_STORAGE_VOLUME_SCHEMA:
             raise ParameterError(
                 "Property {0!r} is not defined in the data model for "
                 "storage volumes.".format(prop_name))
 
-        allowed, create, update, update_while_active, eq_func, type_cast = \
-            ZHMC_STORAGE_VOLUME_PROPERTIES[prop_name]
-
-        if not allowed:
+        if prop_name not in ZHMC_STORAGE_VOLUME_SCHEMA.allowed_names:
             raise ParameterError(
                 "Property {0!r} is not allowed in the 'properties' module "
                 "parameter.".format(prop_name))
 
         # Process a normal (= non-artificial) property
         _create_props, _update_props, _stop = process_normal_property(
-            prop_name, ZHMC_STORAGE_VOLUME_PROPERTIES, input_props,
+            prop_name, ZHMC_STORAGE_VOLUME_SCHEMA, input_props,
             storage_volume)
         create_props.update(_create_props)
         update_props.update(_update_props)
@@ -461,9 +477,6 @@ def ensure_present(params, check_mode):
     storage_group_name = params['storage_group_name']
     storage_volume_name = params['name']
 
-    changed = False
-    result = {}
-
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
@@ -479,63 +492,21 @@ def ensure_present(params, check_mode):
                 "CPC {1!r}, but with CPC {2!r}.".
                 format(storage_group_name, cpc.name, sg_cpc.name))
 
-        try:
-            storage_volume = storage_group.storage_volumes.find(
-                name=storage_volume_name)
-        except zhmcclient.NotFound:
-            storage_volume = None
-        except zhmcclient.NoUniqueMatch:
-            # The name of storage volumes within their storage group is not
-            # enforced to be unique.
-            raise
-
-        if storage_volume is None:
-            # It does not exist. Create it and update it if there are
-            # update-only properties.
-            if not check_mode:
-                create_props, update_props = \
-                    process_properties(cpc, storage_group, storage_volume,
-                                       params)
-                storage_volume = storage_group.storage_volumes.create(
-                    create_props)
-                update2_props = {}
-                for name, value in update_props.items():
-                    if name not in create_props:
-                        update2_props[name] = value
-                if update2_props:
-                    storage_volume.update_properties(update2_props)
-                # We refresh the properties after the update, in case an
-                # input property value gets changed.
-                storage_volume.pull_full_properties()
-            else:
-                # TODO: Show props in module result also in check mode.
-                pass
-            changed = True
-        else:
-            # It exists. Update its properties.
-            storage_volume.pull_full_properties()
-            create_props, update_props = \
-                process_properties(cpc, storage_group, storage_volume, params)
-            if create_props:
-                raise AssertionError("Unexpected "
-                                     "create_props: %r" % create_props)
-            if update_props:
-                if not check_mode:
-                    storage_volume.update_properties(update_props)
-                    # We refresh the properties after the update, in case an
-                    # input property value gets changed.
-                    storage_volume.pull_full_properties()
-                else:
-                    # TODO: Show updated props in mod.result also in chk.mode
-                    storage_volume.pull_full_properties()
-                changed = True
+        # The name of storage volumes within their storage group is not
+        # enforced to be unique, so zhmcclient.NoUniqueMatch may be raised.
+        reconciler = ResourceReconciler(
+            storage_group.storage_volumes, storage_volume_name,
+            lambda storage_volume: process_properties(
+                cpc, storage_group, storage_volume, params),
+            logger=LOGGER)
+        changed, result = reconciler.reconcile(check_mode)
+        storage_volume = reconciler.resource
 
         if not check_mode:
             if not storage_volume:
                 raise AssertionError()
 
         if storage_volume:
-            result = dict(storage_volume.properties)
             add_artificial_properties(result, storage_volume)
 
         return changed, result
@@ -678,6 +649,10 @@ def main():
                    choices=['absent', 'present', 'facts']),
         properties=dict(required=False, type='dict', default={}),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -698,7 +673,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
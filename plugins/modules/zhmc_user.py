@@ -158,6 +158,35 @@ options:
     type: bool
     required: false
     default: false
+  result_properties:
+    description:
+      - "Selects the properties that are returned in the C(user) result, by
+         their names in the data model for users or the names of the
+         artificial properties described for the result. Names may be
+         specified with underscores instead of hyphens. The 'name' property
+         is always returned. If null, all properties are returned."
+      - "The user roles, user pattern, password rule and LDAP server
+         definition of the user are retrieved from the HMC only if at least
+         one of the artificial properties for them is selected."
+    type: dict
+    required: false
+    default: null
+    suboptions:
+      include:
+        description:
+          - "Names of the properties to be returned. If null, all properties
+             are returned that are not excluded."
+        type: list
+        elements: str
+        required: false
+        default: null
+      exclude:
+        description:
+          - "Names of the properties not to be returned."
+        type: list
+        elements: str
+        required: false
+        default: null
   log_file:
     description:
       - "File path of a log file to which the logic flow of this module as well
@@ -166,6 +195,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -393,6 +439,7 @@ user:
     }
 """
 
+import functools  # noqa: E402
 import uuid  # noqa: E402
 import logging  # noqa: E402
 import traceback  # noqa: E402
@@ -400,8 +447,9 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, to_unicode, \
-    process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    process_normal_property, PropertySchema, missing_required_lib, \
+    common_fail_on_import_errors, result_properties_parameter, \
+    ResultSelector, ResourceReconciler  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -513,6 +561,8 @@ ZHMC_USER_PROPERTIES = {
     'user_role_objects': (False, False, False, None, None, None),
 }
 
+ZHMC_USER_SCHEMA = PropertySchema(ZHMC_USER_PROPERTIES)
+
 
 def process_properties(console, user, params):
     """
@@ -572,15 +622,12 @@ def process_properties(console, user, params):
 
     for prop_name in input_props:
 
-        if prop_name not in ZHMC_USER_PROPERTIES:
+        if prop_name not in ZHMC_USER_SCHEMA:
             raise ParameterError(
                 "Property {0!r} is not defined in the data model for "
                 "users.".format(prop_name))
 
-        allowed, create, update, update_while_active, eq_func, type_cast = \
-            ZHMC_USER_PROPERTIES[prop_name]
-
-        if not allowed:
+        if prop_name not in ZHMC_USER_SCHEMA.allowed_names:
             raise ParameterError(
                 "Property {0!r} is not allowed in the 'properties' module "
                 "parameter.".format(prop_name))
@@ -692,7 +739,7 @@ def process_properties(console, user, params):
 
         # Process a normal (= non-artificial) property
         _create_props, _update_props, _stop = process_normal_property(
-            prop_name, ZHMC_USER_PROPERTIES, input_props, user)
+            prop_name, ZHMC_USER_SCHEMA, input_props, user)
         create_props.update(_create_props)
         update_props.update(_update_props)
         if _stop:
@@ -701,11 +748,12 @@ def process_properties(console, user, params):
 
 
 def add_artificial_properties(
-        user_properties, console, user, expand, check_mode):
+        user_properties, console, user, expand, check_mode, selector=None):
     """
     Add artificial properties to the user_properties dict.
 
-    Upon return, the user_properties dict has been extended by these properties:
+    Upon return, the user_properties dict has been extended by these
+    properties, or if a ResultSelector is specified, by those it selects:
 
     Regardless of expand:
 
@@ -754,10 +802,18 @@ def add_artificial_properties(
     # in check mode it is a local User object that does not exist on the HMC.
     # In that case, we cannot retrieve properties from the HMC, so we take them
     # from the user object directly.
+    if selector is None:
+        selector = ResultSelector(None)
+
+    def selected(name_prop, expand_prop):
+        return selector.selected(name_prop) or \
+            (expand and selector.selected(expand_prop))
+
     type_ = user.properties['type']
     auth_type = user.properties['authentication-type']
 
-    if type_ == 'pattern-based':
+    if type_ == 'pattern-based' and \
+            selected('user-pattern-name', 'user-pattern'):
         # For that type, the property exists, but may be null.
         # Note: For other types, the property does not exist.
         user_pattern_uri = user.properties['user-pattern-uri']
@@ -772,7 +828,8 @@ def add_artificial_properties(
             if expand:
                 user_properties['user-pattern'] = None
 
-    if auth_type == 'local':
+    if auth_type == 'local' and \
+            selected('password-rule-name', 'password-rule'):
         # For that auth type, the property exists and is non-null.
         # Note: For other auth types, the property does not exist.
         password_rule_uri = user.properties['password-rule-uri']
@@ -789,7 +846,8 @@ def add_artificial_properties(
             if expand:
                 user_properties['password-rule'] = None
 
-    if auth_type == 'ldap':
+    if auth_type == 'ldap' and \
+            selected('ldap-server-definition-name', 'ldap-server-definition'):
         # For that auth type, the property exists and is non-null.
         # Note: For other auth types, the property exists and is null.
         ldap_srv_def_uri = user.properties['ldap-server-definition-uri']
@@ -806,16 +864,17 @@ def add_artificial_properties(
             if expand:
                 user_properties['ldap-server-definition'] = None
 
-    user_roles = []
-    user_role_uris = user.properties['user-roles']
-    for user_role_uri in user_role_uris:
-        user_role = console.user_roles.resource_object(user_role_uri)
-        user_role.pull_full_properties()
-        user_roles.append(user_role)
-    user_properties['user-role-names'] = [ur.name for ur in user_roles]
-    if expand:
-        user_properties['user-role-objects'] = \
-            [dict(ur.properties) for ur in user_roles]
+    if selected('user-role-names', 'user-role-objects'):
+        user_roles = []
+        user_role_uris = user.properties['user-roles']
+        for user_role_uri in user_role_uris:
+            user_role = console.user_roles.resource_object(user_role_uri)
+            user_role.pull_full_properties()
+            user_roles.append(user_role)
+        user_properties['user-role-names'] = [ur.name for ur in user_roles]
+        if expand:
+            user_properties['user-role-objects'] = \
+                [dict(ur.properties) for ur in user_roles]
 
 
 def create_check_mode_user(console, create_props, update_props):
@@ -936,102 +995,61 @@ def ensure_present(params, check_mode):
     user_name = params['name']
     expand = params['expand']
 
-    changed = False
-    result = {}
-
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
         console = client.consoles.console
         # The default exception handling is sufficient for the above.
 
-        try:
-            user = console.users.find(name=user_name)
-        except zhmcclient.NotFound:
-            user = None
+        # User roles to be added and removed, as determined when processing
+        # the properties
+        roles = {}
 
-        if user is None:
-            # It does not exist. Create it and update it if there are
-            # update-only properties.
-            create_props, update_props, add_roles, rem_roles = \
+        def process_user_properties(user):
+            create_props, update_props, roles['add'], roles['remove'] = \
                 process_properties(console, user, params)
-            update2_props = {}
-            for name, value in update_props.items():
-                if name not in create_props:
-                    update2_props[name] = value
-            if not check_mode:
-                user = console.users.create(create_props)
-                if update2_props:
-                    user.update_properties(update2_props)
-                # We refresh the properties after the update, in case an
-                # input property value gets changed.
-                user.pull_full_properties()
-            else:
-                # Create a User object locally
-                user = create_check_mode_user(
-                    console, create_props, update2_props)
-            result = dict(user.properties)
-            changed = True
-            for role in add_roles:
-                LOGGER.debug(
-                    "Adding role %r to user %r", role.name, user_name)
-                if not check_mode:
-                    user.add_user_role(role)
-                if 'user-roles' not in result:
-                    result['user-roles'] = []
-                result['user-roles'].append(role.uri)
-            if rem_roles:
-                raise AssertionError(
-                    "Unexpected attempt to remove user roles {0!r} from newly "
-                    "created user {1!r}".format(rem_roles, user.name))
-        else:
-            # It exists. Update its properties.
-            user.pull_full_properties()
-            result = dict(user.properties)
-            create_props, update_props, add_roles, rem_roles = \
-                process_properties(console, user, params)
-            if create_props:
-                raise AssertionError("Unexpected "
-                                     "create_props: %r" % create_props)
-            if update_props:
-                LOGGER.debug(
-                    "Existing user %r needs to get properties updated: %r",
-                    user_name, update_props)
-                if not check_mode:
-                    user.update_properties(update_props)
-                    # We refresh the properties after the update, in case an
-                    # input property value gets changed.
-                    user.pull_full_properties()
-                    result = dict(user.properties)
-                else:
-                    # Update the local User object's properties
-                    result.update(update_props)
-                changed = True
-            for role in add_roles:
-                LOGGER.debug(
-                    "Adding role %r to user %r", role.name, user_name)
-                if not check_mode:
-                    user.add_user_role(role)
-                if 'user-roles' not in result:
-                    result['user-roles'] = []
-                result['user-roles'].append(role.uri)
-                changed = True
-            for role in rem_roles:
-                LOGGER.debug(
-                    "Removing role %r from user %r", role.name, user_name)
-                if not check_mode:
-                    user.remove_user_role(role)
-                if 'user-roles' not in result:
-                    raise AssertionError(
-                        "User {0!r} unexpectedly does not have a "
-                        "'user-roles' property".format(user.name))
-                result['user-roles'].remove(role.uri)
-                changed = True
+            return create_props, update_props
+
+        reconciler = ResourceReconciler(
+            console.users, user_name, process_user_properties,
+            check_mode_func=functools.partial(
+                create_check_mode_user, console),
+            logger=LOGGER)
+        changed, result = reconciler.reconcile(check_mode)
+        user = reconciler.resource
 
         if not user:
             raise AssertionError()
 
-        add_artificial_properties(result, console, user, expand, check_mode)
+        if reconciler.created and roles['remove']:
+            raise AssertionError(
+                "Unexpected attempt to remove user roles {0!r} from newly "
+                "created user {1!r}".format(roles['remove'], user.name))
+        for role in roles['add']:
+            LOGGER.debug(
+                "Adding role %r to user %r", role.name, user_name)
+            if not check_mode:
+                user.add_user_role(role)
+            if 'user-roles' not in result:
+                result['user-roles'] = []
+            result['user-roles'].append(role.uri)
+            changed = True
+        for role in roles['remove']:
+            LOGGER.debug(
+                "Removing role %r from user %r", role.name, user_name)
+            if not check_mode:
+                user.remove_user_role(role)
+            if 'user-roles' not in result:
+                raise AssertionError(
+                    "User {0!r} unexpectedly does not have a "
+                    "'user-roles' property".format(user.name))
+            result['user-roles'].remove(role.uri)
+            changed = True
+
+        selector = ResultSelector(params.get('result_properties', None))
+        add_artificial_properties(
+            result, console, user, expand, check_mode, selector)
+        result = selector.apply(result)
 
         return changed, result
 
@@ -1099,7 +1117,10 @@ def facts(params, check_mode):
         user.pull_full_properties()
 
         result = dict(user.properties)
-        add_artificial_properties(result, console, user, expand, check_mode)
+        selector = ResultSelector(params.get('result_properties', None))
+        add_artificial_properties(
+            result, console, user, expand, check_mode, selector)
+        result = selector.apply(result)
 
         return changed, result
 
@@ -1139,7 +1160,12 @@ def main():
                    choices=['absent', 'present', 'facts']),
         properties=dict(required=False, type='dict', default={}),
         expand=dict(required=False, type='bool', default=False),
+        result_properties=result_properties_parameter(),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -1160,7 +1186,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
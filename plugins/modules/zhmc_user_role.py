@@ -237,6 +237,23 @@ options:
     type: str
     required: false
     default: null
+  log_level:
+    description:
+      - "Log level for the logic flow of this module. Log calls below this
+         level are skipped."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
+  hmc_log_level:
+    description:
+      - "Log level for the interactions with the HMC. At level C(debug), the
+         bodies of the HTTP requests and responses are logged, which can be
+         large."
+    type: str
+    choices: ['debug', 'info', 'warning', 'error']
+    required: false
+    default: debug
   _faked_session:
     description:
       - "An internal parameter used for testing the module."
@@ -431,6 +448,7 @@ user_role:
     }
 """
 
+import functools  # noqa: E402
 import uuid  # noqa: E402
 import logging  # noqa: E402
 import traceback  # noqa: E402
@@ -438,8 +456,8 @@ from ansible.module_utils.basic import AnsibleModule  # noqa: E402
 
 from ..module_utils.common import log_init, open_session, close_session, \
     hmc_auth_parameter, Error, ParameterError, to_unicode, \
-    process_normal_property, missing_required_lib, \
-    common_fail_on_import_errors  # noqa: E402
+    process_normal_property, PropertySchema, missing_required_lib, \
+    common_fail_on_import_errors, ResourceReconciler  # noqa: E402
 
 try:
     import requests.packages.urllib3
@@ -501,6 +519,8 @@ ZHMC_USER_ROLE_PROPERTIES = {
     'type': (False, False, False, True, None, None),
 }
 
+ZHMC_USER_ROLE_SCHEMA = PropertySchema(ZHMC_USER_ROLE_PROPERTIES)
+
 
 def process_properties(client, urole, params):
     """
@@ -569,15 +589,12 @@ def process_properties(client, urole, params):
 
     for prop_name in input_props:
 
-        if prop_name not in ZHMC_USER_ROLE_PROPERTIES:
+        if prop_name not in ZHMC_USER_ROLE_SCHEMA:
             raise ParameterError(
                 "Property {0!r} is not defined in the data model for "
                 "user roles.".format(prop_name))
 
-        allowed, create, update, update_while_active, eq_func, type_cast = \
-            ZHMC_USER_ROLE_PROPERTIES[prop_name]
-
-        if not allowed:
+        if prop_name not in ZHMC_USER_ROLE_SCHEMA.allowed_names:
             raise ParameterError(
                 "Property {0!r} is not allowed in the 'properties' module "
                 "parameter.".format(prop_name))
@@ -615,7 +632,7 @@ def process_properties(client, urole, params):
 
         # Process a normal (= non-artificial) property
         _create_props, _update_props, _stop = process_normal_property(
-            prop_name, ZHMC_USER_ROLE_PROPERTIES, input_props, urole)
+            prop_name, ZHMC_USER_ROLE_SCHEMA, input_props, urole)
         create_props.update(_create_props)
         update_props.update(_update_props)
         if _stop:
@@ -1040,45 +1057,39 @@ def ensure_present(params, check_mode):
 
     urole_name = params['name']
 
-    changed = False
-    result = {}
-
     session, logoff = open_session(params)
     try:
         client = zhmcclient.Client(session)
         console = client.consoles.console
         # The default exception handling is sufficient for the above.
 
-        try:
-            urole = console.user_roles.find(name=urole_name)
-        except zhmcclient.NotFound:
-            urole = None
-
-        if urole is None:
-            # It does not exist. Create it and update it if there are
-            # update-only properties.
-            create_props, update_props, cur_perms, add_perms, rem_perms = \
-                process_properties(client, urole, params)
-            update2_props = {}
-            for name, value in update_props.items():
-                if name not in create_props:
-                    update2_props[name] = value
-            if not check_mode:
-                urole = console.user_roles.create(create_props)
-                if update2_props:
-                    urole.update_properties(update2_props)
-                # We refresh the properties after the update, in case an
-                # input property value gets changed.
-                urole.pull_full_properties()
-            else:
-                # Create a User Role object locally
-                urole = create_check_mode_urole(
-                    client, create_props, update2_props)
-            result = dict(urole.properties)
-            changed = True
-
-            for perm_key in rem_perms:
-                opt_kwargs, obj = rem_perms[perm_key]
+        # Current permissions and permissions to be added and removed, as
+        # determined when processing the properties
+        perms = {}
+
+        def process_urole_properties(urole):
+            create_props, update_props, perms['current'], perms['add'], \
+                perms['remove'] = process_properties(client, urole, params)
+            if urole:
+                # Create-only properties are ignored for an existing user role
+                create_props = {}
+            return create_props, update_props
+
+        reconciler = ResourceReconciler(
+            console.user_roles, urole_name, process_urole_properties,
+            check_mode_func=functools.partial(
+                create_check_mode_urole, client),
+            logger=LOGGER)
+        changed, result = reconciler.reconcile(check_mode)
+        urole = reconciler.resource
+
+        if not urole:
+            raise AssertionError()
+
+        cur_perms = perms['current']
+        if reconciler.created or reconciler.update_props:
+            for perm_key in perms['remove']:
+                opt_kwargs, obj = perms['remove'][perm_key]
                 if obj is None:  # resource class
                     kwargs = dict(permitted_object=perm_key)
                 else:
@@ -1090,8 +1101,8 @@ def ensure_present(params, check_mode):
                 if not check_mode:
                     urole.remove_permission(**kwargs)
                 del cur_perms[perm_key]
-            for perm_key in add_perms:
-                opt_kwargs, obj = add_perms[perm_key]
+            for perm_key in perms['add']:
+                opt_kwargs, obj = perms['add'][perm_key]
                 if obj is None:  # resource class
                     kwargs = dict(permitted_object=perm_key)
                 else:
@@ -1102,58 +1113,7 @@ def ensure_present(params, check_mode):
                     kwargs, urole_name)
                 if not check_mode:
                     urole.add_permission(**kwargs)
-                cur_perms[perm_key] = add_perms[perm_key]
-
-        else:
-            # It exists. Update its properties.
-            urole.pull_full_properties()
-            result = dict(urole.properties)
-            create_props, update_props, cur_perms, add_perms, rem_perms = \
-                process_properties(client, urole, params)
-            if update_props:
-                LOGGER.debug(
-                    "Existing user role %r needs to get properties "
-                    "updated: %r", urole_name, update_props)
-                if not check_mode:
-                    urole.update_properties(update_props)
-                    # We refresh the properties after the update, in case an
-                    # input property value gets changed.
-                    urole.pull_full_properties()
-                    result = dict(urole.properties)
-                else:
-                    # Update the local User Role object's properties
-                    result.update(update_props)
-                changed = True
-
-                for perm_key in rem_perms:
-                    opt_kwargs, obj = rem_perms[perm_key]
-                    if obj is None:  # resource class
-                        kwargs = dict(permitted_object=perm_key)
-                    else:
-                        kwargs = dict(permitted_object=obj)
-                    kwargs.update(opt_kwargs)
-                    LOGGER.debug(
-                        "Removing permission %r from user role %r",
-                        kwargs, urole_name)
-                    if not check_mode:
-                        urole.remove_permission(**kwargs)
-                    del cur_perms[perm_key]
-                for perm_key in add_perms:
-                    opt_kwargs, obj = add_perms[perm_key]
-                    if obj is None:  # resource class
-                        kwargs = dict(permitted_object=perm_key)
-                    else:
-                        kwargs = dict(permitted_object=obj)
-                    kwargs.update(opt_kwargs)
-                    LOGGER.debug(
-                        "Adding permission %r to user role %r",
-                        kwargs, urole_name)
-                    if not check_mode:
-                        urole.add_permission(**kwargs)
-                    cur_perms[perm_key] = add_perms[perm_key]
-
-        if not urole:
-            raise AssertionError()
+                cur_perms[perm_key] = perms['add'][perm_key]
 
         # Process artificial properties
 
@@ -1282,6 +1242,10 @@ def main():
                    choices=['absent', 'present', 'facts']),
         properties=dict(required=False, type='dict', default={}),
         log_file=dict(required=False, type='str', default=None),
+        log_level=dict(required=False, type='str', default='debug',
+                       choices=['debug', 'info', 'warning', 'error']),
+        hmc_log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
         _faked_session=dict(required=False, type='raw'),
     )
 
@@ -1302,7 +1266,8 @@ def main():
     common_fail_on_import_errors(module)
 
     log_file = module.params['log_file']
-    log_init(LOGGER_NAME, log_file)
+    log_init(LOGGER_NAME, log_file, module.params['log_level'],
+             module.params['hmc_log_level'])
 
     _params = dict(module.params)
     del _params['hmc_auth']
@@ -0,0 +1,49 @@
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Pytest configuration for all tests.
+
+The tests are isolated from each other and from the environment of the
+developer, so that they can run in parallel with pytest-xdist.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import pytest
+
+from plugins.module_utils import common as module_utils
+
+
+@pytest.fixture(autouse=True)
+def isolated_module_utils(tmp_path, monkeypatch):
+    """
+    Isolate the state of the module utilities that persists across module
+    invocations, for each test:
+
+    * The ZHMC_* environment variables that configure the modules are
+      removed. This also disables the name-URI cache for faked sessions.
+    * The wait history uses a file in the temporary directory of the test.
+    * The cached default retry policy and wait strategy are reset.
+    """
+    for name in list(os.environ):
+        if name.startswith('ZHMC_'):
+            monkeypatch.delenv(name)
+    monkeypatch.setattr(
+        module_utils, 'DEFAULT_WAIT_HISTORY_FILE',
+        str(tmp_path / 'wait_history.json'))
+    monkeypatch.setattr(module_utils, '_RETRY_POLICY', [])
+    monkeypatch.setattr(module_utils, '_WAIT_STRATEGY', [])
@@ -0,0 +1,86 @@
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Pytest configuration for end2end testing.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import pytest
+# The session setup for real HMCs is reused from the zhmcclient fixture
+from zhmcclient.testutils._hmc_definition_fixtures import \
+    setup_hmc_session, teardown_hmc_session
+
+from .utils import faked_session, mocked_hmc_report, MOCKED_HMC_STATS, \
+    add_mocked_hmc_stats
+
+
+@pytest.fixture(scope='module')
+def hmc_session(request, hmc_definition):
+    # pylint: disable=redefined-outer-name,unused-argument
+    """
+    Pytest fixture representing the set of HMC sessions to run a test against.
+
+    This fixture replaces the zhmcclient.testutils.hmc_session fixture, and
+    uses the hmc_definition fixture that is imported by the test modules.
+    For mocked HMCs, the faked session is created from a snapshot by
+    faked_session(), instead of parsing the mock file for each test module.
+    For real HMCs, the session is set up like in the zhmcclient fixture.
+    """
+    hd = hmc_definition
+    if hd.mock_file:
+        session = faked_session(hd)
+        hd.host = session.host
+        hd.skip_msg = None
+        session.hmc_definition = hd
+    else:
+        session = setup_hmc_session(hd)
+    yield session
+    teardown_hmc_session(session)
+
+
+def pytest_sessionfinish(session):
+    """
+    In a pytest-xdist worker process, pass the timing statistics for setting
+    up the mocked HMCs to the controller process.
+    """
+    workeroutput = getattr(session.config, 'workeroutput', None)
+    if workeroutput is not None:
+        workeroutput['mocked_hmc_stats'] = dict(MOCKED_HMC_STATS)
+
+
+@pytest.hookimpl(optionalhook=True)
+def pytest_testnodedown(node, error):
+    # pylint: disable=unused-argument
+    """
+    In the pytest-xdist controller process, add the timing statistics for
+    setting up the mocked HMCs of a worker process that has finished.
+    """
+    stats = getattr(node, 'workeroutput', {}).get('mocked_hmc_stats')
+    if stats:
+        add_mocked_hmc_stats(stats)
+
+
+def pytest_terminal_summary(terminalreporter):
+    """
+    Show the timing report for setting up the mocked HMCs, including the
+    pytest-xdist worker processes.
+    """
+    lines = mocked_hmc_report()
+    if lines:
+        terminalreporter.write_sep('-', 'mocked HMC setup')
+        for line in lines:
+            terminalreporter.write_line(line)
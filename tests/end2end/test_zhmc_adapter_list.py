@@ -24,19 +24,19 @@ import mock
 import requests.packages.urllib3
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 from zhmcclient.testutils import dpm_mode_cpcs  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_adapter_list
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_adapter_list.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_adapter_list.log') if DEBUG else None
 
 
 def get_module_output(mod_obj):
@@ -46,7 +46,8 @@ def get_module_output(mod_obj):
     If the module failed, return None.
     """
 
-    def func(changed, adapters):
+    def func(changed, adapters, removed, token):
+        # pylint: disable=unused-argument
         return changed, adapters
 
     if not mod_obj.exit_json.called:
@@ -215,7 +216,10 @@ def test_zhmc_adapter_list(
             'adapter_family': filter_args_module.get('adapter_family', None),
             'type': filter_args_module.get('type', None),
             'status': filter_args_module.get('status', None),
+            'since_token': None,
             'log_file': LOG_FILE,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': faked_session,
         }
 
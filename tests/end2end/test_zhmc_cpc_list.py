@@ -24,18 +24,18 @@ import mock
 import requests.packages.urllib3
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_cpc_list
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_cpc_list.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_cpc_list.log') if DEBUG else None
 
 
 def get_module_output(mod_obj):
@@ -58,11 +58,15 @@ def get_module_output(mod_obj):
 
 
 def assert_cpc_list(
-        cpc_list, include_unmanaged_cpcs, exp_cpc_dict, exp_um_cpc_dict):
+        cpc_list, include_unmanaged_cpcs, exp_cpc_dict, exp_um_cpc_dict,
+        full_properties=False, expand_children=None):
     """
     Assert the output of the zhmc_cpc_list module
     """
 
+    if expand_children is None:
+        expand_children = []
+
     # Apply default for include_unmanaged_cpcs parameter
     # (explicit is better than implicit)
     if include_unmanaged_cpcs is None:
@@ -99,6 +103,11 @@ def assert_cpc_list(
                 # Handle artificial properties
                 if pname == 'is_managed':
                     continue
+                if pname in expand_children:
+                    assert isinstance(pvalue, list), \
+                        "Child resources {pn!r} of CPC {rn!r} are not a " \
+                        "list".format(pn=pname, rn=cpc_name)
+                    continue
 
                 # Verify normal properties
                 pname_hmc = pname.replace('_', '-')
@@ -115,6 +124,28 @@ def assert_cpc_list(
                     "Result contains unexpected unmanaged CPC: {rn!r}". \
                     format(rn=cpc_name)
 
+        if is_managed:
+            exp_cpc = exp_cpc_dict[cpc_name]
+            if full_properties:
+                for pname_hmc in exp_cpc.properties:
+                    pname = pname_hmc.replace('-', '_')
+                    assert pname in cpc_item, \
+                        "Missing property {pn!r} in CPC {rn!r}". \
+                        format(pn=pname, rn=cpc_name)
+            dpm = exp_cpc.properties['dpm-enabled']
+            for pname in expand_children:
+                if pname == 'lpars':
+                    exp_present = not dpm
+                elif pname == 'virtual_switches':
+                    exp_present = dpm
+                else:
+                    exp_present = True
+                assert (pname in cpc_item) == exp_present, \
+                    "Child resources {pn!r} of CPC {rn!r} unexpectedly " \
+                    "{ep}returned". \
+                    format(pn=pname, rn=cpc_name,
+                           ep='not ' if exp_present else '')
+
 
 @pytest.mark.parametrize(
     "check_mode", [
@@ -129,9 +160,18 @@ def assert_cpc_list(
         pytest.param(None, id="include_unmanaged_cpcs=None"),
     ]
 )
+@pytest.mark.parametrize(
+    "full_properties, expand_children", [
+        pytest.param(False, [], id="full_properties=False"),
+        pytest.param(True, [], id="full_properties=True"),
+        pytest.param(True, ['partitions', 'virtual_switches', 'lpars'],
+                     id="full_properties=True,expand_children"),
+    ]
+)
 @mock.patch("plugins.modules.zhmc_cpc_list.AnsibleModule", autospec=True)
 def test_zhmc_cpc_list(
-        ansible_mod_cls, include_unmanaged_cpcs, check_mode, hmc_session):  # noqa: F811, E501
+        ansible_mod_cls, full_properties, expand_children,
+        include_unmanaged_cpcs, check_mode, hmc_session):  # noqa: F811, E501
     """
     Test the zhmc_cpc_list module with managed and unmanaged CPCs.
     """
@@ -162,7 +202,12 @@ def test_zhmc_cpc_list(
     params = {
         'hmc_host': hmc_host,
         'hmc_auth': hmc_auth,
+        'full_properties': full_properties,
+        'expand_children': expand_children,
+        'max_concurrency': 10,
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': faked_session,
     }
     if include_unmanaged_cpcs is not None:
@@ -186,4 +231,5 @@ def test_zhmc_cpc_list(
     assert changed is False
 
     assert_cpc_list(
-        cpc_list, include_unmanaged_cpcs, exp_cpcs_dict, exp_um_cpcs_dict)
+        cpc_list, include_unmanaged_cpcs, exp_cpcs_dict, exp_um_cpcs_dict,
+        full_properties, expand_children)
@@ -24,19 +24,20 @@ import mock
 import requests.packages.urllib3
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 from zhmcclient.testutils import classic_mode_cpcs  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_lpar_list
-from .utils import mock_ansible_module, get_failure_msg
+from plugins.module_utils.common import ListDelta
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_lpar_list.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_lpar_list.log') if DEBUG else None
 
 
 def get_module_output(mod_obj):
@@ -46,7 +47,8 @@ def get_module_output(mod_obj):
     If the module failed, return None.
     """
 
-    def func(changed, lpars):
+    def func(changed, lpars, removed, token):
+        # pylint: disable=unused-argument
         return changed, lpars
 
     if not mod_obj.exit_json.called:
@@ -190,7 +192,10 @@ def test_zhmc_lpar_list(
         params = {
             'hmc_host': hmc_host,
             'hmc_auth': hmc_auth,
+            'since_token': None,
             'log_file': LOG_FILE,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': faked_session,
         }
         if with_cpc:
@@ -214,3 +219,68 @@ def test_zhmc_lpar_list(
         assert changed is False
 
         assert_lpar_list(lpar_list, exp_lpar_dict)
+
+
+@mock.patch("plugins.modules.zhmc_lpar_list.AnsibleModule", autospec=True)
+def test_zhmc_lpar_list_delta(
+        ansible_mod_cls, classic_mode_cpcs):  # noqa: F811, E501
+    """
+    Test the zhmc_lpar_list module with the since_token parameter.
+    """
+    if not classic_mode_cpcs:
+        pytest.skip("HMC definition does not include any CPCs in classic mode")
+
+    for cpc in classic_mode_cpcs:
+
+        session = cpc.manager.session
+        hd = session.hmc_definition
+        hmc_auth = dict(userid=hd.userid, password=hd.password,
+                        ca_certs=hd.ca_certs, verify=hd.verify)
+        faked_session = session if hd.mock_file else None
+
+        def run_module(since_token):
+            "Run the module and return its exit_json() arguments."
+            params = {
+                'hmc_host': hd.host,
+                'hmc_auth': hmc_auth,
+                'cpc_name': cpc.name,
+                'since_token': since_token,
+                'log_file': LOG_FILE,
+                'log_level': 'debug',
+                'hmc_log_level': 'debug',
+                '_faked_session': faked_session,
+            }
+            mod_obj = mock_ansible_module(ansible_mod_cls, params, False)
+            with pytest.raises(SystemExit) as exc_info:
+                zhmc_lpar_list.main()
+            exit_code = exc_info.value.args[0]
+            assert exit_code == 0, \
+                "Module failed with exit code {e} and message:\n{m}". \
+                format(e=exit_code, m=get_failure_msg(mod_obj))
+            return mod_obj.exit_json.call_args[1]
+
+        # Initial listing returns all LPARs
+        result = run_module(None)
+        lpar_list = result['lpars']
+        assert result['removed'] == []
+        if not lpar_list:
+            pytest.skip("CPC {c!r} does not have any LPARs".format(c=cpc.name))
+
+        # Unchanged LPARs result in an empty delta
+        result2 = run_module(result['token'])
+        assert result2['lpars'] == []
+        assert result2['removed'] == []
+        assert result2['token'] == result['token']
+
+        # Simulate a previous listing in which the first LPAR had a different
+        # status and an additional LPAR existed
+        prev_list = [dict(item) for item in lpar_list]
+        prev_list[0]['status'] = 'foo'
+        prev_list.append(dict(lpar_list[0], name='LPARX'))
+        _, _, prev_token = ListDelta(None).apply(prev_list)
+
+        result3 = run_module(prev_token)
+        assert result3['lpars'] == [lpar_list[0]]
+        assert result3['removed'] == [
+            dict(name='LPARX', cpc_name=cpc.name)]
+        assert result3['token'] == result['token']
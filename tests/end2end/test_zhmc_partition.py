@@ -29,19 +29,19 @@ from pprint import pformat
 import requests.packages.urllib3
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 from zhmcclient.testutils import dpm_mode_cpcs  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_partition
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 DEBUG = False  # Print debug messages
 DEBUG_LOG = False  # Write log file
 
-LOG_FILE = 'zhmc_partition.log' if DEBUG_LOG else None
+LOG_FILE = worker_log_file('zhmc_partition.log') if DEBUG_LOG else None
 
 # Partition properties that are not always present, but only under certain
 # conditions.
@@ -255,7 +255,8 @@ def get_module_output(mod_obj):
     If the module failed, return None.
     """
 
-    def func(changed, partition):
+    def func(changed, partition, job_uri, retries):
+        # pylint: disable=unused-argument
         return changed, partition
 
     if not mod_obj.exit_json.called:
@@ -384,7 +385,12 @@ def test_zhmc_partition_facts(
             'properties': {},
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': faked_session,
         }
 
@@ -589,7 +595,12 @@ def test_zhmc_partition_state(
                 'state': input_state,
                 'expand_storage_groups': False,
                 'expand_crypto_adapters': False,
+                'result_properties': None,
+                'wait': True,
+                'check_mode_facts': True,
                 'log_file': LOG_FILE,
+                'log_level': 'debug',
+                'hmc_log_level': 'debug',
                 '_faked_session': faked_session,
             }
             if input_props2 is not None:
@@ -978,7 +989,12 @@ def test_zhmc_partition_properties(
                     'properties': update_props,
                     'expand_storage_groups': False,
                     'expand_crypto_adapters': False,
+                    'result_properties': None,
+                    'wait': True,
+                    'check_mode_facts': True,
                     'log_file': LOG_FILE,
+                    'log_level': 'debug',
+                    'hmc_log_level': 'debug',
                     '_faked_session': faked_session,
                 }
 
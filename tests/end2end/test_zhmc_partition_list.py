@@ -24,19 +24,19 @@ import mock
 import requests.packages.urllib3
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 from zhmcclient.testutils import dpm_mode_cpcs  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_partition_list
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_partition_list.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_partition_list.log') if DEBUG else None
 
 
 def get_module_output(mod_obj):
@@ -46,7 +46,8 @@ def get_module_output(mod_obj):
     If the module failed, return None.
     """
 
-    def func(changed, partitions):
+    def func(changed, partitions, removed, token):
+        # pylint: disable=unused-argument
         return changed, partitions
 
     if not mod_obj.exit_json.called:
@@ -191,7 +192,10 @@ def test_zhmc_partition_list(
         params = {
             'hmc_host': hmc_host,
             'hmc_auth': hmc_auth,
+            'since_token': None,
             'log_file': LOG_FILE,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': faked_session,
         }
         if with_cpc:
@@ -28,18 +28,18 @@ from collections import OrderedDict
 from pprint import pformat
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_password_rule
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_password_rule.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_password_rule.log') if DEBUG else None
 
 # Properties in the returned password rule facts that are not always present, but
 # only under certain conditions. This includes artificial properties whose base
@@ -162,6 +162,8 @@ def test_zhmc_password_rule_facts(
         'state': 'facts',
         'properties': {},
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': faked_session,
     }
 
@@ -302,6 +304,8 @@ def test_zhmc_password_rule_absent_present(
             'name': pwrule_name,
             'state': input_state,
             'log_file': LOG_FILE,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': faked_session,
         }
         if input_props is not None:
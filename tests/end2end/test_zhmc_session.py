@@ -28,14 +28,14 @@ from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_session, zhmc_cpc_list
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_session.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_session.log') if DEBUG else None
 
 # Regexp pattern to compare actual HMC session IDs against
 SESSION_ID_PATTERN = re.compile(r'[a-z0-9]{45,55}')
@@ -259,6 +259,8 @@ def test_zhmc_session_single(
         'hmc_auth': hmc_auth,
         'action': action,
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': None,
     }
 
@@ -344,6 +346,8 @@ def test_zhmc_session_sequence(
         },
         'action': 'create',
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': None,
     }
     mod_obj = mock_ansible_module(session_mod_cls, params, check_mode)
@@ -379,6 +383,8 @@ def test_zhmc_session_sequence(
             'verify': hmc_definition.verify,
         },
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': None,
     }
     mod_obj = mock_ansible_module(cpc_list_mod_cls, params, check_mode)
@@ -408,6 +414,8 @@ def test_zhmc_session_sequence(
         },
         'action': 'delete',
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': None,
     }
     mod_obj = mock_ansible_module(session_mod_cls, params, check_mode)
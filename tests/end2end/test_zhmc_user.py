@@ -28,18 +28,18 @@ from collections import OrderedDict
 from pprint import pformat
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_user
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_user.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_user.log') if DEBUG else None
 
 # Properties in the returned user facts that are not always present, but
 # only under certain conditions. This includes artificial properties whose base
@@ -282,7 +282,10 @@ def test_zhmc_user_facts(
         'state': 'facts',
         'properties': {},
         'expand': expand,
+        'result_properties': None,
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': faked_session,
     }
 
@@ -449,7 +452,10 @@ def test_zhmc_user_absent_present(
             'name': user_name,
             'state': input_state,
             'expand': expand,
+            'result_properties': None,
             'log_file': LOG_FILE,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': faked_session,
         }
         if input_props is not None:
@@ -27,18 +27,18 @@ from pprint import pformat
 import requests.packages.urllib3
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_user_role
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_user_role.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_user_role.log') if DEBUG else None
 
 # Properties in the returned user role facts that are not always present, but
 # only under certain conditions. This includes artificial properties whose base
@@ -164,6 +164,8 @@ def test_zhmc_user_role_facts(
         'name': urole.name,
         'state': 'facts',
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': faked_session,
     }
 
@@ -322,6 +324,8 @@ def test_zhmc_user_role_absent_present(
             'name': urole_name,
             'state': input_state,
             'log_file': LOG_FILE,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': faked_session,
         }
         if input_props2 is not None:
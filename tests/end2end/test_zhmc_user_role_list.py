@@ -24,18 +24,18 @@ import mock
 import requests.packages.urllib3
 import zhmcclient
 # pylint: disable=line-too-long,unused-import
-from zhmcclient.testutils import hmc_definition, hmc_session  # noqa: F401, E501
+from zhmcclient.testutils import hmc_definition  # noqa: F401, E501
 # pylint: enable=line-too-long,unused-import
 
 from plugins.modules import zhmc_user_role_list
-from .utils import mock_ansible_module, get_failure_msg
+from .utils import mock_ansible_module, get_failure_msg, worker_log_file
 
 requests.packages.urllib3.disable_warnings()
 
 # Print debug messages
 DEBUG = False
 
-LOG_FILE = 'zhmc_user_role_list.log' if DEBUG else None
+LOG_FILE = worker_log_file('zhmc_user_role_list.log') if DEBUG else None
 
 
 def get_module_output(mod_obj):
@@ -117,6 +117,8 @@ def test_zhmc_user_role_list(
         'hmc_host': hmc_host,
         'hmc_auth': hmc_auth,
         'log_file': LOG_FILE,
+        'log_level': 'debug',
+        'hmc_log_level': 'debug',
         '_faked_session': faked_session,
     }
 
@@ -20,6 +20,96 @@ Utility functions for end2end testing.
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
+import os
+import pickle
+import time
+import zhmcclient_mock
+
+# Snapshots of the faked sessions for the mocked HMCs, as pickled
+# zhmcclient_mock.FakedSession objects, by (mock file, userid, password)
+MOCKED_HMC_SNAPSHOTS = {}
+
+# Timing statistics for setting up the faked sessions for the mocked HMCs,
+# for the timing report at the end of the test run
+MOCKED_HMC_STATS = dict(
+    parsed=0,  # Number of mock files parsed
+    parse_time=0.0,  # Time in seconds for parsing the mock files
+    sessions=0,  # Number of faked sessions created from the snapshots
+    load_time=0.0,  # Time in seconds for creating the sessions
+)
+
+
+def faked_session(hd):
+    """
+    Return a new faked session for the mocked HMC of an HMC definition.
+
+    The mock file is parsed only once per test run. Each returned session is
+    a new copy of the snapshot of the faked session, so that changes made to
+    the mocked HMC by a test module do not affect other test modules.
+    """
+    key = (hd.mock_file, hd.userid, hd.password)
+    snapshot = MOCKED_HMC_SNAPSHOTS.get(key)
+    if snapshot is None:
+        start = time.time()
+        session = zhmcclient_mock.FakedSession.from_hmc_yaml_file(
+            hd.mock_file, userid=hd.userid, password=hd.password)
+        snapshot = pickle.dumps(session, pickle.HIGHEST_PROTOCOL)
+        MOCKED_HMC_SNAPSHOTS[key] = snapshot
+        MOCKED_HMC_STATS['parsed'] += 1
+        MOCKED_HMC_STATS['parse_time'] += time.time() - start
+    start = time.time()
+    session = pickle.loads(snapshot)
+    MOCKED_HMC_STATS['sessions'] += 1
+    MOCKED_HMC_STATS['load_time'] += time.time() - start
+    return session
+
+
+def add_mocked_hmc_stats(stats):
+    """
+    Add timing statistics for setting up the faked sessions for the mocked
+    HMCs, e.g. those of a pytest-xdist worker process, to the statistics of
+    this process.
+    """
+    for name, value in stats.items():
+        MOCKED_HMC_STATS[name] += value
+
+
+def mocked_hmc_report():
+    """
+    Return the lines of the timing report for setting up the faked sessions
+    for the mocked HMCs, or an empty list if there were none.
+    """
+    stats = MOCKED_HMC_STATS
+    if not stats['parsed']:
+        return []
+    parse_time = stats['parse_time'] / stats['parsed']
+    without = parse_time * stats['sessions']
+    with_ = stats['parse_time'] + stats['load_time']
+    return [
+        "Parsed {0} mock file(s) in {1:.3f} s".
+        format(stats['parsed'], stats['parse_time']),
+        "Created {0} faked session(s) from snapshots in {1:.3f} s".
+        format(stats['sessions'], stats['load_time']),
+        "Setup time {0:.3f} s instead of about {1:.3f} s when parsing the "
+        "mock file for each session (speedup {2:.1f}x)".
+        format(with_, without, without / with_ if with_ else 0),
+    ]
+
+
+def worker_log_file(filename):
+    """
+    Return the log file name for the current pytest-xdist worker process,
+    so that tests running in parallel do not write to the same log file.
+
+    When not running under pytest-xdist, the log file name is returned
+    unchanged.
+    """
+    worker = os.environ.get('PYTEST_XDIST_WORKER', None)
+    if not worker:
+        return filename
+    base, ext = os.path.splitext(filename)
+    return "{0}.{1}{2}".format(base, worker, ext)
+
 
 def mock_ansible_module(ansible_mod_cls, params, check_mode):
     """
@@ -0,0 +1,326 @@
+#!/usr/bin/env python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Function tests for the 'zhmc_adapter' Ansible module.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import pytest
+import mock
+
+from zhmcclient import Client
+from zhmcclient_mock import FakedSession
+
+from plugins.modules import zhmc_adapter
+
+from .func_utils import mock_ansible_module
+
+# FakedSession() init arguments
+FAKED_SESSION_KWARGS = dict(
+    host='fake-host',
+    hmc_name='faked-hmc-name',
+    hmc_version='2.13.1',
+    api_version='1.8'
+)
+
+# Faked Console that is used for all tests
+# (with property names as specified in HMC data model)
+FAKED_CONSOLE = {
+    'object-uri': '/api/console',
+    'class': 'console',
+    'name': 'hmc-1',
+    'description': 'Console HMC1',
+    'version': '2.13.0',
+}
+
+# Faked CPC in DPM mode that is used for all tests
+# (with property names as specified in HMC data model)
+FAKED_CPC_1_URI = '/api/cpcs/fake-cpc-1'
+FAKED_CPC_1 = {
+    'object-id': 'fake-cpc-1',
+    'object-uri': FAKED_CPC_1_URI,
+    'class': 'cpc',
+    'name': 'cpc-name-1',
+    'description': 'CPC #1 in DPM mode',
+    'status': 'active',
+    'dpm-enabled': True,
+    'is-ensemble-member': False,
+    'iml-mode': 'dpm',
+}
+
+# Faked OSA adapter with two ports, and FCP adapter with one port
+FAKED_OSA_URI = '/api/adapters/fake-osa-1'
+FAKED_OSA = {
+    'object-id': 'fake-osa-1',
+    'object-uri': FAKED_OSA_URI,
+    'parent': FAKED_CPC_1_URI,
+    'class': 'adapter',
+    'name': 'osa-1',
+    'description': 'OSA adapter #1',
+    'type': 'osd',
+    'adapter-family': 'osa',
+    'adapter-id': '110',
+    'card-location': 'A14B-D101-J.01',
+    'port-count': 2,
+    'network-port-uris': [FAKED_OSA_URI + '/network-ports/0',
+                          FAKED_OSA_URI + '/network-ports/1'],
+}
+FAKED_OSA_PORTS = [
+    {
+        'element-id': str(index),
+        'element-uri': FAKED_OSA_URI + '/network-ports/' + str(index),
+        'parent': FAKED_OSA_URI,
+        'class': 'network-port',
+        'name': 'Port {0}'.format(index),
+        'description': '',
+        'index': index,
+    } for index in (0, 1)
+]
+FAKED_FCP_URI = '/api/adapters/fake-fcp-1'
+FAKED_FCP = {
+    'object-id': 'fake-fcp-1',
+    'object-uri': FAKED_FCP_URI,
+    'parent': FAKED_CPC_1_URI,
+    'class': 'adapter',
+    'name': 'fcp-1',
+    'description': 'FCP adapter #1',
+    'type': 'fcp',
+    'adapter-family': 'ficon',
+    'adapter-id': '120',
+    'card-location': 'A14B-D112-J.01',
+    'port-count': 1,
+    'storage-port-uris': [FAKED_FCP_URI + '/storage-ports/0'],
+}
+FAKED_FCP_PORT = {
+    'element-id': '0',
+    'element-uri': FAKED_FCP_URI + '/storage-ports/0',
+    'parent': FAKED_FCP_URI,
+    'class': 'storage-port',
+    'name': 'Port 0',
+    'description': '',
+    'index': 0,
+}
+
+
+def get_failure_msg(mod_obj):
+    """
+    Return the module failure message, as a string (i.e. the 'msg' argument
+    of the call to fail_json()).
+    If the module succeeded, return None.
+    """
+
+    def func(msg):
+        return msg
+
+    if not mod_obj.fail_json.called:
+        return None
+    call_args = mod_obj.fail_json.call_args
+
+    # The following makes sure we get the arguments regardless of whether they
+    # were specified as positional or keyword arguments:
+    return func(*call_args[0], **call_args[1])
+
+
+def get_module_output(mod_obj):
+    """
+    Return the module output as a tuple (changed, kwargs) (i.e. the arguments
+    of the call to exit_json()).
+    If the module failed, return None.
+    """
+
+    def func(changed, **kwargs):
+        return changed, kwargs
+
+    if not mod_obj.exit_json.called:
+        return None
+    call_args = mod_obj.exit_json.call_args
+
+    # The following makes sure we get the arguments regardless of whether they
+    # were specified as positional or keyword arguments:
+    return func(*call_args[0], **call_args[1])
+
+
+class TestAdapter(object):
+    """
+    All tests for the zhmc_adapter module.
+    """
+
+    def setup_method(self):
+        """
+        Using the zhmcclient mock support, set up a CPC in DPM mode with an
+        OSA adapter and an FCP adapter.
+        """
+        self.session = FakedSession(**FAKED_SESSION_KWARGS)
+        self.client = Client(self.session)
+        self.session.hmc.consoles.add(FAKED_CONSOLE)
+        faked_cpc = self.session.hmc.cpcs.add(FAKED_CPC_1)
+        faked_osa = faked_cpc.adapters.add(FAKED_OSA)
+        for port_props in FAKED_OSA_PORTS:
+            faked_osa.ports.add(port_props)
+        faked_fcp = faked_cpc.adapters.add(FAKED_FCP)
+        faked_fcp.ports.add(FAKED_FCP_PORT)
+        self.cpc = self.client.cpcs.find(name=FAKED_CPC_1['name'])
+
+    def run_module(self, ansible_mod_cls, check_mode, **params):
+        """
+        Run the module with the specified module parameters and return the
+        tuple (exit_code, mod_obj).
+        """
+        all_params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': self.cpc.name,
+            'name': None,
+            'match': None,
+            'adapters': None,
+            'properties': None,
+            'max_concurrency': 4,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        all_params.update(params)
+
+        # Prepare mocks for AnsibleModule object
+        mod_obj = mock_ansible_module(ansible_mod_cls, all_params, check_mode)
+
+        # Exercise the code to be tested
+        with pytest.raises(SystemExit) as exc_info:
+            zhmc_adapter.main()
+        exit_code = exc_info.value.args[0]
+        return exit_code, mod_obj
+
+    @mock.patch("plugins.modules.zhmc_adapter.AnsibleModule",
+                autospec=True)
+    def test_adapter_facts(self, ansible_mod_cls):
+        """
+        Test state=facts for a single adapter, including its ports.
+        """
+        exit_code, mod_obj = self.run_module(
+            ansible_mod_cls, False, name='osa-1', state='facts')
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        # Assert module output
+        changed, output = get_module_output(mod_obj)
+        assert changed is False
+        adapter = output['adapter']
+        assert adapter['object-uri'] == FAKED_OSA_URI
+        ports = sorted(adapter['ports'], key=lambda p: p['index'])
+        assert [port['name'] for port in ports] == ['Port 0', 'Port 1']
+        assert ports[1]['element-uri'] == FAKED_OSA_URI + '/network-ports/1'
+
+    @pytest.mark.parametrize(
+        "check_mode", [False, True])
+    @pytest.mark.parametrize(
+        "state", ['facts', 'set'])
+    @mock.patch("plugins.modules.zhmc_adapter.AnsibleModule",
+                autospec=True)
+    def test_adapter_batch(self, ansible_mod_cls, state, check_mode):
+        """
+        Test batch mode, including identification by match properties that
+        are not returned by the adapter listing.
+        """
+        adapters = [
+            dict(name='osa-1', match=None,
+                 properties=dict(description='new OSA')),
+            dict(name='fcp-new', match=dict(card_location='A14B-D112-J.01'),
+                 properties=dict(description='new FCP')),
+        ]
+
+        exit_code, mod_obj = self.run_module(
+            ansible_mod_cls, check_mode, adapters=adapters, state=state)
+
+        if state == 'facts':
+            # The renamed adapter is not found by name in facts mode
+            assert exit_code == 1
+            msg = get_failure_msg(mod_obj)
+            assert msg.startswith("NotFound:")
+            return
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        # Assert module output
+        changed, output = get_module_output(mod_obj)
+        assert changed is True
+        result = output['adapters']
+        assert sorted(result.keys()) == ['fcp-new', 'osa-1']
+        assert result['osa-1']['description'] == 'new OSA'
+        assert len(result['osa-1']['ports']) == 2
+        assert result['fcp-new']['object-uri'] == FAKED_FCP_URI
+        assert result['fcp-new']['name'] == 'fcp-new'
+        assert result['fcp-new']['description'] == 'new FCP'
+        assert result['fcp-new']['ports'][0]['class'] == 'storage-port'
+
+        # Assert the adapters on the HMC
+        fcp = self.cpc.adapters.find(**{'object-id': 'fake-fcp-1'})
+        fcp.pull_full_properties()
+        if check_mode:
+            assert fcp.properties['name'] == 'fcp-1'
+        else:
+            assert fcp.properties['name'] == 'fcp-new'
+            assert fcp.properties['description'] == 'new FCP'
+
+    @pytest.mark.parametrize(
+        "adapters, exp_msg_pattern", [
+            ([dict(name='foo', match=None, properties=None)],
+             "NotFound:"),
+            ([dict(name='foo', match=dict(adapter_family='.*'),
+                   properties=None)],
+             "NoUniqueMatch:"),
+            ([dict(name='osa-1', match=None, properties=None),
+              dict(name='osa-1', match=None, properties=None)],
+             "ParameterError: Adapter names in the 'adapters' module "
+             "parameter are not unique"),
+            ([dict(name='fcp-a', match=dict(card_location='A14B-D112-J.01'),
+                   properties=None),
+              dict(name='fcp-b', match=dict(card_location='A14B-D112-J.01'),
+                   properties=None)],
+             "ParameterError: Adapter items 'fcp-a' and 'fcp-b' in the "
+             "'adapters' module parameter identify the same adapter"),
+            ([dict(name='osa-1', match=None, properties=None),
+              dict(name='osa-new', match=dict(name='osa-1'),
+                   properties=None)],
+             "ParameterError: Adapter items 'osa-1' and 'osa-new' in the "
+             "'adapters' module parameter identify the same adapter"),
+        ])
+    @mock.patch("plugins.modules.zhmc_adapter.AnsibleModule",
+                autospec=True)
+    def test_adapter_batch_error(
+            self, ansible_mod_cls, adapters, exp_msg_pattern):
+        """
+        Test errors in batch mode.
+        """
+        exit_code, mod_obj = self.run_module(
+            ansible_mod_cls, False, adapters=adapters, state='set')
+
+        # Assert module exit code
+        assert exit_code == 1, \
+            "Module unexpectedly succeeded with this output:\n" \
+            "changed: {!r}, {!r}".format(*get_module_output(mod_obj))
+
+        msg = get_failure_msg(mod_obj)
+        assert msg.startswith(exp_msg_pattern)
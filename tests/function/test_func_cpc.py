@@ -29,6 +29,7 @@ import re
 from zhmcclient import Client
 from zhmcclient_mock import FakedSession
 
+from plugins.module_utils import common as module_utils
 from plugins.modules import zhmc_cpc
 
 from .func_utils import mock_ansible_module
@@ -396,7 +397,16 @@ class TestCpc(object):
             'name': self.cpc.name,
             'state': input_state,
             'properties': input_properties,
+            'result_properties': None,
+            'expand_partitions': True,
+            'expand_adapters': True,
+            'expand_storage_groups': True,
+            'expand_virtual_switches': False,
+            'expand_lpars': False,
+            'max_concurrency': 10,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -449,3 +459,244 @@ class TestCpc(object):
                         assert exp_value == self.cpc.properties[hmc_name], \
                             "Unexpected value for property {0!r}". \
                             format(hmc_name)
+
+    @pytest.mark.parametrize(
+        "result_properties, exp_names, exp_list_calls", [
+            (None,
+             None,
+             ['adapters', 'partitions', 'storage-groups']),
+            (dict(include=['status', 'partitions'], exclude=None),
+             ['name', 'partitions', 'status'],
+             ['partitions']),
+            (dict(include=None, exclude=['partitions', 'adapters',
+                                         'storage_groups']),
+             None,
+             []),
+        ])
+    @mock.patch("plugins.modules.zhmc_cpc.AnsibleModule", autospec=True)
+    def test_cpc_result_properties(
+            self, ansible_mod_cls, result_properties, exp_names,
+            exp_list_calls):
+        """
+        Tests for state=facts with result_properties.
+        """
+
+        # Create the faked CPC in DPM mode
+        self.session.hmc.cpcs.add(FAKED_CPC_2)
+
+        # Prepare module input parameters
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'name': FAKED_CPC_2_NAME,
+            'state': 'facts',
+            'properties': None,
+            'result_properties': result_properties,
+            'expand_partitions': True,
+            'expand_adapters': True,
+            'expand_storage_groups': True,
+            'expand_virtual_switches': False,
+            'expand_lpars': False,
+            'max_concurrency': 10,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+
+        # Prepare mocks for AnsibleModule object
+        mod_obj = mock_ansible_module(ansible_mod_cls, params, False)
+
+        # Exercise the code to be tested
+        with pytest.raises(SystemExit) as exc_info:
+            with mock.patch.object(self.session, 'get',
+                                   wraps=self.session.get) as get_mock:
+                zhmc_cpc.main()
+        exit_code = exc_info.value.args[0]
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        # Assert module output
+        changed, cpc_props = get_module_output(mod_obj)
+        assert changed is False
+        if exp_names is not None:
+            assert sorted(cpc_props) == exp_names
+        else:
+            assert cpc_props['description'] == FAKED_CPC_2['description']
+        for name in ('partitions', 'adapters', 'storage-groups'):
+            assert (name in cpc_props) == (name in exp_list_calls)
+
+        # Assert that only the selected child resources were listed
+        get_uris = [call[0][0] for call in get_mock.call_args_list]
+        list_calls = []
+        for uri in get_uris:
+            if uri.startswith(FAKED_CPC_2_URI + '/partitions'):
+                list_calls.append('partitions')
+            elif uri.startswith(FAKED_CPC_2_URI + '/adapters'):
+                list_calls.append('adapters')
+            elif uri.startswith('/api/storage-groups'):
+                list_calls.append('storage-groups')
+        assert sorted(list_calls) == exp_list_calls
+
+    @pytest.mark.parametrize(
+        "include, expand, exp_pulled, exp_required", [
+            (['status', 'partitions', 'adapters', 'storage_groups'],
+             {},
+             ['name', 'status'],
+             []),
+            (['status', 'lpars', 'virtual_switches'],
+             dict(expand_lpars=True, expand_virtual_switches=True),
+             ['dpm-enabled', 'name', 'status'],
+             ['dpm-enabled']),
+            (['status', 'lpars', 'virtual_switches'],
+             {},
+             ['dpm-enabled', 'name', 'status'],
+             []),
+        ])
+    @mock.patch("plugins.modules.zhmc_cpc.AnsibleModule", autospec=True)
+    def test_cpc_result_properties_pull(
+            self, ansible_mod_cls, include, expand, exp_pulled,
+            exp_required):
+        """
+        Test that the artificial properties selected in result_properties
+        are not retrieved from the HMC, but the HMC properties they depend
+        on are, and that the operational mode is required when child
+        resources that depend on it are expanded.
+        """
+
+        # Create the faked CPC in DPM mode
+        self.session.hmc.cpcs.add(FAKED_CPC_2)
+
+        # Prepare module input parameters
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'name': FAKED_CPC_2_NAME,
+            'state': 'facts',
+            'properties': None,
+            'result_properties': dict(include=include, exclude=None),
+            'expand_partitions': True,
+            'expand_adapters': True,
+            'expand_storage_groups': True,
+            'expand_virtual_switches': False,
+            'expand_lpars': False,
+            'max_concurrency': 10,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        params.update(expand)
+
+        # Prepare mocks for AnsibleModule object
+        mod_obj = mock_ansible_module(ansible_mod_cls, params, False)
+
+        # Exercise the code to be tested
+        with pytest.raises(SystemExit) as exc_info:
+            with mock.patch.object(
+                    module_utils, 'pull_properties',
+                    wraps=module_utils.pull_properties) as pull_mock, \
+                mock.patch.object(
+                    module_utils.ResultSelector, 'pull', autospec=True,
+                    side_effect=module_utils.ResultSelector.pull) \
+                    as selector_pull_mock:
+                zhmc_cpc.main()
+        exit_code = exc_info.value.args[0]
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        assert pull_mock.call_count == 1
+        assert sorted(pull_mock.call_args[0][1]) == exp_pulled
+        assert sorted(selector_pull_mock.call_args[1]['required']) == \
+            exp_required
+
+    @pytest.mark.parametrize(
+        "faked_cpc, expand, exp_names", [
+            (FAKED_CPC_2,
+             {},
+             ['adapters', 'partitions', 'storage-groups']),
+            (FAKED_CPC_2,
+             dict(expand_partitions=False, expand_storage_groups=False),
+             ['adapters']),
+            (FAKED_CPC_2,
+             dict(expand_virtual_switches=True, expand_lpars=True),
+             ['adapters', 'partitions', 'storage-groups',
+              'virtual-switches']),
+            (FAKED_CPC_1,
+             dict(expand_partitions=False, expand_adapters=False,
+                  expand_storage_groups=False, expand_virtual_switches=True,
+                  expand_lpars=True),
+             ['lpars']),
+        ])
+    @pytest.mark.parametrize(
+        "max_concurrency", [1, 10])
+    @mock.patch("plugins.modules.zhmc_cpc.AnsibleModule", autospec=True)
+    def test_cpc_expand(
+            self, ansible_mod_cls, max_concurrency, faked_cpc, expand,
+            exp_names):
+        """
+        Tests for state=facts with the expand_* parameters.
+        """
+
+        # Create the faked CPC with one child resource of each kind that
+        # applies to its operational mode
+        faked_cpc = self.session.hmc.cpcs.add(faked_cpc)
+        if faked_cpc.properties['dpm-enabled']:
+            faked_cpc.partitions.add({'name': 'PART1'})
+            faked_cpc.adapters.add({'name': 'OSA1', 'type': 'osd'})
+            faked_cpc.virtual_switches.add({'name': 'VSWITCH1'})
+        else:
+            faked_cpc.lpars.add({'name': 'LPAR1'})
+
+        # Prepare module input parameters
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'name': faked_cpc.properties['name'],
+            'state': 'facts',
+            'properties': None,
+            'result_properties': None,
+            'expand_partitions': True,
+            'expand_adapters': True,
+            'expand_storage_groups': True,
+            'expand_virtual_switches': False,
+            'expand_lpars': False,
+            'max_concurrency': max_concurrency,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        params.update(expand)
+
+        # Prepare mocks for AnsibleModule object
+        mod_obj = mock_ansible_module(ansible_mod_cls, params, False)
+
+        # Exercise the code to be tested
+        with pytest.raises(SystemExit) as exc_info:
+            zhmc_cpc.main()
+        exit_code = exc_info.value.args[0]
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        # Assert module output
+        changed, cpc_props = get_module_output(mod_obj)
+        assert changed is False
+        child_names = [name for name in zhmc_cpc.CPC_CHILD_PROPERTIES
+                       if name in cpc_props]
+        assert sorted(child_names) == exp_names
+        for name in ('partitions', 'virtual-switches', 'lpars'):
+            if name in cpc_props:
+                assert len(cpc_props[name]) == 1
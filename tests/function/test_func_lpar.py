@@ -248,7 +248,8 @@ def get_module_output(mod_obj):
     If the module failed, return None.
     """
 
-    def func(changed, lpar):
+    def func(changed, lpar, job_uri):
+        # pylint: disable=unused-argument
         return changed, lpar
 
     if not mod_obj.exit_json.called:
@@ -404,6 +405,8 @@ class TestLpar(object):
             'activation_profile_name': None,  # TODO: Add to tests
             'properties': input_props,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -481,6 +484,8 @@ class TestLpar(object):
             'state': desired_state,
             'activation_profile_name': None,  # TODO: Add to tests
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -22,6 +22,7 @@ Function tests for the 'zhmc_partition' Ansible module.
 from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
+import os
 import pytest
 import mock
 import re
@@ -30,6 +31,7 @@ from zhmcclient import Client
 from zhmcclient_mock import FakedSession
 
 from plugins.modules import zhmc_partition
+from plugins.module_utils.common import NameUriCache
 
 from .func_utils import mock_ansible_module
 
@@ -307,7 +309,8 @@ def get_failure_msg(mod_obj):
     If the module succeeded, return None.
     """
 
-    def func(msg):
+    def func(msg, retries):
+        # pylint: disable=unused-argument
         return msg
 
     if not mod_obj.fail_json.called:
@@ -326,7 +329,8 @@ def get_module_output(mod_obj):
     If the module failed, return None.
     """
 
-    def func(changed, partition):
+    def func(changed, partition, job_uri, retries):
+        # pylint: disable=unused-argument
         return changed, partition
 
     if not mod_obj.exit_json.called:
@@ -891,7 +895,12 @@ class TestPartition(object):
             'state': desired_state,
             'expand_storage_groups': expand_storage_groups,
             'expand_crypto_adapters': expand_crypto_adapters,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -951,6 +960,259 @@ class TestPartition(object):
                 exp_value = self.partition.properties[pname]
                 assert pvalue == exp_value
 
+    @pytest.mark.parametrize(
+        "initial_state", ['stopped', 'active'])
+    @pytest.mark.parametrize(
+        "desired_state", ['stopped', 'active'])
+    @pytest.mark.parametrize(
+        "properties, exp_prop_names, exp_prop_changed", [
+            ({}, ['status'], False),
+            ({'description': 'new description'}, ['description', 'status'],
+             True),
+            ({'boot_network_nic_name': FAKED_NIC_1_NAME},
+             ['boot-network-device', 'nic-uris', 'status'], True),
+        ])
+    @mock.patch("plugins.modules.zhmc_partition.AnsibleModule",
+                autospec=True)
+    def test_check_mode_selective(
+            self, ansible_mod_cls, properties, exp_prop_names,
+            exp_prop_changed, desired_state, initial_state):
+        """
+        Tests for check mode with check_mode_facts=false, that retrieves only
+        the dependent properties of the partition.
+        """
+
+        # Prepare the initial partition before the test is run
+        self.setup_partition(initial_state)
+        self.setup_hba()
+        self.setup_nic()
+
+        # Prepare module input parameters
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': self.cpc.name,
+            'name': self.partition_name,
+            'state': desired_state,
+            'properties': properties,
+            'expand_storage_groups': True,
+            'expand_crypto_adapters': True,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': False,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+
+        # Prepare mocks for AnsibleModule object
+        mod_obj = mock_ansible_module(ansible_mod_cls, params, True)
+
+        # Exercise the code to be tested
+        with mock.patch("plugins.modules.zhmc_partition.pull_properties",
+                        wraps=zhmc_partition.pull_properties) as pull_mock:
+            with pytest.raises(SystemExit) as exc_info:
+                zhmc_partition.main()
+        exit_code = exc_info.value.args[0]
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        # Assert module output
+        changed, part_props = get_module_output(mod_obj)
+        assert changed is (desired_state != initial_state or
+                           exp_prop_changed)
+        exp_status = 'active' if desired_state == 'active' else 'stopped'
+        assert part_props['status'] == exp_status
+        for prop_name in exp_prop_names:
+            assert prop_name in part_props
+        if 'description' in properties:
+            assert part_props['description'] == properties['description']
+        for prop_name in ('nics', 'hbas', 'virtual-functions',
+                          'storage-groups'):
+            assert prop_name not in part_props
+
+        # Assert that only the dependent properties were retrieved (the
+        # faked HMC does not support property-selective requests, so
+        # pull_properties() retrieves the full properties)
+        assert pull_mock.call_count == 1
+        assert sorted(pull_mock.call_args[0][1]) == exp_prop_names
+
+        # Assert that the partition on the HMC is unchanged
+        self.partition.pull_full_properties()
+        assert self.partition.properties['status'] == initial_state
+
+    @pytest.mark.parametrize(
+        "cached", [False, True])
+    @pytest.mark.parametrize(
+        "initial_state", ['stopped', 'active'])
+    @pytest.mark.parametrize(
+        "desired_state", ['stopped', 'active'])
+    @mock.patch("plugins.modules.zhmc_partition.AnsibleModule",
+                autospec=True)
+    def test_state_request_count(
+            self, ansible_mod_cls, desired_state, initial_state, cached,
+            tmp_path):
+        """
+        Test that state=active/stopped retrieves each set of partition
+        properties at most once, unless the partition was changed, and that
+        the partition is found without listing if its URI is cached.
+        """
+
+        # Prepare the initial partition before the test is run
+        self.setup_partition(initial_state)
+        env = {'ZHMC_URI_CACHE_DIR': str(tmp_path) if cached else ''}
+        if cached:
+            cache = NameUriCache('fake-host', str(tmp_path))
+            cache.set('cpc:' + self.cpc.name, FAKED_CPC_1_URI)
+            cache.set('partition:{0}:{1}'.format(
+                FAKED_CPC_1_URI, self.partition_name), FAKED_PARTITION_1_URI)
+
+        # Prepare module input parameters
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': self.cpc.name,
+            'name': self.partition_name,
+            'state': desired_state,
+            'properties': None,
+            'expand_storage_groups': False,
+            'expand_crypto_adapters': False,
+            'result_properties': dict(include=['status'], exclude=None),
+            'wait': True,
+            'check_mode_facts': True,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+
+        # Prepare mocks for AnsibleModule object
+        mod_obj = mock_ansible_module(ansible_mod_cls, params, False)
+
+        # Exercise the code to be tested
+        with mock.patch.dict(os.environ, env):
+            with mock.patch.object(self.session, 'get',
+                                   wraps=self.session.get) as get_mock:
+                with pytest.raises(SystemExit) as exc_info:
+                    zhmc_partition.main()
+        exit_code = exc_info.value.args[0]
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        changed, part_props = get_module_output(mod_obj)
+        assert changed is (desired_state != initial_state)
+        assert part_props['status'] == desired_state
+
+        # Assert the number of requests. The CPCs and partitions are listed
+        # once for finding the partition, unless its URI is cached. Its full
+        # properties are retrieved initially and, after a start or stop, once
+        # more for the module result. Its status is retrieved by listing it
+        # only after a start or stop, by zhmcclient when waiting for the
+        # operation and by the module.
+        uris = [c[0][0] for c in get_mock.call_args_list]
+        partitions_uri = FAKED_CPC_1_URI + '/partitions'
+        exp_lists = 0 if cached else 1
+        assert uris.count('/api/cpcs') == exp_lists
+        assert uris.count(partitions_uri) == exp_lists
+        full_gets = uris.count(FAKED_PARTITION_1_URI)
+        status_lists = uris.count(
+            partitions_uri + '?name=' + self.partition_name)
+        if changed:
+            assert (full_gets, status_lists) == (2, 2)
+        else:
+            assert (full_gets, status_lists) == (1, 0)
+
+    @pytest.mark.parametrize(
+        "result_properties, exp_names, exp_pulled", [
+            (dict(include=['description', 'nics'], exclude=None),
+             ['description', 'name', 'nics'],
+             ['description', 'name', 'nic-uris']),
+            (dict(include=['boot_storage_volume_name', 'status'],
+                  exclude=['status']),
+             ['boot-storage-volume-name', 'name'],
+             ['boot-storage-volume', 'name']),
+            (dict(include=None, exclude=['nics', 'hbas', 'description']),
+             None, None),
+        ])
+    @mock.patch("plugins.modules.zhmc_partition.AnsibleModule",
+                autospec=True)
+    def test_facts_result_properties(
+            self, ansible_mod_cls, result_properties, exp_names, exp_pulled):
+        """
+        Tests for fact gathering on partitions with result_properties.
+        """
+
+        # Prepare the initial partition before the test is run
+        self.setup_partition('stopped')
+        self.setup_hba()
+        self.setup_nic()
+
+        # Prepare module input parameters
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': self.cpc.name,
+            'name': self.partition_name,
+            'state': 'facts',
+            'expand_storage_groups': True,
+            'expand_crypto_adapters': True,
+            'result_properties': result_properties,
+            'wait': True,
+            'check_mode_facts': True,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+
+        # Prepare mocks for AnsibleModule object
+        mod_obj = mock_ansible_module(ansible_mod_cls, params, False)
+
+        # Exercise the code to be tested
+        with mock.patch("plugins.module_utils.common.pull_properties",
+                        wraps=zhmc_partition.pull_properties) as pull_mock:
+            with pytest.raises(SystemExit) as exc_info:
+                zhmc_partition.main()
+        exit_code = exc_info.value.args[0]
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        # Assert module output
+        changed, part_props = get_module_output(mod_obj)
+        assert changed is False
+        if exp_names is not None:
+            assert sorted(part_props) == exp_names
+        else:
+            for name in result_properties['exclude']:
+                assert name not in part_props
+            assert 'virtual-functions' in part_props
+            assert 'storage-groups' in part_props
+            assert part_props['status'] == 'stopped'
+        if 'nics' in part_props:
+            assert len(part_props['nics']) == 1
+
+        # Assert the retrieved properties (the faked HMC does not support
+        # property-selective requests, so pull_properties() retrieves the
+        # full properties)
+        if exp_pulled is not None:
+            assert pull_mock.call_count == 1
+            assert sorted(pull_mock.call_args[0][1]) == exp_pulled
+        else:
+            assert pull_mock.called is False
+
     @pytest.mark.parametrize(
         "check_mode", [False])
     @pytest.mark.parametrize(
@@ -1044,7 +1306,12 @@ class TestPartition(object):
             'properties': props,
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -1114,7 +1381,12 @@ class TestPartition(object):
             'properties': properties,
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -1193,7 +1465,12 @@ class TestPartition(object):
             'properties': properties,
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -1259,7 +1536,12 @@ class TestPartition(object):
             'properties': properties,
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -1336,7 +1618,12 @@ class TestPartition(object):
             'properties': properties,
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -1414,7 +1701,12 @@ class TestPartition(object):
             'properties': properties,
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
@@ -1601,7 +1893,12 @@ class TestPartition(object):
             'properties': input_props,
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
             '_faked_session': self.session,
         }
 
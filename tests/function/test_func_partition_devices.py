@@ -0,0 +1,404 @@
+#!/usr/bin/env python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Function tests for the 'zhmc_partition_devices' Ansible module.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import pytest
+import mock
+
+from zhmcclient import Client
+from zhmcclient_mock import FakedSession
+
+from plugins.modules import zhmc_partition_devices
+
+from .func_utils import mock_ansible_module
+
+# FakedSession() init arguments
+FAKED_SESSION_KWARGS = dict(
+    host='fake-host',
+    hmc_name='faked-hmc-name',
+    hmc_version='2.13.1',
+    api_version='1.8'
+)
+
+# Faked Console that is used for all tests
+# (with property names as specified in HMC data model)
+FAKED_CONSOLE = {
+    'object-uri': '/api/console',
+    'class': 'console',
+    'name': 'hmc-1',
+    'description': 'Console HMC1',
+    'version': '2.13.0',
+}
+
+# Faked CPC in DPM mode that is used for all tests
+# (with property names as specified in HMC data model)
+FAKED_CPC_1_URI = '/api/cpcs/fake-cpc-1'
+FAKED_CPC_1 = {
+    'object-id': 'fake-cpc-1',
+    'object-uri': FAKED_CPC_1_URI,
+    'class': 'cpc',
+    'name': 'cpc-name-1',
+    'description': 'CPC #1 in DPM mode',
+    'status': 'active',
+    'dpm-enabled': True,
+    'is-ensemble-member': False,
+    'iml-mode': 'dpm',
+}
+
+# Faked partition that is used for these tests
+FAKED_PARTITION_1_NAME = 'part-name-1'
+FAKED_PARTITION_1_URI = '/api/partitions/fake-part-1'
+FAKED_PARTITION_1 = {
+    'object-id': 'fake-part-1',
+    'object-uri': FAKED_PARTITION_1_URI,
+    'parent': FAKED_CPC_1_URI,
+    'class': 'partition',
+    'name': FAKED_PARTITION_1_NAME,
+    'description': 'Partition #1',
+    'status': 'stopped',
+    'virtual-function-uris': [],
+    'nic-uris': [],
+    'hba-uris': [],
+}
+
+# Faked OSA adapter, port and vswitch used for the NICs
+FAKED_ADAPTER_1_NAME = 'osa adapter #1'
+FAKED_ADAPTER_1_URI = '/api/adapters/fake-osa-adapter-1'
+FAKED_PORT_1_URI = FAKED_ADAPTER_1_URI + '/network-ports/fake-port-1'
+FAKED_VSWITCH_1_URI = '/api/virtual-switches/fake-vswitch-1'
+FAKED_ADAPTER_1 = {
+    'object-id': 'fake-osa-adapter-1',
+    'object-uri': FAKED_ADAPTER_1_URI,
+    'parent': FAKED_CPC_1_URI,
+    'class': 'adapter',
+    'name': FAKED_ADAPTER_1_NAME,
+    'description': 'OSA adapter #1',
+    'type': 'osd',
+    'adapter-family': 'osa',
+    'port-count': 1,
+    'network-port-uris': [FAKED_PORT_1_URI],
+    'adapter-id': '110',
+}
+FAKED_PORT_1 = {
+    'element-id': 'fake-port-1',
+    'element-uri': FAKED_PORT_1_URI,
+    'parent': FAKED_ADAPTER_1_URI,
+    'class': 'network-port',
+    'name': 'Port #1',
+    'description': 'Port #1 of OSA adapter #1',
+    'index': 0,
+}
+FAKED_VSWITCH_1 = {
+    'object-id': 'fake-vswitch-1',
+    'object-uri': FAKED_VSWITCH_1_URI,
+    'parent': FAKED_CPC_1_URI,
+    'class': 'virtual-switch',
+    'name': 'vswitch-1',
+    'description': 'vswitch for OSA adapter #1',
+    'type': 'osd',
+    'backing-adapter-uri': FAKED_ADAPTER_1_URI,
+    'port': 0,
+}
+
+# Faked NICs and HBA that initially exist in the partition
+FAKED_NIC_A = {
+    'element-id': 'fake-nic-a',
+    'element-uri': FAKED_PARTITION_1_URI + '/nics/fake-nic-a',
+    'parent': FAKED_PARTITION_1_URI,
+    'class': 'nic',
+    'name': 'nic-a',
+    'description': 'NIC A',
+    'device-number': '0100',
+    'virtual-switch-uri': FAKED_VSWITCH_1_URI,
+    'type': 'osd',
+}
+FAKED_NIC_B = {
+    'element-id': 'fake-nic-b',
+    'element-uri': FAKED_PARTITION_1_URI + '/nics/fake-nic-b',
+    'parent': FAKED_PARTITION_1_URI,
+    'class': 'nic',
+    'name': 'nic-b',
+    'description': 'NIC B',
+    'device-number': '0200',
+    'virtual-switch-uri': FAKED_VSWITCH_1_URI,
+    'type': 'osd',
+}
+FAKED_HBA_A = {
+    'element-id': 'fake-hba-a',
+    'element-uri': FAKED_PARTITION_1_URI + '/hbas/fake-hba-a',
+    'parent': FAKED_PARTITION_1_URI,
+    'class': 'hba',
+    'name': 'hba-a',
+    'description': 'HBA A',
+    'device-number': '1100',
+    'wwpn': 'abcdef0123456789',
+    'adapter-port-uri': 'faked-adapter-port-uri',
+}
+
+
+def get_failure_msg(mod_obj):
+    """
+    Return the module failure message, as a string (i.e. the 'msg' argument
+    of the call to fail_json()).
+    If the module succeeded, return None.
+    """
+
+    def func(msg):
+        return msg
+
+    if not mod_obj.fail_json.called:
+        return None
+    call_args = mod_obj.fail_json.call_args
+
+    # The following makes sure we get the arguments regardless of whether they
+    # were specified as positional or keyword arguments:
+    return func(*call_args[0], **call_args[1])
+
+
+def get_module_output(mod_obj):
+    """
+    Return the module output as a tuple (changed, partition_devices) (i.e.
+    the arguments of the call to exit_json()).
+    If the module failed, return None.
+    """
+
+    def func(changed, partition_devices):
+        return changed, partition_devices
+
+    if not mod_obj.exit_json.called:
+        return None
+    call_args = mod_obj.exit_json.call_args
+
+    # The following makes sure we get the arguments regardless of whether they
+    # were specified as positional or keyword arguments:
+    return func(*call_args[0], **call_args[1])
+
+
+class TestPartitionDevices(object):
+    """
+    All tests for the zhmc_partition_devices module.
+    """
+
+    def setup_method(self):
+        """
+        Using the zhmcclient mock support, set up a CPC in DPM mode with an
+        OSA adapter and a partition that has two NICs and one HBA.
+        """
+        self.session = FakedSession(**FAKED_SESSION_KWARGS)
+        self.client = Client(self.session)
+        self.session.hmc.consoles.add(FAKED_CONSOLE)
+        faked_cpc = self.session.hmc.cpcs.add(FAKED_CPC_1)
+        faked_adapter = faked_cpc.adapters.add(FAKED_ADAPTER_1)
+        faked_adapter.ports.add(FAKED_PORT_1)
+        faked_cpc.virtual_switches.add(FAKED_VSWITCH_1)
+        faked_partition = faked_cpc.partitions.add(FAKED_PARTITION_1)
+        faked_partition.nics.add(FAKED_NIC_A)
+        faked_partition.nics.add(FAKED_NIC_B)
+        faked_partition.hbas.add(FAKED_HBA_A)
+        self.cpc = self.client.cpcs.find(name=FAKED_CPC_1['name'])
+        self.partition = self.cpc.partitions.find(name=FAKED_PARTITION_1_NAME)
+
+    def run_module(self, ansible_mod_cls, check_mode, **device_params):
+        """
+        Run the module with the specified device parameters and return the
+        tuple (exit_code, mod_obj).
+        """
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': self.cpc.name,
+            'partition_name': FAKED_PARTITION_1_NAME,
+            'nics': None,
+            'hbas': None,
+            'virtual_functions': None,
+            'purge': False,
+            'max_concurrency': 4,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        params.update(device_params)
+
+        # Prepare mocks for AnsibleModule object
+        mod_obj = mock_ansible_module(ansible_mod_cls, params, check_mode)
+
+        # Exercise the code to be tested
+        with pytest.raises(SystemExit) as exc_info:
+            zhmc_partition_devices.main()
+        exit_code = exc_info.value.args[0]
+        return exit_code, mod_obj
+
+    def device_names(self, manager_attr):
+        """
+        Return the sorted names of the devices of the partition.
+        """
+        partition = self.cpc.partitions.find(name=FAKED_PARTITION_1_NAME)
+        manager = getattr(partition, manager_attr)
+        return sorted(dev.name for dev in manager.list())
+
+    @pytest.mark.parametrize(
+        "check_mode", [False, True])
+    @pytest.mark.parametrize(
+        "purge", [False, True])
+    @mock.patch("plugins.modules.zhmc_partition_devices.AnsibleModule",
+                autospec=True)
+    def test_pd_success(self, ansible_mod_cls, purge, check_mode):
+        """
+        Test creating, updating and deleting devices in one module run.
+        """
+        nics = [
+            dict(name='nic-a', state='present',
+                 properties=dict(description='NIC A updated')),
+            dict(name='nic-c', state='present',
+                 properties=dict(adapter_name=FAKED_ADAPTER_1_NAME,
+                                 adapter_port=0, device_number='0300')),
+        ]
+        hbas = [
+            dict(name='hba-a', state='absent', properties=None),
+        ]
+
+        exit_code, mod_obj = self.run_module(
+            ansible_mod_cls, check_mode, nics=nics, hbas=hbas, purge=purge)
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        # Assert module output
+        changed, devices = get_module_output(mod_obj)
+        assert changed is True
+        assert sorted(devices.keys()) == ['hbas', 'nics']
+        assert devices['hbas'] == {}
+        if check_mode:
+            assert sorted(devices['nics'].keys()) == ['nic-a']
+            assert devices['nics']['nic-a']['description'] == 'NIC A'
+        else:
+            assert sorted(devices['nics'].keys()) == ['nic-a', 'nic-c']
+            assert devices['nics']['nic-a']['description'] == 'NIC A updated'
+            assert devices['nics']['nic-c']['virtual-switch-uri'] == \
+                FAKED_VSWITCH_1_URI
+
+        # Assert the devices of the partition
+        if check_mode:
+            assert self.device_names('nics') == ['nic-a', 'nic-b']
+            assert self.device_names('hbas') == ['hba-a']
+        elif purge:
+            assert self.device_names('nics') == ['nic-a', 'nic-c']
+            assert self.device_names('hbas') == []
+        else:
+            assert self.device_names('nics') == ['nic-a', 'nic-b', 'nic-c']
+            assert self.device_names('hbas') == []
+
+    @mock.patch("plugins.modules.zhmc_partition_devices.AnsibleModule",
+                autospec=True)
+    def test_pd_unchanged(self, ansible_mod_cls):
+        """
+        Test that devices already in the desired state are not changed and
+        that unspecified device types are not managed.
+        """
+        nics = [
+            dict(name='nic-a', state='present',
+                 properties=dict(description='NIC A')),
+            dict(name='nic-d', state='absent', properties=None),
+        ]
+
+        exit_code, mod_obj = self.run_module(
+            ansible_mod_cls, False, nics=nics)
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        # Assert module output
+        changed, devices = get_module_output(mod_obj)
+        assert changed is False
+        assert sorted(devices.keys()) == ['nics']
+        assert sorted(devices['nics'].keys()) == ['nic-a']
+
+    @mock.patch("plugins.modules.zhmc_partition_devices.AnsibleModule",
+                autospec=True)
+    def test_pd_adapters_listed_once(self, ansible_mod_cls):
+        """
+        Test that the adapters of the CPC are listed only once for multiple
+        devices that specify their backing adapter, and that the backing
+        adapter is retrieved only once.
+        """
+        nics = [
+            dict(name='nic-{0}'.format(index), state='present',
+                 properties=dict(adapter_name=FAKED_ADAPTER_1_NAME,
+                                 adapter_port=0,
+                                 device_number='030{0}'.format(index)))
+            for index in range(3)]
+
+        with mock.patch.object(self.session, 'get',
+                               wraps=self.session.get) as get_mock:
+            exit_code, mod_obj = self.run_module(
+                ansible_mod_cls, False, nics=nics)
+
+        # Assert module exit code
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(get_failure_msg(mod_obj))
+
+        get_uris = [call[0][0].split('?')[0]
+                    for call in get_mock.call_args_list]
+        assert get_uris.count(self.cpc.uri + '/adapters') == 1
+        assert get_uris.count(FAKED_ADAPTER_1_URI) == 1
+        assert self.device_names('nics') == \
+            ['nic-0', 'nic-1', 'nic-2', 'nic-a', 'nic-b']
+
+    @pytest.mark.parametrize(
+        "nics, exp_msg_pattern", [
+            ([dict(name='nic-a', state='present', properties=None),
+              dict(name='nic-a', state='absent', properties=None)],
+             "ParameterError: Device 'nic-a' is specified more than once"),
+            ([dict(name='nic-a', state='present',
+                   properties=dict(adapter_name='foo', adapter_port=0))],
+             "ParameterError: Artificial property 'adapter_name' does not "
+             "specify the name of an existing adapter"),
+            ([dict(name='nic-a', state='present',
+                   properties=dict(element_id='foo'))],
+             "ParameterError: Property 'element_id' is not defined"),
+        ])
+    @mock.patch("plugins.modules.zhmc_partition_devices.AnsibleModule",
+                autospec=True)
+    def test_pd_error(self, ansible_mod_cls, nics, exp_msg_pattern):
+        """
+        Test parameter errors, which must be detected before any change is
+        made.
+        """
+        exit_code, mod_obj = self.run_module(
+            ansible_mod_cls, False, nics=nics, purge=True)
+
+        # Assert module exit code
+        assert exit_code == 1, \
+            "Module unexpectedly succeeded with this output:\n" \
+            "changed: {!r}, partition_devices: {!r}". \
+            format(*get_module_output(mod_obj))
+
+        # Assert the failure message and that nothing was changed
+        msg = get_failure_msg(mod_obj)
+        assert msg.startswith(exp_msg_pattern)
+        assert self.device_names('nics') == ['nic-a', 'nic-b']
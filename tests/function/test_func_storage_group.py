@@ -0,0 +1,435 @@
+# Copyright 2022 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Function tests for the expansion of artificial properties in the
+'zhmc_storage_group' and 'zhmc_partition' Ansible modules.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import pytest
+import mock
+
+import zhmcclient
+from zhmcclient_mock import FakedSession
+
+from plugins.module_utils import common as module_utils
+from plugins.modules import zhmc_storage_group, zhmc_partition
+
+from .func_utils import mock_ansible_module
+
+FAKED_SESSION_KWARGS = dict(
+    host='fake-host',
+    hmc_name='faked-hmc-name',
+    hmc_version='2.14.0',
+    api_version='2.20'
+)
+
+FAKED_CONSOLE = {
+    'object-uri': '/api/console',
+    'class': 'console',
+    'name': 'hmc-1',
+    'description': 'Console HMC1',
+    'version': '2.14.0',
+}
+
+FAKED_CPC_NAME = 'cpc-1'
+FAKED_CPC_URI = '/api/cpcs/fake-cpc-1'
+FAKED_CPC = {
+    'object-id': 'fake-cpc-1',
+    'object-uri': FAKED_CPC_URI,
+    'class': 'cpc',
+    'name': FAKED_CPC_NAME,
+    'description': 'CPC #1 in DPM mode',
+    'status': 'active',
+    'dpm-enabled': True,
+    'is-ensemble-member': False,
+    'iml-mode': 'dpm',
+}
+
+FAKED_ADAPTER_URI = '/api/adapters/fake-fcp-1'
+FAKED_ADAPTER = {
+    'object-id': 'fake-fcp-1',
+    'object-uri': FAKED_ADAPTER_URI,
+    'parent': FAKED_CPC_URI,
+    'class': 'adapter',
+    'name': 'fcp-1',
+    'adapter-id': '120',
+    'adapter-family': 'ficon',
+    'type': 'fcp',
+    'status': 'active',
+}
+
+FAKED_PORT_URIS = [
+    FAKED_ADAPTER_URI + '/storage-ports/0',
+    FAKED_ADAPTER_URI + '/storage-ports/1',
+]
+
+FAKED_SG_NAME = 'sg-1'
+FAKED_SG_URI = '/api/storage-groups/fake-sg-1'
+FAKED_SG = {
+    'object-id': 'fake-sg-1',
+    'object-uri': FAKED_SG_URI,
+    'class': 'storage-group',
+    'name': FAKED_SG_NAME,
+    'description': 'Storage group #1',
+    'cpc-uri': FAKED_CPC_URI,
+    'type': 'fcp',
+    'shared': False,
+    'fulfillment-state': 'complete',
+    # The faked HMC does not support virtual storage resources
+    'virtual-storage-resource-uris': [],
+    'candidate-adapter-port-uris': FAKED_PORT_URIS,
+}
+
+FAKED_PARTITION_NAME = 'part-1'
+
+ALL_EXPANSIONS = ['attached-partitions', 'candidate-adapter-ports',
+                  'storage-volumes', 'virtual-storage-resources']
+
+
+def get_module_output(mod_obj, result_name):
+    """
+    Return the module output as a tuple (changed, result) (i.e. the arguments
+    of the call to exit_json()), or fail with the message of the call to
+    fail_json().
+    """
+    if not mod_obj.exit_json.called:
+        pytest.fail("Module unexpectedly failed with this message:\n{0}".
+                    format(mod_obj.fail_json.call_args[1]['msg']))
+    call_args = mod_obj.exit_json.call_args[1]
+    return call_args['changed'], call_args[result_name]
+
+
+def get_counts(get_mock):
+    """
+    Return the number of GET requests by resource kind, from the mock of
+    Session.get().
+    """
+    counts = dict(adapters=0, ports=0, volumes=0, partitions=0,
+                  storage_groups=0)
+    for call in get_mock.call_args_list:
+        uri = call[0][0].split('?')[0]
+        if uri == FAKED_SG_URI:
+            counts['storage_groups'] += 1
+        elif '/storage-ports/' in uri:
+            counts['ports'] += 1
+        elif uri.startswith('/api/adapters/'):
+            counts['adapters'] += 1
+        elif '/storage-volumes/' in uri:
+            counts['volumes'] += 1
+        elif uri.startswith('/api/partitions/'):
+            counts['partitions'] += 1
+    return counts
+
+
+class TestStorageGroupExpansion(object):
+    """
+    Tests for the expansion of storage group properties.
+
+    The faked HMC does not support listing the partitions attached to a
+    storage group, so that is simulated by patching the zhmcclient method.
+    """
+
+    def setup_method(self):
+        """
+        Using the zhmcclient mock support, set up a CPC in DPM mode with an
+        FCP adapter with two ports, a partition, and a storage group with
+        two storage volumes and both ports as candidate adapter ports.
+        """
+        self.session = FakedSession(**FAKED_SESSION_KWARGS)
+        self.client = zhmcclient.Client(self.session)
+        self.session.hmc.consoles.add(FAKED_CONSOLE)
+        faked_cpc = self.session.hmc.cpcs.add(FAKED_CPC)
+        faked_adapter = faked_cpc.adapters.add(FAKED_ADAPTER)
+        for index, port_uri in enumerate(FAKED_PORT_URIS):
+            faked_adapter.ports.add({
+                'element-id': str(index),
+                'element-uri': port_uri,
+                'class': 'storage-port',
+                'index': index,
+                'name': 'port-{0}'.format(index),
+            })
+        faked_sg = self.session.hmc.consoles.console.storage_groups.add(
+            FAKED_SG)
+        for index in range(2):
+            faked_sg.storage_volumes.add({
+                'name': 'vol-{0}'.format(index),
+                'size': 10.0,
+                'usage': 'data',
+            })
+        faked_cpc.partitions.add({
+            'name': FAKED_PARTITION_NAME,
+            'status': 'stopped',
+            'storage-group-uris': [FAKED_SG_URI],
+        })
+
+    def list_attached_partitions(self, storage_group, name=None,
+                                 status=None):
+        "Simulate listing the partitions attached to the storage group."
+        # pylint: disable=unused-argument
+        cpc = self.client.cpcs.find(name=FAKED_CPC_NAME)
+        return cpc.partitions.list()
+
+    def run_module(self, module, params, result_name):
+        """
+        Run the module and return its output and the number of GET requests
+        by resource kind.
+        """
+        with mock.patch.object(
+                zhmcclient.StorageGroup, 'list_attached_partitions',
+                autospec=True, side_effect=self.list_attached_partitions), \
+            mock.patch.object(self.session, 'get',
+                              wraps=self.session.get) as get_mock:
+            with pytest.raises(SystemExit):
+                module.main()
+        mod_obj = module.AnsibleModule.return_value
+        changed, result = get_module_output(mod_obj, result_name)
+        return changed, result, get_counts(get_mock)
+
+    @pytest.mark.parametrize(
+        "expand, expand_properties, exp_expansions", [
+            (False, None, []),
+            (False, ['storage_volumes'], []),
+            (True, None, ALL_EXPANSIONS),
+            (True, ['storage_volumes'], ['storage-volumes']),
+            (True, ['candidate_adapter_ports', 'attached_partitions'],
+             ['attached-partitions', 'candidate-adapter-ports']),
+            (True, ['virtual_storage_resources'],
+             ['virtual-storage-resources']),
+            (True, [], []),
+        ])
+    @mock.patch("plugins.modules.zhmc_storage_group.AnsibleModule",
+                autospec=True)
+    def test_sg_expand_properties(
+            self, ansible_mod_cls, expand, expand_properties,
+            exp_expansions):
+        """
+        Test that state=facts returns exactly the expansions selected by
+        expand and expand_properties, and retrieves only the resources
+        needed for them, each at most once.
+        """
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': FAKED_CPC_NAME,
+            'name': FAKED_SG_NAME,
+            'state': 'facts',
+            'properties': None,
+            'expand': expand,
+            'expand_properties': expand_properties,
+            'result_properties': None,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        mock_ansible_module(ansible_mod_cls, params, False)
+
+        # Exercise the code to be tested
+        changed, sg_props, counts = self.run_module(
+            zhmc_storage_group, params, 'storage_group')
+
+        assert changed is False
+        assert sg_props['name'] == FAKED_SG_NAME
+        assert sg_props['attached-partition-names'] == [FAKED_PARTITION_NAME]
+        expansions = [name for name in ALL_EXPANSIONS if name in sg_props]
+        assert expansions == exp_expansions
+
+        if 'candidate-adapter-ports' in exp_expansions:
+            caps = sg_props['candidate-adapter-ports']
+            assert sorted(cap['element-uri'] for cap in caps) == \
+                FAKED_PORT_URIS
+            for cap in caps:
+                assert cap['parent-adapter']['name'] == FAKED_ADAPTER['name']
+        if 'storage-volumes' in exp_expansions:
+            assert sorted(sv['name'] for sv in sg_props['storage-volumes']) \
+                == ['vol-0', 'vol-1']
+        if 'attached-partitions' in exp_expansions:
+            assert [p['name'] for p in sg_props['attached-partitions']] == \
+                [FAKED_PARTITION_NAME]
+            assert 'storage-group-uris' in sg_props['attached-partitions'][0]
+
+        # The adapter of both ports is retrieved only once
+        exp_caps = 'candidate-adapter-ports' in exp_expansions
+        assert counts['adapters'] == (1 if exp_caps else 0)
+        assert counts['ports'] == (2 if exp_caps else 0)
+        assert counts['volumes'] == \
+            (2 if 'storage-volumes' in exp_expansions else 0)
+        assert counts['partitions'] == \
+            (1 if 'attached-partitions' in exp_expansions else 0)
+
+    @pytest.mark.parametrize(
+        "expand_properties, result_properties, exp_expansions", [
+            (None, dict(include=['storage_volumes'], exclude=None),
+             ['storage-volumes']),
+            (['storage_volumes', 'attached_partitions'],
+             dict(include=None, exclude=['attached_partitions']),
+             ['storage-volumes']),
+        ])
+    @mock.patch("plugins.modules.zhmc_storage_group.AnsibleModule",
+                autospec=True)
+    def test_sg_expand_result_properties(
+            self, ansible_mod_cls, expand_properties, result_properties,
+            exp_expansions):
+        """
+        Test that expansions that are not selected by result_properties are
+        not retrieved, in addition to the selection by expand_properties.
+        """
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': FAKED_CPC_NAME,
+            'name': FAKED_SG_NAME,
+            'state': 'facts',
+            'properties': None,
+            'expand': True,
+            'expand_properties': expand_properties,
+            'result_properties': result_properties,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        mock_ansible_module(ansible_mod_cls, params, False)
+
+        # Exercise the code to be tested
+        _, sg_props, counts = self.run_module(
+            zhmc_storage_group, params, 'storage_group')
+
+        expansions = [name for name in ALL_EXPANSIONS if name in sg_props]
+        assert expansions == exp_expansions
+        assert counts['adapters'] == 0
+        assert counts['ports'] == 0
+        assert counts['partitions'] == 0
+        assert counts['volumes'] == 2
+
+    @pytest.mark.parametrize(
+        "state", ['facts', 'present'])
+    @pytest.mark.parametrize(
+        "check_mode", [False, True])
+    @mock.patch("plugins.modules.zhmc_storage_group.AnsibleModule",
+                autospec=True)
+    def test_sg_selective_expand(self, ansible_mod_cls, check_mode, state):
+        """
+        Test that the storage group is not retrieved again for the expansion
+        after a property-selective retrieval, and that result_properties is
+        applied also in check mode.
+        """
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': FAKED_CPC_NAME,
+            'name': FAKED_SG_NAME,
+            'state': state,
+            'properties': None,
+            'expand': True,
+            'expand_properties': ['storage_volumes'],
+            'result_properties': dict(
+                include=['storage_volumes', 'type'], exclude=None),
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        mock_ansible_module(ansible_mod_cls, params, check_mode)
+        hmc = self.session.hmc
+
+        def pull_properties(resource, names):
+            "Simulate a property-selective retrieval"
+            faked_res = hmc.lookup_by_uri(resource.uri)
+            resource.update_properties_local(dict(
+                (name, faked_res.properties[name]) for name in names
+                if name in faked_res.properties))
+            module_utils.PropertyFreshness.of(resource).mark_fresh(names)
+
+        # The faked HMC does not support property-selective requests, so
+        # they are simulated.
+        with mock.patch.object(
+                module_utils, 'pull_properties',
+                side_effect=pull_properties) as pull_mock:
+
+            # Exercise the code to be tested
+            _, sg_props, counts = self.run_module(
+                zhmc_storage_group, params, 'storage_group')
+
+        # The expansions are not determined for state=present in check mode
+        if check_mode and state == 'present':
+            assert sorted(sg_props) == ['name', 'type']
+        else:
+            assert sorted(sg_props) == ['name', 'storage-volumes', 'type']
+            assert len(sg_props['storage-volumes']) == 2
+        if state == 'facts':
+            assert pull_mock.call_count == 1
+            assert pull_mock.call_args[0][0].uri == FAKED_SG_URI
+            assert 'storage-volume-uris' in pull_mock.call_args[0][1]
+            assert counts['storage_groups'] == 0
+
+    @pytest.mark.parametrize(
+        "expand_storage_groups", [False, True])
+    @mock.patch("plugins.modules.zhmc_partition.AnsibleModule",
+                autospec=True)
+    def test_partition_expand_storage_groups(
+            self, ansible_mod_cls, expand_storage_groups):
+        """
+        Test that zhmc_partition with expand_storage_groups returns the
+        storage groups of the partition with the expansions of
+        expand_storage_group_properties(), retrieving each resource once.
+        """
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': FAKED_CPC_NAME,
+            'name': FAKED_PARTITION_NAME,
+            'state': 'facts',
+            'properties': None,
+            'expand_storage_groups': expand_storage_groups,
+            'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        mock_ansible_module(ansible_mod_cls, params, False)
+
+        # Exercise the code to be tested
+        changed, part_props, counts = self.run_module(
+            zhmc_partition, params, 'partition')
+
+        assert changed is False
+        if not expand_storage_groups:
+            assert 'storage-groups' not in part_props
+            assert counts['adapters'] == 0
+            assert counts['volumes'] == 0
+            return
+        sgs = part_props['storage-groups']
+        assert [sg['name'] for sg in sgs] == [FAKED_SG_NAME]
+        sg_props = sgs[0]
+        assert [name for name in ALL_EXPANSIONS if name in sg_props] == [
+            'candidate-adapter-ports', 'storage-volumes',
+            'virtual-storage-resources']
+        assert len(sg_props['candidate-adapter-ports']) == 2
+        assert len(sg_props['storage-volumes']) == 2
+        assert counts['adapters'] == 1
+        assert counts['ports'] == 2
+        assert counts['volumes'] == 2
@@ -0,0 +1,330 @@
+# Copyright 2022 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Function tests for the batch mode of the 'zhmc_storage_group_attachment'
+Ansible module.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import threading
+import pytest
+import mock
+
+import zhmcclient
+from zhmcclient_mock import FakedSession
+
+from plugins.modules import zhmc_storage_group_attachment
+
+from .func_utils import mock_ansible_module
+
+FAKED_SESSION_KWARGS = dict(
+    host='fake-host',
+    hmc_name='faked-hmc-name',
+    hmc_version='2.14.0',
+    api_version='2.20'
+)
+
+FAKED_CONSOLE = {
+    'object-uri': '/api/console',
+    'class': 'console',
+    'name': 'hmc-1',
+    'description': 'Console HMC1',
+    'version': '2.14.0',
+}
+
+FAKED_CPC_NAME = 'cpc-1'
+FAKED_CPC_URI = '/api/cpcs/fake-cpc-1'
+FAKED_CPC = {
+    'object-id': 'fake-cpc-1',
+    'object-uri': FAKED_CPC_URI,
+    'class': 'cpc',
+    'name': FAKED_CPC_NAME,
+    'description': 'CPC #1 in DPM mode',
+    'status': 'active',
+    'dpm-enabled': True,
+    'is-ensemble-member': False,
+    'iml-mode': 'dpm',
+}
+
+FAKED_SG_NAME = 'sg-1'
+FAKED_SG = {
+    'object-id': 'fake-sg-1',
+    'object-uri': '/api/storage-groups/fake-sg-1',
+    'class': 'storage-group',
+    'name': FAKED_SG_NAME,
+    'description': 'Storage group #1',
+    'cpc-uri': FAKED_CPC_URI,
+    'type': 'fcp',
+    'shared': False,
+    'fulfillment-state': 'complete',
+}
+
+PARTITION_NAMES = ['part-1', 'part-2', 'part-3']
+
+
+def http_error_409():
+    "Return an HTTPError for HTTP status 409."
+    return zhmcclient.HTTPError({
+        'http-status': 409,
+        'reason': 1,
+        'message': 'Partition is in a transitional status',
+    })
+
+
+def get_module_result(mod_obj):
+    """
+    Return the arguments of the call to exit_json() or fail_json() of the
+    module, as a dict.
+    """
+    if mod_obj.exit_json.called:
+        return mod_obj.exit_json.call_args[1]
+    return mod_obj.fail_json.call_args[1]
+
+
+class TestStorageGroupAttachmentBatch(object):
+    """
+    All tests for the batch mode (partition_names) of the
+    zhmc_storage_group_attachment module.
+
+    The faked HMC does not support attaching storage groups to partitions, so
+    the attachments are simulated by patching the zhmcclient methods.
+    """
+
+    def setup_method(self):
+        """
+        Using the zhmcclient mock support, set up a CPC in DPM mode with
+        partitions and a storage group, and simulate the attachments of the
+        storage group.
+        """
+        self.session = FakedSession(**FAKED_SESSION_KWARGS)
+        self.client = zhmcclient.Client(self.session)
+        self.session.hmc.consoles.add(FAKED_CONSOLE)
+        faked_cpc = self.session.hmc.cpcs.add(FAKED_CPC)
+        for name in PARTITION_NAMES:
+            faked_cpc.partitions.add({
+                'name': name,
+                'status': 'stopped',
+            })
+        self.session.hmc.consoles.console.storage_groups.add(FAKED_SG)
+
+        self.attached = set()  # names of partitions attached
+        self.failures = {}  # exceptions by partition name, raised once
+        self.calls = []  # (operation, partition name)
+        self.lock = threading.Lock()
+
+    def change(self, operation, partition):
+        "Simulate an attach or detach operation."
+        with self.lock:
+            self.calls.append((operation, partition.name))
+            exc = self.failures.pop(partition.name, None)
+            if exc is not None:
+                raise exc
+            if operation == 'attach':
+                self.attached.add(partition.name)
+            else:
+                self.attached.discard(partition.name)
+
+    def run_module(self, ansible_mod_cls, state, partition_names,
+                   check_mode=False):
+        """
+        Run the module in batch mode with simulated attachments, and return
+        the module exit code, the module result and the mock for
+        wait_for_transition_completion().
+        """
+        params = {
+            'hmc_host': 'fake-host',
+            'hmc_auth': dict(userid='fake-userid',
+                             password='fake-password'),
+            'cpc_name': FAKED_CPC_NAME,
+            'storage_group_name': FAKED_SG_NAME,
+            'partition_name': None,
+            'partition_names': partition_names,
+            'max_concurrency': 10,
+            'state': state,
+            'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
+            '_faked_session': self.session,
+        }
+        mod_obj = mock_ansible_module(ansible_mod_cls, params, check_mode)
+
+        def attach(partition, storage_group):
+            # pylint: disable=unused-argument
+            self.change('attach', partition)
+
+        def detach(partition, storage_group):
+            # pylint: disable=unused-argument
+            self.change('detach', partition)
+
+        def list_attached_partitions(storage_group, name=None, status=None):
+            # pylint: disable=unused-argument
+            cpc = self.client.cpcs.find(name=FAKED_CPC_NAME)
+            return [p for p in cpc.partitions.list()
+                    if p.name in self.attached]
+
+        with mock.patch.object(
+                zhmcclient.Partition, 'attach_storage_group',
+                autospec=True, side_effect=attach), \
+            mock.patch.object(
+                zhmcclient.Partition, 'detach_storage_group',
+                autospec=True, side_effect=detach), \
+            mock.patch.object(
+                zhmcclient.StorageGroup, 'list_attached_partitions',
+                autospec=True, side_effect=list_attached_partitions), \
+            mock.patch.object(
+                zhmc_storage_group_attachment,
+                'wait_for_transition_completion') as wait_mock:
+            with pytest.raises(SystemExit) as exc_info:
+                zhmc_storage_group_attachment.main()
+
+        exit_code = exc_info.value.args[0]
+        return exit_code, get_module_result(mod_obj), wait_mock
+
+    @pytest.mark.parametrize(
+        "check_mode", [False, True])
+    @pytest.mark.parametrize(
+        "state, initial_attached, exp_calls", [
+            ('attached', [],
+             [('attach', 'part-1'), ('attach', 'part-2')]),
+            ('attached', ['part-2'],
+             [('attach', 'part-1')]),
+            ('attached', ['part-1', 'part-2'],
+             []),
+            ('detached', ['part-1', 'part-2', 'part-3'],
+             [('detach', 'part-1'), ('detach', 'part-2')]),
+            ('detached', ['part-3'],
+             []),
+            ('facts', ['part-2'],
+             []),
+        ])
+    @mock.patch("plugins.modules.zhmc_storage_group_attachment.AnsibleModule",
+                autospec=True)
+    def test_sga_batch_success(
+            self, ansible_mod_cls, state, initial_attached, exp_calls,
+            check_mode):
+        """
+        Test batch attach, detach and facts, with and without check mode.
+        """
+        self.attached.update(initial_attached)
+        partition_names = ['part-1', 'part-2']
+
+        # Exercise the code to be tested
+        exit_code, result, _ = self.run_module(
+            ansible_mod_cls, state, partition_names, check_mode)
+
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(result['msg'])
+        assert result['changed'] == bool(exp_calls)
+
+        # Check mode performs no operations and returns the actual state
+        if check_mode:
+            exp_calls = []
+        assert sorted(self.calls) == exp_calls
+
+        attachments = result['storage_group_attachments']
+        assert sorted(attachments) == partition_names
+        for name in partition_names:
+            assert attachments[name] == dict(
+                attached=name in self.attached, error=None)
+
+        # Partitions that were not specified are not changed
+        assert ('part-3' in self.attached) == ('part-3' in initial_attached)
+
+    @mock.patch("plugins.modules.zhmc_storage_group_attachment.AnsibleModule",
+                autospec=True)
+    def test_sga_batch_partition_not_found(self, ansible_mod_cls):
+        """
+        Test batch mode with a partition that does not exist.
+        """
+
+        # Exercise the code to be tested
+        exit_code, result, _ = self.run_module(
+            ansible_mod_cls, 'attached', ['part-1', 'part-x'])
+
+        assert exit_code == 1
+        assert result['msg'].startswith("ParameterError:")
+        assert 'part-x' in result['msg']
+        assert self.calls == []
+
+    @mock.patch("plugins.modules.zhmc_storage_group_attachment.AnsibleModule",
+                autospec=True)
+    def test_sga_batch_duplicate_names(self, ansible_mod_cls):
+        """
+        Test batch mode with a partition that is specified twice.
+        """
+
+        # Exercise code
+        exit_code, result, _ = self.run_module(
+            ansible_mod_cls, 'attached', ['part-1', 'part-2', 'part-1'])
+
+        assert exit_code == 1
+        assert result['msg'].startswith("ParameterError:")
+        assert "not unique" in result['msg']
+        assert self.calls == []
+        assert self.attached == set()
+
+    @mock.patch("plugins.modules.zhmc_storage_group_attachment.AnsibleModule",
+                autospec=True)
+    def test_sga_batch_retry(self, ansible_mod_cls):
+        """
+        Test that an operation that fails with HTTP status 409 is retried
+        once after waiting for the transition completion of the partition.
+        """
+        self.failures['part-1'] = http_error_409()
+
+        # Exercise the code to be tested
+        exit_code, result, wait_mock = self.run_module(
+            ansible_mod_cls, 'attached', ['part-1', 'part-2'])
+
+        assert exit_code == 0, \
+            "Module unexpectedly failed with this message:\n{0}". \
+            format(result['msg'])
+        assert result['changed'] is True
+        assert sorted(self.calls) == [
+            ('attach', 'part-1'), ('attach', 'part-1'), ('attach', 'part-2')]
+        assert wait_mock.call_count == 1
+        assert wait_mock.call_args[0][0].name == 'part-1'
+        assert self.attached == set(['part-1', 'part-2'])
+
+    @mock.patch("plugins.modules.zhmc_storage_group_attachment.AnsibleModule",
+                autospec=True)
+    def test_sga_batch_partial_failure(self, ansible_mod_cls):
+        """
+        Test that a failure for one partition does not prevent the changes
+        for the other partitions, and that the module fails with the result
+        for each partition.
+        """
+        self.failures['part-2'] = zhmcclient.HTTPError({
+            'http-status': 400,
+            'reason': 1,
+            'message': 'Bad request',
+        })
+
+        # Exercise the code to be tested
+        exit_code, result, wait_mock = self.run_module(
+            ansible_mod_cls, 'attached', ['part-1', 'part-2'])
+
+        assert exit_code == 1
+        assert 'part-2' in result['msg']
+        assert result['changed'] is True
+        assert wait_mock.call_count == 0
+        attachments = result['storage_group_attachments']
+        assert attachments['part-1'] == dict(attached=True, error=None)
+        assert attachments['part-2']['attached'] is False
+        assert attachments['part-2']['error'].startswith("HTTPError:")
+        assert self.attached == set(['part-1'])
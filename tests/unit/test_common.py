@@ -0,0 +1,1676 @@
+#!/usr/bin/env python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Unit tests for the 'common' module utilities.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import os
+import fcntl
+import json
+import logging
+import threading
+import time
+import pytest
+import mock
+import requests_mock
+import zhmcclient
+
+from plugins.module_utils import common as module_utils
+from plugins.module_utils.common import ParameterError
+
+
+class TestConcurrentMap(object):
+    """
+    Unit tests for the concurrent_map() function.
+    """
+
+    @pytest.mark.parametrize(
+        "max_concurrency", [0, 1, 3, 20])
+    @pytest.mark.parametrize(
+        "num_items", [0, 1, 10])
+    def test_cm_results(self, num_items, max_concurrency):
+        """
+        Test that the results are returned in the order of the items.
+        """
+        items = list(range(num_items))
+
+        # Exercise code
+        results = module_utils.concurrent_map(
+            lambda item: item * 2, items, max_concurrency)
+
+        assert results == [item * 2 for item in items]
+
+    @pytest.mark.parametrize(
+        "max_concurrency", [1, 2, 4])
+    def test_cm_bounded(self, max_concurrency):
+        """
+        Test that no more than max_concurrency calls run concurrently.
+        """
+        lock = threading.Lock()
+        counts = dict(active=0, max_active=0)
+
+        def func(item):
+            with lock:
+                counts['active'] += 1
+                counts['max_active'] = max(counts['max_active'],
+                                           counts['active'])
+            time.sleep(0.01)
+            with lock:
+                counts['active'] -= 1
+            return item
+
+        # Exercise code
+        module_utils.concurrent_map(func, range(12), max_concurrency)
+
+        assert counts['max_active'] <= max_concurrency
+        assert counts['active'] == 0
+
+    def test_cm_exception(self):
+        """
+        Test that all calls complete and that the exception of the first
+        failing item is re-raised.
+        """
+        called = []
+
+        def func(item):
+            called.append(item)
+            if item in (3, 5):
+                raise ValueError(item)
+            return item
+
+        # Exercise code
+        with pytest.raises(ValueError) as exc_info:
+            module_utils.concurrent_map(func, range(8), 4)
+
+        assert exc_info.value.args[0] == 3
+        assert sorted(called) == list(range(8))
+
+
+class TestResourceFetcher(object):
+    """
+    Unit tests for the ResourceFetcher class.
+    """
+
+    @staticmethod
+    def make_resource(uri, full_properties=False):
+        """
+        Return a mocked resource object with the specified URI.
+        """
+        resource = mock.Mock(spec=['uri', 'full_properties',
+                                   'pull_full_properties'])
+        resource.uri = uri
+        resource.full_properties = full_properties
+        return resource
+
+    def test_rf_dedup(self):
+        """
+        Test that resources with the same URI are retrieved only once.
+        """
+        fetcher = module_utils.ResourceFetcher(max_concurrency=4)
+        res1 = self.make_resource('/api/adapters/1')
+        res1b = self.make_resource('/api/adapters/1')
+        res2 = self.make_resource('/api/adapters/2')
+        res3 = self.make_resource('/api/adapters/3', full_properties=True)
+
+        # Exercise code
+        assert fetcher.add(res1) is res1
+        assert fetcher.add(res1b) is res1
+        assert fetcher.add(res2) is res2
+        assert fetcher.add(res3) is res3
+        fetcher.fetch()
+        fetcher.fetch()
+
+        assert res1.pull_full_properties.call_count == 1
+        assert res1b.pull_full_properties.call_count == 0
+        assert res2.pull_full_properties.call_count == 1
+        assert res3.pull_full_properties.call_count == 0
+
+
+class TestAsyncOperations(object):
+    """
+    Unit tests for submitting the final status-changing operation of
+    start_partition(), stop_partition() and ensure_lpar_*() asynchronously.
+    """
+
+    @staticmethod
+    def make_partition(status):
+        """Return a mocked partition with the specified status."""
+        partition = mock.Mock()
+        partition.name = 'part1'
+        partition.get_property.return_value = status
+        partition.manager.cpc.name = 'cpc1'
+        partition.manager.cpc.partitions.list.return_value = [partition]
+        return partition
+
+    @staticmethod
+    def make_lpar(status):
+        """Return a mocked LPAR with the specified status."""
+        lpar = mock.Mock()
+        lpar.name = 'lpar1'
+        lpar_listed = mock.Mock()
+        lpar_listed.get_property.return_value = status
+        lpar.manager.cpc.lpars.list.return_value = [lpar_listed]
+        return lpar
+
+    @pytest.mark.parametrize(
+        "func_name, status, method", [
+            ('start_partition', 'stopped', 'start'),
+            ('stop_partition', 'active', 'stop'),
+        ])
+    def test_partition_async(self, func_name, status, method):
+        """
+        Test that the operation is submitted without waiting and its job
+        is returned.
+        """
+        partition = self.make_partition(status)
+        jobs = []
+
+        # Exercise code
+        changed = getattr(module_utils, func_name)(
+            partition, False, jobs)
+
+        assert changed is True
+        operation = getattr(partition, method)
+        assert operation.call_args == mock.call(wait_for_completion=False)
+        assert jobs == [operation.return_value]
+
+    @pytest.mark.parametrize(
+        "func_name, status, method, exp_kwargs", [
+            ('ensure_lpar_inactive', 'operating', 'deactivate',
+             dict(wait_for_completion=False, force=True)),
+            ('ensure_lpar_active', 'not-activated', 'activate',
+             dict(wait_for_completion=False, activation_profile_name='p1',
+                  force=False)),
+            ('ensure_lpar_loaded', 'not-operating', 'load',
+             dict(wait_for_completion=False)),
+        ])
+    def test_lpar_async(self, func_name, status, method, exp_kwargs):
+        """
+        Test that the operation is submitted without waiting and its job
+        is returned.
+        """
+        lpar = self.make_lpar(status)
+        jobs = []
+        func = getattr(module_utils, func_name)
+        logger = mock.Mock()
+
+        # Exercise code
+        if func_name == 'ensure_lpar_inactive':
+            changed = func(logger, lpar, False, jobs)
+        else:
+            changed = func(logger, lpar, False, 'p1', False, jobs=jobs)
+
+        assert changed is True
+        operation = getattr(lpar, method)
+        assert operation.call_args == mock.call(**exp_kwargs)
+        assert jobs == [operation.return_value]
+
+
+class FakedClock(object):
+    """
+    A clock for time.time() and time.sleep() that advances only when
+    sleeping.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps = []
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class TestWaitStrategy(object):
+    """
+    Unit tests for the WaitStrategy and WaitHistory classes.
+    """
+
+    @staticmethod
+    def take(iterator, num):
+        """Return the first num items of an iterator."""
+        return [next(iterator) for _ in range(num)]
+
+    def test_ws_intervals(self):
+        """
+        Test the exponential back-off without history and without jitter.
+        """
+        strategy = module_utils.WaitStrategy(
+            initial_interval=1, max_interval=8, jitter=0)
+
+        # Exercise code
+        intervals = self.take(strategy.intervals('cpc1', 'op1'), 6)
+
+        assert intervals == [1, 2, 4, 8, 8, 8]
+
+    def test_ws_intervals_history(self):
+        """
+        Test that the first interval is based on the history.
+        """
+        history = module_utils.WaitHistory()
+        history.record('cpc1', 'op1', 100)
+        strategy = module_utils.WaitStrategy(
+            initial_interval=1, max_interval=8, jitter=0, history=history,
+            initial_delay_ratio=0.5)
+
+        # Exercise code
+        intervals1 = self.take(strategy.intervals('cpc1', 'op1'), 3)
+        intervals2 = self.take(strategy.intervals('cpc2', 'op1'), 3)
+
+        assert intervals1 == [50, 1, 2]
+        assert intervals2 == [1, 2, 4]
+
+    def test_ws_intervals_jitter(self):
+        """
+        Test that the intervals have jitter within the bounds.
+        """
+        strategy = module_utils.WaitStrategy(
+            initial_interval=10, max_interval=10, jitter=0.2)
+
+        # Exercise code
+        intervals = self.take(strategy.intervals(), 100)
+
+        assert all(8 <= interval <= 12 for interval in intervals)
+        assert len(set(intervals)) > 1
+
+    @pytest.mark.parametrize(
+        "polls_needed, exp_done, exp_sleeps", [
+            (3, True, [1, 2, 4]),
+            (10, False, [1, 2, 4, 3]),
+        ])
+    def test_ws_wait(self, polls_needed, exp_done, exp_sleeps):
+        """
+        Test wait() for completion and for timeout, and that the histogram is
+        logged.
+        """
+        clock = FakedClock()
+        logger = mock.Mock()
+        strategy = module_utils.WaitStrategy(
+            timeout=10, initial_interval=1, max_interval=30, jitter=0,
+            logger=logger)
+        polls = []
+
+        def check():
+            polls.append(clock.now)
+            return len(polls) >= polls_needed
+
+        with mock.patch.object(module_utils.time, 'time', clock.time), \
+                mock.patch.object(module_utils.time, 'sleep', clock.sleep):
+
+            # Exercise code
+            done = strategy.wait(check, 'cpc1', 'op1')
+
+        assert done is exp_done
+        assert clock.sleeps == exp_sleeps
+        assert logger.debug.call_count == 1
+        log_args = logger.debug.call_args[0]
+        exp_bucket = "<=10s: 1" if exp_done else ">600s: 0"
+        assert exp_bucket in log_args[-1]
+
+    def test_ws_history_file(self, tmp_path):
+        """
+        Test that the history is a moving average that is shared through the
+        file.
+        """
+        filename = str(tmp_path / 'history.json')
+        history1 = module_utils.WaitHistory(filename)
+
+        # Exercise code
+        history1.record('cpc1', 'op1', 100)
+        history1.record('cpc1', 'op1', 200)
+        history2 = module_utils.WaitHistory(filename)
+
+        assert history1.get('cpc1', 'op1') == pytest.approx(130)
+        assert history2.get('cpc1', 'op1') == pytest.approx(130)
+        assert history2.get('cpc1', 'op2') is None
+
+    def test_ws_history_bad_file(self, tmp_path):
+        """
+        Test that an invalid or inaccessible history file is ignored.
+        """
+        bad_file = tmp_path / 'history.json'
+        bad_file.write_text(u'{invalid')
+        history1 = module_utils.WaitHistory(str(bad_file))
+        history2 = module_utils.WaitHistory(
+            str(tmp_path / 'missing' / 'history.json'))
+
+        # Exercise code
+        assert history1.get('cpc1', 'op1') is None
+        history2.record('cpc1', 'op1', 10)
+
+        assert history2.get('cpc1', 'op1') == 10
+
+    def test_wait_for_partition_status(self):
+        """
+        Test wait_for_partition_status() for completion and for timeout.
+        """
+        clock = FakedClock()
+        partition = mock.Mock()
+        partition.name = 'part1'
+        partition.manager.cpc.name = 'cpc1'
+        listed = mock.Mock()
+        listed.get_property.side_effect = ['starting', 'starting', 'active']
+        partition.manager.cpc.partitions.list.return_value = [listed]
+        strategy = module_utils.WaitStrategy(timeout=5, jitter=0)
+
+        with mock.patch.object(module_utils.time, 'time', clock.time), \
+                mock.patch.object(module_utils.time, 'sleep', clock.sleep):
+
+            # Exercise code
+            module_utils.wait_for_partition_status(
+                partition, ('active',), 'partition-start', strategy)
+
+            listed.get_property.side_effect = None
+            listed.get_property.return_value = 'starting'
+            with pytest.raises(module_utils.StatusTimeout):
+                module_utils.wait_for_partition_status(
+                    partition, ('active',), 'partition-start', strategy)
+
+        assert clock.sleeps == [1, 2, 2, 1, 2, 2]
+
+
+class TestRequestThrottle(object):
+    """
+    Unit tests for the RequestThrottle class and request_throttle().
+    """
+
+    def test_rt_concurrency(self, tmp_path):
+        """
+        Test that the number of concurrent requests is limited across threads,
+        and that the throttle is reentrant.
+        """
+        throttle = module_utils.RequestThrottle(
+            'hmc1', max_concurrent_requests=2, directory=str(tmp_path),
+            poll_interval=0.01)
+        lock = threading.Lock()
+        counts = dict(active=0, max_active=0)
+
+        def request(item):
+            with lock:
+                counts['active'] += 1
+                counts['max_active'] = max(
+                    counts['max_active'], counts['active'])
+            time.sleep(0.02)
+            with lock:
+                counts['active'] -= 1
+            # A nested request must not wait for a slot
+            return throttle.call(lambda: item)
+
+        # Exercise code
+        results = module_utils.concurrent_map(
+            lambda item: throttle.call(request, item), range(8), 8)
+
+        assert results == list(range(8))
+        assert counts['max_active'] == 2
+        stats = throttle.stats()
+        assert stats['requests'] == 8
+        assert stats['throttled_requests'] >= 6
+        assert stats['wait_time'] > 0
+
+    def test_rt_other_process(self, tmp_path):
+        """
+        Test that a slot that is locked elsewhere (e.g. by another process) is
+        waited for.
+        """
+        throttle = module_utils.RequestThrottle(
+            'hmc1', max_concurrent_requests=1, directory=str(tmp_path),
+            poll_interval=0.01)
+        slot_file = str(tmp_path / 'hmc1' / 'slot-0.lock')
+        fd = os.open(slot_file, os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        timer = threading.Timer(0.1, os.close, [fd])
+        timer.start()
+
+        # Exercise code
+        start = time.time()
+        throttle.call(lambda: None)
+        elapsed = time.time() - start
+
+        timer.join()
+        assert elapsed >= 0.09
+        assert throttle.stats()['throttled_requests'] == 1
+
+    def test_rt_timeout(self, tmp_path):
+        """
+        Test that waiting for a slot that does not become free times out.
+        """
+        throttle = module_utils.RequestThrottle(
+            'hmc1', max_concurrent_requests=1, directory=str(tmp_path),
+            poll_interval=0.01, timeout=0.1)
+        slot_file = str(tmp_path / 'hmc1' / 'slot-0.lock')
+        fd = os.open(slot_file, os.O_RDWR | os.O_CREAT)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+        func = mock.Mock()
+        try:
+            with pytest.raises(module_utils.Error) as exc_info:
+
+                # Exercise code
+                throttle.call(func)
+
+        finally:
+            os.close(fd)
+        assert 'Timed out' in str(exc_info.value)
+        assert func.call_count == 0
+
+    def test_rt_rate(self, tmp_path):
+        """
+        Test that the request rate is limited.
+        """
+        throttle = module_utils.RequestThrottle(
+            'hmc1', max_requests_per_second=50, directory=str(tmp_path))
+
+        # Exercise code
+        start = time.time()
+        for _ in range(6):
+            throttle.call(lambda: None)
+        elapsed = time.time() - start
+
+        assert elapsed >= 0.09
+
+    def test_rt_wrap(self, tmp_path):
+        """
+        Test that the job of a synchronous POST is waited for outside of the
+        throttle.
+        """
+        throttle = module_utils.RequestThrottle(
+            'hmc1', max_concurrent_requests=1, directory=str(tmp_path))
+        session = mock.Mock()
+        job = mock.Mock(spec=module_utils.Job)
+        job.wait_for_completion.return_value = 'job-result'
+        session.post.return_value = job
+        orig_post = session.post
+
+        # Exercise code
+        throttle.wrap(session)
+        result = session.post('/api/foo', body={}, wait_for_completion=True,
+                              operation_timeout=10)
+        session.get('/api/bar')
+
+        assert result == 'job-result'
+        assert orig_post.call_args == mock.call(
+            '/api/foo', body={}, wait_for_completion=False)
+        assert job.wait_for_completion.call_args == mock.call(10)
+        assert session.zhmc_throttle.stats()['requests'] == 2
+
+    def test_rt_wrap_twice(self, tmp_path):
+        """
+        Test that wrapping a session that is already throttled does not nest
+        the throttles, which would deadlock with a single slot.
+        """
+        throttle = module_utils.RequestThrottle(
+            'hmc1', max_concurrent_requests=1, directory=str(tmp_path),
+            timeout=1)
+        other_throttle = module_utils.RequestThrottle(
+            'hmc1', max_concurrent_requests=1, directory=str(tmp_path),
+            timeout=1)
+        session = mock.Mock()
+        session.get.return_value = 'get-result'
+
+        # Exercise code
+        throttle.wrap(session)
+        other_throttle.wrap(session)
+        result = session.get('/api/bar')
+
+        assert result == 'get-result'
+        assert session.zhmc_throttle is throttle
+        assert throttle.stats()['requests'] == 1
+        assert other_throttle.stats()['requests'] == 0
+
+    @pytest.mark.parametrize(
+        "env, exp_concurrency, exp_rate", [
+            ({}, None, None),
+            ({'ZHMC_MAX_CONCURRENT_REQUESTS': '4'}, 4, None),
+            ({'ZHMC_MAX_REQUESTS_PER_SECOND': '2.5'}, None, 2.5),
+            ({'ZHMC_MAX_CONCURRENT_REQUESTS': 'x'}, ParameterError, None),
+            ({'ZHMC_MAX_REQUESTS_PER_SECOND': '0'}, ParameterError, None),
+        ])
+    def test_request_throttle(self, env, exp_concurrency, exp_rate):
+        """
+        Test request_throttle() with the environment variables.
+        """
+        with mock.patch.dict(os.environ, env, clear=True):
+
+            if exp_concurrency is ParameterError:
+                with pytest.raises(ParameterError):
+
+                    # Exercise code
+                    module_utils.request_throttle('hmc1')
+                return
+
+            # Exercise code
+            throttle = module_utils.request_throttle('hmc1')
+
+        if exp_concurrency is None and exp_rate is None:
+            assert throttle is None
+        else:
+            assert throttle.max_concurrent_requests == exp_concurrency
+            assert throttle.max_requests_per_second == exp_rate
+
+
+class TestNameUriCache(object):
+    """
+    Unit tests for the NameUriCache class, uri_cache() and find_partition().
+    """
+
+    def setup_method(self):
+        """
+        Set up a faked HMC with a CPC in DPM mode and a partition.
+        """
+        self.session = module_utils.FakedSession(
+            'fake-host', 'fake-hmc', '2.14.1', '2.20')
+        self.faked_cpc = self.session.hmc.cpcs.add({
+            'object-id': 'fake-cpc-1',
+            'name': 'cpc-1',
+            'dpm-enabled': True,
+        })
+        self.faked_cpc.partitions.add({
+            'object-id': 'fake-part-1',
+            'name': 'part-1',
+            'status': 'stopped',
+        })
+        self.client = zhmcclient.Client(self.session)
+
+    def list_uris(self, get_mock):
+        "Return the URIs of the list operations that were performed."
+        return [c[0][0].split('?')[0] for c in get_mock.call_args_list
+                if c[0][0].split('?')[0] in (
+                    '/api/cpcs', '/api/cpcs/fake-cpc-1/partitions')]
+
+    def test_nuc_persistence(self, tmp_path):
+        """
+        Test that the entries are shared through the cache file.
+        """
+        cache1 = module_utils.NameUriCache('hmc:1', str(tmp_path))
+        cache2 = module_utils.NameUriCache('hmc:1', str(tmp_path))
+
+        # Exercise code
+        cache1.set('cpc:cpc-1', '/api/cpcs/1')
+        cache1.set('cpc:cpc-2', '/api/cpcs/2')
+        cache2.delete('cpc:cpc-1')
+
+        assert cache1.filename == str(tmp_path / 'hmc_1.json')
+        cache3 = module_utils.NameUriCache('hmc:1', str(tmp_path))
+        assert cache3.get('cpc:cpc-1') is None
+        assert cache3.get('cpc:cpc-2') == '/api/cpcs/2'
+        assert (cache3.hits, cache3.misses) == (1, 1)
+
+    def test_nuc_bad_file(self, tmp_path):
+        """
+        Test that an invalid cache file is treated as empty, and that a cache
+        file that cannot be written is ignored.
+        """
+        (tmp_path / 'hmc1.json').write_text(u'{bad json')
+        cache = module_utils.NameUriCache('hmc1', str(tmp_path))
+        assert cache.get('cpc:cpc-1') is None
+
+        (tmp_path / 'file').write_text(u'')
+        cache = module_utils.NameUriCache('hmc1', str(tmp_path / 'file'))
+
+        # Exercise code
+        cache.set('cpc:cpc-1', '/api/cpcs/1')
+
+        assert cache.get('cpc:cpc-1') == '/api/cpcs/1'
+
+    @pytest.mark.parametrize(
+        "env, faked, exp_directory", [
+            ({}, False, module_utils.DEFAULT_URI_CACHE_DIR),
+            ({}, True, None),
+            ({'ZHMC_URI_CACHE_DIR': ''}, False, None),
+            ({'ZHMC_URI_CACHE_DIR': '/cache'}, True, '/cache'),
+        ])
+    def test_uri_cache(self, env, faked, exp_directory):
+        """
+        Test uri_cache() with the environment variable.
+        """
+        with mock.patch.dict(os.environ, env, clear=True):
+
+            # Exercise code
+            cache = module_utils.uri_cache('hmc1', faked)
+
+        if exp_directory is None:
+            assert cache is None
+        else:
+            assert cache.directory == exp_directory
+
+    @pytest.mark.parametrize(
+        "cached, exp_lists", [
+            (False, ['/api/cpcs', '/api/cpcs/fake-cpc-1/partitions']),
+            (True, []),
+        ])
+    def test_find_partition(self, tmp_path, cached, exp_lists):
+        """
+        Test that a partition with cached URIs is found without listing, and
+        that its properties are then current.
+        """
+        self.session.zhmc_uri_cache = module_utils.NameUriCache(
+            'fake-host', str(tmp_path))
+        if cached:
+            module_utils.find_partition(self.client, 'cpc-1', 'part-1')
+            self.client = zhmcclient.Client(self.session)
+
+        with mock.patch.object(
+                self.session, 'get', wraps=self.session.get) as get_mock:
+
+            # Exercise code
+            cpc, partition = module_utils.find_partition(
+                self.client, 'cpc-1', 'part-1')
+
+            module_utils.pull_full_properties(partition)
+
+        assert cpc.uri == '/api/cpcs/fake-cpc-1'
+        assert partition.uri == '/api/partitions/fake-part-1'
+        assert self.list_uris(get_mock) == exp_lists
+        assert get_mock.call_count == len(exp_lists) + 1
+
+    def test_find_partition_selective(self, tmp_path):
+        """
+        Test that a cached partition URI is validated with a
+        property-selective request, and not by retrieving the full set of
+        properties.
+        """
+        self.session.zhmc_uri_cache = module_utils.NameUriCache(
+            'fake-host', str(tmp_path))
+        module_utils.find_partition(self.client, 'cpc-1', 'part-1')
+        self.client = zhmcclient.Client(self.session)
+
+        def pull_properties(partition, names):
+            # pylint: disable=unused-argument
+            partition.update_properties_local(
+                {'name': 'part-1', 'parent': '/api/cpcs/fake-cpc-1'})
+
+        # The faked session does not support property-selective requests, so
+        # it is treated like a real session and the request is simulated.
+        with mock.patch.object(module_utils, 'FakedSession', type(None)), \
+            mock.patch.object(
+                zhmcclient.Partition, 'pull_properties', autospec=True,
+                side_effect=pull_properties) as pull_mock, \
+            mock.patch.object(
+                zhmcclient.Partition, 'pull_full_properties',
+                autospec=True) as pull_full_mock:
+
+            # Exercise code
+            _, partition = module_utils.find_partition(
+                self.client, 'cpc-1', 'part-1')
+
+        assert partition.uri == '/api/partitions/fake-part-1'
+        assert pull_mock.call_args == mock.call(partition, ['name', 'parent'])
+        assert pull_full_mock.call_count == 0
+
+    def test_find_partition_outdated(self, tmp_path):
+        """
+        Test that outdated URIs of the CPC and partition are removed from the
+        cache and the resources are found by listing.
+        """
+        cache = module_utils.NameUriCache('fake-host', str(tmp_path))
+        self.session.zhmc_uri_cache = cache
+        cache.set('cpc:cpc-1', '/api/cpcs/old-cpc')
+        cache.set('partition:/api/cpcs/old-cpc:part-1',
+                  '/api/partitions/old-part')
+        cache.set('partition:/api/cpcs/fake-cpc-1:part-2',
+                  '/api/partitions/fake-part-1')
+
+        # Exercise code
+        _, partition = module_utils.find_partition(
+            self.client, 'cpc-1', 'part-1')
+
+        assert partition.uri == '/api/partitions/fake-part-1'
+        cache = module_utils.NameUriCache('fake-host', str(tmp_path))
+        assert cache.get('cpc:cpc-1') == '/api/cpcs/fake-cpc-1'
+        assert cache.get('partition:/api/cpcs/fake-cpc-1:part-1') == \
+            '/api/partitions/fake-part-1'
+
+        # Exercise code
+        _, partition = module_utils.find_partition(
+            self.client, 'cpc-1', 'part-2', required=False)
+
+        assert partition is None
+        cache = module_utils.NameUriCache('fake-host', str(tmp_path))
+        assert cache.get('partition:/api/cpcs/fake-cpc-1:part-2') is None
+        with pytest.raises(zhmcclient.NotFound):
+
+            # Exercise code
+            module_utils.find_partition(self.client, 'cpc-1', 'part-2')
+
+
+def http_error(http_status, reason=1):
+    "Return a zhmcclient.HTTPError with the HTTP status and reason code."
+    return module_utils.HTTPError({
+        'http-status': http_status,
+        'reason': reason,
+        'message': 'fake error',
+        'request-method': 'GET',
+        'request-uri': '/api/fake',
+    })
+
+
+class TestRetryPolicy(object):
+    """
+    Unit tests for the RetryPolicy class and related functions.
+    """
+
+    @pytest.mark.parametrize(
+        "errors, exp_exc, exp_sleeps, exp_stats", [
+            ([], None, [], (0, 0, 0)),
+            ([http_error(503), http_error(409)], None, [1, 2], (1, 2, 0)),
+            ([module_utils.HMCConnectionError('reset', None)], None, [1],
+             (1, 1, 0)),
+            ([http_error(503)] * 3, module_utils.HTTPError, [1, 2],
+             (1, 2, 1)),
+            ([http_error(404)], module_utils.HTTPError, [], (0, 0, 0)),
+            ([ValueError()], ValueError, [], (0, 0, 0)),
+        ])
+    def test_rp_call(self, errors, exp_exc, exp_sleeps, exp_stats):
+        """
+        Test that only transient errors are retried, up to the maximum number
+        of attempts.
+        """
+        policy = module_utils.RetryPolicy(attempts=3, backoff=1, jitter=0)
+        func = mock.Mock(side_effect=list(errors) + ['result'])
+
+        with mock.patch.object(module_utils.time, 'sleep') as sleep:
+            if exp_exc:
+                with pytest.raises(exp_exc):
+
+                    # Exercise code
+                    policy.call(func, 'arg')
+            else:
+
+                # Exercise code
+                result = policy.call(func, 'arg')
+
+                assert result == 'result'
+
+        assert [c[0][0] for c in sleep.call_args_list] == exp_sleeps
+        stats = policy.stats()
+        assert (stats['retried_requests'], stats['retries'],
+                stats['failed_requests']) == exp_stats
+        assert stats['backoff_time'] == sum(exp_sleeps)
+
+    def test_rp_nested(self):
+        """
+        Test that requests issued during a retried operation are not retried
+        individually.
+        """
+        policy = module_utils.RetryPolicy(attempts=2, backoff=1, jitter=0)
+        request = mock.Mock(side_effect=[http_error(409), 'ok'])
+
+        def operation():
+            return policy.call(request)
+
+        with mock.patch.object(module_utils.time, 'sleep'):
+
+            # Exercise code
+            result = policy.call(operation)
+
+        assert result == 'ok'
+        assert request.call_count == 2
+        assert policy.stats()['retries'] == 1
+
+    def test_rp_wrap(self):
+        """
+        Test that GET requests of a wrapped session are retried, and that
+        wrapping a session twice has no effect.
+        """
+        policy = module_utils.RetryPolicy(attempts=2, backoff=1, jitter=0)
+        session = mock.Mock()
+        session.get.side_effect = [http_error(503), 'ok']
+        session.post.side_effect = [http_error(503)]
+        orig_get = session.get
+
+        # Exercise code
+        policy.wrap(session)
+        policy.wrap(session)
+        with mock.patch.object(module_utils.time, 'sleep'):
+            result = session.get('/api/foo')
+            with pytest.raises(module_utils.HTTPError):
+                session.post('/api/foo', body={})
+
+        assert result == 'ok'
+        assert orig_get.call_count == 2
+        assert session.zhmc_retry is policy
+        assert policy.stats()['retries'] == 1
+
+    def test_update_after_transition(self):
+        """
+        Test that update_after_transition() retries the wait for the
+        transition together with the update.
+        """
+        policy = module_utils.RetryPolicy(attempts=2, backoff=1, jitter=0)
+        partition = mock.Mock()
+        partition.manager.session.zhmc_retry = policy
+        listed_partition = mock.Mock()
+        listed_partition.get_property.return_value = 'active'
+        partition.manager.cpc.partitions.list.return_value = \
+            [listed_partition]
+        nic = mock.Mock()
+        nic.update_properties.side_effect = [http_error(409), None]
+
+        # Exercise code
+        with mock.patch.object(module_utils.time, 'sleep'):
+            module_utils.update_after_transition(
+                partition, nic, {'description': 'foo'})
+
+        # The partition status is retrieved for each attempt
+        assert partition.manager.cpc.partitions.list.call_count == 2
+        assert nic.update_properties.call_args_list == \
+            [mock.call({'description': 'foo'})] * 2
+
+    def test_rp_close_session(self, caplog):
+        """
+        Test that the retry statistics of a session are logged when the
+        session is closed.
+        """
+        policy = module_utils.RetryPolicy(attempts=2, backoff=1, jitter=0)
+        session = mock.Mock(spec=['get', 'logoff'])
+        session.get.side_effect = [http_error(503), 'result']
+        policy.wrap(session)
+        with mock.patch.object(module_utils.time, 'sleep'):
+            session.get('/api/foo')
+
+        # Exercise code
+        with caplog.at_level(logging.DEBUG, logger='zhmc_common'):
+            module_utils.close_session(session, False)
+
+        assert "Retries of HMC requests: {0!r}".format(policy.stats()) in \
+            caplog.text
+        assert policy.stats()['retries'] == 1
+
+    @pytest.mark.parametrize(
+        "env, exp_attempts, exp_backoff", [
+            ({}, 3, 1.0),
+            ({'ZHMC_RETRY_ATTEMPTS': '1', 'ZHMC_RETRY_BACKOFF': '0.5'}, 1,
+             0.5),
+            ({'ZHMC_RETRY_ATTEMPTS': '-1'}, ParameterError, None),
+        ])
+    def test_default_retry_policy(self, env, exp_attempts, exp_backoff):
+        """
+        Test default_retry_policy() with the environment variables.
+        """
+        with mock.patch.dict(os.environ, env, clear=True), \
+                mock.patch.object(module_utils, '_RETRY_POLICY', []):
+
+            if exp_attempts is ParameterError:
+                with pytest.raises(ParameterError):
+
+                    # Exercise code
+                    module_utils.default_retry_policy()
+                return
+
+            # Exercise code
+            policy = module_utils.default_retry_policy()
+
+            assert module_utils.default_retry_policy() is policy
+
+        assert policy.attempts == exp_attempts
+        assert policy.backoff.initial_interval == exp_backoff
+
+
+class TestPullProperties(object):
+    """
+    Unit tests for the pull_properties() function.
+    """
+
+    @pytest.mark.parametrize(
+        "faked, exp_selective", [
+            (False, True),
+            (True, False),
+        ])
+    def test_pull_properties(self, faked, exp_selective):
+        """
+        Test that the properties are retrieved selectively, except for faked
+        sessions.
+        """
+        resource = mock.Mock()
+        if faked:
+            resource.manager.session = module_utils.FakedSession(
+                'fake-host', 'fake-hmc', '2.13.1', '1.8')
+
+        # Exercise code
+        module_utils.pull_properties(resource, {'status', 'description'})
+
+        if exp_selective:
+            assert resource.pull_properties.call_args == \
+                mock.call(['description', 'status'])
+            assert resource.pull_full_properties.called is False
+        else:
+            assert resource.pull_properties.called is False
+            assert resource.pull_full_properties.call_count == 1
+
+    def test_pull_properties_fresh(self):
+        """
+        Test that current properties are not retrieved again, until they are
+        invalidated.
+        """
+        resource = mock.Mock()
+
+        # Exercise code
+        module_utils.pull_properties(resource, {'status', 'description'})
+        module_utils.pull_properties(resource, {'status'})
+        module_utils.pull_full_properties(resource)
+        module_utils.pull_full_properties(resource)
+        module_utils.invalidate_properties(resource)
+        module_utils.pull_properties(resource, {'status'})
+
+        assert resource.pull_properties.call_args_list == [
+            mock.call(['description', 'status']), mock.call(['status'])]
+        assert resource.pull_full_properties.call_count == 1
+
+
+class TestResultSelector(object):
+    """
+    Unit tests for the ResultSelector class.
+    """
+
+    @pytest.mark.parametrize(
+        "result_properties, exp_selected, exp_hmc_properties", [
+            (None,
+             ['name', 'status', 'nics', 'description', 'acceptable-status'],
+             None),
+            (dict(include=None, exclude=['nics', 'status']),
+             ['name', 'description', 'acceptable-status'],
+             None),
+            (dict(include=['status', 'nics'], exclude=None),
+             ['name', 'status', 'nics'],
+             ['name', 'nic-uris', 'status']),
+            (dict(include=['status', 'nics', 'acceptable_status'],
+                  exclude=['nics']),
+             ['name', 'status', 'acceptable-status'],
+             ['acceptable-status', 'name', 'status']),
+        ])
+    def test_rs_selection(
+            self, result_properties, exp_selected, exp_hmc_properties):
+        """
+        Test the selection of properties.
+        """
+        selector = module_utils.ResultSelector(
+            result_properties, dependencies={'nics': ('nic-uris',)})
+        properties = {
+            'name': 'p1', 'status': 'active', 'nics': [],
+            'description': '', 'acceptable-status': [],
+        }
+
+        # Exercise code
+        result = selector.apply(properties)
+        hmc_properties = selector.hmc_properties()
+
+        assert sorted(result) == sorted(exp_selected)
+        for name in properties:
+            assert selector.selected(name) == (name in exp_selected)
+        if exp_hmc_properties is None:
+            assert hmc_properties is None
+        else:
+            assert sorted(hmc_properties) == exp_hmc_properties
+
+    def test_rs_pull(self):
+        """
+        Test that pull() retrieves the full properties without include list,
+        and otherwise the needed properties.
+        """
+        resource = mock.Mock()
+        resource.manager.session = mock.Mock()
+
+        # Exercise code
+        module_utils.ResultSelector(None).pull(resource)
+        module_utils.ResultSelector(dict(include=['status'])).pull(
+            resource, required=('cpc-uri',))
+
+        assert resource.pull_full_properties.call_count == 1
+        assert resource.pull_properties.call_args == \
+            mock.call(['cpc-uri', 'name', 'status'])
+
+
+class TestListDelta(object):
+    """
+    Unit tests for the ListDelta class.
+    """
+
+    ITEMS = [
+        dict(name='p1', cpc_name='CPC1', status='active'),
+        dict(name='p2', cpc_name='CPC1', status='stopped'),
+        dict(name='p1', cpc_name='CPC2', status='active'),
+    ]
+
+    def test_ld_no_token(self):
+        """
+        Test that without since_token, all items are returned.
+        """
+        items, removed, token = module_utils.ListDelta(None).apply(
+            self.ITEMS)
+
+        assert items == self.ITEMS
+        assert removed == []
+        assert token.startswith(module_utils.ListDelta.TOKEN_PREFIX)
+
+    def test_ld_delta(self):
+        """
+        Test that with since_token, only the added and changed items are
+        returned, and the removed items are identified.
+        """
+        _, _, token = module_utils.ListDelta(None).apply(self.ITEMS)
+        new_items = [
+            dict(name='p1', cpc_name='CPC1', status='active'),  # unchanged
+            dict(name='p2', cpc_name='CPC1', status='active'),  # changed
+            dict(name='p3', cpc_name='CPC1', status='stopped'),  # added
+        ]
+
+        # Exercise code
+        items, removed, new_token = module_utils.ListDelta(token).apply(
+            new_items)
+
+        assert items == new_items[1:]
+        assert removed == [dict(name='p1', cpc_name='CPC2')]
+        assert new_token == module_utils.ListDelta(None).apply(new_items)[2]
+
+        # A token for unchanged items results in an empty delta
+        items, removed, _ = module_utils.ListDelta(new_token).apply(new_items)
+        assert items == []
+        assert removed == []
+
+    @pytest.mark.parametrize(
+        "token", [
+            'foo',
+            module_utils.ListDelta.TOKEN_PREFIX + 'foo',
+            module_utils.ListDelta.TOKEN_PREFIX + 'eJyrVkpUslIwrAUACeUCKQ==',
+        ])
+    def test_ld_invalid_token(self, token):
+        """
+        Test that an invalid since_token raises ParameterError.
+        """
+        with pytest.raises(ParameterError):
+            module_utils.ListDelta(token)
+
+
+class TestPropertySchema(object):
+    """
+    Unit tests for the PropertySchema class.
+    """
+
+    def test_ps_compile(self):
+        """
+        Test that the property definitions are compiled into PropertyDef
+        records and property name sets.
+        """
+        resource_properties = {
+            'name': (True, True, True, True, None, None),
+            'cpc_uri': (False, False, False, None, None, None),
+            'max_memory': (True, True, True, False, None, int, True, 1024),
+            'type': (True, True, False, None, None, None),
+        }
+
+        # Exercise code
+        schema = module_utils.PropertySchema(resource_properties)
+
+        assert sorted(schema) == sorted(resource_properties)
+        assert len(schema) == 4
+        assert 'name' in schema
+        assert 'foo' not in schema
+        p = schema['max_memory']
+        assert p.name == 'max_memory'
+        assert p.hmc_name == 'max-memory'
+        assert p.type_cast is int
+        assert p.required is True
+        assert p.default == 1024
+        p = schema['cpc_uri']
+        assert p.hmc_name == 'cpc-uri'
+        assert p.required is False
+        assert p.default is None
+        assert schema.allowed_names == {'name', 'max_memory', 'type'}
+        assert schema.create_names == {'name', 'max_memory', 'type'}
+        assert schema.update_names == {'name', 'max_memory'}
+        assert schema.update_while_active_names == {'name'}
+
+    @pytest.mark.parametrize(
+        "current_props, exp_create, exp_update, exp_deactivate", [
+            (None,
+             {'max-memory': 2048}, {}, False),
+            ({'max-memory': 1024},
+             {}, {'max-memory': 2048}, True),
+            ({'max-memory': 2048},
+             {}, {}, False),
+        ])
+    def test_ps_process_normal_property(
+            self, current_props, exp_create, exp_update, exp_deactivate):
+        """
+        Test process_normal_property() with a PropertySchema.
+        """
+        schema = module_utils.PropertySchema({
+            'max_memory': (True, True, True, False, None, int),
+        })
+        input_props = {'max_memory': '2048'}
+        if current_props is None:
+            resource = None
+        else:
+            resource = mock.Mock()
+            resource.properties = current_props
+
+        # Exercise code
+        result = module_utils.process_normal_property(
+            'max_memory', schema, input_props, resource)
+
+        assert result == (exp_create, exp_update, exp_deactivate)
+
+
+class TestResourceReconciler(object):
+    """
+    Unit tests for the ResourceReconciler class and its fetch strategies.
+    """
+
+    @staticmethod
+    def make_manager(resources):
+        """
+        Return a mocked manager object with the specified mocked resource
+        objects.
+        """
+        manager = mock.Mock()
+        manager.class_name = 'nic'
+        manager.resource_class = zhmcclient.Nic
+        manager.parent.uri = '/api/partitions/1'
+        manager.list.return_value = resources
+
+        def find(name):
+            for res in resources:
+                if res.name == name:
+                    return res
+            raise module_utils.NotFound({'name': name}, manager)
+
+        manager.find.side_effect = find
+        return manager
+
+    @staticmethod
+    def make_resource(name, properties):
+        """
+        Return a mocked resource object with the specified properties.
+        """
+        resource = mock.Mock()
+        resource.name = name
+        resource.uri = '/api/nics/' + name
+        resource.full_properties = False
+        resource.properties = dict(properties)
+        resource.pull_full_properties.side_effect = \
+            lambda: setattr(resource, 'full_properties', True)
+        return resource
+
+    @staticmethod
+    def process_properties(resource):
+        """
+        Process the input properties {'name': 'nic1', 'description': 'new'},
+        where 'description' is an update-only property.
+        """
+        if resource is None:
+            return {'name': 'nic1'}, {'description': 'new'}
+        if resource.properties['description'] == 'new':
+            return {}, {}
+        return {}, {'description': 'new'}
+
+    @pytest.mark.parametrize(
+        "check_mode", [False, True])
+    def test_rr_create(self, check_mode):
+        """
+        Test reconciling a resource that does not exist.
+        """
+        manager = self.make_manager([])
+        created = self.make_resource('nic1', {'name': 'nic1'})
+        manager.create.return_value = created
+        check_mode_func = mock.Mock(return_value=created)
+        reconciler = module_utils.ResourceReconciler(
+            manager, 'nic1', self.process_properties,
+            check_mode_func=check_mode_func)
+
+        # Exercise code
+        changed, result = reconciler.reconcile(check_mode)
+
+        assert changed is True
+        assert result == {'name': 'nic1'}
+        assert reconciler.created is True
+        assert reconciler.resource is created
+        if check_mode:
+            assert manager.create.called is False
+            assert check_mode_func.call_args == \
+                mock.call({'name': 'nic1'}, {'description': 'new'})
+        else:
+            assert manager.create.call_args == mock.call({'name': 'nic1'})
+            assert created.update_properties.call_args == \
+                mock.call({'description': 'new'})
+            assert created.pull_full_properties.call_count == 1
+
+    @pytest.mark.parametrize(
+        "check_mode", [False, True])
+    @pytest.mark.parametrize(
+        "description, exp_changed", [
+            ('old', True),
+            ('new', False),
+        ])
+    def test_rr_update(self, description, exp_changed, check_mode):
+        """
+        Test reconciling a resource that exists.
+        """
+        nic = self.make_resource(
+            'nic1', {'name': 'nic1', 'description': description})
+        manager = self.make_manager([nic])
+        update_func = mock.Mock()
+        reconciler = module_utils.ResourceReconciler(
+            manager, 'nic1', self.process_properties, update_func=update_func)
+
+        # Exercise code
+        changed, result = reconciler.reconcile(check_mode)
+
+        assert changed is exp_changed
+        assert reconciler.created is False
+        assert reconciler.resource is nic
+        assert manager.create.called is False
+        if exp_changed and not check_mode:
+            assert update_func.call_args == \
+                mock.call(nic, {'description': 'new'})
+            # Initial retrieval and refresh after the update
+            assert nic.pull_full_properties.call_count == 2
+        else:
+            assert update_func.called is False
+            assert nic.pull_full_properties.call_count == 1
+        if check_mode:
+            assert result == {'name': 'nic1', 'description': 'new'}
+
+    def test_rr_batch_fetch(self):
+        """
+        Test that BatchFetch lists the resources of a manager once.
+        """
+        nics = [self.make_resource(name, {'name': name, 'description': 'new'})
+                for name in ('nic1', 'nic2')]
+        manager = self.make_manager(nics)
+        fetch = module_utils.BatchFetch()
+
+        # Exercise code
+        for name in ('nic1', 'nic2', 'nic3'):
+            module_utils.ResourceReconciler(
+                manager, name, lambda res: ({}, {}), fetch=fetch).find()
+
+        assert manager.list.call_count == 1
+        assert manager.find.called is False
+        for nic in nics:
+            assert nic.pull_full_properties.call_count == 1
+
+    def test_rr_cached_fetch(self):
+        """
+        Test that CachedFetch looks up and retrieves a resource once.
+        """
+        nic = self.make_resource('nic1', {'name': 'nic1'})
+        manager = self.make_manager([nic])
+        fetch = module_utils.CachedFetch()
+
+        # Exercise code
+        for _ in range(2):
+            res = module_utils.ResourceReconciler(
+                manager, 'nic1', lambda res: ({}, {}), fetch=fetch).find()
+            assert res is nic
+
+        assert manager.find.call_count == 1
+        assert nic.pull_full_properties.call_count == 1
+
+
+class TestLogInit(object):
+    """
+    Unit tests for the log_init() function and the QueueLogHandler class.
+    """
+
+    LOGGER_NAMES = ('zhmc_test', module_utils.COMMON_LOGGER_NAME,
+                    'zhmcclient.hmc')
+
+    @pytest.fixture(autouse=True)
+    def loggers(self):
+        """
+        Restore the loggers that are set up by log_init() after each test.
+        """
+        saved = dict(
+            (name, (logging.getLogger(name).level,
+                    list(logging.getLogger(name).handlers)))
+            for name in self.LOGGER_NAMES +
+            (module_utils.REQUEST_LOGGER_NAME,))
+        yield
+        added = set()
+        for name, (level, handlers) in saved.items():
+            logger = logging.getLogger(name)
+            added.update(h for h in logger.handlers if h not in handlers)
+            logger.setLevel(level)
+            logger.handlers = handlers
+        for handler in added:
+            handler.close()
+
+    @staticmethod
+    def read_log(log_file):
+        """
+        Flush the log handlers and return the lines of the log file.
+        """
+        for handler in logging.getLogger('zhmc_test').handlers:
+            handler.flush()
+        with open(log_file) as fp:
+            return fp.read().splitlines()
+
+    def test_log_levels(self, tmp_path):
+        """
+        Test that log_init() sets the log levels and one handler per logger.
+        """
+        log_file = str(tmp_path / 'test.log')
+
+        # Exercise code
+        for _ in range(2):
+            module_utils.log_init('zhmc_test', log_file, 'info', 'warning')
+
+        handlers = [logging.getLogger(name).handlers[-1]
+                    for name in self.LOGGER_NAMES]
+        assert isinstance(handlers[0], module_utils.QueueLogHandler)
+        assert handlers == [handlers[0]] * 3
+        for name in self.LOGGER_NAMES:
+            assert logging.getLogger(name).handlers.count(handlers[0]) == 1
+
+        logging.getLogger('zhmc_test').debug("module debug")
+        logging.getLogger('zhmc_test').info("module %s", "info")
+        logging.getLogger('zhmcclient.hmc').info("hmc info")
+        logging.getLogger('zhmcclient.hmc').warning("hmc warning")
+
+        lines = self.read_log(log_file)
+        assert len(lines) == 2
+        assert lines[0].endswith(" INFO zhmc_test {0} module info".
+                                 format(os.getpid()))
+        assert lines[1].endswith(" WARNING zhmcclient.hmc {0} hmc warning".
+                                 format(os.getpid()))
+
+    def test_log_truncation(self, tmp_path):
+        """
+        Test that long log messages are truncated.
+        """
+        log_file = str(tmp_path / 'test.log')
+        env = {'ZHMC_LOG_MAX_LENGTH': '10'}
+        with mock.patch.dict(os.environ, env):
+
+            # Exercise code
+            module_utils.log_init('zhmc_test', log_file)
+
+        logging.getLogger('zhmc_test').debug("body: %s", 'x' * 20)
+
+        lines = self.read_log(log_file)
+        assert lines[0].endswith(" body: xxxx... (16 more characters)")
+
+    def test_log_mutable_args(self, tmp_path):
+        """
+        Test that a message argument that is changed after logging is logged
+        with the value it had when it was logged.
+        """
+        log_file = str(tmp_path / 'test.log')
+        module_utils.log_init('zhmc_test', log_file)
+        handler = logging.getLogger('zhmc_test').handlers[-1]
+        logged = threading.Event()
+        orig_truncate = handler.truncate
+
+        def truncate(record):
+            "Process the log record only after the argument was changed"
+            logged.wait(5)
+            return orig_truncate(record)
+
+        body = {'name': 'old'}
+        with mock.patch.object(handler, 'truncate', side_effect=truncate):
+
+            # Exercise code
+            logging.getLogger('zhmc_test').debug("body: %r", body)
+
+            body['name'] = 'new'
+            logged.set()
+            lines = self.read_log(log_file)
+
+        assert lines[0].endswith(" body: {'name': 'old'}")
+
+    def test_log_rotation(self, tmp_path):
+        """
+        Test that the log file is rotated by size.
+        """
+        log_file = str(tmp_path / 'test.log')
+        env = {'ZHMC_LOG_MAX_BYTES': '200', 'ZHMC_LOG_BACKUP_COUNT': '2'}
+        with mock.patch.dict(os.environ, env):
+
+            # Exercise code
+            module_utils.log_init('zhmc_test', log_file)
+
+        for i in range(20):
+            logging.getLogger('zhmc_test').debug("message %s", i)
+        self.read_log(log_file)
+
+        assert sorted(os.listdir(str(tmp_path))) == \
+            ['test.log', 'test.log.1', 'test.log.2']
+        assert os.path.getsize(log_file) <= 200
+
+    def test_log_invalid_envvar(self, tmp_path):
+        """
+        Test that invalid log environment variables are ignored with a
+        warning.
+        """
+        log_file = str(tmp_path / 'test.log')
+        env = {'ZHMC_LOG_MAX_LENGTH': 'foo'}
+        with mock.patch.dict(os.environ, env):
+
+            # Exercise code
+            module_utils.log_init('zhmc_test', log_file)
+
+        lines = self.read_log(log_file)
+        assert len(lines) == 1
+        assert "Ignoring invalid log configuration: Environment variable " \
+            "ZHMC_LOG_MAX_LENGTH must be a positive number" in lines[0]
+
+    def test_log_json(self, tmp_path):
+        """
+        Test the JSON lines log format, with the log records of HMC requests.
+        """
+        log_file = str(tmp_path / 'test.log')
+        env = {'ZHMC_LOG_FORMAT': 'json', 'ZHMC_LOG_CORRELATION_ID': 'id1'}
+        with mock.patch.dict(os.environ, env):
+
+            # Exercise code
+            module_utils.log_init('zhmc_test', log_file, 'info', 'info')
+
+        session = mock.Mock(spec=['get', 'post', 'delete'])
+        session.get.return_value = {}
+        session.post.side_effect = [
+            {'object-uri': '/api/partitions/1'},
+            mock.Mock(spec=module_utils.Job),
+            None,
+            {'cpcs': []},
+        ]
+        session.delete.side_effect = zhmcclient.HTTPError(
+            {'http-status': 404, 'reason': 1, 'message': 'not found'})
+        module_utils.log_requests(session)
+        module_utils.log_requests(session)
+
+        logging.getLogger('zhmc_test').info("module %s", "info")
+        session.get('/api/cpcs')
+        with pytest.raises(zhmcclient.HTTPError):
+            session.delete(uri='/api/partitions/1')
+        for _ in range(4):
+            session.post('/api/foo', body={})
+
+        items = [json.loads(line) for line in self.read_log(log_file)]
+        assert len(items) == 7
+        for item in items:
+            assert item['module'] == 'zhmc_test'
+            assert item['correlation_id'] == 'id1'
+            assert item['pid'] == os.getpid()
+        assert items[0]['level'] == 'INFO'
+        assert items[0]['logger'] == 'zhmc_test'
+        assert items[0]['message'] == "module info"
+        assert items[1]['logger'] == module_utils.REQUEST_LOGGER_NAME
+        assert (items[1]['method'], items[1]['uri'], items[1]['status'],
+                items[1]['error']) == ('GET', '/api/cpcs', 200, None)
+        assert items[1]['duration'] >= 0
+        assert (items[2]['method'], items[2]['uri'], items[2]['status'],
+                items[2]['error']) == \
+            ('DELETE', '/api/partitions/1', 404, 'HTTPError')
+        assert [(item['method'], item['status'], item['error'])
+                for item in items[3:]] == \
+            [('POST', 201, None), ('POST', 202, None), ('POST', 204, None),
+             ('POST', 200, None)]
+
+    def test_log_requests_disabled(self, tmp_path):
+        """
+        Test that HMC requests are not logged below their log level.
+        """
+        log_file = str(tmp_path / 'test.log')
+        module_utils.log_init('zhmc_test', log_file, 'debug', 'warning')
+        session = mock.Mock(spec=['get', 'post', 'delete'])
+        module_utils.log_requests(session)
+
+        # Exercise code
+        session.get('/api/cpcs')
+
+        assert self.read_log(log_file) == []
+
+
+class TestSessionCassette(object):
+    """
+    Unit tests for the SessionCassette class and its use in open_session().
+    """
+
+    def setup_method(self):
+        """
+        Set up a faked HMC with a CPC in DPM mode and a partition.
+        """
+        self.session = module_utils.FakedSession(
+            'fake-host', 'fake-hmc', '2.14.1', '2.20')
+        faked_cpc = self.session.hmc.cpcs.add({
+            'object-id': 'fake-cpc-1',
+            'name': 'cpc-1',
+            'dpm-enabled': True,
+        })
+        faked_cpc.partitions.add({
+            'object-id': 'fake-part-1',
+            'name': 'part-1',
+            'status': 'stopped',
+        })
+
+    @staticmethod
+    def run_requests(session):
+        """
+        Perform some requests with the session and return their results.
+        """
+        client = zhmcclient.Client(session)
+        cpc = client.cpcs.find(name='cpc-1')
+        partition = cpc.partitions.find(name='part-1')
+        partition.update_properties({'description': 'new'})
+        partition.pull_full_properties()
+        try:
+            session.get('/api/partitions/fake-part-2')
+        except zhmcclient.HTTPError as exc:
+            error = exc.http_status
+        return dict(cpc.properties), dict(partition.properties), error
+
+    @pytest.mark.parametrize("filename", ['cassette.json', 'cassette.json.gz'])
+    def test_sc_record_replay(self, tmp_path, filename):
+        """
+        Test that a recorded session is replayed with the same results.
+        """
+        cassette_file = str(tmp_path / filename)
+        params = dict(hmc_host='fake-host', _faked_session=self.session)
+        env = {'ZHMC_SESSION_RECORD': cassette_file}
+        with mock.patch.dict(os.environ, env):
+            session, logoff = module_utils.open_session(params)
+            exp_results = self.run_requests(session)
+            module_utils.close_session(session, logoff)
+
+        cassette = module_utils.SessionCassette.load(cassette_file)
+        assert cassette.stats() == dict(recorded=5)
+        assert cassette.interactions[2]['method'] == 'POST'
+        assert cassette.interactions[2]['body'] == {'description': 'new'}
+        assert cassette.interactions[4]['error']['body']['http-status'] == 404
+
+        params = dict(
+            hmc_host='fake-host',
+            hmc_auth=dict(userid='fake-userid', password='fake-password'))
+        env = {'ZHMC_SESSION_REPLAY': cassette_file}
+        with mock.patch.dict(os.environ, env):
+
+            # Exercise code
+            session, logoff = module_utils.open_session(params)
+            results = self.run_requests(session)
+
+            assert results == exp_results
+            assert logoff is False
+            assert session.zhmc_cassette.stats() == \
+                dict(recorded=5, replayed=5, remaining=0)
+            with pytest.raises(module_utils.ReplayError):
+                session.get('/api/cpcs/fake-cpc-1')
+            module_utils.close_session(session, logoff)
+
+    def test_sc_secrets(self, tmp_path):
+        """
+        Test that the password and session ID of the logon of a real session,
+        and passwords in request bodies are not stored in the cassette file,
+        and that the requests with passwords are replayed.
+        """
+        cassette_file = str(tmp_path / 'cassette.json')
+        logon_result = {
+            'api-session': 'secret-session-id',
+            'session-credential': 'secret-credential',
+            'notification-topic': 'topic-1',
+            'job-notification-topic': 'topic-2',
+        }
+        user_body = {'name': 'user-1', 'password': 'secret-user-password'}
+        session = zhmcclient.Session(
+            'hmc1', 'userid-1', 'secret-password', verify_cert=False)
+        cassette = module_utils.SessionCassette(cassette_file)
+        cassette.record(session)
+        with requests_mock.mock() as m:
+            m.post('/api/sessions', json=logon_result)
+            m.post('/api/console/users',
+                   json={'object-uri': '/api/users/user-1'})
+
+            # Exercise code
+            session.logon()
+            result = session.post('/api/console/users', body=user_body)
+
+        cassette.save()
+
+        assert session.session_id == 'secret-session-id'
+        assert result == {'object-uri': '/api/users/user-1'}
+        assert user_body['password'] == 'secret-user-password'
+        with open(cassette_file) as fp:
+            content = fp.read()
+        assert 'secret' not in content
+        interactions = json.loads(content)['interactions']
+        assert interactions[0]['body'] == {
+            'userid': 'userid-1', 'password': '********'}
+        assert interactions[0]['result']['api-session'] == '********'
+        assert interactions[0]['result']['notification-topic'] == 'topic-1'
+
+        cassette = module_utils.SessionCassette.load(cassette_file)
+        session = mock.Mock(spec=['get', 'post', 'delete'])
+        cassette.replay(session)
+
+        # Exercise code
+        result = session.post('/api/console/users', body=user_body)
+
+        assert result == {'object-uri': '/api/users/user-1'}
+
+    def test_sc_bad_file(self, tmp_path):
+        """
+        Test that an invalid cassette file is reported.
+        """
+        (tmp_path / 'cassette.json').write_text(u'{"version": 1}')
+
+        with pytest.raises(ParameterError):
+
+            # Exercise code
+            module_utils.SessionCassette.load(str(tmp_path / 'cassette.json'))
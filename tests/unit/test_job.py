@@ -0,0 +1,177 @@
+#!/usr/bin/env python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Unit tests for the 'zhmc_job' Ansible module.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import pytest
+import mock
+
+from zhmcclient import Job
+
+from plugins.module_utils.common import ParameterError, WaitStrategy
+from plugins.modules import zhmc_job
+from plugins.modules.zhmc_job import JobState, wait_for_jobs
+
+
+class FakedClock(object):
+    """
+    A clock for time.time() and time.sleep() that advances only when
+    sleeping.
+    """
+
+    def __init__(self):
+        self.now = 1000.0
+
+    def time(self):
+        return self.now
+
+    def sleep(self, seconds):
+        assert seconds > 0
+        self.now += seconds
+
+
+class FakedJobSession(object):
+    """
+    A session that returns the job status for GET on a job URI from a list of
+    responses per job, and records the times of the GET requests.
+    """
+
+    def __init__(self, clock, responses):
+        self.clock = clock
+        self.responses = responses  # dict: uri -> list of response bodies
+        self.get_times = dict((uri, []) for uri in responses)
+        self.deleted = []
+
+    def get(self, uri):
+        self.get_times[uri].append(self.clock.now)
+        return self.responses[uri].pop(0)
+
+    def delete(self, uri):
+        self.deleted.append(uri)
+
+
+RUNNING = {'status': 'running'}
+COMPLETE = {'status': 'complete', 'job-status-code': 200,
+            'job-results': {'foo': 'bar'}}
+FAILED = {'status': 'complete', 'job-status-code': 409,
+          'job-reason-code': 1, 'job-results': {'message': 'busy'}}
+CANCELED = {'status': 'canceled'}
+
+
+def run_wait(responses, timeout=100, poll_interval=1, max_poll_interval=4):
+    """
+    Run wait_for_jobs() for the jobs in responses with a faked clock, and
+    return the tuple (results, session).
+    """
+    clock = FakedClock()
+    session = FakedJobSession(clock, responses)
+    wait_strategy = WaitStrategy(
+        timeout=timeout, initial_interval=poll_interval,
+        max_interval=max_poll_interval, jitter=0)
+    states = [JobState(Job(session, uri, None, None),
+                       wait_strategy.intervals())
+              for uri in sorted(responses)]
+    with mock.patch.object(zhmc_job.time, 'time', clock.time), \
+            mock.patch.object(zhmc_job.time, 'sleep', clock.sleep):
+        wait_for_jobs(states, wait_strategy, max_concurrency=4)
+    return [state.result() for state in states], session
+
+
+def test_wait_backoff():
+    """
+    Test that jobs are polled with exponential back-off up to the maximum
+    poll interval, and that completed jobs are deleted.
+    """
+    responses = {
+        '/api/jobs/1': [RUNNING] * 5 + [COMPLETE],
+        '/api/jobs/2': [COMPLETE],
+    }
+
+    # Exercise code
+    results, session = run_wait(responses)
+
+    assert results[0]['status'] == 'complete'
+    assert results[0]['job_results'] == {'foo': 'bar'}
+    assert results[0]['polls'] == 6
+    assert results[1]['status'] == 'complete'
+    assert results[1]['polls'] == 1
+    times = session.get_times['/api/jobs/1']
+    intervals = [t2 - t1 for t1, t2 in zip(times, times[1:])]
+    assert intervals == [1, 2, 4, 4, 4]
+    assert results[0]['duration'] == 15.0
+    assert sorted(session.deleted) == ['/api/jobs/1', '/api/jobs/2']
+
+
+def test_wait_errors():
+    """
+    Test that failed, canceled and timed out jobs are reported per job.
+    """
+    responses = {
+        '/api/jobs/1': [RUNNING, FAILED],
+        '/api/jobs/2': [CANCELED],
+        '/api/jobs/3': [RUNNING] * 100,
+        '/api/jobs/4': [RUNNING, COMPLETE],
+    }
+
+    # Exercise code
+    results, _ = run_wait(responses, timeout=10)
+
+    assert results[0]['status'] == 'failed'
+    assert results[0]['error'].startswith("HTTPError: 409,1: busy")
+    assert results[1]['status'] == 'canceled'
+    assert results[2]['status'] == 'timeout'
+    assert results[2]['error'] == "Job did not complete within 10 seconds"
+    assert results[3]['status'] == 'complete'
+    assert results[3]['error'] is None
+
+
+@pytest.mark.parametrize(
+    "params_update, exp_msg", [
+        (dict(job_uris=['/api/jobs/1', '/api/jobs/1']),
+         "Job URIs in the 'job_uris' module parameter are not unique"),
+        (dict(poll_interval=10),
+         "The 'poll_interval' module parameter must be positive"),
+    ])
+def test_perform_task_param_error(params_update, exp_msg):
+    """
+    Test perform_task() with invalid module parameters.
+    """
+    params = dict(
+        hmc_host='fake-host',
+        hmc_auth=dict(userid='fake-userid', password='fake-password'),
+        job_uris=['/api/jobs/1'],
+        timeout=10,
+        poll_interval=1,
+        max_poll_interval=5,
+        max_concurrency=4,
+        log_file=None,
+        log_level='debug',
+        hmc_log_level='debug',
+        _faked_session=None,
+    )
+    params.update(params_update)
+
+    with pytest.raises(ParameterError) as exc_info:
+
+        # Exercise code
+        zhmc_job.perform_task(params, False)
+
+    assert str(exc_info.value).startswith(exp_msg)
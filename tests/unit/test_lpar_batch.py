@@ -0,0 +1,298 @@
+#!/usr/bin/env python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Unit tests for the 'zhmc_lpar_batch' Ansible module.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import pytest
+import mock
+
+from plugins.module_utils.common import StatusError, ParameterError
+from plugins.modules import zhmc_lpar_batch
+from plugins.modules.zhmc_lpar_batch import next_operation, \
+    check_mode_operations, LparTask, run_tasks
+
+# LPAR status after each operation, for the simulated LPARs
+STATUS_AFTER = {
+    'activate': 'not-operating',
+    'load': 'operating',
+    'deactivate': 'not-activated',
+}
+
+
+class FakedJob(object):
+    """
+    A simulated asynchronous job that completes after a number of polls.
+    """
+
+    def __init__(self, lpar, operation, polls):
+        self.lpar = lpar
+        self.operation = operation
+        self.polls = polls
+        self.uri = '/api/jobs/{0}-{1}'.format(lpar.name, operation)
+
+    def check_for_completion(self):
+        self.polls -= 1
+        if self.polls > 0:
+            return 'running', None
+        self.lpar.status = STATUS_AFTER[self.operation]
+        self.lpar.running -= 1
+        return 'complete', None
+
+
+class FakedLpar(object):
+    """
+    A simulated LPAR whose operations return FakedJob objects, and that
+    records the concurrency of its jobs in a shared dict.
+    """
+
+    def __init__(self, name, status, counts, polls=2):
+        self.name = name
+        self.status = status
+        self.counts = counts
+        self.polls = polls
+        self.running = 0
+        self.calls = []
+
+    def _job(self, operation, **kwargs):
+        self.calls.append((operation, kwargs))
+        self.running += 1
+        self.counts['submitted'] += 1
+        return FakedJob(self, operation, self.polls)
+
+    def activate(self, **kwargs):
+        return self._job('activate', **kwargs)
+
+    def load(self, **kwargs):
+        return self._job('load', **kwargs)
+
+    def deactivate(self, **kwargs):
+        return self._job('deactivate', **kwargs)
+
+
+def faked_pull_lpar_status(lpar):
+    """Replacement for pull_lpar_status() for FakedLpar objects."""
+    return lpar.status
+
+
+@pytest.mark.parametrize(
+    "state, status, exp_operation", [
+        ('inactive', 'not-activated', None),
+        ('inactive', 'not-operating', 'deactivate'),
+        ('inactive', 'operating', 'deactivate'),
+        ('active', 'not-activated', 'activate'),
+        ('active', 'not-operating', None),
+        ('active', 'exceptions', None),
+        ('loaded', 'not-activated', 'activate'),
+        ('loaded', 'not-operating', 'load'),
+        ('loaded', 'acceptable', None),
+    ])
+def test_next_operation(state, status, exp_operation):
+    """
+    Test next_operation() for reachable states.
+    """
+    assert next_operation(state, status) == exp_operation
+
+
+@pytest.mark.parametrize(
+    "state, status", [
+        ('active', 'starting'),
+        ('loaded', 'unknown'),
+    ])
+def test_next_operation_error(state, status):
+    """
+    Test next_operation() for states that cannot be reached.
+    """
+    with pytest.raises(StatusError):
+        next_operation(state, status)
+
+
+@pytest.mark.parametrize(
+    "state, status, exp_operations", [
+        ('loaded', 'not-activated', ['activate', 'load']),
+        ('loaded', 'operating', []),
+        ('inactive', 'operating', ['deactivate']),
+        ('active', 'not-activated', ['activate']),
+    ])
+def test_check_mode_operations(state, status, exp_operations):
+    """
+    Test check_mode_operations().
+    """
+    assert check_mode_operations(state, status) == exp_operations
+
+
+def make_tasks(specs, counts, polls=2):
+    """
+    Return a list of LparTask objects for FakedLpar objects, from a list of
+    tuples (cpc_name, lpar_name, state, status).
+    """
+    tasks = []
+    for cpc_name, lpar_name, state, status in specs:
+        lpar = FakedLpar(lpar_name, status, counts, polls)
+        task = LparTask(cpc_name, lpar, state, 'profile-' + lpar_name)
+        task.status = status
+        tasks.append(task)
+    return tasks
+
+
+def track_concurrency(tasks, counts):
+    """
+    Wrap the check_for_completion() polls so that the maximum number of
+    outstanding jobs overall and per CPC is recorded in counts.
+    """
+    orig_submit = LparTask.submit
+
+    def submit(task, operation, now):
+        orig_submit(task, operation, now)
+        running = [t for t in tasks if t.job is not None]
+        counts['max'] = max(counts['max'], len(running))
+        for cpc_name in set(t.cpc_name for t in running):
+            num = len([t for t in running if t.cpc_name == cpc_name])
+            counts['max_cpc'] = max(counts['max_cpc'], num)
+
+    return mock.patch.object(LparTask, 'submit', submit)
+
+
+@pytest.mark.parametrize(
+    "max_concurrency, max_concurrency_per_cpc, exp_max, exp_max_cpc", [
+        (1, None, 1, 1),
+        (3, None, 3, 3),
+        (10, 2, 4, 2),
+        (10, None, 6, 3),
+    ])
+@mock.patch.object(zhmc_lpar_batch, 'pull_lpar_status',
+                   faked_pull_lpar_status)
+@mock.patch.object(zhmc_lpar_batch.time, 'sleep', lambda secs: None)
+def test_run_tasks_concurrency(
+        max_concurrency, max_concurrency_per_cpc, exp_max, exp_max_cpc):
+    """
+    Test that run_tasks() performs all operations and honors the global and
+    per-CPC concurrency limits.
+    """
+    specs = [('CPC{0}'.format(c), 'LPAR{0}{1}'.format(c, i), 'loaded',
+              'not-activated') for c in (1, 2) for i in (1, 2, 3)]
+    counts = dict(submitted=0, max=0, max_cpc=0)
+    tasks = make_tasks(specs, counts)
+
+    with track_concurrency(tasks, counts):
+
+        # Exercise code
+        run_tasks(tasks, max_concurrency, max_concurrency_per_cpc,
+                  poll_interval=0, timeout=60)
+
+    assert counts['submitted'] == 12
+    assert counts['max'] == exp_max
+    assert counts['max_cpc'] == exp_max_cpc
+    for task in tasks:
+        result = task.result()
+        assert result['error'] is None
+        assert result['changed'] is True
+        assert result['status'] == 'operating'
+        assert [op['operation'] for op in result['operations']] == \
+            ['activate', 'load']
+        assert all(op['duration'] is not None
+                   for op in result['operations'])
+        assert task.lpar.calls[0] == (
+            'activate', dict(wait_for_completion=False,
+                             activation_profile_name=task.
+                             activation_profile_name,
+                             force=False))
+
+
+@mock.patch.object(zhmc_lpar_batch, 'pull_lpar_status',
+                   faked_pull_lpar_status)
+@mock.patch.object(zhmc_lpar_batch.time, 'sleep', lambda secs: None)
+def test_run_tasks_errors():
+    """
+    Test that failures of single LPARs are recorded without affecting the
+    other LPARs.
+    """
+    specs = [
+        ('CPC1', 'LPAR1', 'inactive', 'operating'),
+        ('CPC1', 'LPAR2', 'active', 'starting'),
+        ('CPC1', 'LPAR3', 'active', 'not-operating'),
+        ('CPC1', 'LPAR4', 'loaded', 'not-operating'),
+    ]
+    counts = dict(submitted=0)
+    tasks = make_tasks(specs, counts)
+    tasks[3].lpar.load = mock.Mock(
+        side_effect=zhmc_lpar_batch.zhmcclient.HTTPError(
+            {'http-status': 409, 'reason': 1, 'message': 'busy'}))
+
+    # Exercise code
+    run_tasks(tasks, 2, None, poll_interval=0, timeout=60)
+
+    results = [task.result() for task in tasks]
+    assert results[0]['error'] is None
+    assert results[0]['status'] == 'not-activated'
+    assert results[0]['operations'][0]['operation'] == 'deactivate'
+    assert results[1]['error'].startswith(
+        "StatusError: Cannot get LPAR from status")
+    assert results[1]['changed'] is False
+    assert results[2]['error'] is None
+    assert results[2]['changed'] is False
+    assert results[3]['error'].startswith("HTTPError: 409,1: busy")
+
+
+@mock.patch.object(zhmc_lpar_batch, 'pull_lpar_status',
+                   faked_pull_lpar_status)
+def test_run_tasks_timeout():
+    """
+    Test that an LPAR whose job does not complete in time is reported as
+    failed.
+    """
+    counts = dict(submitted=0)
+    tasks = make_tasks([('CPC1', 'LPAR1', 'active', 'not-activated')],
+                       counts, polls=1000000)
+
+    # Exercise code
+    run_tasks(tasks, 1, None, poll_interval=0.01, timeout=0.05)
+
+    result = tasks[0].result()
+    assert result['error'].startswith("Timeout after 0.05 seconds")
+    assert result['operations'] == [
+        dict(operation='activate', duration=None)]
+
+
+@pytest.mark.parametrize(
+    "max_concurrency, max_concurrency_per_cpc, exp_param", [
+        (0, None, 'max_concurrency'),
+        (10, 0, 'max_concurrency_per_cpc'),
+        (10, -1, 'max_concurrency_per_cpc'),
+    ])
+def test_perform_task_concurrency_error(
+        max_concurrency, max_concurrency_per_cpc, exp_param):
+    """
+    Test that invalid concurrency limits are rejected before the HMC is
+    contacted.
+    """
+    params = dict(
+        lpars=[dict(cpc_name='CPC1', name='LPAR1')],
+        max_concurrency=max_concurrency,
+        max_concurrency_per_cpc=max_concurrency_per_cpc,
+    )
+    with mock.patch.object(zhmc_lpar_batch, 'open_session') as open_mock:
+        with pytest.raises(ParameterError) as exc_info:
+
+            # Exercise code
+            zhmc_lpar_batch.perform_task(params, False)
+
+    assert "'{0}'".format(exp_param) in str(exc_info.value)
+    assert open_mock.call_count == 0
@@ -0,0 +1,455 @@
+#!/usr/bin/env python
+# Copyright 2023 IBM Corp. All Rights Reserved.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+
+"""
+Unit tests for the 'zhmc_metrics' and 'zhmc_metrics_exporter' Ansible modules.
+"""
+
+from __future__ import (absolute_import, division, print_function)
+__metaclass__ = type
+
+import datetime
+import pytest
+import mock
+import zhmcclient
+
+from zhmcclient_mock import FakedSession
+from zhmcclient_mock._hmc import FakedMetricObjectValues
+
+from plugins.module_utils.common import Error, ParameterError
+from plugins.module_utils.metrics import MetricsRecord, MetricsRingBuffer, \
+    MetricsExporter, iter_metrics_response, exporter_status, process_alive
+from plugins.modules import zhmc_metrics
+from plugins.modules.zhmc_metrics_exporter import perform_task
+
+PARTITION_USAGE = ('processor-usage', 'network-usage', 'storage-usage',
+                   'accelerator-usage', 'crypto-usage')
+
+
+def make_session(samples):
+    """
+    Return a faked session for a CPC with two partitions, that returns the
+    'partition-usage' metrics with the specified processor usage values per
+    sample, for each partition.
+    """
+    session = FakedSession('fake-host', 'fake-hmc', '2.14.1', '2.20')
+    cpc = session.hmc.cpcs.add({
+        'object-id': 'fake-cpc-1',
+        'name': 'cpc-1',
+        'dpm-enabled': True,
+    })
+    for index in (1, 2):
+        cpc.partitions.add({
+            'object-id': 'fake-part-{0}'.format(index),
+            'name': 'part-{0}'.format(index),
+        })
+    for sample, values in enumerate(samples):
+        timestamp = datetime.datetime(2023, 5, 10, 10, 14, sample)
+        for index, value in enumerate(values, 1):
+            session.hmc.add_metric_values(FakedMetricObjectValues(
+                'partition-usage',
+                '/api/partitions/fake-part-{0}'.format(index), timestamp,
+                list(zip(PARTITION_USAGE, (value, 10, 1, 0, 0)))))
+    return session
+
+
+def module_params(session, **params_update):
+    """
+    Return the parameters for the zhmc_metrics module.
+    """
+    params = dict(
+        hmc_host='fake-host',
+        hmc_auth=dict(userid='fake-userid', password='fake-password'),
+        metric_groups=['partition-usage'],
+        samples=1,
+        interval=15,
+        source='hmc',
+        exporter_dir=None,
+        log_file=None,
+        log_level='debug',
+        hmc_log_level='debug',
+        _faked_session=session,
+    )
+    params.update(params_update)
+    return params
+
+
+def run_retrieval(session, **params_update):
+    """
+    Run perform_retrieval() without sleeping, and return its result.
+    """
+    params = module_params(session, **params_update)
+    with mock.patch.object(zhmc_metrics.time, 'sleep') as sleep_mock:
+        result = zhmc_metrics.perform_retrieval(params)
+    assert sleep_mock.call_count == params['samples'] - 1
+    return result
+
+
+def test_iter_metrics_response():
+    """
+    Test that the samples of a metrics response are parsed and can be stored
+    in columns per resource.
+    """
+    m_defs = {
+        'grp': mock.Mock(metric_definitions={
+            'count': mock.Mock(index=0, type=int),
+            'ratio': mock.Mock(index=1, type=float),
+            'flag': mock.Mock(index=2, type=bool),
+            'label': mock.Mock(index=3, type=str),
+        }),
+    }
+    response = '\n'.join([
+        '"grp"',
+        '"/api/res/1"', '1683713670000', '1,0.5,true,"a"', '',
+        '"/api/res/2"', '1683713670000', '2,1.5,false,"b"', '',
+        '',
+        '"grp"',
+        '"/api/res/1"', '1683713685000', '3,2.5,false,"c"', '',
+        '',
+        '',
+    ])
+    metrics = [('count', int), ('ratio', float), ('flag', bool),
+               ('label', str)]
+    record = MetricsRecord('/api/res/1', metrics)
+
+    # Exercise code
+    samples = list(iter_metrics_response(response, m_defs))
+
+    assert samples == [
+        ('grp', '/api/res/1', 1683713670000, [1, 0.5, True, 'a']),
+        ('grp', '/api/res/2', 1683713670000, [2, 1.5, False, 'b']),
+        ('grp', '/api/res/1', 1683713685000, [3, 2.5, False, 'c']),
+    ]
+    for _, uri, timestamp, values in samples:
+        if uri == '/api/res/1':
+            record.append(timestamp, values)
+    columns = dict(record.columns)
+    assert list(record.timestamps) == [1683713670000, 1683713685000]
+    assert list(columns['count']) == [1, 3]
+    assert list(columns['ratio']) == [0.5, 2.5]
+    assert columns['flag'] == [True, False]
+    assert columns['label'] == ['a', 'c']
+    assert record.aggregates() == {
+        'count': dict(min=1, max=3, avg=2.0),
+        'ratio': dict(min=0.5, max=2.5, avg=1.5),
+    }
+
+
+def test_retrieval():
+    """
+    Test a single sample, including the resource names.
+    """
+    session = make_session([(15, 20)])
+
+    # Exercise code
+    result = run_retrieval(session)
+
+    records = result['partition-usage']
+    assert [r['resource_name'] for r in records] == ['part-1', 'part-2']
+    assert records[0]['resource_uri'] == '/api/partitions/fake-part-1'
+    assert records[0]['resource_class'] == 'partition'
+    assert records[0]['samples'] == 1
+    assert records[0]['metrics']['processor-usage'] == 15
+    assert records[1]['metrics']['processor-usage'] == 20
+    assert 'aggregates' not in records[0]
+    assert session.hmc.metrics_contexts.list() == []
+
+
+def test_retrieval_aggregates():
+    """
+    Test that the metrics are aggregated over the samples. The faked HMC
+    returns the same metric values for each sample.
+    """
+    session = make_session([(10, 20), (14, 30)])
+
+    # Exercise code
+    result = run_retrieval(session, samples=3)
+
+    record = result['partition-usage'][0]
+    assert record['samples'] == 6
+    assert record['metrics']['processor-usage'] == 14
+    assert record['aggregates']['processor-usage'] == \
+        dict(min=10, max=14, avg=12.0)
+    assert record['aggregates']['network-usage'] == \
+        dict(min=10, max=10, avg=10.0)
+
+
+def test_retrieval_unsupported_group():
+    """
+    Test that a metric group that the HMC does not support is reported, and
+    that the metrics context is deleted.
+    """
+    session = make_session([(15, 20)])
+
+    with pytest.raises(Error) as exc_info:
+
+        # Exercise code
+        run_retrieval(
+            session, metric_groups=['partition-usage', 'bogus-group'])
+
+    assert str(exc_info.value) == \
+        "The HMC does not support metric groups: bogus-group"
+    assert session.hmc.metrics_contexts.list() == []
+
+
+@pytest.mark.parametrize(
+    "params_update, exp_msg", [
+        (dict(metric_groups=[]),
+         "Module parameter 'metric_groups' must not be empty"),
+        (dict(samples=0),
+         "Module parameter 'samples' must be at least 1"),
+        (dict(interval=10),
+         "Module parameter 'interval' must be between 15 and 3600"),
+    ])
+def test_retrieval_param_error(params_update, exp_msg):
+    """
+    Test perform_retrieval() with invalid module parameters.
+    """
+    with pytest.raises(ParameterError) as exc_info:
+
+        # Exercise code
+        run_retrieval(None, **params_update)
+
+    assert str(exc_info.value).startswith(exp_msg)
+
+
+def test_ring_buffer(tmp_path):
+    """
+    Test that the ring buffer keeps the most recent records, drops records
+    that are too large, and is continued when it is created again.
+    """
+    filename = str(tmp_path / 'metrics.buffer')
+    buffer = MetricsRingBuffer.create(filename, record_size=64, capacity=3)
+
+    # Exercise code
+    for index in range(4):
+        assert buffer.append(1000 + index, dict(i=index)) is True
+    assert buffer.append(2000, dict(i='x' * 64)) is False
+
+    reader = MetricsRingBuffer.open(filename)
+    assert list(reader.records()) == [
+        (1001, dict(i=1)), (1002, dict(i=2)), (1003, dict(i=3))]
+    assert (reader.written, reader.dropped) == (4, 1)
+
+    buffer.close()
+    buffer = MetricsRingBuffer.create(filename, record_size=64, capacity=3)
+    buffer.append(1004, dict(i=4))
+    assert [p['i'] for _, p in reader.records()] == [2, 3, 4]
+    reader.close()
+    buffer.close()
+
+    buffer = MetricsRingBuffer.create(filename, record_size=64, capacity=5)
+    assert list(buffer.records()) == []
+    buffer.close()
+
+    (tmp_path / 'other').write_text(u'foo' * 30)
+    with pytest.raises(Error):
+        MetricsRingBuffer.open(str(tmp_path / 'other'))
+
+
+def test_exporter(tmp_path):
+    """
+    Test that the exporter writes the samples to the ring buffer and deletes
+    its metrics context, and that zhmc_metrics reads them back.
+    """
+    session = make_session([(10, 20), (14, 30)])
+    client = zhmcclient.Client(session)
+    exporter = MetricsExporter(
+        client, 'fake-host', ['partition-usage'], 15,
+        directory=str(tmp_path))
+
+    # Exercise code
+    with mock.patch.object(exporter._stop, 'wait'):
+        exporter.run(max_samples=2)
+
+    state = exporter_status(str(tmp_path), 'fake-host')
+    assert state['status'] == 'stopped'
+    assert state['running'] is False
+    assert state['samples'] == 2
+    assert state['written'] == 8
+    assert state['metrics']['partition-usage']['metrics'][0] == \
+        ['processor-usage', 'int']
+    assert session.hmc.metrics_contexts.list() == []
+
+    # Exercise code
+    result = zhmc_metrics.perform_exporter_read(module_params(
+        None, source='exporter', exporter_dir=str(tmp_path), samples=3))
+
+    record = result['partition-usage'][0]
+    assert record['resource_name'] == 'part-1'
+    assert record['samples'] == 3
+    assert record['metrics']['processor-usage'] == 14
+    assert record['aggregates']['processor-usage'] == \
+        dict(min=10, max=14, avg=12.667)
+
+
+@pytest.mark.parametrize(
+    "exporter_groups, exp_msg", [
+        (None, "There is no metrics exporter for HMC fake-host"),
+        (['cpc-usage-overview'],
+         "The metrics exporter for HMC fake-host does not export metric "
+         "groups ['partition-usage']"),
+    ])
+def test_exporter_read_error(tmp_path, exporter_groups, exp_msg):
+    """
+    Test reading from a missing exporter or one with other metric groups.
+    """
+    if exporter_groups:
+        client = zhmcclient.Client(make_session([]))
+        exporter = MetricsExporter(
+            client, 'fake-host', exporter_groups, 15,
+            directory=str(tmp_path))
+        exporter.run(max_samples=1)
+
+    with pytest.raises(Error) as exc_info:
+
+        # Exercise code
+        zhmc_metrics.perform_exporter_read(module_params(
+            None, source='exporter', exporter_dir=str(tmp_path)))
+
+    assert str(exc_info.value).startswith(exp_msg)
+
+
+def exporter_params(tmp_path, state, **params_update):
+    """
+    Return the parameters for the zhmc_metrics_exporter module.
+    """
+    params = dict(
+        hmc_host='fake-host',
+        hmc_auth=dict(userid='fake-userid', password='fake-password'),
+        state=state,
+        metric_groups=['partition-usage'],
+        interval=15,
+        capacity=100,
+        record_size=256,
+        exporter_dir=str(tmp_path),
+        log_file=None,
+        log_level='debug',
+        hmc_log_level='debug',
+        _faked_session=make_session([(10, 20)]),
+    )
+    params.update(params_update)
+    return params
+
+
+def test_exporter_lifecycle(tmp_path):
+    """
+    Test starting the exporter daemon process, and stopping it.
+    """
+
+    # Exercise code
+    changed, result = perform_task(
+        exporter_params(tmp_path, 'started'), False)
+
+    try:
+        assert changed is True
+        assert result['running'] is True
+        assert result['status'] == 'running'
+        assert result['metric_groups'] == ['partition-usage']
+        pid = result['pid']
+
+        # Exercise code
+        changed, result = perform_task(
+            exporter_params(tmp_path, 'started'), False)
+
+        assert changed is False
+        assert result['pid'] == pid
+
+        # Exercise code
+        changed, result = perform_task(
+            exporter_params(tmp_path, 'facts'), False)
+
+        assert changed is False
+        assert result['pid'] == pid
+
+    finally:
+
+        # Exercise code
+        changed, result = perform_task(
+            exporter_params(tmp_path, 'stopped'), False)
+
+    assert changed is True
+    assert result['running'] is False
+    assert result['status'] == 'stopped'
+    assert result['samples'] == 1
+    assert result['written'] == 2
+    assert result['last_error'] is None
+
+    # Exercise code
+    changed, result = perform_task(
+        exporter_params(tmp_path, 'stopped'), False)
+
+    assert changed is False
+
+
+@pytest.mark.parametrize(
+    "state, exp_changed", [
+        ('started', True),
+        ('stopped', False),
+        ('facts', False),
+    ])
+def test_exporter_not_started(tmp_path, state, exp_changed):
+    """
+    Test the states in check mode without an exporter.
+    """
+
+    # Exercise code
+    changed, result = perform_task(exporter_params(tmp_path, state), True)
+
+    assert changed is exp_changed
+    assert result is None
+
+
+def test_exporter_start_failure(tmp_path):
+    """
+    Test that an exporter that fails to start is reported.
+    """
+    params = exporter_params(tmp_path, 'started',
+                             metric_groups=['foo-usage'])
+
+    with pytest.raises(Error) as exc_info:
+
+        # Exercise code
+        perform_task(params, False)
+
+    assert str(exc_info.value).startswith(
+        "The metrics exporter failed to start: ")
+    status = exporter_status(str(tmp_path), 'fake-host')
+    assert status['status'] == 'failed'
+    assert not process_alive(status['pid']) or status['running'] is False
+
+
+@pytest.mark.parametrize(
+    "params_update, exp_msg", [
+        (dict(metric_groups=None),
+         "Module parameter 'metric_groups' must be specified"),
+        (dict(interval=5),
+         "Module parameter 'interval' must be between 15 and 3600"),
+        (dict(capacity=0),
+         "Module parameter 'capacity' must be positive"),
+    ])
+def test_exporter_param_error(tmp_path, params_update, exp_msg):
+    """
+    Test state=started with invalid module parameters.
+    """
+    params = exporter_params(tmp_path, 'started', **params_update)
+
+    with pytest.raises(ParameterError) as exc_info:
+
+        # Exercise code
+        perform_task(params, False)
+
+    assert str(exc_info.value).startswith(exp_msg)
@@ -54,6 +54,8 @@ class TestZhmcNicMain(object):
             'name': 'fake-nic-name',
             'state': 'absent',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
 
         # Return values of perform_task()
@@ -100,6 +102,10 @@ class TestZhmcNicMain(object):
                        choices=['absent', 'present']),
             properties=dict(required=False, type='dict', default={}),
             log_file=dict(required=False, type='str', default=None),
+            log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
+            hmc_log_level=dict(required=False, type='str', default='debug',
+                               choices=['debug', 'info', 'warning', 'error']),
             _faked_session=dict(required=False, type='raw'),
         )
         assert ansible_mod_cls.call_args == \
@@ -138,6 +144,8 @@ class TestZhmcNicMain(object):
             'name': 'fake-nic-name',
             'state': 'absent',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
 
         # Exception raised by perform_task()
@@ -191,6 +199,8 @@ class TestZhmcNicPerformTask(object):
         params = {
             'state': 'present',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
 
         # Prepare return values
@@ -232,6 +242,8 @@ class TestZhmcNicPerformTask(object):
         params = {
             'state': 'absent',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
 
         # Prepare return values
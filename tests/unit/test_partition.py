@@ -21,6 +21,7 @@ from __future__ import (absolute_import, division, print_function)
 __metaclass__ = type
 
 import unittest
+import timeit
 import mock
 import re
 import pdb
@@ -31,6 +32,14 @@ import zhmcclient_mock
 from plugins.modules import zhmc_partition
 from plugins.module_utils import common as module_utils
 
+# Retry counters returned by the module if no retries happened
+NO_RETRIES = dict(
+    retried_requests=0,
+    retries=0,
+    failed_requests=0,
+    backoff_time=0.0,
+)
+
 
 class TestZhmcPartitionMain(unittest.TestCase):
     """
@@ -56,13 +65,19 @@ class TestZhmcPartitionMain(unittest.TestCase):
             'state': 'absent',
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
         check_mode = False
 
         # Return values of perform_task()
         perform_task_changed = True
         perform_task_result = {}
+        perform_task_job_uri = None
 
         # Prepare mocks
         mod_obj = ansible_mod_cls.return_value
@@ -71,7 +86,8 @@ class TestZhmcPartitionMain(unittest.TestCase):
         mod_obj.fail_json.configure_mock(side_effect=SystemExit(1))
         mod_obj.exit_json.configure_mock(side_effect=SystemExit(0))
         perform_task_func.return_value = (perform_task_changed,
-                                          perform_task_result)
+                                          perform_task_result,
+                                          perform_task_job_uri)
 
         # Exercise code
         with self.assertRaises(SystemExit) as cm:
@@ -106,7 +122,25 @@ class TestZhmcPartitionMain(unittest.TestCase):
                                        default=False),
             expand_crypto_adapters=dict(required=False, type='bool',
                                         default=False),
+            result_properties=dict(
+                required=False,
+                type='dict',
+                default=None,
+                options=dict(
+                    include=dict(required=False, type='list', elements='str',
+                                 default=None),
+                    exclude=dict(required=False, type='list', elements='str',
+                                 default=None),
+                ),
+            ),
+            wait=dict(required=False, type='bool', default=True),
+            check_mode_facts=dict(required=False, type='bool',
+                                  default=True),
             log_file=dict(required=False, type='str', default=None),
+            log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
+            hmc_log_level=dict(required=False, type='str', default='debug',
+                               choices=['debug', 'info', 'warning', 'error']),
             _faked_session=dict(required=False, type='raw'),
         )
         assert ansible_mod_cls.call_args == \
@@ -119,7 +153,9 @@ class TestZhmcPartitionMain(unittest.TestCase):
         # Assert call to exit_json()
         assert mod_obj.exit_json.call_args == \
             mock.call(changed=perform_task_changed,
-                      partition=perform_task_result)
+                      partition=perform_task_result,
+                      job_uri=perform_task_job_uri,
+                      retries=NO_RETRIES)
 
         # Assert no call to fail_json()
         assert mod_obj.fail_json.called is False
@@ -143,7 +179,12 @@ class TestZhmcPartitionMain(unittest.TestCase):
             'state': 'absent',
             'expand_storage_groups': False,
             'expand_crypto_adapters': False,
+            'result_properties': None,
+            'wait': True,
+            'check_mode_facts': True,
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
         check_mode = False
 
@@ -171,7 +212,8 @@ class TestZhmcPartitionMain(unittest.TestCase):
 
         # Assert call to fail_json()
         assert mod_obj.fail_json.call_args == \
-            mock.call(msg="ParameterError: fake message")
+            mock.call(msg="ParameterError: fake message",
+                      retries=NO_RETRIES)
 
         # Assert no call to exit_json()
         assert mod_obj.exit_json.called is False
@@ -198,6 +240,8 @@ class TestZhmcPartitionPerformTask(unittest.TestCase):
         params = {
             'state': 'active',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
         check_mode = True
 
@@ -208,15 +252,16 @@ class TestZhmcPartitionPerformTask(unittest.TestCase):
         }
 
         # Prepare mocks
-        ensure_active_func.return_value = (changed, result)
+        ensure_active_func.return_value = (changed, result, None)
 
         # Exercise code
-        actual_changed, actual_result = zhmc_partition.perform_task(
-            params, check_mode)
+        actual_changed, actual_result, actual_job_uri = \
+            zhmc_partition.perform_task(params, check_mode)
 
         # Assert return values
         assert actual_changed == changed
         assert actual_result == result
+        assert actual_job_uri is None
 
         # Assert call to the desired action function
         assert ensure_active_func.call_args == mock.call(params, check_mode)
@@ -241,6 +286,8 @@ class TestZhmcPartitionPerformTask(unittest.TestCase):
         params = {
             'state': 'stopped',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
         check_mode = True
 
@@ -251,15 +298,16 @@ class TestZhmcPartitionPerformTask(unittest.TestCase):
         }
 
         # Prepare mocks
-        ensure_stopped_func.return_value = (changed, result)
+        ensure_stopped_func.return_value = (changed, result, None)
 
         # Exercise code
-        actual_changed, actual_result = zhmc_partition.perform_task(
-            params, check_mode)
+        actual_changed, actual_result, actual_job_uri = \
+            zhmc_partition.perform_task(params, check_mode)
 
         # Assert return values
         assert actual_changed == changed
         assert actual_result == result
+        assert actual_job_uri is None
 
         # Assert call to the desired action function
         assert ensure_stopped_func.call_args == mock.call(params, check_mode)
@@ -284,6 +332,8 @@ class TestZhmcPartitionPerformTask(unittest.TestCase):
         params = {
             'state': 'absent',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
         check_mode = False
 
@@ -294,15 +344,16 @@ class TestZhmcPartitionPerformTask(unittest.TestCase):
         }
 
         # Prepare mocks
-        ensure_absent_func.return_value = (changed, result)
+        ensure_absent_func.return_value = (changed, result, None)
 
         # Exercise code
-        actual_changed, actual_result = zhmc_partition.perform_task(
-            params, check_mode)
+        actual_changed, actual_result, actual_job_uri = \
+            zhmc_partition.perform_task(params, check_mode)
 
         # Assert return values
         assert actual_changed == changed
         assert actual_result == result
+        assert actual_job_uri is None
 
         # Assert call to the desired action function
         assert ensure_absent_func.call_args == mock.call(params, check_mode)
@@ -691,4 +742,87 @@ def test_partition_create_check_mode_partition(
                     format(prop_hmc_name, exp_prop_value)
 
 
+# Number of passes over the partition property table in the benchmark
+BENCHMARK_PASSES = 200
+
+
+def benchmark_input_properties():
+    """
+    Return the input properties for the benchmark of processing the partition
+    properties, as a dict with the default values of all normal (= non-
+    artificial) properties that can be set and have a default value.
+    """
+    input_props = {}
+    for prop_name in zhmc_partition.ZHMC_PARTITION_PROPERTIES:
+        p = zhmc_partition.ZHMC_PARTITION_SCHEMA[prop_name]
+        if prop_name in zhmc_partition.ARTIFICIAL_PROPERTY_DEPENDENCIES:
+            continue
+        if not p.allowed or not (p.create or p.update):
+            continue
+        if p.default in (None, zhmc_partition.SPECIAL_DEFAULT):
+            continue
+        input_props[prop_name] = p.default
+    return input_props
+
+
+class UncompiledSchema(object):
+    """
+    Property definitions that are compiled each time they are used, as a
+    baseline for the benchmark of the compiled property schema.
+    """
+
+    def __init__(self, resource_properties):
+        self.resource_properties = resource_properties
+
+    def __getitem__(self, name):
+        return module_utils.PropertyDef(name, self.resource_properties[name])
+
+
+@pytest.mark.parametrize(
+    "exists", [False, True])
+def test_partition_property_schema_benchmark(exists):
+    """
+    Micro-benchmark for processing the partition properties with the compiled
+    property schema, compared to compiling the property definitions from the
+    property definition dict when they are used.
+    """
+    input_props = benchmark_input_properties()
+    if exists:
+        partition = mock.Mock()
+        partition.properties = dict(
+            (zhmc_partition.ZHMC_PARTITION_SCHEMA[name].hmc_name, value)
+            for name, value in input_props.items())
+    else:
+        partition = None
+
+    def process(resource_properties):
+        results = []
+        for prop_name in input_props:
+            results.append(module_utils.process_normal_property(
+                prop_name, resource_properties, input_props, partition))
+        return results
+
+    uncompiled = UncompiledSchema(zhmc_partition.ZHMC_PARTITION_PROPERTIES)
+
+    # Exercise code
+    schema_results = process(zhmc_partition.ZHMC_PARTITION_SCHEMA)
+    dict_results = process(uncompiled)
+    schema_time = timeit.timeit(
+        lambda: process(zhmc_partition.ZHMC_PARTITION_SCHEMA),
+        number=BENCHMARK_PASSES)
+    dict_time = timeit.timeit(
+        lambda: process(uncompiled), number=BENCHMARK_PASSES)
+
+    print("\nProcessing {0} partition properties {1} times: "
+          "schema: {2:.4f} s, dict: {3:.4f} s".
+          format(len(input_props), BENCHMARK_PASSES, schema_time, dict_time))
+
+    assert schema_results == dict_results
+    for create_props, update_props, stop in schema_results:
+        if exists:
+            assert (create_props, update_props, stop) == ({}, {}, False)
+        else:
+            assert len(create_props) + len(update_props) == 1
+
+
 # The other functions of the module are tested with function tests.
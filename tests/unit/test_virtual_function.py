@@ -54,6 +54,8 @@ class TestZhmcVirtualFunctionMain(object):
             'name': 'fake-vfunction-name',
             'state': 'absent',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
 
         # Return values of perform_task()
@@ -100,6 +102,10 @@ class TestZhmcVirtualFunctionMain(object):
                        choices=['absent', 'present']),
             properties=dict(required=False, type='dict', default={}),
             log_file=dict(required=False, type='str', default=None),
+            log_level=dict(required=False, type='str', default='debug',
+                           choices=['debug', 'info', 'warning', 'error']),
+            hmc_log_level=dict(required=False, type='str', default='debug',
+                               choices=['debug', 'info', 'warning', 'error']),
             _faked_session=dict(required=False, type='raw'),
         )
         assert ansible_mod_cls.call_args == \
@@ -139,6 +145,8 @@ class TestZhmcVirtualFunctionMain(object):
             'name': 'fake-vfunction-name',
             'state': 'absent',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
 
         # Exception raised by perform_task()
@@ -192,6 +200,8 @@ class TestZhmcVirtualFunctionPerformTask(object):
         params = {
             'state': 'present',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
 
         # Prepare return values
@@ -233,6 +243,8 @@ class TestZhmcVirtualFunctionPerformTask(object):
         params = {
             'state': 'absent',
             'log_file': None,
+            'log_level': 'debug',
+            'hmc_log_level': 'debug',
         }
 
         # Prepare return values